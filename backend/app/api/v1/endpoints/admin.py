@@ -1,6 +1,6 @@
 import json
 from collections import Counter
-from datetime import datetime, timezone
+from datetime import date, datetime, time as dt_time, timedelta, timezone
 from typing import Dict, List, Optional, Set, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -10,6 +10,8 @@ from sqlalchemy import func, inspect, or_
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.diagnostico_sql import limpar_diagnostico_sql, relatorio_diagnostico_sql
+from app.core.paginacao import codificar_cursor, decodificar_cursor, filtro_depois_do_cursor
 from app.core.runtime_checks import build_runtime_report
 from app.core.security import require_papel
 from app.db.database import get_db
@@ -17,6 +19,9 @@ from app.models.auditoria_evento import AuditoriaEvento
 from app.models.papel import Papel
 from app.models.papel_permissao import PapelPermissao
 from app.models.user import User
+from app.services.auditoria_arquivo import arquivar_auditoria
+from app.services.auditoria_service import estatisticas_auditoria, facetas_auditoria
+from app.services.coorte_eco_service import consultar_coorte
 
 router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -41,6 +46,8 @@ PERMISSION_MODULES = [
 PERMISSION_MODULE_CODES = {item["codigo"] for item in PERMISSION_MODULES}
 _BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$", "$2$")
 _DIAGNOSTIC_SAMPLE_LIMIT = 10
+AUDITORIA_TOTAL_MAX = 10000
+_AUDITORIA_TABELA_OK: Set[str] = set()
 _PERMISSION_SEED_ALIASES = {
     "logistica": ("agenda", "clinicas"),
 }
@@ -534,6 +541,49 @@ def obter_hardening_readiness(
         "rollout_checklist": _montar_checklist_rollout(checks),
     }
 
+@router.get("/relatorios/eco-coorte")
+def relatorio_eco_coorte(
+    especie: Optional[str] = None,
+    raca: Optional[str] = None,
+    peso_min: Optional[float] = Query(default=None, ge=0),
+    peso_max: Optional[float] = Query(default=None, ge=0),
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None,
+    parametro: Optional[str] = Query(default=None, description="Chave do laudo (AE_Ao) ou prefixo (la_ao)"),
+    faixas_peso: Optional[str] = Query(default=None, description="Limites em kg separados por virgula, ex.: 5,10,20"),
+    interpolar: bool = False,
+    current_user: User = Depends(require_papel("admin")),
+    db: Session = Depends(get_db),
+):
+    """Distribuicao das medidas de eco de uma coorte (z-scores e percentis contra ReferenciaEco)."""
+    _ = current_user
+    limites: List[float] = []
+    if faixas_peso:
+        try:
+            limites = [float(item) for item in faixas_peso.split(",") if item.strip()]
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="faixas_peso deve ser uma lista de numeros separados por virgula.",
+            )
+
+    try:
+        return consultar_coorte(
+            db,
+            especie=especie,
+            raca=raca,
+            peso_min=peso_min,
+            peso_max=peso_max,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            parametro=parametro,
+            faixas_peso=limites,
+            interpolar=interpolar,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
 @router.get("/papeis", response_model=List[PapelAdminResponse])
 def listar_papeis(
     current_user: User = Depends(require_papel("admin")),
@@ -799,6 +849,53 @@ def desativar_usuario(
     return {"message": "Usuario desativado com sucesso.", "id": usuario_id, "ativo": 0}
 
 
+@router.get("/diagnostico/sql")
+def obter_diagnostico_sql(current_user: User = Depends(require_papel("admin"))):
+    """Consultas lentas (com plano) e N+1 por rota vistos desde o ultimo reset.
+
+    Vazio a menos que SQL_DIAGNOSTICO esteja ligado.
+    """
+    _ = current_user
+    return relatorio_diagnostico_sql()
+
+
+@router.delete("/diagnostico/sql")
+def limpar_diagnostico(current_user: User = Depends(require_papel("admin"))):
+    _ = current_user
+    limpar_diagnostico_sql()
+    return {"message": "Diagnostico de SQL limpo."}
+
+
+@router.get("/auditoria/fila")
+def obter_fila_auditoria(current_user: User = Depends(require_papel("admin"))):
+    """Backlog, descartes e falhas do gravador assincrono de auditoria."""
+    _ = current_user
+    return estatisticas_auditoria()
+
+
+def _tabela_auditoria_existe(db: Session) -> bool:
+    # So o resultado positivo fica em cache: a tabela nao some depois de criada.
+    chave = str(db.bind.url)
+    if chave in _AUDITORIA_TABELA_OK:
+        return True
+    if "auditoria_eventos" not in inspect(db.bind).get_table_names():
+        return False
+    _AUDITORIA_TABELA_OK.add(chave)
+    return True
+
+
+def _parse_data_filtro(valor: Optional[str], campo: str) -> Optional[date]:
+    if not valor or not valor.strip():
+        return None
+    try:
+        return date.fromisoformat(valor.strip()[:10])
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{campo} invalida (use AAAA-MM-DD).",
+        )
+
+
 @router.get("/auditoria")
 def listar_auditoria(
     modulo: Optional[str] = None,
@@ -807,15 +904,25 @@ def listar_auditoria(
     busca: Optional[str] = None,
     data_inicio: Optional[str] = None,
     data_fim: Optional[str] = None,
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(require_papel("admin")),
     db: Session = Depends(get_db),
 ):
+    """Eventos de auditoria, do mais recente para o mais antigo.
+
+    Paginacao por cursor: passe `next_cursor` da resposta anterior em
+    `cursor` (`skip` continua aceito, mas custa O(skip)). `total` so vem na
+    primeira pagina e para de contar em AUDITORIA_TOTAL_MAX
+    (`total_exato=False`).
+    """
     _ = current_user
-    if "auditoria_eventos" not in inspect(db.bind).get_table_names():
-        return {"total": 0, "items": [], "modulos": [], "acoes": []}
+    if not _tabela_auditoria_existe(db):
+        return {"total": 0, "total_exato": True, "items": [], "modulos": [], "acoes": [], "next_cursor": None}
 
+    inicio = _parse_data_filtro(data_inicio, "data_inicio")
+    fim = _parse_data_filtro(data_fim, "data_fim")
     query = db.query(AuditoriaEvento)
 
     if modulo:
@@ -836,21 +943,34 @@ def listar_auditoria(
             )
         )
 
-    if data_inicio:
-        query = query.filter(func.date(AuditoriaEvento.created_at) >= data_inicio)
-    if data_fim:
-        query = query.filter(func.date(AuditoriaEvento.created_at) <= data_fim)
-
-    total = query.count()
-    rows = (
-        query.order_by(AuditoriaEvento.created_at.desc(), AuditoriaEvento.id.desc())
-        .offset(skip)
-        .limit(max(1, min(limit, 500)))
-        .all()
-    )
+    # Intervalo sobre a coluna (usa o indice e a poda de particoes), nao date().
+    if inicio:
+        query = query.filter(AuditoriaEvento.created_at >= datetime.combine(inicio, dt_time.min))
+    if fim:
+        query = query.filter(AuditoriaEvento.created_at < datetime.combine(fim + timedelta(days=1), dt_time.min))
 
-    modulos = [row[0] for row in db.query(AuditoriaEvento.modulo).distinct().order_by(AuditoriaEvento.modulo.asc()).all()]
-    acoes = [row[0] for row in db.query(AuditoriaEvento.acao).distinct().order_by(AuditoriaEvento.acao.asc()).all()]
+    total: Optional[int] = None
+    total_exato = True
+    if cursor:
+        cursor_created_at, cursor_id = decodificar_cursor(cursor, "Cursor de auditoria")
+        query = query.filter(
+            filtro_depois_do_cursor(AuditoriaEvento.created_at, AuditoriaEvento.id, cursor_created_at, cursor_id)
+        )
+    else:
+        amostra = query.with_entities(AuditoriaEvento.id).limit(AUDITORIA_TOTAL_MAX + 1).subquery()
+        total = db.query(func.count()).select_from(amostra).scalar() or 0
+        if total > AUDITORIA_TOTAL_MAX:
+            total, total_exato = AUDITORIA_TOTAL_MAX, False
+
+    limit = max(1, min(limit, 500))
+    query = query.order_by(AuditoriaEvento.created_at.desc(), AuditoriaEvento.id.desc())
+    if not cursor and skip > 0:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+    next_cursor = codificar_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    rows = rows[:limit]
+
+    modulos, acoes = facetas_auditoria(db)
 
     def _parse_detalhes(raw: Optional[str]) -> dict:
         if not raw:
@@ -890,7 +1010,25 @@ def listar_auditoria(
 
     return {
         "total": total,
+        "total_exato": total_exato,
         "items": items,
         "modulos": modulos,
         "acoes": acoes,
+        "next_cursor": next_cursor,
     }
+
+
+@router.post("/auditoria/arquivar")
+def arquivar_auditoria_antiga(
+    dry_run: bool = True,
+    retencao_dias: Optional[int] = Query(default=None, ge=1),
+    current_user: User = Depends(require_papel("admin")),
+):
+    """Arquiva (ou simula, em dry-run) os eventos alem da retencao em NDJSON gzip."""
+    _ = current_user
+    if retencao_dias is None and int(settings.AUDITORIA_RETENCAO_DIAS or 0) <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe retencao_dias ou configure AUDITORIA_RETENCAO_DIAS.",
+        )
+    return arquivar_auditoria(retencao_dias=retencao_dias, dry_run=dry_run)
@@ -10,11 +10,11 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy import func
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import case, func, or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.models.agendamento import Agendamento
 from app.models.paciente import Paciente
 from app.models.clinica import Clinica
@@ -40,7 +40,12 @@ from app.core.agenda_config import (
 )
 from app.core.agenda_realtime import agenda_realtime_manager
 from app.core.security import get_current_user
-from app.services.logistica_service import normalizar_perfil, obter_duracao_deslocamento
+from app.services.logistica_service import (
+    carregar_matriz_duracoes,
+    normalizar_perfil,
+    obter_duracao_deslocamento,
+)
+from app.services.rota_service import MAX_VISITAS as MAX_VISITAS_ROTA, Visita, otimizar_rota
 from app.services.precos_service import calcular_preco_servico
 from app.services.auditoria_service import registrar_auditoria
 
@@ -49,6 +54,10 @@ router = APIRouter()
 LOCAL_TZ = timezone(timedelta(hours=-3))
 AGENDA_STATUS_PERMITIDOS = ["Agendado", "Reservado", "Confirmado", "Em atendimento", "Realizado", "Cancelado", "Faltou"]
 MIN_MARGEM_SEGURA_DESLOCAMENTO_MIN = 10
+# Nenhum atendimento passa de um dia (validado na criacao e na edicao); e o
+# limite inferior da busca de sobreposicao em _validar_slot_disponivel.
+DURACAO_MAXIMA_AGENDAMENTO = timedelta(hours=24)
+CONSTRAINT_SOBREPOSICAO = "ex_agendamentos_sem_sobreposicao"
 
 
 class SugestaoHorarioPayload(BaseModel):
@@ -62,6 +71,22 @@ class SugestaoHorarioPayload(BaseModel):
     ignorar_agendamento_id: Optional[int] = Field(default=None, ge=1)
 
 
+class VisitaRotaPayload(BaseModel):
+    clinica_id: int = Field(..., ge=1)
+    duracao_minutos: int = Field(default=30, ge=5, le=720)
+    janela_inicio: Optional[str] = Field(default=None, description="Inicio mais cedo (HH:MM)")
+    janela_fim: Optional[str] = Field(default=None, description="Inicio mais tarde (HH:MM)")
+    referencia: Optional[str] = None
+
+
+class RotaOtimizadaPayload(BaseModel):
+    data: str = Field(..., description="Data no formato YYYY-MM-DD")
+    perfil_deslocamento: str = Field(default="comercial")
+    origem_clinica_id: Optional[int] = Field(default=None, ge=1)
+    # Sem visitas: otimiza os agendamentos ativos do dia.
+    visitas: Optional[list[VisitaRotaPayload]] = Field(default=None, max_length=MAX_VISITAS_ROTA)
+
+
 def _parse_hora_hhmm(value: Optional[str], fallback: str) -> str:
     raw = str(value or "").strip()
     if len(raw) != 5 or raw[2] != ":":
@@ -139,7 +164,16 @@ def _obter_janela_funcionamento_data(
         return None, None, "Data invalida. Use o formato YYYY-MM-DD."
 
     agenda_semanal, agenda_feriados, agenda_excecoes = _obter_regras_agenda(db)
+    return _janela_funcionamento(data_ref, agenda_semanal, agenda_feriados, agenda_excecoes)
+
 
+def _janela_funcionamento(
+    data_ref: date,
+    agenda_semanal: dict,
+    agenda_feriados: list,
+    agenda_excecoes: list,
+) -> tuple[Optional[datetime], Optional[datetime], Optional[str]]:
+    """Janela de funcionamento da data com regras ja carregadas (uso em lote)."""
     excecao = obter_excecao_data(data_ref, agenda_excecoes)
     if excecao is not None:
         if not bool(excecao.get("ativo", False)):
@@ -527,6 +561,35 @@ def _validar_agendamento_no_funcionamento(db: Session, agendamento: Agendamento)
         raise HTTPException(status_code=422, detail=mensagem)
 
 
+def _reservar_escrita_sqlite(db: Session) -> None:
+    """No SQLite, abre a transacao com BEGIN IMMEDIATE antes da checagem de slot.
+
+    Assim checagem e gravacao ficam atomicas: outro writer espera o commit
+    (busy_timeout) e ja enxerga o agendamento gravado. Como o lock e do banco
+    todo, nada lento (validacao de deslocamento, APIs de rota) roda depois dele. No Postgres quem garante
+    e a constraint de exclusao da migracao 20260321_17.
+    """
+    connection = db.connection()
+    if connection.dialect.name != "sqlite":
+        return
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _commit_agendamento(db: Session) -> None:
+    """Commit que traduz a constraint de exclusao de horario no 409 da agenda."""
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if CONSTRAINT_SOBREPOSICAO in str(getattr(exc, "orig", exc)):
+            raise HTTPException(
+                status_code=409,
+                detail="Horario indisponivel: ja existe atendimento neste slot.",
+            ) from exc
+        raise
+
+
 def _validar_slot_disponivel(
     db: Session,
     agendamento: Agendamento,
@@ -552,13 +615,25 @@ def _validar_slot_disponivel(
 
     if fim_local <= inicio_local:
         raise HTTPException(status_code=422, detail="Horario final invalido para validar disponibilidade.")
+    if fim_dt - inicio_dt > DURACAO_MAXIMA_AGENDAMENTO:
+        # Sem este corte, um agendamento mais longo escaparia da faixa abaixo.
+        raise HTTPException(status_code=422, detail="Agendamento nao pode durar mais de 24 horas.")
 
-    data_referencia = inicio_local.date().isoformat()
-
+    # Faixa sargavel sobre ix_agendamentos_inicio; o corte exato (fim ausente
+    # conta como 30 min) continua abaixo, sobre poucas linhas.
+    _reservar_escrita_sqlite(db)
     query = (
         db.query(Agendamento)
         .filter(Agendamento.status != "Cancelado")
-        .filter(func.date(Agendamento.inicio) == data_referencia)
+        .filter(Agendamento.inicio < fim_dt)
+        .filter(Agendamento.inicio > inicio_dt - DURACAO_MAXIMA_AGENDAMENTO)
+        .filter(
+            or_(
+                Agendamento.fim.is_(None),
+                Agendamento.fim > inicio_dt,
+                Agendamento.fim <= Agendamento.inicio,
+            )
+        )
     )
     if agendamento_id_excluir is not None:
         query = query.filter(Agendamento.id != agendamento_id_excluir)
@@ -955,6 +1030,108 @@ def agendamentos_hoje(
     return {"total": len(items), "items": items}
 
 
+def _duracao_minutos_sql(dialeto: str):
+    """Duracao (min) de cada agendamento em SQL; fim ausente/invalido vale 30 min."""
+    if dialeto == "postgresql":
+        bruta = func.extract("epoch", Agendamento.fim - Agendamento.inicio) / 60
+    else:
+        bruta = (func.julianday(Agendamento.fim) - func.julianday(Agendamento.inicio)) * 1440
+    return case(
+        (or_(Agendamento.fim.is_(None), Agendamento.fim <= Agendamento.inicio), 30),
+        else_=bruta,
+    )
+
+
+@router.get("/calendario")
+def calendario_mensal(
+    mes: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Mapa de calor do mes (YYYY-MM): por dia, contagem por status e por clinica e
+    minutos agendados x disponiveis na janela de funcionamento.
+
+    Uma unica agregacao (GROUP BY data, status, clinica) sobre a coluna indexada
+    `data`; cancelados contam no status, mas nao ocupam minutos.
+    """
+    referencia = (mes or datetime.now(LOCAL_TZ).strftime("%Y-%m")).strip()
+    try:
+        primeiro_dia = datetime.strptime(f"{referencia}-01", "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Mes invalido. Use o formato YYYY-MM.")
+    proximo_mes = (primeiro_dia + timedelta(days=32)).replace(day=1)
+    ultimo_dia = proximo_mes - timedelta(days=1)
+
+    duracao = _duracao_minutos_sql(db.get_bind().dialect.name)
+    linhas = (
+        db.query(
+            Agendamento.data,
+            Agendamento.status,
+            Agendamento.clinica_id,
+            Clinica.nome,
+            func.count(Agendamento.id),
+            func.sum(duracao),
+        )
+        .outerjoin(Clinica, Agendamento.clinica_id == Clinica.id)
+        .filter(Agendamento.data >= primeiro_dia.isoformat(), Agendamento.data <= ultimo_dia.isoformat())
+        .group_by(Agendamento.data, Agendamento.status, Agendamento.clinica_id, Clinica.nome)
+        .all()
+    )
+
+    por_dia: dict[str, dict] = {}
+    clinicas: dict[Optional[int], dict] = {}
+    for data_iso, status_ag, clinica_id, clinica_nome, quantidade, minutos in linhas:
+        dia = por_dia.setdefault(str(data_iso)[:10], {"por_status": {}, "por_clinica": {}, "minutos_agendados": 0})
+        status_ag = str(status_ag or "").strip() or "Agendado"
+        quantidade = int(quantidade or 0)
+        dia["por_status"][status_ag] = dia["por_status"].get(status_ag, 0) + quantidade
+        dia["por_clinica"][clinica_id] = dia["por_clinica"].get(clinica_id, 0) + quantidade
+        if status_ag != "Cancelado":
+            dia["minutos_agendados"] += int(round(float(minutos or 0)))
+        clinica = clinicas.setdefault(clinica_id, {"clinica_id": clinica_id, "nome": clinica_nome, "total": 0})
+        clinica["total"] += quantidade
+
+    agenda_semanal, agenda_feriados, agenda_excecoes = _obter_regras_agenda(db)
+    dias = []
+    totais = {"total": 0, "por_status": {}, "minutos_agendados": 0, "minutos_disponiveis": 0}
+    data_ref = primeiro_dia
+    while data_ref <= ultimo_dia:
+        dados = por_dia.get(data_ref.isoformat(), {"por_status": {}, "por_clinica": {}, "minutos_agendados": 0})
+        inicio, fim, motivo = _janela_funcionamento(data_ref, agenda_semanal, agenda_feriados, agenda_excecoes)
+        disponiveis = int((fim - inicio).total_seconds() // 60) if inicio and fim else 0
+        total_dia = sum(dados["por_status"].values())
+        dias.append(
+            {
+                "data": data_ref.isoformat(),
+                "total": total_dia,
+                "por_status": dados["por_status"],
+                "por_clinica": [
+                    {"clinica_id": clinica_id, "total": quantidade}
+                    for clinica_id, quantidade in sorted(dados["por_clinica"].items(), key=lambda item: (-item[1], item[0] or 0))
+                ],
+                "minutos_agendados": dados["minutos_agendados"],
+                "minutos_disponiveis": disponiveis,
+                "ocupacao": round(dados["minutos_agendados"] / disponiveis, 4) if disponiveis else None,
+                "fechado": motivo is not None,
+                "motivo_fechamento": motivo,
+            }
+        )
+        totais["total"] += total_dia
+        for status_ag, quantidade in dados["por_status"].items():
+            totais["por_status"][status_ag] = totais["por_status"].get(status_ag, 0) + quantidade
+        totais["minutos_agendados"] += dados["minutos_agendados"]
+        totais["minutos_disponiveis"] += disponiveis
+        data_ref += timedelta(days=1)
+
+    return {
+        "mes": primeiro_dia.strftime("%Y-%m"),
+        "dias": dias,
+        "clinicas": sorted(clinicas.values(), key=lambda item: (-item["total"], item["clinica_id"] or 0)),
+        "totais": totais,
+    }
+
+
 @router.get("/stream")
 async def stream_agenda(
     request: Request,
@@ -1165,6 +1342,118 @@ def sugerir_horarios_agenda(
     }
 
 
+def _minutos_para_hhmm(minutos: int) -> str:
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def _janela_visita_minutos(value: Optional[str], campo: str) -> Optional[int]:
+    if value is None or not str(value).strip():
+        return None
+    hora = _parse_hora_hhmm(value, "")
+    if not hora:
+        raise HTTPException(status_code=422, detail=f"{campo} invalido. Use HH:MM.")
+    return _hora_para_minutos(hora)
+
+
+@router.post("/rota-otimizada")
+def otimizar_rota_dia(
+    payload: RotaOtimizadaPayload,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Propoe a ordem de visitas do dia com menor deslocamento entre clinicas.
+
+    Usa os agendamentos ativos da data ou, se `visitas` vier preenchido, um
+    conjunto de solicitacoes pendentes com janelas opcionais de horario.
+    """
+    data_iso = _extract_date_filter(payload.data)
+    if not data_iso:
+        raise HTTPException(status_code=422, detail="Data invalida. Use o formato YYYY-MM-DD.")
+
+    janela_inicio, janela_fim, motivo_fechado = _obter_janela_funcionamento_data(db, data_iso)
+    if janela_inicio is None or janela_fim is None:
+        raise HTTPException(status_code=422, detail=motivo_fechado or "Sem janela de funcionamento nesta data.")
+    inicio_jornada = janela_inicio.hour * 60 + janela_inicio.minute
+    fim_jornada = janela_fim.hour * 60 + janela_fim.minute
+
+    ignorados: list[dict] = []
+    visitas: list[Visita] = []
+    if payload.visitas is not None:
+        for indice, item in enumerate(payload.visitas):
+            visitas.append(
+                Visita(
+                    referencia=item.referencia or str(indice),
+                    clinica_id=int(item.clinica_id),
+                    duracao_min=int(item.duracao_minutos),
+                    janela_inicio_min=_janela_visita_minutos(item.janela_inicio, "janela_inicio"),
+                    janela_fim_min=_janela_visita_minutos(item.janela_fim, "janela_fim"),
+                )
+            )
+    else:
+        for item in _listar_agendamentos_ativos_do_dia(db, data_iso):
+            if not item.get("clinica_id"):
+                ignorados.append({"agendamento_id": item["id"], "motivo": "Agendamento sem clinica."})
+                continue
+            visitas.append(
+                Visita(
+                    referencia=item["id"],
+                    clinica_id=int(item["clinica_id"]),
+                    duracao_min=max(5, _minutos_entre(item["inicio"], item["fim"])),
+                )
+            )
+
+    perfil_norm = normalizar_perfil(payload.perfil_deslocamento)
+    clinica_ids = {v.clinica_id for v in visitas}
+    if payload.origem_clinica_id:
+        clinica_ids.add(int(payload.origem_clinica_id))
+    matriz = carregar_matriz_duracoes(db, clinica_ids, perfil=perfil_norm)
+    nomes = {
+        int(cid): str(nome or "").strip() or f"Clinica #{int(cid)}"
+        for cid, nome in db.query(Clinica.id, Clinica.nome).filter(Clinica.id.in_(clinica_ids)).all()
+    } if clinica_ids else {}
+
+    resultado = otimizar_rota(
+        visitas,
+        matriz,
+        inicio_jornada_min=inicio_jornada,
+        fim_jornada_min=fim_jornada,
+        origem_clinica_id=payload.origem_clinica_id,
+    )
+    proposta = resultado["proposta"]
+
+    def _etapa(etapa: dict) -> dict:
+        chave = "agendamento_id" if payload.visitas is None else "referencia"
+        return {
+            chave: etapa["referencia"],
+            "clinica_id": etapa["clinica_id"],
+            "clinica": nomes.get(etapa["clinica_id"], f"Clinica #{etapa['clinica_id']}"),
+            "chegada": _minutos_para_hhmm(etapa["chegada_min"]),
+            "inicio": _minutos_para_hhmm(etapa["inicio_min"]),
+            "fim": _minutos_para_hhmm(etapa["fim_min"]),
+            "deslocamento_min": etapa["deslocamento_min"],
+            "espera_min": etapa["espera_min"],
+        }
+
+    return {
+        "ok": True,
+        "data": data_iso,
+        "perfil_deslocamento": perfil_norm,
+        "metodo": resultado["metodo"],
+        "janela": {
+            "inicio": janela_inicio.strftime("%Y-%m-%d %H:%M"),
+            "fim": janela_fim.strftime("%Y-%m-%d %H:%M"),
+        },
+        "viavel": proposta["viavel"],
+        "atraso_min": proposta["violacao_min"],
+        "deslocamento_total_min": proposta["deslocamento_total_min"],
+        "deslocamento_atual_min": resultado["atual"]["deslocamento_total_min"],
+        "economia_min": resultado["economia_min"],
+        "termino": _minutos_para_hhmm(proposta["termino_min"]),
+        "items": [_etapa(etapa) for etapa in proposta["etapas"]],
+        "ignorados": ignorados,
+    }
+
+
 @router.get("/{agendamento_id}", response_model=AgendamentoResponse)
 def obter_agendamento(
     agendamento_id: int,
@@ -1206,12 +1495,14 @@ def criar_agendamento(
 
     _apply_service_duration_if_needed(db, db_agendamento)
     _validar_agendamento_no_funcionamento(db, db_agendamento)
-    _validar_slot_disponivel(db, db_agendamento)
+    # Deslocamento (chamadas HTTP de rota) antes do BEGIN IMMEDIATE da checagem
+    # de slot: o lock de escrita do SQLite so vale para checagem e gravacao.
     _validar_deslocamento_agendamento(
         db,
         db_agendamento,
         permitir_confirmacao=confirmar_conflito_deslocamento,
     )
+    _validar_slot_disponivel(db, db_agendamento)
     _fill_data_hora_from_inicio(db_agendamento)
     related = _fetch_related_names(db, db_agendamento)
     _sync_denormalized_fields(db_agendamento, related)
@@ -1223,7 +1514,7 @@ def criar_agendamento(
     )
 
     db.add(db_agendamento)
-    db.commit()
+    _commit_agendamento(db)
     db.refresh(db_agendamento)
     contexto = _contexto_agendamento_auditoria(db_agendamento, related)
 
@@ -1323,23 +1614,23 @@ def atualizar_agendamento(
 
         if alterou_horario or reativando_cancelado:
             _validar_agendamento_no_funcionamento(db, db_agendamento)
-            _validar_slot_disponivel(db, db_agendamento, agendamento_id_excluir=agendamento_id)
             _validar_deslocamento_agendamento(
                 db,
                 db_agendamento,
                 agendamento_id_excluir=agendamento_id,
                 permitir_confirmacao=confirmar_conflito_deslocamento,
             )
+            _validar_slot_disponivel(db, db_agendamento, agendamento_id_excluir=agendamento_id)
     elif reativando_cancelado:
         _apply_service_duration_if_needed(db, db_agendamento)
         _validar_agendamento_no_funcionamento(db, db_agendamento)
-        _validar_slot_disponivel(db, db_agendamento, agendamento_id_excluir=agendamento_id)
         _validar_deslocamento_agendamento(
             db,
             db_agendamento,
             agendamento_id_excluir=agendamento_id,
             permitir_confirmacao=confirmar_conflito_deslocamento,
         )
+        _validar_slot_disponivel(db, db_agendamento, agendamento_id_excluir=agendamento_id)
     if "inicio" in update_data:
         _fill_data_hora_from_inicio(db_agendamento)
 
@@ -1356,7 +1647,7 @@ def atualizar_agendamento(
     db_agendamento.atualizado_em = datetime.now()
     db_agendamento.updated_at = datetime.now()
 
-    db.commit()
+    _commit_agendamento(db)
     db.refresh(db_agendamento)
     contexto = _contexto_agendamento_auditoria(db_agendamento, related)
 
@@ -1451,8 +1742,8 @@ def atualizar_status(
     if status_anterior == "Cancelado" and status_normalizado != "Cancelado":
         _apply_service_duration_if_needed(db, db_agendamento)
         _validar_agendamento_no_funcionamento(db, db_agendamento)
-        _validar_slot_disponivel(db, db_agendamento, agendamento_id_excluir=agendamento_id)
         _validar_deslocamento_agendamento(db, db_agendamento, agendamento_id_excluir=agendamento_id)
+        _validar_slot_disponivel(db, db_agendamento, agendamento_id_excluir=agendamento_id)
     db_agendamento.atualizado_em = datetime.now()
     db_agendamento.updated_at = datetime.now()
 
@@ -1466,7 +1757,7 @@ def atualizar_status(
     mensagens_adicionais: list[str] = []
 
     try:
-        db.commit()
+        _commit_agendamento(db)
         db.refresh(db_agendamento)
     except SQLAlchemyError:
         db.rollback()
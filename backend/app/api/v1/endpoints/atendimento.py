@@ -1,19 +1,14 @@
 from datetime import datetime, timedelta
-from io import BytesIO
-import re
+import os
 from typing import Any, Dict, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel, Field
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import mm
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
-from sqlalchemy import or_
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session
 
+from app.core.paginacao import codificar_cursor, decodificar_cursor, filtro_depois_do_cursor
 from app.core.security import get_current_user
 from app.db.database import get_db
 from app.models.agendamento import Agendamento
@@ -31,9 +26,28 @@ from app.models.laudo import Exame
 from app.models.paciente import Paciente
 from app.models.tutor import Tutor
 from app.models.user import User
+from app.services.atendimento_pdf_service import (
+    DOCUMENTO_EXAMES,
+    DOCUMENTO_PRESCRICAO,
+    compute_atendimento_pdf_cache_key,
+)
+from app.services.laudo_pdf_jobs import (
+    JOB_STATUS_COMPLETED,
+    JOB_STATUS_PENDING,
+    JOB_STATUS_PROCESSING,
+    enqueue_atendimento_pdf_job,
+    get_atendimento_pdf_job,
+    serialize_laudo_pdf_job,
+    submit_laudo_pdf_job,
+    wait_for_pdf_job,
+)
 
 router = APIRouter()
 
+# Quanto uma requisicao de download espera o job antes de responder 202 com o
+# status do job (o cliente segue pelo GET /pdf-jobs/{job_id}).
+ESPERA_PDF_SEGUNDOS = 3
+
 
 class ExameSolicitacaoPayload(BaseModel):
     id: Optional[int] = None
@@ -211,252 +225,6 @@ def _to_iso(value: Any) -> Optional[str]:
     return str(value)
 
 
-def _formatar_data_hora(value: Any) -> str:
-    if not value:
-        return "-"
-    if isinstance(value, datetime):
-        return value.strftime("%d/%m/%Y %H:%M")
-    try:
-        parsed = _parse_datetime(str(value))
-        if parsed:
-            return parsed.strftime("%d/%m/%Y %H:%M")
-    except Exception:
-        pass
-    return str(value)
-
-
-def _nome_arquivo_limpo(raw: str, fallback: str) -> str:
-    cleaned = re.sub(r"[^A-Za-z0-9_-]+", "_", (raw or "").strip()).strip("_")
-    return cleaned or fallback
-
-
-def _montar_story_cabecalho_atendimento(
-    atendimento: AtendimentoClinico,
-    paciente: Optional[Paciente],
-    tutor: Optional[Tutor],
-    clinica: Optional[Clinica],
-    titulo: str,
-) -> list:
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        "AtendimentoPdfTitle",
-        parent=styles["Heading1"],
-        fontName="Helvetica-Bold",
-        fontSize=16,
-        spaceAfter=8,
-    )
-    normal = ParagraphStyle(
-        "AtendimentoPdfNormal",
-        parent=styles["BodyText"],
-        fontName="Helvetica",
-        fontSize=10,
-        leading=13,
-    )
-
-    story: list = []
-    story.append(Paragraph(titulo, title_style))
-    story.append(Paragraph(f"<b>Atendimento:</b> #{atendimento.id}", normal))
-    story.append(Paragraph(f"<b>Data:</b> {_formatar_data_hora(atendimento.data_atendimento)}", normal))
-    story.append(Paragraph(f"<b>Status:</b> {atendimento.status or '-'}", normal))
-    story.append(Paragraph(f"<b>Paciente:</b> {(paciente.nome if paciente else '-')}", normal))
-    story.append(Paragraph(f"<b>Tutor:</b> {(tutor.nome if tutor else '-')}", normal))
-    story.append(Paragraph(f"<b>Clinica:</b> {(clinica.nome if clinica else '-')}", normal))
-    story.append(Paragraph(f"<b>Veterinario:</b> {atendimento.criado_por_nome or '-'}", normal))
-    story.append(Spacer(1, 4 * mm))
-    return story
-
-
-def _gerar_pdf_prescricao_bytes(
-    atendimento: AtendimentoClinico,
-    paciente: Optional[Paciente],
-    tutor: Optional[Tutor],
-    clinica: Optional[Clinica],
-    prescricao: PrescricaoClinica,
-    itens: List[PrescricaoItem],
-) -> bytes:
-    styles = getSampleStyleSheet()
-    normal = ParagraphStyle(
-        "AtendimentoPdfBody",
-        parent=styles["BodyText"],
-        fontName="Helvetica",
-        fontSize=10,
-        leading=13,
-    )
-    heading = ParagraphStyle(
-        "AtendimentoPdfHeading",
-        parent=styles["Heading3"],
-        fontName="Helvetica-Bold",
-        fontSize=12,
-        spaceAfter=5,
-    )
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        leftMargin=15 * mm,
-        rightMargin=15 * mm,
-        topMargin=12 * mm,
-        bottomMargin=12 * mm,
-        title=f"Receita - Atendimento {atendimento.id}",
-    )
-
-    story = _montar_story_cabecalho_atendimento(
-        atendimento,
-        paciente,
-        tutor,
-        clinica,
-        "Receita Veterinaria",
-    )
-
-    data = [[
-        "Medicamento",
-        "Dose",
-        "Frequencia",
-        "Duracao",
-        "Via",
-        "Instrucoes",
-    ]]
-    for idx, item in enumerate(itens, start=1):
-        data.append([
-            f"{idx}. {item.medicamento_nome or '-'}",
-            item.dose or "-",
-            item.frequencia or "-",
-            item.duracao or "-",
-            item.via or "-",
-            item.instrucoes or "-",
-        ])
-
-    table = Table(
-        data,
-        colWidths=[52 * mm, 20 * mm, 24 * mm, 19 * mm, 17 * mm, 48 * mm],
-        repeatRows=1,
-    )
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e5e7eb")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#111827")),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-        ("FONTSIZE", (0, 0), (-1, -1), 9),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#d1d5db")),
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("LEFTPADDING", (0, 0), (-1, -1), 4),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-        ("TOPPADDING", (0, 0), (-1, -1), 4),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-    ]))
-    story.append(table)
-    story.append(Spacer(1, 5 * mm))
-
-    story.append(Paragraph("Orientacoes Gerais", heading))
-    story.append(Paragraph((prescricao.orientacoes_gerais or "-").replace("\n", "<br/>"), normal))
-    if prescricao.retorno_dias:
-        story.append(Spacer(1, 3 * mm))
-        story.append(Paragraph(f"<b>Retorno sugerido:</b> {prescricao.retorno_dias} dia(s)", normal))
-
-    doc.build(story)
-    pdf = buffer.getvalue()
-    buffer.close()
-    return pdf
-
-
-def _gerar_pdf_exames_bytes(
-    atendimento: AtendimentoClinico,
-    paciente: Optional[Paciente],
-    tutor: Optional[Tutor],
-    clinica: Optional[Clinica],
-    exames: List[Exame],
-) -> bytes:
-    styles = getSampleStyleSheet()
-    normal = ParagraphStyle(
-        "AtendimentoPdfBodyExames",
-        parent=styles["BodyText"],
-        fontName="Helvetica",
-        fontSize=10,
-        leading=13,
-    )
-    heading = ParagraphStyle(
-        "AtendimentoPdfHeadingExames",
-        parent=styles["Heading3"],
-        fontName="Helvetica-Bold",
-        fontSize=12,
-        spaceAfter=5,
-    )
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        leftMargin=15 * mm,
-        rightMargin=15 * mm,
-        topMargin=12 * mm,
-        bottomMargin=12 * mm,
-        title=f"Solicitacao de exames - Atendimento {atendimento.id}",
-    )
-
-    story = _montar_story_cabecalho_atendimento(
-        atendimento,
-        paciente,
-        tutor,
-        clinica,
-        "Solicitacao de Exames",
-    )
-
-    data = [[
-        "Exame",
-        "Prioridade",
-        "Status",
-        "Data solicitacao",
-        "Valor",
-        "Observacoes",
-    ]]
-    for idx, exame in enumerate(exames, start=1):
-        valor = "-"
-        if exame.valor not in (None, ""):
-            try:
-                valor = f"R$ {float(exame.valor):.2f}"
-            except Exception:
-                valor = str(exame.valor)
-
-        data.append([
-            f"{idx}. {exame.tipo_exame or '-'}",
-            exame.prioridade or "-",
-            exame.status or "-",
-            _formatar_data_hora(exame.data_solicitacao),
-            valor,
-            exame.observacoes or "-",
-        ])
-
-    table = Table(
-        data,
-        colWidths=[50 * mm, 24 * mm, 20 * mm, 25 * mm, 18 * mm, 43 * mm],
-        repeatRows=1,
-    )
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#dbeafe")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#111827")),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-        ("FONTSIZE", (0, 0), (-1, -1), 9),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#d1d5db")),
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("LEFTPADDING", (0, 0), (-1, -1), 4),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-        ("TOPPADDING", (0, 0), (-1, -1), 4),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-    ]))
-    story.append(table)
-    story.append(Spacer(1, 5 * mm))
-
-    story.append(Paragraph("Observacoes clinicas", heading))
-    story.append(Paragraph((atendimento.observacoes or "-").replace("\n", "<br/>"), normal))
-
-    doc.build(story)
-    pdf = buffer.getvalue()
-    buffer.close()
-    return pdf
-
-
 def _resolver_tutor_paciente(db: Session, paciente_id: int) -> Optional[int]:
     paciente = db.query(Paciente).filter(Paciente.id == paciente_id).first()
     if not paciente:
@@ -607,60 +375,84 @@ def _sync_prescricao(
     return prescricao
 
 
-def _montar_detalhe_atendimento(
+def _carregar_relacionados_atendimentos(
     db: Session,
-    atendimento: AtendimentoClinico,
-) -> dict:
-    paciente = db.query(Paciente).filter(Paciente.id == atendimento.paciente_id).first()
-    tutor = None
-    if atendimento.tutor_id:
-        tutor = db.query(Tutor).filter(Tutor.id == atendimento.tutor_id).first()
-    clinica = None
-    if atendimento.clinica_id:
-        clinica = db.query(Clinica).filter(Clinica.id == atendimento.clinica_id).first()
-
-    exames = (
-        db.query(Exame)
-        .filter(Exame.atendimento_id == atendimento.id)
-        .order_by(Exame.id.asc())
-        .all()
-    )
+    atendimento_ids: List[int],
+) -> Dict[int, dict]:
+    """Exames, prescricao (com itens), evolucoes e anexos de varios atendimentos.
+
+    Uma consulta por tipo com `IN (ids)` (como um selectinload), em vez de
+    uma serie de consultas por atendimento.
+    """
+    relacionados: Dict[int, dict] = {
+        atendimento_id: {"exames": [], "prescricao": None, "evolucoes": [], "anexos": []}
+        for atendimento_id in atendimento_ids
+    }
+    if not relacionados:
+        return relacionados
+    ids = list(relacionados)
 
-    prescricao = (
-        db.query(PrescricaoClinica)
-        .filter(PrescricaoClinica.atendimento_id == atendimento.id)
-        .first()
+    for exame in (
+        db.query(Exame)
+        .filter(Exame.atendimento_id.in_(ids))
+        .order_by(Exame.atendimento_id, Exame.id.asc())
+    ):
+        relacionados[exame.atendimento_id]["exames"].append(exame)
+
+    linhas_prescricao = (
+        db.query(PrescricaoClinica, PrescricaoItem)
+        .outerjoin(PrescricaoItem, PrescricaoItem.prescricao_id == PrescricaoClinica.id)
+        .filter(PrescricaoClinica.atendimento_id.in_(ids))
+        .order_by(PrescricaoClinica.id.asc(), PrescricaoItem.ordem.asc(), PrescricaoItem.id.asc())
     )
-    prescricao_dict = None
-    if prescricao:
-        itens = (
-            db.query(PrescricaoItem)
-            .filter(PrescricaoItem.prescricao_id == prescricao.id)
-            .order_by(PrescricaoItem.ordem.asc(), PrescricaoItem.id.asc())
-            .all()
-        )
-        prescricao_dict = {
-            "id": prescricao.id,
-            "orientacoes_gerais": prescricao.orientacoes_gerais or "",
-            "retorno_dias": prescricao.retorno_dias,
-            "itens": [_map_prescricao_item(item) for item in itens],
-        }
+    for prescricao, item in linhas_prescricao:
+        atual = relacionados[prescricao.atendimento_id]["prescricao"]
+        if atual is None:
+            # Mesma regra do .first() anterior: vale a primeira prescricao.
+            atual = relacionados[prescricao.atendimento_id]["prescricao"] = {
+                "id": prescricao.id,
+                "orientacoes_gerais": prescricao.orientacoes_gerais or "",
+                "retorno_dias": prescricao.retorno_dias,
+                "itens": [],
+            }
+        if item is not None and atual["id"] == prescricao.id:
+            atual["itens"].append(_map_prescricao_item(item))
 
-    # Buscar evoluções
-    evolucoes = (
+    for evolucao in (
         db.query(EvolucaoClinica)
-        .filter(EvolucaoClinica.atendimento_id == atendimento.id)
+        .filter(EvolucaoClinica.atendimento_id.in_(ids))
         .order_by(EvolucaoClinica.data_evolucao.desc())
-        .all()
-    )
+    ):
+        relacionados[evolucao.atendimento_id]["evolucoes"].append(evolucao)
 
-    # Buscar anexos
-    anexos = (
+    for anexo in (
         db.query(AnexoAtendimento)
-        .filter(AnexoAtendimento.atendimento_id == atendimento.id)
+        .filter(AnexoAtendimento.atendimento_id.in_(ids))
         .order_by(AnexoAtendimento.created_at.desc())
-        .all()
+    ):
+        relacionados[anexo.atendimento_id]["anexos"].append(anexo)
+
+    return relacionados
+
+
+def _montar_detalhe_atendimento(
+    db: Session,
+    atendimento: AtendimentoClinico,
+) -> dict:
+    paciente_nome, tutor_nome, clinica_nome = (
+        db.query(Paciente.nome, Tutor.nome, Clinica.nome)
+        .select_from(AtendimentoClinico)
+        .outerjoin(Paciente, Paciente.id == AtendimentoClinico.paciente_id)
+        .outerjoin(Tutor, Tutor.id == AtendimentoClinico.tutor_id)
+        .outerjoin(Clinica, Clinica.id == AtendimentoClinico.clinica_id)
+        .filter(AtendimentoClinico.id == atendimento.id)
+        .one()
     )
+    relacionados = _carregar_relacionados_atendimentos(db, [atendimento.id])[atendimento.id]
+    exames = relacionados["exames"]
+    prescricao_dict = relacionados["prescricao"]
+    evolucoes = relacionados["evolucoes"]
+    anexos = relacionados["anexos"]
 
     return {
         "id": atendimento.id,
@@ -709,9 +501,9 @@ def _montar_detalhe_atendimento(
         "criado_por_id": atendimento.criado_por_id,
         "criado_por_nome": atendimento.criado_por_nome,
         # Relacionamentos
-        "paciente_nome": paciente.nome if paciente else "",
-        "tutor_nome": tutor.nome if tutor else "",
-        "clinica_nome": clinica.nome if clinica else "",
+        "paciente_nome": paciente_nome or "",
+        "tutor_nome": tutor_nome or "",
+        "clinica_nome": clinica_nome or "",
         # Extras
         "exames": [_map_exame(exame) for exame in exames],
         "prescricao": prescricao_dict,
@@ -750,96 +542,135 @@ def listar_atendimentos(
     agendamento_id: Optional[int] = None,
     status: Optional[str] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    """Atendimentos do mais recente para o mais antigo.
+
+    Paginacao por cursor: passe `next_cursor` da resposta anterior em
+    `cursor` (`skip` continua aceito, mas custa O(skip)). `total` so vem
+    na primeira pagina.
+    """
     _ = current_user
-    query = (
-        db.query(
-            AtendimentoClinico,
-            Paciente.nome.label("paciente_nome"),
-            Tutor.nome.label("tutor_nome"),
-            Clinica.nome.label("clinica_nome"),
-        )
-        .outerjoin(Paciente, AtendimentoClinico.paciente_id == Paciente.id)
-        .outerjoin(Tutor, AtendimentoClinico.tutor_id == Tutor.id)
-        .outerjoin(Clinica, AtendimentoClinico.clinica_id == Clinica.id)
-    )
+    filtrados = db.query(AtendimentoClinico.id, AtendimentoClinico.data_atendimento)
 
     dt_inicio = _parse_datetime(data_inicio)
     dt_fim = _parse_datetime(data_fim)
     if dt_inicio:
-        query = query.filter(AtendimentoClinico.data_atendimento >= dt_inicio)
+        filtrados = filtrados.filter(AtendimentoClinico.data_atendimento >= dt_inicio)
     if dt_fim:
-        query = query.filter(AtendimentoClinico.data_atendimento < dt_fim + timedelta(days=1))
+        filtrados = filtrados.filter(AtendimentoClinico.data_atendimento < dt_fim + timedelta(days=1))
     if paciente_id:
-        query = query.filter(AtendimentoClinico.paciente_id == paciente_id)
+        filtrados = filtrados.filter(AtendimentoClinico.paciente_id == paciente_id)
     if clinica_id:
-        query = query.filter(AtendimentoClinico.clinica_id == clinica_id)
+        filtrados = filtrados.filter(AtendimentoClinico.clinica_id == clinica_id)
     if agendamento_id:
-        query = query.filter(AtendimentoClinico.agendamento_id == agendamento_id)
+        filtrados = filtrados.filter(AtendimentoClinico.agendamento_id == agendamento_id)
     if status:
-        query = query.filter(AtendimentoClinico.status == status)
+        filtrados = filtrados.filter(AtendimentoClinico.status == status)
     if search:
         termo = f"%{search.strip()}%"
-        query = query.filter(
-            or_(
-                Paciente.nome.ilike(termo),
-                Tutor.nome.ilike(termo),
-                Clinica.nome.ilike(termo),
-                AtendimentoClinico.diagnostico_principal.ilike(termo),
-                AtendimentoClinico.diagnostico_secundario.ilike(termo),
-                AtendimentoClinico.diagnostico_diferencial.ilike(termo),
-                AtendimentoClinico.queixa_principal.ilike(termo),
+        filtrados = (
+            filtrados.outerjoin(Paciente, AtendimentoClinico.paciente_id == Paciente.id)
+            .outerjoin(Tutor, AtendimentoClinico.tutor_id == Tutor.id)
+            .outerjoin(Clinica, AtendimentoClinico.clinica_id == Clinica.id)
+            .filter(
+                or_(
+                    Paciente.nome.ilike(termo),
+                    Tutor.nome.ilike(termo),
+                    Clinica.nome.ilike(termo),
+                    AtendimentoClinico.diagnostico_principal.ilike(termo),
+                    AtendimentoClinico.diagnostico_secundario.ilike(termo),
+                    AtendimentoClinico.diagnostico_diferencial.ilike(termo),
+                    AtendimentoClinico.queixa_principal.ilike(termo),
+                )
             )
         )
 
-    total = query.count()
-    rows = (
-        query.order_by(
-            AtendimentoClinico.data_atendimento.desc(),
-            AtendimentoClinico.id.desc(),
+    total: Optional[int] = None
+    if cursor:
+        cursor_data, cursor_id = decodificar_cursor(cursor, "Cursor de atendimentos")
+        filtrados = filtrados.filter(
+            filtro_depois_do_cursor(
+                AtendimentoClinico.data_atendimento, AtendimentoClinico.id, cursor_data, cursor_id
+            )
         )
-        .offset(skip)
-        .limit(limit)
-        .all()
+    else:
+        total = filtrados.order_by(None).count()
+
+    limit = max(1, min(limit, 500))
+    filtrados = filtrados.order_by(AtendimentoClinico.data_atendimento.desc(), AtendimentoClinico.id.desc())
+    if not cursor and skip > 0:
+        filtrados = filtrados.offset(skip)
+    pagina = filtrados.limit(limit + 1).cte("pagina_atendimentos")
+
+    # Agregados so das linhas da pagina, juntados na mesma consulta.
+    ids_pagina = select(pagina.c.id)
+    exames_por_atendimento = (
+        select(Exame.atendimento_id.label("atendimento_id"), func.count(Exame.id).label("total_exames"))
+        .where(Exame.atendimento_id.in_(ids_pagina))
+        .group_by(Exame.atendimento_id)
+        .subquery("exames_por_atendimento")
+    )
+    prescricoes_por_atendimento = (
+        select(PrescricaoClinica.atendimento_id.label("atendimento_id"))
+        .where(PrescricaoClinica.atendimento_id.in_(ids_pagina))
+        .group_by(PrescricaoClinica.atendimento_id)
+        .subquery("prescricoes_por_atendimento")
     )
 
-    items = []
-    for atendimento, paciente_nome, tutor_nome, clinica_nome in rows:
-        total_exames = (
-            db.query(Exame.id)
-            .filter(Exame.atendimento_id == atendimento.id)
-            .count()
-        )
-        prescricao_existe = (
-            db.query(PrescricaoClinica.id)
-            .filter(PrescricaoClinica.atendimento_id == atendimento.id)
-            .first()
-            is not None
-        )
-        items.append(
-            {
-                "id": atendimento.id,
-                "paciente_id": atendimento.paciente_id,
-                "clinica_id": atendimento.clinica_id,
-                "agendamento_id": atendimento.agendamento_id,
-                "data_atendimento": _to_iso(atendimento.data_atendimento),
-                "status": atendimento.status,
-                "queixa_principal": atendimento.queixa_principal or "",
-                "diagnostico": atendimento.diagnostico_principal or "",
-                "paciente_nome": paciente_nome or "",
-                "tutor_nome": tutor_nome or "",
-                "clinica_nome": clinica_nome or "",
-                "total_exames": total_exames,
-                "tem_prescricao": prescricao_existe,
-                "created_at": _to_iso(atendimento.created_at),
-            }
+    rows = (
+        db.query(
+            AtendimentoClinico.id,
+            AtendimentoClinico.paciente_id,
+            AtendimentoClinico.clinica_id,
+            AtendimentoClinico.agendamento_id,
+            AtendimentoClinico.data_atendimento,
+            AtendimentoClinico.status,
+            AtendimentoClinico.queixa_principal,
+            AtendimentoClinico.diagnostico_principal,
+            AtendimentoClinico.created_at,
+            Paciente.nome.label("paciente_nome"),
+            Tutor.nome.label("tutor_nome"),
+            Clinica.nome.label("clinica_nome"),
+            func.coalesce(exames_por_atendimento.c.total_exames, 0).label("total_exames"),
+            prescricoes_por_atendimento.c.atendimento_id.isnot(None).label("tem_prescricao"),
         )
+        .join(pagina, pagina.c.id == AtendimentoClinico.id)
+        .outerjoin(Paciente, AtendimentoClinico.paciente_id == Paciente.id)
+        .outerjoin(Tutor, AtendimentoClinico.tutor_id == Tutor.id)
+        .outerjoin(Clinica, AtendimentoClinico.clinica_id == Clinica.id)
+        .outerjoin(exames_por_atendimento, exames_por_atendimento.c.atendimento_id == AtendimentoClinico.id)
+        .outerjoin(prescricoes_por_atendimento, prescricoes_por_atendimento.c.atendimento_id == AtendimentoClinico.id)
+        .order_by(AtendimentoClinico.data_atendimento.desc(), AtendimentoClinico.id.desc())
+        .all()
+    )
+    next_cursor = codificar_cursor(rows[limit - 1].data_atendimento, rows[limit - 1].id) if len(rows) > limit else None
+
+    items = [
+        {
+            "id": row.id,
+            "paciente_id": row.paciente_id,
+            "clinica_id": row.clinica_id,
+            "agendamento_id": row.agendamento_id,
+            "data_atendimento": _to_iso(row.data_atendimento),
+            "status": row.status,
+            "queixa_principal": row.queixa_principal or "",
+            "diagnostico": row.diagnostico_principal or "",
+            "paciente_nome": row.paciente_nome or "",
+            "tutor_nome": row.tutor_nome or "",
+            "clinica_nome": row.clinica_nome or "",
+            "total_exames": int(row.total_exames or 0),
+            "tem_prescricao": bool(row.tem_prescricao),
+            "created_at": _to_iso(row.created_at),
+        }
+        for row in rows[:limit]
+    ]
 
-    return {"total": total, "items": items}
+    return {"total": total, "items": items, "next_cursor": next_cursor}
 
 
 @router.get("/contexto")
@@ -870,6 +701,47 @@ def obter_contexto_agendamento(
     }
 
 
+@router.get("/pdf-jobs/{job_id}")
+def obter_status_job_pdf_atendimento(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Consulta o status de um job de receita/exames."""
+    _ = current_user
+    job = get_atendimento_pdf_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job de PDF nao encontrado")
+
+    if job.status == JOB_STATUS_PENDING:
+        submit_laudo_pdf_job(job.id)
+
+    return serialize_laudo_pdf_job(job)
+
+
+@router.get("/pdf-jobs/{job_id}/download")
+def baixar_pdf_atendimento_pronto(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Faz download do PDF gerado por um job concluido."""
+    _ = current_user
+    job = get_atendimento_pdf_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job de PDF nao encontrado")
+    if job.status != JOB_STATUS_COMPLETED:
+        raise HTTPException(status_code=409, detail="PDF ainda nao esta pronto")
+    if not job.arquivo_caminho or not os.path.exists(job.arquivo_caminho):
+        raise HTTPException(status_code=410, detail="Arquivo PDF nao encontrado no armazenamento")
+
+    return FileResponse(
+        path=job.arquivo_caminho,
+        media_type="application/pdf",
+        filename=job.arquivo_nome or f"{job.documento}_atendimento_{job.atendimento_id}.pdf",
+    )
+
+
 @router.get("/{atendimento_id}")
 def obter_atendimento(
     atendimento_id: int,
@@ -883,52 +755,58 @@ def obter_atendimento(
     return _montar_detalhe_atendimento(db, atendimento)
 
 
+def _baixar_pdf_atendimento(db: Session, atendimento_id: int, documento: str, current_user: User):
+    """Envia o PDF do job com o mesmo carimbo de conteudo; sem cache, gera pelo pipeline de jobs.
+
+    Reimpressoes viram envio de arquivo, e cliques repetidos enquanto o PDF e
+    gerado esperam o mesmo job em vez de renderizar de novo. A espera e curta e
+    sem conexao presa: a sessao e liberada antes, e se o job nao terminar a
+    tempo a resposta e 202 com o payload do job.
+    """
+    try:
+        cache_key = compute_atendimento_pdf_cache_key(db, atendimento_id, documento)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+
+    job = enqueue_atendimento_pdf_job(db, atendimento_id, documento, current_user.id, cache_key=cache_key)
+    job_id = job.id
+    if job.status != JOB_STATUS_COMPLETED:
+        pendente = serialize_laudo_pdf_job(job)
+        # Devolve a conexao ao pool durante a espera: o worker do job tambem
+        # precisa de uma, e uma rajada de downloads nao pode esgota-lo.
+        db.commit()
+        db.close()
+        if not wait_for_pdf_job(job_id, ESPERA_PDF_SEGUNDOS):
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content=pendente,
+                headers={"Retry-After": "2"},
+            )
+        job = get_atendimento_pdf_job(db, job_id)
+
+    if not job or job.status in (JOB_STATUS_PENDING, JOB_STATUS_PROCESSING):
+        raise HTTPException(
+            status_code=503,
+            detail="PDF em processamento, tente novamente em instantes.",
+            headers={"Retry-After": "5"},
+        )
+    if job.status != JOB_STATUS_COMPLETED or not job.arquivo_caminho or not os.path.exists(job.arquivo_caminho):
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar PDF: {job.erro or 'arquivo nao encontrado'}")
+
+    return FileResponse(
+        path=job.arquivo_caminho,
+        media_type="application/pdf",
+        filename=job.arquivo_nome or f"{documento}_atendimento_{atendimento_id}.pdf",
+    )
+
+
 @router.get("/{atendimento_id}/prescricao/pdf")
 def gerar_pdf_prescricao(
     atendimento_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    _ = current_user
-    atendimento = db.query(AtendimentoClinico).filter(AtendimentoClinico.id == atendimento_id).first()
-    if not atendimento:
-        raise HTTPException(status_code=404, detail="Atendimento nao encontrado.")
-
-    paciente = db.query(Paciente).filter(Paciente.id == atendimento.paciente_id).first()
-    tutor = db.query(Tutor).filter(Tutor.id == atendimento.tutor_id).first() if atendimento.tutor_id else None
-    clinica = db.query(Clinica).filter(Clinica.id == atendimento.clinica_id).first() if atendimento.clinica_id else None
-    prescricao = (
-        db.query(PrescricaoClinica)
-        .filter(PrescricaoClinica.atendimento_id == atendimento.id)
-        .first()
-    )
-    if not prescricao:
-        raise HTTPException(status_code=404, detail="Prescricao nao encontrada para este atendimento.")
-
-    itens = (
-        db.query(PrescricaoItem)
-        .filter(PrescricaoItem.prescricao_id == prescricao.id)
-        .order_by(PrescricaoItem.ordem.asc(), PrescricaoItem.id.asc())
-        .all()
-    )
-    if not itens:
-        raise HTTPException(status_code=404, detail="Prescricao sem itens para gerar PDF.")
-
-    pdf_bytes = _gerar_pdf_prescricao_bytes(
-        atendimento,
-        paciente,
-        tutor,
-        clinica,
-        prescricao,
-        itens,
-    )
-    paciente_nome = _nome_arquivo_limpo(paciente.nome if paciente else "", f"paciente_{atendimento.paciente_id}")
-    filename = f"receita_atendimento_{atendimento.id}_{paciente_nome}.pdf"
-    return StreamingResponse(
-        BytesIO(pdf_bytes),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+    return _baixar_pdf_atendimento(db, atendimento_id, DOCUMENTO_PRESCRICAO, current_user)
 
 
 @router.get("/{atendimento_id}/exames/pdf")
@@ -937,37 +815,22 @@ def gerar_pdf_solicitacao_exames(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    _ = current_user
-    atendimento = db.query(AtendimentoClinico).filter(AtendimentoClinico.id == atendimento_id).first()
-    if not atendimento:
-        raise HTTPException(status_code=404, detail="Atendimento nao encontrado.")
+    return _baixar_pdf_atendimento(db, atendimento_id, DOCUMENTO_EXAMES, current_user)
 
-    paciente = db.query(Paciente).filter(Paciente.id == atendimento.paciente_id).first()
-    tutor = db.query(Tutor).filter(Tutor.id == atendimento.tutor_id).first() if atendimento.tutor_id else None
-    clinica = db.query(Clinica).filter(Clinica.id == atendimento.clinica_id).first() if atendimento.clinica_id else None
-    exames = (
-        db.query(Exame)
-        .filter(Exame.atendimento_id == atendimento.id)
-        .order_by(Exame.id.asc())
-        .all()
-    )
-    if not exames:
-        raise HTTPException(status_code=404, detail="Nao ha exames para este atendimento.")
-
-    pdf_bytes = _gerar_pdf_exames_bytes(
-        atendimento,
-        paciente,
-        tutor,
-        clinica,
-        exames,
-    )
-    paciente_nome = _nome_arquivo_limpo(paciente.nome if paciente else "", f"paciente_{atendimento.paciente_id}")
-    filename = f"solicitacao_exames_atendimento_{atendimento.id}_{paciente_nome}.pdf"
-    return StreamingResponse(
-        BytesIO(pdf_bytes),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+
+@router.post("/{atendimento_id}/{documento}/pdf-jobs")
+def criar_job_pdf_atendimento(
+    atendimento_id: int,
+    documento: str = Path(..., pattern="^(prescricao|exames)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Enfileira a receita ou a solicitacao de exames e retorna o status do job."""
+    try:
+        job = enqueue_atendimento_pdf_job(db, atendimento_id, documento, current_user.id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    return serialize_laudo_pdf_job(job)
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.core.security import get_current_user
+from app.db.database import get_db
+from app.models.user import User
+from app.services import busca_service
+
+router = APIRouter()
+
+
+@router.get("")
+def buscar(
+    q: str = Query(..., min_length=1, max_length=120),
+    limite: int = Query(busca_service.LIMITE_PADRAO, ge=1, le=busca_service.LIMITE_MAXIMO),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Busca unificada: melhores resultados de pacientes, tutores e clinicas."""
+    return busca_service.buscar(db, q, limite)
@@ -14,6 +14,7 @@ from app.models.tabela_preco import PrecoServicoClinica
 from app.core.security import get_current_user
 from app.core.config import settings
 from app.models.user import User
+from app.services.busca_service import gerar_nome_key
 from app.services.precos_service import calcular_preco_servico
 from app.services.geocoding_service import (
     GeocodingError,
@@ -356,6 +357,7 @@ def criar_clinica(
 
         db_clinica = Clinica(
             nome=clinica.nome,
+            nome_key=gerar_nome_key(clinica.nome),
             cnpj=clinica.cnpj,
             telefone=clinica.telefone,
             email=clinica.email,
@@ -566,6 +568,7 @@ def atualizar_clinica(
     try:
         if clinica.nome is not None:
             db_clinica.nome = clinica.nome
+            db_clinica.nome_key = gerar_nome_key(clinica.nome)
         if clinica.cnpj is not None:
             db_clinica.cnpj = clinica.cnpj
         if clinica.telefone is not None:
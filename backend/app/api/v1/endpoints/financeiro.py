@@ -4,7 +4,7 @@ from sqlalchemy import func, and_, or_, extract
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.models.financeiro import Transacao, ContaPagar, ContaReceber, CategoriaTransacao
 from app.models.user import User
 from app.core.security import get_current_user
@@ -569,7 +569,7 @@ def resumo_financeiro(
     periodo: str = Query("mes", pattern="^(dia|semana|mes|ano|personalizado)$"),
     data_inicio: Optional[str] = None,
     data_fim: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Retorna resumo financeiro do período"""
@@ -639,7 +639,7 @@ def relatorio_por_categoria(
     tipo: str = Query(..., pattern="^(entrada|saida)$"),
     data_inicio: Optional[str] = None,
     data_fim: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Relatório de entradas/saídas por categoria"""
@@ -680,7 +680,7 @@ def relatorio_por_categoria(
 def relatorio_fluxo_caixa(
     data_inicio: str,
     data_fim: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Relatório de fluxo de caixa diário"""
@@ -734,7 +734,7 @@ def relatorio_fluxo_caixa(
 @router.get("/relatorios/comparativo-mensal", response_model=RelatorioComparativo)
 def relatorio_comparativo_mensal(
     meses: int = Query(6, ge=2, le=24),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Comparativo financeiro dos últimos meses"""
@@ -792,7 +792,7 @@ def relatorio_comparativo_mensal(
 def relatorio_dre(
     data_inicio: str,
     data_fim: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Demonstração do Resultado do Exercício (DRE) simplificada"""
@@ -883,7 +883,7 @@ def relatorio_dre(
 def dados_grafico(
     tipo: str = Query("mensal", pattern="^(mensal|semanal|anual)$"),
     meses: int = Query(6, ge=1, le=24),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Dados formatados para gráficos"""
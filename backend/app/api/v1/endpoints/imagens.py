@@ -2,15 +2,25 @@
 import uuid
 import os
 from datetime import datetime, timedelta
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
-from sqlalchemy.orm import Session
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query, status
+from sqlalchemy.orm import Session, defer
 
 from app.db.database import get_db
 from app.models.user import User
 from app.models.imagem_laudo import ImagemLaudo, ImagemTemporaria
 from app.core.security import get_current_user
 from app.core.config import settings
+from app.services.imagem_thumbs import (
+    DEFAULT_THUMB_WIDTH,
+    compute_image_hash,
+    ensure_thumbnail,
+    find_cached_thumbnail,
+    normalize_thumb_format,
+    normalize_thumb_width,
+    submit_thumbnail_pregeneration,
+    thumb_media_type,
+)
 
 router = APIRouter()
 
@@ -31,6 +41,16 @@ def get_file_extension(filename: str) -> str:
     return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
 
 
+def _carregar_conteudo_imagem(imagem: ImagemLaudo) -> bytes:
+    """Retorna os bytes originais da imagem, do banco ou do disco"""
+    if imagem.conteudo:
+        return imagem.conteudo
+    if imagem.caminho_arquivo and os.path.exists(imagem.caminho_arquivo):
+        with open(imagem.caminho_arquivo, "rb") as file_obj:
+            return file_obj.read()
+    return b""
+
+
 @router.post("/upload-temp", response_model=dict)
 async def upload_imagem_temporaria(
     arquivo: UploadFile = File(...),
@@ -62,6 +82,7 @@ async def upload_imagem_temporaria(
     
     # Usar session_id fornecido ou criar um novo
     session_id_usado = session_id if session_id else str(uuid.uuid4())
+    conteudo_sha256 = compute_image_hash(conteudo)
     
     imagem_temp = ImagemTemporaria(
         session_id=session_id_usado,
@@ -69,6 +90,7 @@ async def upload_imagem_temporaria(
         tipo_mime=arquivo.content_type or f"image/{get_file_extension(arquivo.filename)}",
         tamanho_bytes=len(conteudo),
         conteudo=conteudo,
+        conteudo_sha256=conteudo_sha256,
         ordem=ordem,
         descricao=descricao,
         expira_em=datetime.utcnow() + timedelta(hours=24)
@@ -77,6 +99,9 @@ async def upload_imagem_temporaria(
     db.add(imagem_temp)
     db.commit()
     db.refresh(imagem_temp)
+
+    # Miniaturas sao indexadas pelo hash, entao ficam prontas para quando a imagem for associada ao laudo
+    submit_thumbnail_pregeneration(conteudo, conteudo_sha256)
     
     return {
         "success": True,
@@ -141,7 +166,7 @@ def listar_imagens_temporarias(
     imagens = db.query(ImagemTemporaria).filter(
         ImagemTemporaria.session_id == session_id,
         ImagemTemporaria.expira_em > datetime.utcnow()
-    ).order_by(ImagemTemporaria.ordem).all()
+    ).options(defer(ImagemTemporaria.conteudo)).order_by(ImagemTemporaria.ordem).all()
     
     return {
         "items": [
@@ -167,13 +192,7 @@ def associar_imagens_ao_laudo(
     current_user: User = Depends(get_current_user)
 ):
     """Associa imagens temporárias a um laudo salvo"""
-    # Limpar imagens temporárias expiradas primeiro
-    imagens_expiradas = db.query(ImagemTemporaria).filter(
-        ImagemTemporaria.expira_em <= datetime.utcnow()
-    ).all()
-    for img_exp in imagens_expiradas:
-        db.delete(img_exp)
-    
+    # Imagens temporárias expiradas são removidas pelo retention_sweeper
     # Buscar imagens temporárias do session_id atual
     imagens_temp = db.query(ImagemTemporaria).filter(
         ImagemTemporaria.session_id == session_id,
@@ -181,7 +200,6 @@ def associar_imagens_ao_laudo(
     ).all()
     
     if not imagens_temp:
-        db.commit()  # Commit da limpeza
         return {"message": "Nenhuma imagem para associar"}
     
     # Buscar a maior ordem existente no laudo
@@ -198,6 +216,7 @@ def associar_imagens_ao_laudo(
             tipo_mime=img_temp.tipo_mime,
             tamanho_bytes=img_temp.tamanho_bytes,
             conteudo=img_temp.conteudo,
+            conteudo_sha256=img_temp.conteudo_sha256 or compute_image_hash(img_temp.conteudo),
             ordem=ultima_ordem + count,  # Continuar ordem após imagens existentes
             descricao=img_temp.descricao,
             ativo=1
@@ -226,7 +245,7 @@ def listar_imagens_do_laudo(
     imagens = db.query(ImagemLaudo).filter(
         ImagemLaudo.laudo_id == laudo_id,
         ImagemLaudo.ativo == 1
-    ).order_by(ImagemLaudo.ordem).all()
+    ).options(defer(ImagemLaudo.conteudo)).order_by(ImagemLaudo.ordem).all()
     
     return {
         "items": [
@@ -237,7 +256,8 @@ def listar_imagens_do_laudo(
                 "ordem": img.ordem,
                 "pagina": img.pagina,
                 "tamanho": img.tamanho_bytes,
-                "url": f"/imagens/{img.id}"
+                "url": f"/imagens/{img.id}",
+                "url_thumb": f"/imagens/{img.id}/thumb?w={DEFAULT_THUMB_WIDTH}"
             }
             for img in imagens
         ],
@@ -270,6 +290,82 @@ def get_imagem(
     )
 
 
+def _etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match com comparacao fraca (RFC 9110): `*` ou qualquer tag da lista."""
+    if not if_none_match:
+        return False
+    for candidata in if_none_match.split(","):
+        candidata = candidata.strip()
+        if candidata == "*" or candidata.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@router.get("/{imagem_id}/thumb")
+def get_imagem_thumb(
+    imagem_id: int,
+    w: int = Query(DEFAULT_THUMB_WIDTH, ge=1, le=4096),
+    formato: str = Query("webp"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Retorna uma miniatura (WebP/JPEG) da imagem, gerada sob demanda e mantida em cache no disco.
+
+    A ETag vem do hash do conteudo: com If-None-Match igual responde 304 sem
+    tocar no disco nem no BLOB.
+    """
+    from fastapi.responses import FileResponse, Response
+
+    try:
+        formato = normalize_thumb_format(formato)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    largura = normalize_thumb_width(w)
+
+    # Sem carregar o BLOB: se a miniatura ja existe, basta enviar o arquivo
+    imagem = db.query(ImagemLaudo).filter(
+        ImagemLaudo.id == imagem_id,
+        ImagemLaudo.ativo == 1
+    ).options(defer(ImagemLaudo.conteudo)).first()
+
+    if not imagem:
+        raise HTTPException(status_code=404, detail="Imagem não encontrada")
+
+    def _headers_cache() -> dict:
+        return {
+            "Cache-Control": "private, max-age=86400",
+            "ETag": f'"{imagem.conteudo_sha256}-{largura}-{formato}"',
+        }
+
+    if imagem.conteudo_sha256 and _etag_confere(if_none_match, _headers_cache()["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_headers_cache())
+
+    caminho = find_cached_thumbnail(imagem.conteudo_sha256, largura, formato)
+    if not caminho:
+        conteudo = _carregar_conteudo_imagem(imagem)
+        if not conteudo:
+            raise HTTPException(status_code=404, detail="Conteúdo da imagem não encontrado")
+
+        if not imagem.conteudo_sha256:
+            imagem.conteudo_sha256 = compute_image_hash(conteudo)
+            db.commit()
+
+        try:
+            caminho = ensure_thumbnail(conteudo, largura, formato, content_hash=imagem.conteudo_sha256)
+        except Exception as exc:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Não foi possível gerar a miniatura: {exc}"
+            )
+
+    return FileResponse(
+        caminho,
+        media_type=thumb_media_type(formato),
+        headers=_headers_cache(),
+    )
+
+
 @router.delete("/{imagem_id}")
 def delete_imagem(
     imagem_id: int,
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 from io import BytesIO
@@ -8,10 +8,12 @@ import json
 import os
 import re
 import unicodedata
+from urllib.parse import quote
 
 from app.db.database import get_db
 from app.models.laudo import Laudo, Exame
 from app.models.user import User
+from app.utils.laudo_dados import carregar_anexos
 from app.core.security import get_current_user
 from app.services.laudo_pdf_jobs import (
     JOB_STATUS_COMPLETED,
@@ -63,6 +65,18 @@ def _gerar_nome_key(nome: Optional[str]) -> str:
     return texto
 
 
+def _content_disposition_anexo(filename: str) -> str:
+    """Content-Disposition com nome ASCII e `filename*` (RFC 5987) para acentos.
+
+    Header em latin-1 com nome acentuado quebra clientes que leem UTF-8.
+    """
+    ascii_nome = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+    ascii_nome = re.sub(r'["\\\r\n]', "", ascii_nome) or "laudo.pdf"
+    if ascii_nome == filename:
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename=\"{ascii_nome}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
 def _legacy_now_str() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -194,17 +208,7 @@ def _normalizar_ecocardiograma_cabecalho(raw: Any) -> Optional[Dict[str, Any]]:
 
 
 def _carregar_anexos_dict(anexos_raw: Any) -> Dict[str, Any]:
-    anexos_data: Dict[str, Any] = {}
-    if isinstance(anexos_raw, dict):
-        anexos_data = dict(anexos_raw)
-    elif isinstance(anexos_raw, str) and anexos_raw.strip():
-        try:
-            parsed = json.loads(anexos_raw)
-            if isinstance(parsed, dict):
-                anexos_data = parsed
-        except json.JSONDecodeError:
-            anexos_data = {}
-    return anexos_data
+    return carregar_anexos(anexos_raw)
 
 
 def _normalizar_ultrassonografia_abdominal(raw: Any) -> Optional[Dict[str, Any]]:
@@ -286,48 +290,19 @@ def _serializar_anexos(
 
 
 def _extrair_pressao_arterial_de_anexos(anexos_raw: Any) -> Optional[Dict[str, Any]]:
-    if not anexos_raw:
-        return None
-    if isinstance(anexos_raw, dict):
-        return _normalizar_pressao_arterial(anexos_raw.get("pressao_arterial"))
-    if isinstance(anexos_raw, str):
-        try:
-            parsed = json.loads(anexos_raw)
-            if isinstance(parsed, dict):
-                return _normalizar_pressao_arterial(parsed.get("pressao_arterial"))
-        except json.JSONDecodeError:
-            return None
-    return None
+    return _normalizar_pressao_arterial(_carregar_anexos_dict(anexos_raw).get("pressao_arterial"))
 
 
 def _extrair_ultrassonografia_abdominal_de_anexos(anexos_raw: Any) -> Optional[Dict[str, Any]]:
-    if not anexos_raw:
-        return None
-    if isinstance(anexos_raw, dict):
-        return _normalizar_ultrassonografia_abdominal(anexos_raw.get("ultrassonografia_abdominal"))
-    if isinstance(anexos_raw, str):
-        try:
-            parsed = json.loads(anexos_raw)
-            if isinstance(parsed, dict):
-                return _normalizar_ultrassonografia_abdominal(parsed.get("ultrassonografia_abdominal"))
-        except json.JSONDecodeError:
-            return None
-    return None
+    return _normalizar_ultrassonografia_abdominal(
+        _carregar_anexos_dict(anexos_raw).get("ultrassonografia_abdominal")
+    )
 
 
 def _extrair_ecocardiograma_cabecalho_de_anexos(anexos_raw: Any) -> Optional[Dict[str, Any]]:
-    if not anexos_raw:
-        return None
-    if isinstance(anexos_raw, dict):
-        return _normalizar_ecocardiograma_cabecalho(anexos_raw.get("ecocardiograma_cabecalho"))
-    if isinstance(anexos_raw, str):
-        try:
-            parsed = json.loads(anexos_raw)
-            if isinstance(parsed, dict):
-                return _normalizar_ecocardiograma_cabecalho(parsed.get("ecocardiograma_cabecalho"))
-        except json.JSONDecodeError:
-            return None
-    return None
+    return _normalizar_ecocardiograma_cabecalho(
+        _carregar_anexos_dict(anexos_raw).get("ecocardiograma_cabecalho")
+    )
 
 
 def _extrair_ultrassonografia_abdominal_do_descricao(descricao_raw: Any) -> Optional[Dict[str, Any]]:
@@ -1014,7 +989,7 @@ def atualizar_laudo_ultrassonografia_abdominal(
         laudo.medico_solicitante = laudo_data.get("medico_solicitante")
 
     laudo.anexos = _serializar_anexos(
-        laudo.anexos,
+        laudo.anexos_dados,
         ultrassonografia_abdominal=ultrassonografia_abdominal,
     )
     laudo.updated_at = datetime.now()
@@ -1092,10 +1067,11 @@ def obter_laudo(
     
     # Buscar imagens do laudo
     from app.models.imagem_laudo import ImagemLaudo
+    from app.services.imagem_thumbs import DEFAULT_THUMB_WIDTH
     imagens = db.query(ImagemLaudo).filter(
         ImagemLaudo.laudo_id == laudo_id,
         ImagemLaudo.ativo == 1
-    ).order_by(ImagemLaudo.ordem).all()
+    ).options(defer(ImagemLaudo.conteudo)).order_by(ImagemLaudo.ordem).all()
     
     imagens_list = []
     for img in imagens:
@@ -1105,12 +1081,13 @@ def obter_laudo(
             "ordem": img.ordem,
             "descricao": img.descricao,
             "url": f"/imagens/{img.id}",
+            "url_thumb": f"/imagens/{img.id}/thumb?w={DEFAULT_THUMB_WIDTH}",
             "tamanho": img.tamanho_bytes
         })
 
-    pressao_arterial = _extrair_pressao_arterial_de_anexos(laudo.anexos)
-    ultrassonografia_abdominal = _extrair_ultrassonografia_abdominal_de_anexos(laudo.anexos)
-    ecocardiograma_cabecalho = _extrair_ecocardiograma_cabecalho_de_anexos(laudo.anexos)
+    pressao_arterial = _normalizar_pressao_arterial(laudo.pressao_arterial_json)
+    ultrassonografia_abdominal = _extrair_ultrassonografia_abdominal_de_anexos(laudo.anexos_dados)
+    ecocardiograma_cabecalho = _extrair_ecocardiograma_cabecalho_de_anexos(laudo.anexos_dados)
     if not ultrassonografia_abdominal and (laudo.tipo or "").lower() == "ultrassonografia_abdominal":
         ultrassonografia_abdominal = _extrair_ultrassonografia_abdominal_do_descricao(laudo.descricao)
     if ultrassonografia_abdominal and not ultrassonografia_abdominal.get("sexo_paciente") and paciente:
@@ -1143,6 +1120,8 @@ def obter_laudo(
         "created_at": laudo.created_at.isoformat() if laudo.created_at else None,
         "updated_at": laudo.updated_at.isoformat() if laudo.updated_at else None,
         "data_laudo": laudo.data_laudo.isoformat() if laudo.data_laudo else None,
+        "medidas": laudo.medidas,
+        "qualitativa": laudo.qualitativa,
         "pressao_arterial": pressao_arterial,
         "ultrassonografia_abdominal": ultrassonografia_abdominal,
         "ecocardiograma_cabecalho": ecocardiograma_cabecalho,
@@ -1191,18 +1170,15 @@ def atualizar_laudo(
     if "tipo_laudo" in laudo_data and "tipo" not in laudo_data:
         laudo_data["tipo"] = laudo_data.pop("tipo_laudo")
 
+    anexos_alterados: Dict[str, Any] = {}
     if "pressao_arterial" in laudo_data:
-        pressao_arterial = _normalizar_pressao_arterial(laudo_data.pop("pressao_arterial"))
-        laudo.anexos = _serializar_anexos(laudo.anexos, pressao_arterial)
+        anexos_alterados["pressao_arterial"] = _normalizar_pressao_arterial(laudo_data.pop("pressao_arterial"))
 
     if "ultrassonografia_abdominal" in laudo_data:
         ultrassonografia_abdominal = _normalizar_ultrassonografia_abdominal(
             laudo_data.pop("ultrassonografia_abdominal")
         )
-        laudo.anexos = _serializar_anexos(
-            laudo.anexos,
-            ultrassonografia_abdominal=ultrassonografia_abdominal,
-        )
+        anexos_alterados["ultrassonografia_abdominal"] = ultrassonografia_abdominal
         if ultrassonografia_abdominal:
             laudo_data.setdefault(
                 "descricao",
@@ -1214,16 +1190,17 @@ def atualizar_laudo(
             )
 
     if "ecocardiograma_cabecalho" in laudo_data:
-        ecocardiograma_cabecalho = _normalizar_ecocardiograma_cabecalho(
+        anexos_alterados["ecocardiograma_cabecalho"] = _normalizar_ecocardiograma_cabecalho(
             laudo_data.pop("ecocardiograma_cabecalho")
         )
-        laudo.anexos = _serializar_anexos(
-            laudo.anexos,
-            ecocardiograma_cabecalho=ecocardiograma_cabecalho,
-        )
 
+    if anexos_alterados:
+        laudo.anexos = _serializar_anexos(laudo.anexos_dados, **anexos_alterados)
+
+    # So colunas: medidas/qualitativa/pressao_arterial sao leituras derivadas.
+    colunas = Laudo.__table__.columns.keys()
     for field, value in laudo_data.items():
-        if hasattr(laudo, field):
+        if field in colunas:
             setattr(laudo, field, value)
 
     laudo.updated_at = datetime.now()
@@ -1347,7 +1324,7 @@ def gerar_pdf_laudo(
         return StreamingResponse(
             BytesIO(pdf.content),
             media_type="application/pdf",
-            headers={"Content-Disposition": f'attachment; filename="{pdf.filename}"'},
+            headers={"Content-Disposition": _content_disposition_anexo(pdf.filename)},
         )
     except ValueError as exc:
         if "Laudo nao encontrado" in str(exc):
@@ -1369,8 +1346,7 @@ def gerar_pdf_laudo(
     from app.models.clinica import Clinica
     from app.models.imagem_laudo import ImagemLaudo
     from app.models.configuracao import Configuracao, ConfiguracaoUsuario
-    from app.models.referencia_eco import ReferenciaEco
-    from sqlalchemy import func
+    from app.services.referencias_eco_service import buscar_referencia
     import traceback
 
     try:
@@ -1453,7 +1429,7 @@ def gerar_pdf_laudo(
             "solicitante": laudo.medico_solicitante or "",
             "data_exame": data_exame_str,
         }
-        ecocardiograma_cabecalho = _extrair_ecocardiograma_cabecalho_de_anexos(laudo.anexos) or {}
+        ecocardiograma_cabecalho = _extrair_ecocardiograma_cabecalho_de_anexos(laudo.anexos_dados) or {}
         dados_paciente["ritmo"] = str(ecocardiograma_cabecalho.get("ritmo") or "").strip()
         dados_paciente["estado"] = str(ecocardiograma_cabecalho.get("estado") or "").strip()
         dados_paciente["fc"] = str(ecocardiograma_cabecalho.get("fc") or "").strip()
@@ -1491,7 +1467,7 @@ def gerar_pdf_laudo(
         tipo_laudo = (laudo.tipo or "").lower()
 
         if tipo_laudo == "pressao_arterial":
-            pressao_arterial = _extrair_pressao_arterial_de_anexos(laudo.anexos) or {}
+            pressao_arterial = _normalizar_pressao_arterial(laudo.pressao_arterial_json) or {}
             classificacao = laudo.diagnostico or _classificar_pressao_media(pressao_arterial.get("pas_media"))
 
             dados_pressao = {
@@ -1514,7 +1490,7 @@ def gerar_pdf_laudo(
             )
             filename = f"{filename_base}__PA.pdf"
         elif tipo_laudo == "ultrassonografia_abdominal":
-            ultrassonografia_abdominal = _extrair_ultrassonografia_abdominal_de_anexos(laudo.anexos)
+            ultrassonografia_abdominal = _extrair_ultrassonografia_abdominal_de_anexos(laudo.anexos_dados)
             if not ultrassonografia_abdominal:
                 ultrassonografia_abdominal = _extrair_ultrassonografia_abdominal_do_descricao(laudo.descricao)
             if not ultrassonografia_abdominal:
@@ -1545,40 +1521,14 @@ def gerar_pdf_laudo(
             )
             filename = f"{filename_base}__US_abdominal.pdf"
         else:
-            medidas = {}
-            qualitativa = {}
-            pressao_arterial = _extrair_pressao_arterial_de_anexos(laudo.anexos)
-            if laudo.descricao:
-                descricao = laudo.descricao
-                for match in re.finditer(r"-\s*([\w_]+):\s*([\d.,]+)", descricao):
-                    chave = match.group(1)
-                    valor = match.group(2).replace(",", ".")
-                    medidas[chave] = valor
-
-                qualitativa_match = re.search(r"Avalia(?:ç|c)ão Qualitativa[\s\n]*(-.*?)(?=\n##|\Z)", descricao, re.DOTALL)
-                if not qualitativa_match:
-                    qualitativa_match = re.search(r"Avaliacao Qualitativa[\s\n]*(-.*?)(?=\n##|\Z)", descricao, re.DOTALL)
-                if qualitativa_match:
-                    qualitativa_texto = qualitativa_match.group(1)
-                    for match in re.finditer(r"-\s*(\w+):?\s*(.+?)(?=\n-|\Z)", qualitativa_texto, re.DOTALL):
-                        campo = match.group(1).lower().strip()
-                        valor = match.group(2).strip()
-                        if campo in ["valvas", "camaras", "funcao", "pericardio", "vasos", "ad_vd"]:
-                            qualitativa[campo] = valor
+            medidas = laudo.medidas
+            qualitativa = laudo.qualitativa
+            pressao_arterial = _normalizar_pressao_arterial(laudo.pressao_arterial_json)
 
             referencia_eco = None
             if paciente and paciente.especie and paciente.peso_kg is not None:
                 try:
-                    ref = db.query(ReferenciaEco).filter(
-                        ReferenciaEco.especie.ilike(paciente.especie)
-                    ).order_by(
-                        func.abs(ReferenciaEco.peso_kg - float(paciente.peso_kg))
-                    ).first()
-                    if ref:
-                        referencia_eco = {
-                            col.name: getattr(ref, col.name)
-                            for col in ref.__table__.columns
-                        }
+                    referencia_eco = buscar_referencia(db, paciente.especie, float(paciente.peso_kg))
                 except Exception as e:
                     db.rollback()
                     print(f"[WARN] ReferenciaEco indisponivel para PDF: {e}")
@@ -1609,7 +1559,7 @@ def gerar_pdf_laudo(
         return StreamingResponse(
             BytesIO(pdf_bytes),
             media_type="application/pdf",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+            headers={"Content-Disposition": _content_disposition_anexo(filename)},
         )
     except HTTPException:
         raise
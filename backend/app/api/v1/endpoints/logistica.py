@@ -10,6 +10,8 @@ from app.models.clinica import Clinica
 from app.models.clinica_deslocamento import ClinicaDeslocamento
 from app.models.user import User
 from app.services.logistica_service import (
+    clinicas_proximas,
+    montar_matriz_heuristica,
     normalizar_perfil,
     recalcular_matriz_completa,
     recalcular_matriz_para_clinica,
@@ -86,6 +88,47 @@ def obter_matriz_deslocamento(
     }
 
 
+@router.get("/proximas")
+def listar_clinicas_proximas(
+    clinica_id: int = Query(..., ge=1),
+    k: int = Query(default=5, ge=1, le=200),
+    perfil: str = "comercial",
+    max_minutos: Optional[int] = Query(default=None, ge=1),
+    incluir_inativas: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Clinicas mais proximas pela matriz heuristica (haversine/cidade), calculada em memoria."""
+    perfil_norm = normalizar_perfil(perfil)
+
+    query_clinicas = db.query(Clinica)
+    if not incluir_inativas:
+        query_clinicas = query_clinicas.filter(Clinica.ativo == True)
+    clinicas = query_clinicas.order_by(Clinica.id.asc()).all()
+    nomes = {int(c.id): c.nome for c in clinicas}
+    if int(clinica_id) not in nomes:
+        raise HTTPException(status_code=404, detail="Clinica nao encontrada.")
+
+    matriz = montar_matriz_heuristica(clinicas, [perfil_norm])
+    items = clinicas_proximas(
+        matriz,
+        clinica_id,
+        perfil=perfil_norm,
+        k=k,
+        max_minutos=max_minutos,
+    )
+    for item in items:
+        item["nome"] = nomes.get(item["clinica_id"])
+
+    return {
+        "clinica": {"id": clinica_id, "nome": nomes[int(clinica_id)]},
+        "perfil": perfil_norm,
+        "max_minutos": max_minutos,
+        "total_itens": len(items),
+        "items": items,
+    }
+
+
 @router.get("/deslocamento")
 def obter_deslocamento_entre_clinicas(
     origem_clinica_id: int = Query(..., ge=1),
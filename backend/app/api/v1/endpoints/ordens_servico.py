@@ -1,27 +1,21 @@
 """Endpoints para gerenciamento de ordens de servico."""
 
-from datetime import date, datetime
+import os
+from datetime import date, datetime, time as dt_time, timedelta
 from decimal import Decimal, InvalidOperation
-from html import escape
 from io import BytesIO
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import mm
-from reportlab.lib.utils import ImageReader
-from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
-from sqlalchemy import func, or_
+from sqlalchemy import and_, case, func, or_
 from sqlalchemy.orm import Session
 
+from app.core.paginacao import codificar_cursor_campos, decodificar_cursor_campos, filtro_depois_do_cursor
 from app.core.security import get_current_user
 from app.db.database import get_db
 from app.models.clinica import Clinica
-from app.models.configuracao import Configuracao
 from app.models.financeiro import Transacao
 from app.models.ordem_servico import OrdemServico
 from app.models.paciente import Paciente
@@ -30,10 +24,26 @@ from app.models.tutor import Tutor
 from app.models.user import User
 from app.services.auditoria_service import registrar_auditoria
 from app.services.precos_service import calcular_preco_servico
+from app.services.relatorio_pendencias_jobs import (
+    JOB_STATUS_COMPLETED,
+    JOB_STATUS_PENDING,
+    FiltrosPendencias,
+    consulta_pendencias,
+    enqueue_relatorio_pendencias_job,
+    get_relatorio_pendencias_job_for_user,
+    item_relatorio,
+    montar_cabecalho_pendencias,
+    serialize_relatorio_pendencias_job,
+    submit_relatorio_pendencias_job,
+)
+from app.services.relatorio_pendencias_pdf import gerar_pdf_cobranca_pendencias
 
 router = APIRouter()
 
 OS_STATUSES = {"Pendente", "Pago", "Cancelado"}
+ORDENS_TOTAL_MAX = 10000
+# Pagina maxima da listagem; acima disso o cliente segue `next_cursor`.
+ORDENS_LIMITE_MAXIMO = 500
 
 
 class OrdemServicoUpdate(BaseModel):
@@ -127,259 +137,35 @@ def _find_os_with_names(db: Session, os_id: int):
     )
 
 
-def _formatar_moeda_brl(valor: Any) -> str:
+def _parse_data_filtro(valor: Optional[str], campo: str) -> Optional[date]:
+    if not valor or not valor.strip():
+        return None
     try:
-        numero = float(valor or 0)
-    except (TypeError, ValueError):
-        numero = 0.0
-    inteiro, casas = f"{numero:,.2f}".split(".")
-    return f"R$ {inteiro.replace(',', '.')},{casas}"
-
-
-def _formatar_data_ddmmaa(valor: Any) -> str:
-    if not valor:
-        return "-"
-    if isinstance(valor, datetime):
-        return valor.strftime("%d/%m/%Y")
-    texto = str(valor).strip()
-    if not texto:
-        return "-"
-    if texto.endswith("Z"):
-        texto = texto[:-1] + "+00:00"
-    try:
-        return datetime.fromisoformat(texto).strftime("%d/%m/%Y")
+        return date.fromisoformat(valor.strip()[:10])
     except ValueError:
-        return texto
-
-
-def _texto_pdf(valor: Any, fallback: str = "-") -> str:
-    texto = str(valor or "").strip()
-    if not texto:
-        texto = fallback
-    return escape(texto)
-
-
-def _desenhar_rodape_relatorio(canvas, doc, texto_rodape: str):
-    canvas.saveState()
-    canvas.setStrokeColor(colors.HexColor("#D1D5DB"))
-    canvas.setLineWidth(0.5)
-    canvas.line(doc.leftMargin, 12 * mm, A4[0] - doc.rightMargin, 12 * mm)
-    canvas.setFont("Helvetica", 8)
-    canvas.setFillColor(colors.HexColor("#6B7280"))
-    canvas.drawString(doc.leftMargin, 8 * mm, (texto_rodape or "")[:120])
-    canvas.drawRightString(A4[0] - doc.rightMargin, 8 * mm, f"Pagina {canvas.getPageNumber()}")
-    canvas.restoreState()
-
-
-def _gerar_pdf_cobranca_pendencias(
-    itens: List[Dict[str, Any]],
-    nome_empresa: str,
-    contato_empresa: str,
-    texto_rodape: str,
-    filtros_texto: str,
-    mensagem_cobranca: Optional[str] = None,
-    logomarca_dados: Optional[bytes] = None,
-) -> bytes:
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        leftMargin=14 * mm,
-        rightMargin=14 * mm,
-        topMargin=14 * mm,
-        bottomMargin=18 * mm,
-        title="Relatorio de Cobranca - Valores Pendentes",
-    )
-
-    styles = getSampleStyleSheet()
-    style_titulo = ParagraphStyle(
-        "RelatorioTitulo",
-        parent=styles["Heading1"],
-        fontName="Helvetica-Bold",
-        fontSize=15,
-        textColor=colors.HexColor("#0F172A"),
-        spaceAfter=3,
-    )
-    style_normal = ParagraphStyle(
-        "RelatorioNormal",
-        parent=styles["BodyText"],
-        fontName="Helvetica",
-        fontSize=9.5,
-        leading=13,
-        textColor=colors.HexColor("#111827"),
-    )
-    style_secao = ParagraphStyle(
-        "RelatorioSecao",
-        parent=styles["Heading3"],
-        fontName="Helvetica-Bold",
-        fontSize=11,
-        textColor=colors.HexColor("#1F2937"),
-        spaceAfter=2,
-        spaceBefore=6,
-    )
-
-    story: List[Any] = []
-
-    logo = None
-    if logomarca_dados:
-        try:
-            logo_reader = ImageReader(BytesIO(logomarca_dados))
-            largura, altura = logo_reader.getSize()
-            max_largura = 34 * mm
-            max_altura = 24 * mm
-            escala = min(max_largura / largura, max_altura / altura)
-            logo = Image(BytesIO(logomarca_dados), width=largura * escala, height=altura * escala)
-            logo.hAlign = "LEFT"
-        except Exception:
-            logo = None
-
-    emissao = datetime.now().strftime("%d/%m/%Y %H:%M")
-    texto_cabecalho = [
-        "Relatorio de Cobranca - Valores Pendentes",
-        _texto_pdf(nome_empresa, "Fort Cordis"),
-        f"Emissao: {emissao}",
-    ]
-    if contato_empresa:
-        texto_cabecalho.append(_texto_pdf(contato_empresa, ""))
-    if filtros_texto:
-        texto_cabecalho.append(f"Filtros: {_texto_pdf(filtros_texto, '-')} ")
-
-    cabecalho_info = [
-        Paragraph(texto_cabecalho[0], style_titulo),
-        Paragraph("<br/>".join(texto_cabecalho[1:]), style_normal),
-    ]
-    if logo:
-        tabela_cabecalho = Table(
-            [[logo, cabecalho_info]],
-            colWidths=[38 * mm, doc.width - (38 * mm)],
-        )
-        tabela_cabecalho.setStyle(
-            TableStyle(
-                [
-                    ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                    ("LEFTPADDING", (0, 0), (-1, -1), 0),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 0),
-                    ("TOPPADDING", (0, 0), (-1, -1), 0),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
-                ]
-            )
-        )
-        story.append(tabela_cabecalho)
-    else:
-        story.extend(cabecalho_info)
-
-    story.append(Spacer(1, 4 * mm))
-    story.append(Paragraph("Mensagem", style_secao))
-    mensagem_pdf = (
-        str(mensagem_cobranca or "").strip()
-        or "Prezados parceiros, segue o demonstrativo atualizado das ordens de servico em aberto para conferencia e programacao de pagamento."
-    )
-    story.append(
-        Paragraph(
-            _texto_pdf(mensagem_pdf, "-").replace("\n", "<br/>"),
-            style_normal,
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{campo} invalida (use AAAA-MM-DD).",
         )
-    )
 
-    grupos: Dict[str, Dict[str, Any]] = {}
-    for item in itens:
-        chave = item["chave"]
-        grupo = grupos.get(chave)
-        if not grupo:
-            grupo = {
-                "clinica_nome": item["clinica_nome"],
-                "clinica_telefone": item["clinica_telefone"],
-                "ordens": [],
-                "total": 0.0,
-            }
-            grupos[chave] = grupo
-
-        grupo["ordens"].append(item)
-        grupo["total"] += float(item["valor_final"] or 0)
-
-    total_geral = 0.0
-    for grupo in grupos.values():
-        story.append(Spacer(1, 3 * mm))
-        story.append(Paragraph(f"Clinica: {_texto_pdf(grupo['clinica_nome'], 'Nao informada')}", style_secao))
-        story.append(
-            Paragraph(
-                f"Telefone: {_texto_pdf(grupo['clinica_telefone'], 'nao informado')}",
-                style_normal,
-            )
-        )
 
-        linhas_tabela = [["OS", "Data", "Paciente", "Tutor", "Servico", "Valor"]]
-        for ordem in grupo["ordens"]:
-            linhas_tabela.append(
-                [
-                    str(ordem["numero_os"] or "-"),
-                    _formatar_data_ddmmaa(ordem["data_atendimento"]),
-                    str(ordem["paciente"] or "-"),
-                    str(ordem["tutor"] or "-"),
-                    str(ordem["servico"] or "-"),
-                    _formatar_moeda_brl(ordem["valor_final"]),
-                ]
-            )
+def _filtro_depois_do_cursor_os(momento: Optional[datetime], os_id: int):
+    """Linhas depois de (momento, id) em ORDER BY data_atendimento DESC NULLS LAST, id DESC."""
+    if momento is None:
+        return and_(OrdemServico.data_atendimento.is_(None), OrdemServico.id < os_id)
+    return or_(
+        filtro_depois_do_cursor(OrdemServico.data_atendimento, OrdemServico.id, momento, os_id),
+        OrdemServico.data_atendimento.is_(None),
+    )
 
-        linhas_tabela.append(["", "", "", "", "Subtotal", _formatar_moeda_brl(grupo["total"])])
-        tabela = Table(
-            linhas_tabela,
-            colWidths=[22 * mm, 22 * mm, 36 * mm, 30 * mm, 48 * mm, 24 * mm],
-            repeatRows=1,
-        )
 
-        subtotal_row = len(linhas_tabela) - 1
-        tabela.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E8EEF8")),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0F172A")),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("FONTNAME", (0, 1), (-1, -2), "Helvetica"),
-                    ("FONTNAME", (0, subtotal_row), (-1, subtotal_row), "Helvetica-Bold"),
-                    ("FONTSIZE", (0, 0), (-1, -1), 8.8),
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#D1D5DB")),
-                    ("ALIGN", (-1, 1), (-1, -1), "RIGHT"),
-                    ("ALIGN", (0, 0), (0, -1), "CENTER"),
-                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                    ("LEFTPADDING", (0, 0), (-1, -1), 4),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-                    ("TOPPADDING", (0, 0), (-1, -1), 3),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-                    ("BACKGROUND", (0, subtotal_row), (-1, subtotal_row), colors.HexColor("#F3F4F6")),
-                ]
-            )
-        )
-        story.append(Spacer(1, 1.5 * mm))
-        story.append(tabela)
-        total_geral += grupo["total"]
-
-    story.append(Spacer(1, 5 * mm))
-    story.append(
-        Paragraph(
-            f"<b>Total pendente geral:</b> {_formatar_moeda_brl(total_geral)}",
-            style_normal,
-        )
-    )
-    story.append(Spacer(1, 2 * mm))
-    story.append(
-        Paragraph(
-            "Agradecemos a parceria e permanecemos a disposicao para qualquer duvida.",
-            style_normal,
-        )
-    )
-    story.append(Paragraph("Atenciosamente,", style_normal))
-    story.append(Paragraph(f"<b>{_texto_pdf(nome_empresa, 'Fort Cordis')}</b>", style_normal))
-
-    rodape_final = texto_rodape.strip() if texto_rodape else nome_empresa
-    doc.build(
-        story,
-        onFirstPage=lambda c, d: _desenhar_rodape_relatorio(c, d, rodape_final),
-        onLaterPages=lambda c, d: _desenhar_rodape_relatorio(c, d, rodape_final),
-    )
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
-    return pdf_bytes
+def _decodificar_cursor_os(cursor: str) -> tuple[Optional[datetime], int]:
+    dados = decodificar_cursor_campos(cursor, "Cursor de ordens de servico")
+    try:
+        momento = datetime.fromisoformat(dados["c"]) if dados.get("c") is not None else None
+        return momento, int(dados["i"])
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de ordens de servico invalido.")
 
 
 @router.get("")
@@ -390,12 +176,23 @@ def listar_ordens(
     tipo_horario: Optional[str] = Query(None, pattern="^(comercial|plantao)$"),
     data_inicio: Optional[str] = None,
     data_fim: Optional[str] = None,
+    cursor: Optional[str] = None,
+    incluir_total: bool = True,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=ORDENS_LIMITE_MAXIMO),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Lista ordens de servico com filtros."""
+    """Lista ordens de servico com filtros, da mais recente para a mais antiga.
+
+    Paginacao por cursor: passe `next_cursor` da resposta anterior em
+    `cursor` (`skip` continua aceito, mas custa O(skip)); `limit` acima de
+    ORDENS_LIMITE_MAXIMO e recusado com 422. `total` so vem na
+    primeira pagina (e nao vem com `incluir_total=false`); para de contar em
+    ORDENS_TOTAL_MAX (`total_exato=False`).
+    """
+    inicio = _parse_data_filtro(data_inicio, "data_inicio")
+    fim = _parse_data_filtro(data_fim, "data_fim")
     query = (
         db.query(
             OrdemServico,
@@ -418,18 +215,32 @@ def listar_ordens(
         query = query.filter(OrdemServico.servico_id == servico_id)
     if tipo_horario:
         query = query.filter(OrdemServico.tipo_horario == tipo_horario)
-    if data_inicio:
-        query = query.filter(func.date(OrdemServico.data_atendimento) >= data_inicio)
-    if data_fim:
-        query = query.filter(func.date(OrdemServico.data_atendimento) <= data_fim)
-
-    total = query.count()
-    results = (
-        query.order_by(OrdemServico.data_atendimento.desc(), OrdemServico.id.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    # Intervalo sobre a coluna (usa o indice), nao date().
+    if inicio:
+        query = query.filter(OrdemServico.data_atendimento >= datetime.combine(inicio, dt_time.min))
+    if fim:
+        query = query.filter(OrdemServico.data_atendimento < datetime.combine(fim + timedelta(days=1), dt_time.min))
+
+    total: Optional[int] = None
+    total_exato = True
+    if cursor:
+        cursor_data, cursor_id = _decodificar_cursor_os(cursor)
+        query = query.filter(_filtro_depois_do_cursor_os(cursor_data, cursor_id))
+    elif incluir_total:
+        amostra = query.with_entities(OrdemServico.id).limit(ORDENS_TOTAL_MAX + 1).subquery()
+        total = db.query(func.count()).select_from(amostra).scalar() or 0
+        if total > ORDENS_TOTAL_MAX:
+            total, total_exato = ORDENS_TOTAL_MAX, False
+
+    query = query.order_by(OrdemServico.data_atendimento.desc().nulls_last(), OrdemServico.id.desc())
+    if not cursor and skip > 0:
+        query = query.offset(skip)
+    results = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(results) > limit:
+        ultima = results[limit - 1][0]
+        next_cursor = codificar_cursor_campos({"c": ultima.data_atendimento, "i": ultima.id})
+    results = results[:limit]
 
     items = [
         _serialize_os(
@@ -442,7 +253,7 @@ def listar_ordens(
         for os_data, paciente_nome, tutor_nome, clinica_nome, servico_nome in results
     ]
 
-    return {"total": total, "items": items}
+    return {"total": total, "total_exato": total_exato, "items": items, "next_cursor": next_cursor}
 
 
 @router.get("/relatorios/pendencias/pdf")
@@ -459,134 +270,30 @@ def gerar_relatorio_pendencias_pdf(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Gera PDF profissional de cobranca das ordens de servico pendentes."""
-    query = (
-        db.query(
-            OrdemServico,
-            Paciente.nome.label("paciente_nome"),
-            Tutor.nome.label("tutor_nome"),
-            Clinica.nome.label("clinica_nome"),
-            Clinica.telefone.label("clinica_telefone"),
-            Servico.nome.label("servico_nome"),
-        )
-        .outerjoin(Paciente, OrdemServico.paciente_id == Paciente.id)
-        .outerjoin(Tutor, Paciente.tutor_id == Tutor.id)
-        .outerjoin(Clinica, OrdemServico.clinica_id == Clinica.id)
-        .outerjoin(Servico, OrdemServico.servico_id == Servico.id)
-    )
-
-    if status and status != "todos":
-        query = query.filter(OrdemServico.status == status)
-    if clinica_id:
-        query = query.filter(OrdemServico.clinica_id == clinica_id)
-    elif clinica_nome:
-        nome_limpo = clinica_nome.strip().lower()
-        if nome_limpo == "clinica nao informada":
-            query = query.filter(OrdemServico.clinica_id.is_(None))
-        else:
-            query = query.filter(func.lower(Clinica.nome) == nome_limpo)
-    if servico_id:
-        query = query.filter(OrdemServico.servico_id == servico_id)
-    if tipo_horario:
-        query = query.filter(OrdemServico.tipo_horario == tipo_horario)
-    if data_inicio:
-        query = query.filter(func.date(OrdemServico.data_atendimento) >= data_inicio)
-    if data_fim:
-        query = query.filter(func.date(OrdemServico.data_atendimento) <= data_fim)
-    if busca:
-        termo = f"%{busca.strip()}%"
-        query = query.filter(
-            or_(
-                OrdemServico.numero_os.ilike(termo),
-                Paciente.nome.ilike(termo),
-                Tutor.nome.ilike(termo),
-                Clinica.nome.ilike(termo),
-                Servico.nome.ilike(termo),
-            )
-        )
+    """Gera PDF profissional de cobranca das ordens de servico pendentes.
 
-    resultados = query.order_by(Clinica.nome.asc(), OrdemServico.data_atendimento.asc(), OrdemServico.id.asc()).all()
-    if not resultados:
+    Para muitas clinicas (fechamento do mes), prefira o job
+    POST /relatorios/pendencias/jobs, que renderiza por clinica em paralelo.
+    """
+    filtros = FiltrosPendencias(
+        status=status,
+        clinica_id=clinica_id,
+        clinica_nome=clinica_nome,
+        servico_id=servico_id,
+        tipo_horario=tipo_horario,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        busca=busca,
+        mensagem=mensagem,
+    )
+    itens_relatorio = [item_relatorio(row) for row in consulta_pendencias(db, filtros).all()]
+    if not itens_relatorio:
         raise HTTPException(
             status_code=404,
             detail="Nao ha ordens para gerar relatorio com os filtros selecionados.",
         )
 
-    itens_relatorio: List[Dict[str, Any]] = []
-    for os_data, paciente_nome, tutor_nome, clinica_nome, clinica_telefone, servico_nome in resultados:
-        nome_clinica = (clinica_nome or "Clinica nao informada").strip()
-        chave = f"id:{os_data.clinica_id}" if os_data.clinica_id else f"nome:{nome_clinica.lower()}"
-        itens_relatorio.append(
-            {
-                "chave": chave,
-                "numero_os": os_data.numero_os or "",
-                "paciente": paciente_nome or "",
-                "tutor": tutor_nome or "",
-                "clinica_nome": nome_clinica,
-                "clinica_telefone": (clinica_telefone or "").strip(),
-                "servico": servico_nome or "",
-                "data_atendimento": os_data.data_atendimento,
-                "valor_final": float(os_data.valor_final or 0),
-            }
-        )
-
-    configuracao = db.query(Configuracao).first()
-    nome_empresa = (
-        (configuracao.nome_empresa or "").strip()
-        if configuracao and configuracao.nome_empresa
-        else "Fort Cordis Cardiologia Veterinaria"
-    )
-
-    contato_partes: List[str] = []
-    if configuracao:
-        if configuracao.telefone:
-            contato_partes.append(str(configuracao.telefone).strip())
-        if configuracao.email:
-            contato_partes.append(str(configuracao.email).strip())
-        cidade_estado = " ".join(
-            [parte for parte in [configuracao.cidade or "", configuracao.estado or ""] if parte]
-        ).strip()
-        if cidade_estado:
-            contato_partes.append(cidade_estado)
-    contato_empresa = " | ".join([p for p in contato_partes if p])
-
-    filtros_aplicados: List[str] = []
-    if status and status != "todos":
-        filtros_aplicados.append(f"status={status}")
-    if clinica_id:
-        clinica_ref = db.query(Clinica).filter(Clinica.id == clinica_id).first()
-        filtros_aplicados.append(f"clinica={clinica_ref.nome if clinica_ref else clinica_id}")
-    elif clinica_nome:
-        filtros_aplicados.append(f"clinica={clinica_nome}")
-    if servico_id:
-        servico_ref = db.query(Servico).filter(Servico.id == servico_id).first()
-        filtros_aplicados.append(f"servico={servico_ref.nome if servico_ref else servico_id}")
-    if tipo_horario:
-        filtros_aplicados.append(f"tipo_horario={tipo_horario}")
-    if data_inicio:
-        filtros_aplicados.append(f"de={data_inicio}")
-    if data_fim:
-        filtros_aplicados.append(f"ate={data_fim}")
-    if busca:
-        filtros_aplicados.append(f"busca={busca}")
-    filtros_texto = ", ".join(filtros_aplicados) if filtros_aplicados else "sem filtros especificos"
-
-    logomarca = None
-    texto_rodape = ""
-    if configuracao:
-        if configuracao.mostrar_logomarca and configuracao.logomarca_dados:
-            logomarca = configuracao.logomarca_dados
-        texto_rodape = (configuracao.texto_rodape_laudo or "").strip()
-
-    pdf_bytes = _gerar_pdf_cobranca_pendencias(
-        itens=itens_relatorio,
-        nome_empresa=nome_empresa,
-        contato_empresa=contato_empresa,
-        texto_rodape=texto_rodape,
-        filtros_texto=filtros_texto,
-        mensagem_cobranca=mensagem,
-        logomarca_dados=logomarca,
-    )
+    pdf_bytes = gerar_pdf_cobranca_pendencias(itens=itens_relatorio, **montar_cabecalho_pendencias(db, filtros))
 
     filename = f"relatorio_cobranca_pendencias_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf"
     return StreamingResponse(
@@ -596,6 +303,69 @@ def gerar_relatorio_pendencias_pdf(
     )
 
 
+class RelatorioPendenciasJobInput(BaseModel):
+    formato: str = Field(default="zip", pattern="^(zip|pdf)$")
+    status: Optional[str] = "Pendente"
+    clinica_id: Optional[int] = None
+    clinica_nome: Optional[str] = None
+    servico_id: Optional[int] = None
+    tipo_horario: Optional[str] = Field(default=None, pattern="^(comercial|plantao)$")
+    data_inicio: Optional[str] = None
+    data_fim: Optional[str] = None
+    busca: Optional[str] = None
+    mensagem: Optional[str] = None
+
+
+@router.post("/relatorios/pendencias/jobs")
+def criar_job_relatorio_pendencias(
+    payload: RelatorioPendenciasJobInput,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Enfileira o relatorio de pendencias por clinica (ZIP com um PDF por clinica ou PDF unico)."""
+    filtros = FiltrosPendencias(**payload.model_dump(exclude={"formato"}))
+    return enqueue_relatorio_pendencias_job(db, filtros, payload.formato, current_user.id)
+
+
+@router.get("/relatorios/pendencias/jobs/{job_id}")
+def obter_job_relatorio_pendencias(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Consulta o status de um job do relatorio de pendencias."""
+    job = get_relatorio_pendencias_job_for_user(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job do relatorio nao encontrado")
+
+    if job.status == JOB_STATUS_PENDING:
+        submit_relatorio_pendencias_job(job.id)
+
+    return serialize_relatorio_pendencias_job(job)
+
+
+@router.get("/relatorios/pendencias/jobs/{job_id}/download")
+def baixar_job_relatorio_pendencias(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Faz download (em streaming do disco) do ZIP/PDF gerado por um job concluido."""
+    job = get_relatorio_pendencias_job_for_user(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job do relatorio nao encontrado")
+    if job.status != JOB_STATUS_COMPLETED:
+        raise HTTPException(status_code=409, detail="Relatorio ainda nao esta pronto")
+    if not job.arquivo_caminho or not os.path.exists(job.arquivo_caminho):
+        raise HTTPException(status_code=410, detail="Arquivo do relatorio nao encontrado no armazenamento")
+
+    return FileResponse(
+        path=job.arquivo_caminho,
+        media_type="application/zip" if job.formato == "zip" else "application/pdf",
+        filename=job.arquivo_nome or f"relatorio_cobranca_pendencias.{job.formato}",
+    )
+
+
 @router.get("/{os_id}")
 def obter_ordem(
     os_id: int,
@@ -993,6 +763,14 @@ def ordens_pendentes_clinica(
     }
 
 
+def _contagem_status(status_os: str):
+    return func.coalesce(func.sum(case((OrdemServico.status == status_os, 1), else_=0)), 0)
+
+
+def _soma_valor_status(status_os: str):
+    return func.coalesce(func.sum(case((OrdemServico.status == status_os, OrdemServico.valor_final), else_=0)), 0)
+
+
 @router.get("/dashboard/resumo")
 def resumo_os(
     mes: Optional[int] = None,
@@ -1015,22 +793,15 @@ def resumo_os(
             OrdemServico.data_atendimento < data_fim,
         )
 
-    pendentes = query.filter(OrdemServico.status == "Pendente").count()
-    pagas = query.filter(OrdemServico.status == "Pago").count()
-    canceladas = query.filter(OrdemServico.status == "Cancelado").count()
-
-    valor_total = (
-        db.query(func.sum(OrdemServico.valor_final))
-        .filter(OrdemServico.status == "Pago")
-        .scalar()
-        or 0
-    )
-    valor_pendente = (
-        db.query(func.sum(OrdemServico.valor_final))
-        .filter(OrdemServico.status == "Pendente")
-        .scalar()
-        or 0
-    )
+    # Uma unica varredura do conjunto filtrado (agregacao condicional por status).
+    pendentes, pagas, canceladas, valor_total, valor_pendente = query.with_entities(
+        _contagem_status("Pendente"),
+        _contagem_status("Pago"),
+        _contagem_status("Cancelado"),
+        _soma_valor_status("Pago"),
+        _soma_valor_status("Pendente"),
+    ).one()
+    pendentes, pagas, canceladas = int(pendentes), int(pagas), int(canceladas)
 
     return {
         "total_os": pendentes + pagas + canceladas,
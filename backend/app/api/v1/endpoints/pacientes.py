@@ -10,10 +10,20 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.core.security import get_current_user
-from app.db.database import get_db
+from app.core.paginacao import codificar_cursor_campos, decodificar_cursor_campos
+from app.db.database import get_db, get_read_db
 from app.models.paciente import Paciente
 from app.models.tutor import Tutor
 from app.models.user import User
+from app.services.busca_service import filtro_nome
+from app.services.timeline_service import (
+    LIMITE_MAXIMO as TIMELINE_LIMITE_MAXIMO,
+    LIMITE_PADRAO as TIMELINE_LIMITE_PADRAO,
+    TIPOS as TIMELINE_TIPOS,
+    CursorTimeline,
+    montar_timeline,
+    normalizar_momento,
+)
 
 router = APIRouter()
 
@@ -206,19 +216,7 @@ def listar_pacientes(
 
     if search:
         termo = search.strip()
-        termo_key = _gerar_nome_key(termo)
-        filtros = [
-            Paciente.nome.ilike(f"%{termo}%"),
-            Tutor.nome.ilike(f"%{termo}%"),
-        ]
-        if termo_key:
-            filtros.extend(
-                [
-                    func.coalesce(Paciente.nome_key, "").ilike(f"%{termo_key}%"),
-                    func.coalesce(Tutor.nome_key, "").ilike(f"%{termo_key}%"),
-                ]
-            )
-        query = query.filter(or_(*filtros))
+        query = query.filter(or_(filtro_nome(db, Paciente, termo), filtro_nome(db, Tutor, termo)))
 
     total = query.count()
     items = query.order_by(Paciente.nome.asc()).offset(skip).limit(limit).all()
@@ -439,6 +437,64 @@ def obter_tutor_paciente(
     }
 
 
+def _decodificar_cursor_timeline(cursor: str) -> CursorTimeline:
+    dados = decodificar_cursor_campos(cursor, "Cursor da linha do tempo")
+    try:
+        tipo = str(dados["f"])
+        if tipo not in TIMELINE_TIPOS:
+            raise ValueError(tipo)
+        momento = normalizar_momento(datetime.fromisoformat(dados["c"]))
+        return CursorTimeline(momento=momento, tipo=tipo, item_id=int(dados["i"]))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor da linha do tempo invalido.")
+
+
+@router.get("/{paciente_id}/timeline")
+def linha_do_tempo_paciente(
+    paciente_id: int,
+    cursor: Optional[str] = None,
+    limit: int = TIMELINE_LIMITE_PADRAO,
+    tipos: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Agendamentos, atendimentos, laudos, OS e transacoes do paciente, do mais recente ao mais antigo.
+
+    `tipos` filtra as fontes (lista separada por virgula); `cursor` vem de
+    `next_cursor` da pagina anterior.
+    """
+    paciente = db.query(Paciente.id, Paciente.nome).filter(Paciente.id == paciente_id).first()
+    if not paciente:
+        raise HTTPException(status_code=404, detail="Paciente nao encontrado")
+
+    selecionados = None
+    if tipos:
+        selecionados = [t.strip() for t in tipos.split(",") if t.strip()]
+        invalidos = sorted(set(selecionados) - set(TIMELINE_TIPOS))
+        if invalidos:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Tipos invalidos: {', '.join(invalidos)}. Use: {', '.join(TIMELINE_TIPOS)}.",
+            )
+
+    itens, proximo = montar_timeline(
+        db,
+        paciente_id,
+        cursor=_decodificar_cursor_timeline(cursor) if cursor else None,
+        limite=max(1, min(limit, TIMELINE_LIMITE_MAXIMO)),
+        tipos=selecionados,
+    )
+    next_cursor = None
+    if proximo is not None:
+        next_cursor = codificar_cursor_campos({"c": proximo.momento, "f": proximo.tipo, "i": proximo.item_id})
+
+    return {
+        "paciente": {"id": paciente.id, "nome": paciente.nome},
+        "items": itens,
+        "next_cursor": next_cursor,
+    }
+
+
 @router.delete("/{paciente_id}")
 def deletar_paciente(
     paciente_id: int,
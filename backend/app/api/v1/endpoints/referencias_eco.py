@@ -1,9 +1,8 @@
 """Endpoints para gerenciamento de referências ecocardiográficas"""
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
 import csv
 import io
 
@@ -11,6 +10,8 @@ from app.db.database import get_db
 from app.models.referencia_eco import ReferenciaEco
 from app.models.user import User
 from app.core.security import get_current_user
+from app.services import referencias_eco_service
+from app.services.referencias_eco_service import normalizar_especie as _normalizar_especie
 
 router = APIRouter()
 
@@ -39,20 +40,6 @@ _MAPEAMENTO_CSV_FELINOS = {
 }
 
 
-def _normalizar_especie(especie: Optional[str]) -> Optional[str]:
-    """Normaliza texto de especie para Canina/Felina."""
-    if not especie:
-        return None
-
-    valor = especie.strip().lower()
-    if valor.startswith("fel") or "gato" in valor or "cat" in valor:
-        return "Felina"
-    if valor.startswith("can") or "cao" in valor or "cão" in valor or "dog" in valor:
-        return "Canina"
-
-    return especie.strip()
-
-
 def _aplicar_filtro_especie(query, especie: Optional[str]):
     """Aplica filtro flexivel por especie (suporta legado canino/caninos/felino/felinos)."""
     especie_norm = _normalizar_especie(especie)
@@ -67,49 +54,12 @@ def _aplicar_filtro_especie(query, especie: Optional[str]):
     return query.filter(ReferenciaEco.especie.ilike(especie_norm))
 
 
+_COLUNAS_REFERENCIA = tuple(column.name for column in ReferenciaEco.__table__.columns)
+
+
 def _referencia_to_dict(r: ReferenciaEco) -> dict:
     """Serializa um ReferenciaEco para dict (evita problemas de JSON com objetos SQLAlchemy)."""
-    return {
-        "id": r.id,
-        "especie": r.especie,
-        "peso_kg": r.peso_kg,
-        # VE - Modo M
-        "lvid_d_min": r.lvid_d_min, "lvid_d_max": r.lvid_d_max,
-        "lvid_s_min": r.lvid_s_min, "lvid_s_max": r.lvid_s_max,
-        "ivs_d_min": r.ivs_d_min, "ivs_d_max": r.ivs_d_max,
-        "ivs_s_min": r.ivs_s_min, "ivs_s_max": r.ivs_s_max,
-        "lvpw_d_min": r.lvpw_d_min, "lvpw_d_max": r.lvpw_d_max,
-        "lvpw_s_min": r.lvpw_s_min, "lvpw_s_max": r.lvpw_s_max,
-        # Função
-        "fs_min": r.fs_min, "fs_max": r.fs_max,
-        "ef_min": r.ef_min, "ef_max": r.ef_max,
-        "tapse_min": r.tapse_min, "tapse_max": r.tapse_max,
-        "mapse_min": r.mapse_min, "mapse_max": r.mapse_max,
-        # Vasos
-        "ao_min": r.ao_min, "ao_max": r.ao_max,
-        "la_min": r.la_min, "la_max": r.la_max,
-        "la_ao_min": r.la_ao_min, "la_ao_max": r.la_ao_max,
-        # Artéria Pulmonar
-        "ap_min": r.ap_min, "ap_max": r.ap_max,
-        "ap_ao_min": r.ap_ao_min, "ap_ao_max": r.ap_ao_max,
-        # Fluxos
-        "vmax_ao_min": r.vmax_ao_min, "vmax_ao_max": r.vmax_ao_max,
-        "vmax_pulm_min": r.vmax_pulm_min, "vmax_pulm_max": r.vmax_pulm_max,
-        # Mitral/Diastólica
-        "mv_e_min": r.mv_e_min, "mv_e_max": r.mv_e_max,
-        "mv_a_min": r.mv_a_min, "mv_a_max": r.mv_a_max,
-        "mv_ea_min": r.mv_ea_min, "mv_ea_max": r.mv_ea_max,
-        "mv_dt_min": r.mv_dt_min, "mv_dt_max": r.mv_dt_max,
-        "ivrt_min": r.ivrt_min, "ivrt_max": r.ivrt_max,
-        # Doppler Tecidual
-        "tdi_e_min": r.tdi_e_min, "tdi_e_max": r.tdi_e_max,
-        "tdi_a_min": r.tdi_a_min, "tdi_a_max": r.tdi_a_max,
-        "e_e_linha_min": r.e_e_linha_min, "e_e_linha_max": r.e_e_linha_max,
-        # Volumes
-        "edv_min": r.edv_min, "edv_max": r.edv_max,
-        "esv_min": r.esv_min, "esv_max": r.esv_max,
-        "sv_min": r.sv_min, "sv_max": r.sv_max,
-    }
+    return {coluna: getattr(r, coluna) for coluna in _COLUNAS_REFERENCIA}
 
 
 def _importar_csv_from_content(content: str, especie: str, db: Session) -> int:
@@ -222,6 +172,22 @@ class ReferenciaEcoUpdate(ReferenciaEcoCreate):
     pass
 
 
+class AvaliacaoPaciente(BaseModel):
+    peso_kg: Optional[float] = None
+    medidas: Dict[str, Any] = Field(default_factory=dict)
+
+
+class AvaliacaoRequest(AvaliacaoPaciente):
+    especie: str
+    interpolar: bool = False
+
+
+class AvaliacaoLoteRequest(BaseModel):
+    especie: str
+    interpolar: bool = False
+    pacientes: List[AvaliacaoPaciente] = Field(default_factory=list, max_length=5000)
+
+
 @router.get("", response_model=None)
 @router.get("/", response_model=None)
 def listar_referencias(
@@ -272,6 +238,7 @@ def importar_referencias_csv(
             result["felinos"] = _importar_csv_from_content(content, "Felina", db)
         except Exception as e:
             result["erros"].append(f"Felinos: {str(e)}")
+    referencias_eco_service.invalidar_cache_referencias()
     return result
 
 
@@ -292,18 +259,52 @@ def obter_referencia(
 def buscar_referencia_por_peso(
     especie: str,
     peso_kg: float,
+    interpolar: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Busca a referência mais próxima do peso informado"""
-    query = _aplicar_filtro_especie(db.query(ReferenciaEco), especie)
-    ref = query.order_by(
-        func.abs(ReferenciaEco.peso_kg - peso_kg)
-    ).first()
-    
+    """Busca a referência mais próxima do peso (ou interpolada entre os pesos vizinhos)."""
+    ref = referencias_eco_service.buscar_referencia(db, especie, peso_kg, interpolar=interpolar)
     if not ref:
         raise HTTPException(status_code=404, detail="Referência não encontrada")
-    return _referencia_to_dict(ref)
+    return ref
+
+
+@router.post("/avaliar")
+def avaliar_medidas(
+    payload: AvaliacaoRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Classifica as medidas de um laudo (Abaixo/Normal/Acima) contra a referência."""
+    resultado = referencias_eco_service.avaliar_medidas(
+        db,
+        payload.especie,
+        payload.peso_kg,
+        payload.medidas,
+        interpolar=payload.interpolar,
+    )
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Referência não encontrada")
+    return {"items": resultado}
+
+
+@router.post("/avaliar-lote")
+def avaliar_medidas_lote(
+    payload: AvaliacaoLoteRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Classifica as medidas de vários pacientes da mesma espécie numa única passada."""
+    resultados = referencias_eco_service.avaliar_lote(
+        db,
+        payload.especie,
+        [item.model_dump() for item in payload.pacientes],
+        interpolar=payload.interpolar,
+    )
+    if resultados is None:
+        raise HTTPException(status_code=404, detail="Referência não encontrada")
+    return {"total": len(resultados), "items": resultados}
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
@@ -317,6 +318,7 @@ def criar_referencia(
     db.add(nova_ref)
     db.commit()
     db.refresh(nova_ref)
+    referencias_eco_service.invalidar_cache_referencias()
     return nova_ref
 
 
@@ -337,6 +339,7 @@ def atualizar_referencia(
     
     db.commit()
     db.refresh(ref)
+    referencias_eco_service.invalidar_cache_referencias()
     return ref
 
 
@@ -353,4 +356,5 @@ def deletar_referencia(
     
     db.delete(ref)
     db.commit()
+    referencias_eco_service.invalidar_cache_referencias()
     return {"message": "Referência removida com sucesso"}
@@ -12,6 +12,7 @@ from app.core.security import get_current_user
 from app.db.database import get_db
 from app.models.tutor import Tutor
 from app.models.user import User
+from app.services.busca_service import filtro_nome
 
 router = APIRouter()
 
@@ -59,7 +60,7 @@ def listar_tutores(
     query = db.query(Tutor).filter(Tutor.ativo == 1)
 
     if busca:
-        query = query.filter(Tutor.nome.ilike(f"%{busca}%"))
+        query = query.filter(filtro_nome(db, Tutor, busca))
 
     total = query.count()
     items = query.offset(skip).limit(limit).all()
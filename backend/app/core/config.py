@@ -5,15 +5,45 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DATABASE_READ_URL: str = ""  # replica para relatorios; vazio = DATABASE_URL em modo somente leitura
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800  # segundos; evita conexoes derrubadas pelo pooler/firewall
+    DB_POOL_PRE_PING: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE_MB: int = 256
     SECRET_KEY: str = "change-me"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 720
     UPLOAD_DIR: str = "/opt/fortcordis/uploads"
+    RELATORIO_PENDENCIAS_PROCESSOS: int = 2  # processos que renderizam extratos por clinica (0 = no proprio job)
     GOOGLE_MAPS_API_KEY: str = ""
+    GEO_CACHE_ATIVO: bool = True  # cache em banco das consultas Google/ViaCEP
+    GEO_CACHE_TTL_ROTAS_SECONDS: int = 21600  # Routes/Distance Matrix (com transito)
+    GEO_CACHE_TTL_GEOCODING_SECONDS: int = 2592000
+    GEO_CACHE_TTL_VIACEP_SECONDS: int = 2592000
+    GEO_CACHE_TTL_FALHA_SECONDS: int = 600  # cache negativo: CEP inexistente, endereco sem resultado
     REQUIRE_STRONG_SECRET_KEY: bool = False
     REQUIRE_UP_TO_DATE_MIGRATIONS: bool = False
     ALLOW_PERMISSION_MATRIX_FALLBACK: bool = False
     ALLOW_LEGACY_PLAIN_PASSWORDS: bool = False
+    RETENTION_SWEEP_INTERVAL_MINUTES: int = 60
+    RETENTION_SWEEP_BATCH_SIZE: int = 500
+    AUDITORIA_MODO: str = "async"  # async | sync
+    AUDITORIA_FILA_MAX: int = 10000
+    AUDITORIA_LOTE_MAX: int = 200
+    AUDITORIA_FLUSH_INTERVAL_MS: int = 500
+    AUDITORIA_RETENCAO_DIAS: int = 0  # 0 = nao arquiva
+    AUDITORIA_ARQUIVO_DIR: str = ""  # padrao: UPLOAD_DIR/auditoria_arquivo
+    SQL_DIAGNOSTICO: bool = False  # log de consultas lentas com EXPLAIN + deteccao de N+1
+    SQL_LENTA_MS: int = 200
+    SQL_N_MAIS_UM_LIMITE: int = 10
+    HEALTH_CACHE_TTL_SECONDS: int = 15  # /health e /ready servem o relatorio em cache por este tempo
+    METRICS_TOKEN: str = ""  # se definido, /metrics exige "Authorization: Bearer <token>"
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,319 @@
+"""
+Diagnostico de SQL: consultas lentas com EXPLAIN e deteccao de N+1.
+
+Opt-in (SQL_DIAGNOSTICO=true). Usa os mesmos hooks de cursor da
+instrumentacao (app/core/instrumentation.py):
+
+- consulta acima de SQL_LENTA_MS: registra SQL, parametros e o plano
+  (`EXPLAIN`, ou `EXPLAIN QUERY PLAN` no SQLite; so para SELECT, com o
+  plano guardado por alguns minutos por SQL normalizado);
+- a mesma consulta normalizada (literais e placeholders trocados por ?)
+  repetida mais de SQL_N_MAIS_UM_LIMITE vezes numa requisicao: N+1 na rota.
+
+Os achados ficam em memoria (ultimos e um resumo por rota/consulta) e
+saem em GET /admin/diagnostico/sql. `monitorar_consultas()` coleta as
+consultas mesmo com o diagnostico desligado; e a base da fixture
+`orcamento_consultas` dos testes.
+"""
+from __future__ import annotations
+
+import re
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+MAX_ACHADOS_RECENTES = 200
+MAX_RESUMO = 500
+PLANO_TTL_SECONDS = 300
+_MAX_SQL = 2000
+_MAX_PARAMETROS = 500
+
+TIPO_LENTA = "lenta"
+TIPO_N_MAIS_UM = "n_mais_um"
+
+_ESPACOS_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+|\?|__\[POSTCOMPILE_\w+\]")
+_NUMERO_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LISTA_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalizar_sql(statement: str) -> str:
+    """SQL sem literais/parametros, para agrupar execucoes da mesma consulta."""
+    sql = _ESPACOS_RE.sub(" ", str(statement or "")).strip()
+    sql = _STRING_RE.sub("?", sql)
+    sql = _PLACEHOLDER_RE.sub("?", sql)
+    sql = _NUMERO_RE.sub("?", sql)
+    sql = _LISTA_RE.sub("(?...)", sql)
+    return sql[:_MAX_SQL]
+
+
+def ativo() -> bool:
+    return bool(settings.SQL_DIAGNOSTICO)
+
+
+class ColetaConsultas:
+    """Consultas vistas durante `monitorar_consultas()`, por rota."""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.total = 0
+        self.por_rota: Dict[Optional[str], Counter] = {}
+
+    def registrar(self, rota: Optional[str], consultas: Dict[str, int]) -> None:
+        with self._lock:
+            contador = self.por_rota.setdefault(rota, Counter())
+            contador.update(consultas)
+            self.total += sum(consultas.values())
+
+    def violacoes(
+        self,
+        max_consultas: Optional[int] = None,
+        max_repeticoes: Optional[int] = None,
+    ) -> List[str]:
+        """Mensagens para cada limite estourado (lista vazia = dentro do orcamento)."""
+        with self._lock:
+            falhas = []
+            if max_consultas is not None and self.total > max_consultas:
+                por_rota = ", ".join(
+                    f"{rota or '<fora de requisicao>'}={sum(contador.values())}"
+                    for rota, contador in self.por_rota.items()
+                )
+                falhas.append(f"{self.total} consultas (orcamento {max_consultas}): {por_rota}")
+            if max_repeticoes is not None:
+                for rota, contador in self.por_rota.items():
+                    for sql, vezes in contador.most_common():
+                        if vezes <= max_repeticoes:
+                            break
+                        falhas.append(
+                            f"N+1 em {rota or '<fora de requisicao>'}: {vezes}x (limite {max_repeticoes}) {sql}"
+                        )
+            return falhas
+
+
+class _Diagnostico:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._recentes: Deque[Dict[str, Any]] = deque(maxlen=MAX_ACHADOS_RECENTES)
+        self._resumo: Dict[Tuple[str, Optional[str], str], Dict[str, Any]] = {}
+        self._planos: Dict[str, Tuple[float, List[str]]] = {}
+        self._coletores: List[ColetaConsultas] = []
+
+    def coletores(self) -> List[ColetaConsultas]:
+        with self._lock:
+            return list(self._coletores)
+
+    def adicionar_coletor(self, coleta: ColetaConsultas) -> None:
+        with self._lock:
+            self._coletores.append(coleta)
+
+    def remover_coletor(self, coleta: ColetaConsultas) -> None:
+        with self._lock:
+            if coleta in self._coletores:
+                self._coletores.remove(coleta)
+
+    def plano_em_cache(self, sql: str) -> Optional[List[str]]:
+        with self._lock:
+            item = self._planos.get(sql)
+        if item and time.monotonic() - item[0] < PLANO_TTL_SECONDS:
+            return item[1]
+        return None
+
+    def guardar_plano(self, sql: str, plano: List[str]) -> None:
+        with self._lock:
+            if len(self._planos) >= MAX_RESUMO:
+                self._planos.clear()
+            self._planos[sql] = (time.monotonic(), plano)
+
+    def publicar(self, achado: Dict[str, Any]) -> None:
+        chave = (achado["tipo"], achado.get("rota"), achado["sql"])
+        valor = achado.get("duracao_ms") if achado["tipo"] == TIPO_LENTA else achado.get("repeticoes")
+        with self._lock:
+            self._recentes.append(achado)
+            resumo = self._resumo.get(chave)
+            if resumo is None:
+                if len(self._resumo) >= MAX_RESUMO:
+                    return
+                resumo = self._resumo[chave] = {
+                    "tipo": achado["tipo"],
+                    "rota": achado.get("rota"),
+                    "sql": achado["sql"],
+                    "ocorrencias": 0,
+                    "pior": 0,
+                }
+            resumo["ocorrencias"] += 1
+            resumo["pior"] = max(resumo["pior"], valor or 0)
+            resumo["ultima_em"] = achado["em"]
+
+        if achado["tipo"] == TIPO_LENTA:
+            print(
+                f"[sql-diagnostico] Consulta lenta ({achado['duracao_ms']}ms) em "
+                f"{achado.get('rota') or '-'}: {achado['sql'][:300]}"
+            )
+        else:
+            print(
+                f"[sql-diagnostico] N+1 em {achado.get('rota') or '-'}: "
+                f"{achado['repeticoes']}x {achado['sql'][:300]}"
+            )
+
+    def relatorio(self) -> Dict[str, Any]:
+        with self._lock:
+            resumo = sorted(
+                (dict(item) for item in self._resumo.values()),
+                key=lambda item: (item["tipo"], -item["ocorrencias"], -item["pior"]),
+            )
+            recentes = list(reversed(self._recentes))
+        return {
+            "ativo": ativo(),
+            "lenta_ms": int(settings.SQL_LENTA_MS),
+            "n_mais_um_limite": int(settings.SQL_N_MAIS_UM_LIMITE),
+            "resumo": resumo,
+            "recentes": recentes,
+        }
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._recentes.clear()
+            self._resumo.clear()
+            self._planos.clear()
+
+
+_DIAGNOSTICO = _Diagnostico()
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _resumir_parametros(parameters: Any) -> str:
+    texto = repr(parameters)
+    return texto if len(texto) <= _MAX_PARAMETROS else texto[:_MAX_PARAMETROS] + "..."
+
+
+def _explain(conn: Any, statement: str, parameters: Any) -> List[str]:
+    dialeto = conn.dialect.name
+    prefixo = "EXPLAIN QUERY PLAN " if dialeto == "sqlite" else "EXPLAIN "
+    # Cursor DBAPI direto: nao dispara os hooks de novo.
+    cursor = conn.connection.cursor()
+    try:
+        if dialeto == "postgresql":
+            # Um EXPLAIN com erro nao pode abortar a transacao da requisicao.
+            cursor.execute("SAVEPOINT fortcordis_explain")
+        try:
+            cursor.execute(prefixo + statement, parameters or ())
+            linhas = [str(row[-1]) for row in cursor.fetchall()]
+        except Exception as exc:
+            if dialeto == "postgresql":
+                cursor.execute("ROLLBACK TO SAVEPOINT fortcordis_explain")
+            return [f"EXPLAIN indisponivel: {exc}"]
+        if dialeto == "postgresql":
+            cursor.execute("RELEASE SAVEPOINT fortcordis_explain")
+        return linhas
+    finally:
+        cursor.close()
+
+
+def _plano(conn: Any, statement: str, sql: str, parameters: Any, executemany: bool) -> List[str]:
+    if executemany or not re.match(r"\s*(SELECT|WITH)\b", statement, re.IGNORECASE):
+        return []
+    plano = _DIAGNOSTICO.plano_em_cache(sql)
+    if plano is None:
+        try:
+            plano = _explain(conn, statement, parameters)
+        except Exception as exc:
+            plano = [f"EXPLAIN indisponivel: {exc}"]
+        _DIAGNOSTICO.guardar_plano(sql, plano)
+    return plano
+
+
+def observar_consulta(
+    conn: Any,
+    statement: str,
+    parameters: Any,
+    executemany: bool,
+    duracao: float,
+    estatisticas: Any,
+) -> None:
+    """Chamado pelo hook after_cursor_execute quando `ativo()` ou ha coletores."""
+    sql = normalizar_sql(statement)
+    if estatisticas is not None:
+        estatisticas.por_consulta[sql] += 1
+    else:
+        for coleta in _DIAGNOSTICO.coletores():
+            coleta.registrar(None, {sql: 1})
+
+    duracao_ms = round(duracao * 1000, 1)
+    if not ativo() or duracao_ms < int(settings.SQL_LENTA_MS):
+        return
+
+    achado = {
+        "tipo": TIPO_LENTA,
+        "rota": None,
+        "sql": sql,
+        "statement": str(statement)[:_MAX_SQL],
+        "parametros": _resumir_parametros(parameters),
+        "duracao_ms": duracao_ms,
+        "plano": _plano(conn, statement, sql, parameters, executemany),
+        "em": _agora(),
+    }
+    if estatisticas is not None:
+        estatisticas.achados.append(achado)
+    else:
+        _DIAGNOSTICO.publicar(achado)
+
+
+def finalizar_requisicao(rota: Optional[str], estatisticas: Any) -> None:
+    """Publica os achados da requisicao ja com a rota e procura N+1."""
+    if not estatisticas.por_consulta and not estatisticas.achados:
+        return
+
+    for coleta in _DIAGNOSTICO.coletores():
+        coleta.registrar(rota, estatisticas.por_consulta)
+
+    if not ativo():
+        return
+    for achado in estatisticas.achados:
+        achado["rota"] = rota
+        _DIAGNOSTICO.publicar(achado)
+
+    limite = max(1, int(settings.SQL_N_MAIS_UM_LIMITE))
+    for sql, repeticoes in estatisticas.por_consulta.items():
+        if repeticoes > limite:
+            _DIAGNOSTICO.publicar(
+                {
+                    "tipo": TIPO_N_MAIS_UM,
+                    "rota": rota,
+                    "sql": sql,
+                    "repeticoes": repeticoes,
+                    "consultas_na_requisicao": estatisticas.consultas,
+                    "em": _agora(),
+                }
+            )
+
+
+def precisa_observar() -> bool:
+    return ativo() or bool(_DIAGNOSTICO.coletores())
+
+
+@contextmanager
+def monitorar_consultas() -> Iterator[ColetaConsultas]:
+    """Coleta as consultas executadas no bloco (qualquer thread/requisicao)."""
+    coleta = ColetaConsultas()
+    _DIAGNOSTICO.adicionar_coletor(coleta)
+    try:
+        yield coleta
+    finally:
+        _DIAGNOSTICO.remover_coletor(coleta)
+
+
+def relatorio_diagnostico_sql() -> Dict[str, Any]:
+    return _DIAGNOSTICO.relatorio()
+
+
+def limpar_diagnostico_sql() -> None:
+    _DIAGNOSTICO.limpar()
@@ -0,0 +1,194 @@
+"""
+Instrumentacao por requisicao: latencia por rota e consultas SQL.
+
+`InstrumentacaoMiddleware` mede cada requisicao HTTP e registra a latencia
+por metodo, template de rota (ex.: /api/v1/laudos/{laudo_id}) e status.
+Os hooks `before/after_cursor_execute` do engine (mais `handle_error`, que
+descarta o inicio das consultas que falham) contam as consultas e o
+tempo de banco da requisicao atual (via contextvar, que o threadpool do
+Starlette propaga para endpoints sync). Os dois aparecem no header
+`Server-Timing` e em /metrics. O diagnostico opcional de consultas
+lentas/N+1 (app/core/diagnostico_sql.py) usa os mesmos hooks.
+"""
+from __future__ import annotations
+
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+from app.core import diagnostico_sql
+from app.core.metrics import counter, gauge, histogram
+
+SEM_ROTA = "<sem_rota>"
+
+HTTP_REQUEST_SECONDS = histogram(
+    "fortcordis_http_request_duration_seconds",
+    "Latencia das requisicoes HTTP por rota.",
+    ("method", "route", "status"),
+)
+HTTP_EM_ANDAMENTO = gauge(
+    "fortcordis_http_requests_in_progress",
+    "Requisicoes HTTP em andamento.",
+)
+DB_QUERIES_POR_REQUISICAO = histogram(
+    "fortcordis_db_queries_per_request",
+    "Consultas SQL executadas por requisicao.",
+    ("route",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_SECONDS_POR_REQUISICAO = histogram(
+    "fortcordis_db_time_per_request_seconds",
+    "Tempo total de banco por requisicao.",
+    ("route",),
+)
+DB_QUERIES_TOTAL = counter(
+    "fortcordis_db_queries",
+    "Consultas SQL executadas (requisicoes e jobs).",
+)
+DB_QUERY_SECONDS = histogram(
+    "fortcordis_db_query_duration_seconds",
+    "Duracao de cada consulta SQL.",
+)
+
+
+@dataclass
+class EstatisticasRequisicao:
+    consultas: int = 0
+    tempo_db: float = 0.0
+    rota: Optional[str] = None
+    # So preenchidos com o diagnostico de SQL ligado (app/core/diagnostico_sql.py).
+    por_consulta: Counter = field(default_factory=Counter)
+    achados: List[dict] = field(default_factory=list)
+
+
+_REQUISICAO_ATUAL: ContextVar[Optional[EstatisticasRequisicao]] = ContextVar(
+    "fortcordis_requisicao_atual", default=None
+)
+
+
+def estatisticas_requisicao_atual() -> Optional[EstatisticasRequisicao]:
+    return _REQUISICAO_ATUAL.get()
+
+
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("_fortcordis_inicio_consulta", []).append((context, time.perf_counter()))
+
+
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany) -> None:
+    inicios = conn.info.get("_fortcordis_inicio_consulta")
+    if not inicios:
+        return
+    duracao = time.perf_counter() - inicios.pop()[1]
+    DB_QUERIES_TOTAL.inc()
+    DB_QUERY_SECONDS.observe(duracao)
+
+    estatisticas = _REQUISICAO_ATUAL.get()
+    if estatisticas is not None:
+        estatisticas.consultas += 1
+        estatisticas.tempo_db += duracao
+
+    if diagnostico_sql.precisa_observar():
+        try:
+            diagnostico_sql.observar_consulta(conn, statement, parameters, executemany, duracao, estatisticas)
+        except Exception as exc:
+            print(f"[sql-diagnostico] WARN: falha ao observar consulta: {exc}")
+
+
+def _erro_na_consulta(contexto) -> None:
+    # Consulta que falhou nao passa pelo after_cursor_execute: sem isso o
+    # inicio dela ficaria para sempre na conexao (que volta ao pool).
+    conexao = contexto.connection
+    if conexao is None or contexto.execution_context is None:
+        return
+    inicios = conexao.info.get("_fortcordis_inicio_consulta")
+    if inicios and inicios[-1][0] is contexto.execution_context:
+        inicios.pop()
+
+
+def instalar_instrumentacao_sql(engine: Engine) -> None:
+    if event.contains(engine, "before_cursor_execute", _antes_da_consulta):
+        return
+    event.listen(engine, "before_cursor_execute", _antes_da_consulta)
+    event.listen(engine, "after_cursor_execute", _depois_da_consulta)
+    event.listen(engine, "handle_error", _erro_na_consulta)
+
+
+def _server_timing(total: float, estatisticas: EstatisticasRequisicao) -> bytes:
+    return (
+        f"app;dur={total * 1000:.1f}, "
+        f'db;dur={estatisticas.tempo_db * 1000:.1f};desc="{estatisticas.consultas} consultas"'
+    ).encode("latin-1")
+
+
+class InstrumentacaoMiddleware:
+    """Middleware ASGI puro (nao bufferiza a resposta como o BaseHTTPMiddleware)."""
+
+    def __init__(self, app: Callable) -> None:
+        self.app = app
+        self._rotas_por_endpoint: Optional[Dict[Any, List[Tuple[Any, str]]]] = None
+
+    def _template_da_rota(self, scope: dict) -> str:
+        endpoint = scope.get("endpoint")
+        router = getattr(scope.get("app"), "router", None)
+        if endpoint is None or router is None:
+            return SEM_ROTA
+
+        if self._rotas_por_endpoint is None:
+            rotas: Dict[Any, List[Tuple[Any, str]]] = {}
+            for rota in router.routes:
+                caminho = getattr(rota, "path", None)
+                if caminho is not None and getattr(rota, "endpoint", None) is not None:
+                    rotas.setdefault(rota.endpoint, []).append((rota, caminho))
+            self._rotas_por_endpoint = rotas
+
+        candidatas = self._rotas_por_endpoint.get(endpoint) or []
+        if len(candidatas) == 1:
+            return candidatas[0][1]
+        for rota, caminho in candidatas:
+            correspondencia, _ = rota.matches(scope)
+            if correspondencia == Match.FULL:
+                return caminho
+        return SEM_ROTA
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estatisticas = EstatisticasRequisicao()
+        token = _REQUISICAO_ATUAL.set(estatisticas)
+        inicio = time.perf_counter()
+        status_code = 500
+        HTTP_EM_ANDAMENTO.inc()
+
+        async def send_instrumentado(message: dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers") or [])
+                headers.append((b"server-timing", _server_timing(time.perf_counter() - inicio, estatisticas)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_instrumentado)
+        finally:
+            duracao = time.perf_counter() - inicio
+            HTTP_EM_ANDAMENTO.dec()
+            _REQUISICAO_ATUAL.reset(token)
+            rota = self._template_da_rota(scope)
+            estatisticas.rota = rota
+            HTTP_REQUEST_SECONDS.observe(duracao, method=scope.get("method", ""), route=rota, status=status_code)
+            if rota != SEM_ROTA:
+                DB_QUERIES_POR_REQUISICAO.observe(estatisticas.consultas, route=rota)
+                DB_SECONDS_POR_REQUISICAO.observe(estatisticas.tempo_db, route=rota)
+            try:
+                diagnostico_sql.finalizar_requisicao(rota, estatisticas)
+            except Exception as exc:
+                print(f"[sql-diagnostico] WARN: falha ao finalizar requisicao: {exc}")
@@ -0,0 +1,239 @@
+"""
+Metricas no formato texto do Prometheus, sem dependencias externas.
+
+Contadores, histogramas e medidores vivem num registro por processo e sao
+publicados em /metrics. Medidores podem ter uma funcao por combinacao de
+labels, avaliada so na hora da coleta (ex.: tamanho das filas de jobs).
+Com varios workers cada processo publica os seus valores; a agregacao
+fica com o Prometheus.
+"""
+from __future__ import annotations
+
+import math
+from threading import Lock
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# O Response do Starlette acrescenta o charset.
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_numero(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _formatar_labels(nomes: Iterable[str], valores: Iterable[str]) -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, descricao: str, labels: Iterable[str] = ()) -> None:
+        self.nome = nome
+        self.descricao = descricao
+        self.labels = tuple(labels)
+        self._lock = Lock()
+
+    def _chave(self, valores: Dict[str, object]) -> LabelValues:
+        if set(valores) != set(self.labels):
+            raise ValueError(f"{self.nome}: labels esperados {self.labels}, recebidos {tuple(valores)}")
+        return tuple(str(valores[nome]) for nome in self.labels)
+
+    def _amostras(self) -> Iterable[Tuple[str, LabelValues, Tuple[str, ...], float]]:
+        raise NotImplementedError
+
+    def renderizar(self) -> str:
+        linhas = [
+            f"# HELP {self.nome} {_escapar(self.descricao)}",
+            f"# TYPE {self.nome} {self.tipo}",
+        ]
+        for sufixo, valores, extra, numero in self._amostras():
+            nomes = self.labels + (("le",) if extra else ())
+            labels = _formatar_labels(nomes, valores + extra)
+            linhas.append(f"{self.nome}{sufixo}{labels} {_formatar_numero(numero)}")
+        return "\n".join(linhas)
+
+
+class Counter(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nome: str, descricao: str, labels: Iterable[str] = ()) -> None:
+        super().__init__(nome, descricao, labels)
+        self._valores: Dict[LabelValues, float] = {}
+
+    def inc(self, valor: float = 1.0, **labels: object) -> None:
+        chave = self._chave(labels)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def valor(self, **labels: object) -> float:
+        with self._lock:
+            return self._valores.get(self._chave(labels), 0.0)
+
+    def _amostras(self):
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [("_total", chave, (), valor) for chave, valor in itens]
+
+
+class Histogram(_Metrica):
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nome: str,
+        descricao: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(nome, descricao, labels)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # chave -> ([contagem por bucket], soma, contagem)
+        self._series: Dict[LabelValues, Tuple[list, float, int]] = {}
+
+    def observe(self, valor: float, **labels: object) -> None:
+        chave = self._chave(labels)
+        with self._lock:
+            contagens, soma, total = self._series.get(chave) or ([0] * len(self.buckets), 0.0, 0)
+            for indice, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    contagens[indice] += 1
+                    break
+            self._series[chave] = (contagens, soma + valor, total + 1)
+
+    def contagem(self, **labels: object) -> int:
+        with self._lock:
+            serie = self._series.get(self._chave(labels))
+        return serie[2] if serie else 0
+
+    def _amostras(self):
+        with self._lock:
+            itens = sorted((chave, (list(c), s, t)) for chave, (c, s, t) in self._series.items())
+        amostras = []
+        for chave, (contagens, soma, total) in itens:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, contagens):
+                acumulado += contagem
+                amostras.append(("_bucket", chave, (_formatar_numero(limite),), acumulado))
+            amostras.append(("_bucket", chave, ("+Inf",), total))
+            amostras.append(("_sum", chave, (), soma))
+            amostras.append(("_count", chave, (), total))
+        return amostras
+
+
+class Gauge(_Metrica):
+    tipo = "gauge"
+
+    def __init__(self, nome: str, descricao: str, labels: Iterable[str] = ()) -> None:
+        super().__init__(nome, descricao, labels)
+        self._valores: Dict[LabelValues, float] = {}
+        self._funcoes: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, valor: float, **labels: object) -> None:
+        chave = self._chave(labels)
+        with self._lock:
+            self._valores[chave] = float(valor)
+
+    def inc(self, valor: float = 1.0, **labels: object) -> None:
+        chave = self._chave(labels)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def dec(self, valor: float = 1.0, **labels: object) -> None:
+        self.inc(-valor, **labels)
+
+    def set_function(self, funcao: Callable[[], float], **labels: object) -> None:
+        chave = self._chave(labels)
+        with self._lock:
+            self._funcoes[chave] = funcao
+
+    def _amostras(self):
+        with self._lock:
+            valores = dict(self._valores)
+            funcoes = dict(self._funcoes)
+        for chave, funcao in funcoes.items():
+            try:
+                valores[chave] = float(funcao())
+            except Exception:
+                # Coleta nunca deve derrubar o /metrics.
+                continue
+        return [("", chave, (), valor) for chave, valor in sorted(valores.items())]
+
+
+class Registro:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._metricas: Dict[str, _Metrica] = {}
+
+    def registrar(self, metrica: _Metrica) -> _Metrica:
+        with self._lock:
+            existente = self._metricas.get(metrica.nome)
+            if existente is not None:
+                if type(existente) is not type(metrica) or existente.labels != metrica.labels:
+                    raise ValueError(f"Metrica {metrica.nome} ja registrada com outro formato.")
+                return existente
+            self._metricas[metrica.nome] = metrica
+            return metrica
+
+    def obter(self, nome: str) -> Optional[_Metrica]:
+        with self._lock:
+            return self._metricas.get(nome)
+
+    def renderizar(self) -> str:
+        with self._lock:
+            metricas = [self._metricas[nome] for nome in sorted(self._metricas)]
+        return "\n".join(metrica.renderizar() for metrica in metricas) + "\n"
+
+
+REGISTRO = Registro()
+
+
+def counter(nome: str, descricao: str, labels: Iterable[str] = ()) -> Counter:
+    return REGISTRO.registrar(Counter(nome, descricao, labels))
+
+
+def histogram(
+    nome: str,
+    descricao: str,
+    labels: Iterable[str] = (),
+    buckets: Iterable[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRO.registrar(Histogram(nome, descricao, labels, buckets))
+
+
+def gauge(nome: str, descricao: str, labels: Iterable[str] = ()) -> Gauge:
+    return REGISTRO.registrar(Gauge(nome, descricao, labels))
+
+
+def renderizar_metricas() -> str:
+    return REGISTRO.renderizar()
+
+
+# Metricas de jobs: definidas aqui para os servicos so importarem.
+FILA_JOBS = gauge(
+    "fortcordis_job_fila",
+    "Itens pendentes ou em execucao por fila de background.",
+    ("fila",),
+)
+PDF_RENDER_SECONDS = histogram(
+    "fortcordis_pdf_render_seconds",
+    "Duracao da renderizacao de PDF de laudo nos jobs.",
+    ("resultado",),
+)
+XML_PARSE_SECONDS = histogram(
+    "fortcordis_xml_parse_seconds",
+    "Duracao do parse de XML de ecocardiograma.",
+    ("resultado",),
+)
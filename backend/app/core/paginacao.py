@@ -0,0 +1,64 @@
+"""
+Paginacao por cursor (keyset) em listas ordenadas por (data DESC, id DESC).
+
+O cursor e opaco para o cliente: base64 url-safe de {"c": data ISO, "i": id}
+da ultima linha da pagina. A proxima pagina filtra as linhas "depois" dela
+na mesma ordem, o que usa o indice (data, id) em vez de OFFSET.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+
+def _cursor_invalido(descricao: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"{descricao} invalido.",
+    )
+
+
+def codificar_cursor_campos(campos: Dict[str, Any]) -> str:
+    """Cursor opaco com campos arbitrarios (datas viram ISO)."""
+    normalizados = {
+        chave: valor.isoformat() if isinstance(valor, (datetime, date)) else valor
+        for chave, valor in campos.items()
+    }
+    bruto = json.dumps(normalizados).encode("utf-8")
+    return base64.urlsafe_b64encode(bruto).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor_campos(cursor: str, descricao: str = "Cursor") -> Dict[str, Any]:
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise _cursor_invalido(descricao)
+    if not isinstance(dados, dict):
+        raise _cursor_invalido(descricao)
+    return dados
+
+
+def codificar_cursor(momento: Any, item_id: int) -> str:
+    valor = momento if isinstance(momento, (datetime, date)) else str(momento)
+    return codificar_cursor_campos({"c": valor, "i": int(item_id)})
+
+
+def decodificar_cursor(cursor: str, descricao: str = "Cursor") -> Tuple[datetime, int]:
+    dados = decodificar_cursor_campos(cursor, descricao)
+    try:
+        return datetime.fromisoformat(dados["c"]), int(dados["i"])
+    except Exception:
+        raise _cursor_invalido(descricao)
+
+
+def filtro_depois_do_cursor(coluna_data, coluna_id, momento: datetime, item_id: int):
+    """Linhas que vem depois de (momento, item_id) em ORDER BY data DESC, id DESC."""
+    return or_(
+        coluna_data < momento,
+        and_(coluna_data == momento, coluna_id < item_id),
+    )
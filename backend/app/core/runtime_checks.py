@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import Any
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
 
 from sqlalchemy import text
 
@@ -136,8 +139,84 @@ def build_runtime_report() -> dict[str, Any]:
     }
 
 
+class _RuntimeReportCache:
+    """Ultimo relatorio de runtime; renovado em segundo plano quando passa do TTL.
+
+    Quem pede o relatorio nunca espera pela renovacao (exceto na primeira vez):
+    recebe o ultimo disponivel e, se ele expirou, dispara uma unica thread de
+    atualizacao. Probes de load balancer ficam sem I/O.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._report: Optional[dict[str, Any]] = None
+        self._built_at = 0.0
+        self._refreshing = False
+
+    def store(self, report: dict[str, Any]) -> dict[str, Any]:
+        report = {**report, "checked_at": datetime.now(timezone.utc).isoformat()}
+        with self._lock:
+            self._report = report
+            self._built_at = time.monotonic()
+        return report
+
+    def _refresh(self) -> None:
+        try:
+            self.store(build_runtime_report())
+        except Exception as exc:
+            print(f"[health] WARN: falha ao atualizar relatorio de runtime: {exc}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self) -> dict[str, Any]:
+        ttl = max(0, int(settings.HEALTH_CACHE_TTL_SECONDS))
+        with self._lock:
+            report = self._report
+            age = time.monotonic() - self._built_at
+            stale = report is not None and age >= ttl
+            start_refresh = stale and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+
+        if report is None:
+            return {**self.store(build_runtime_report()), "age_seconds": 0.0}
+        if start_refresh:
+            threading.Thread(target=self._refresh, name="runtime-report-refresh", daemon=True).start()
+
+        # Renovacao travada (ex.: banco sem responder): o relatorio antigo nao
+        # pode manter a instancia "ready" indefinidamente.
+        max_age = max(60, ttl * 4)
+        if age > max_age:
+            issue = f"Relatorio de saude desatualizado ha {int(age)}s."
+            report = {
+                **report,
+                "ready": False,
+                "readiness_issues": [*report["readiness_issues"], issue],
+                "warnings": [*report["warnings"], issue],
+            }
+        return {**report, "age_seconds": round(age, 3)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._report = None
+            self._built_at = 0.0
+            self._refreshing = False
+
+
+_REPORT_CACHE = _RuntimeReportCache()
+
+
+def get_cached_runtime_report() -> dict[str, Any]:
+    return _REPORT_CACHE.get()
+
+
+def clear_runtime_report_cache() -> None:
+    _REPORT_CACHE.clear()
+
+
 def validate_startup_or_raise() -> dict[str, Any]:
-    report = build_runtime_report()
+    report = _REPORT_CACHE.store(build_runtime_report())
 
     for warning in report["warnings"]:
         print(f"[startup-check] WARN: {warning}")
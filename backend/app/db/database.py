@@ -1,17 +1,127 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.instrumentation import instalar_instrumentacao_sql
+
+_SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SQLITE_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    return _is_sqlite(url) and make_url(url).database in (None, "", ":memory:")
+
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """Perfil de PRAGMAs aplicado a cada conexao SQLite (valores invalidos sao ignorados)."""
+    pragmas: Dict[str, Any] = {}
+    journal_mode = str(settings.SQLITE_JOURNAL_MODE or "").strip().upper()
+    if journal_mode in _SQLITE_JOURNAL_MODES:
+        pragmas["journal_mode"] = journal_mode
+    elif journal_mode:
+        print(f"[db] WARN: SQLITE_JOURNAL_MODE invalido ({journal_mode}); mantendo o padrao.")
+    synchronous = str(settings.SQLITE_SYNCHRONOUS or "").strip().upper()
+    if synchronous in _SQLITE_SYNCHRONOUS:
+        pragmas["synchronous"] = synchronous
+    elif synchronous:
+        print(f"[db] WARN: SQLITE_SYNCHRONOUS invalido ({synchronous}); mantendo o padrao.")
+    if int(settings.SQLITE_BUSY_TIMEOUT_MS) > 0:
+        pragmas["busy_timeout"] = int(settings.SQLITE_BUSY_TIMEOUT_MS)
+    if int(settings.SQLITE_CACHE_SIZE_KB) > 0:
+        # Negativo = tamanho em KiB (positivo seria em paginas).
+        pragmas["cache_size"] = -int(settings.SQLITE_CACHE_SIZE_KB)
+    if int(settings.SQLITE_MMAP_SIZE_MB) >= 0:
+        pragmas["mmap_size"] = int(settings.SQLITE_MMAP_SIZE_MB) * 1024 * 1024
+    pragmas["temp_store"] = "MEMORY"
+    return pragmas
+
+
+def _instalar_pragmas_sqlite(engine: Engine, read_only: bool) -> None:
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _aplicar_pragmas(dbapi_connection, _connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for nome, valor in pragmas.items():
+                cursor.execute(f"PRAGMA {nome}={valor}")
+            if read_only:
+                cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+
 
-# Para SQLite, adicionar check_same_thread=False
-connect_args = {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
+def build_engine(url: str, read_only: bool = False) -> Engine:
+    """Engine com pool configuravel; no SQLite, aplica o perfil de PRAGMAs a cada conexao."""
+    kwargs: Dict[str, Any] = {}
+    if _is_sqlite(url):
+        # Para SQLite, adicionar check_same_thread=False
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not _is_sqlite_memory(url):
+        # SQLite em memoria usa SingletonThreadPool, que nao aceita estes parametros.
+        kwargs.update(
+            pool_size=max(1, int(settings.DB_POOL_SIZE)),
+            max_overflow=max(0, int(settings.DB_MAX_OVERFLOW)),
+            pool_timeout=int(settings.DB_POOL_TIMEOUT),
+            pool_recycle=int(settings.DB_POOL_RECYCLE),
+            # Conexao SQLite local nao "cai"; o ping so faz sentido em servidor.
+            pool_pre_ping=bool(settings.DB_POOL_PRE_PING) and not _is_sqlite(url),
+        )
+    if read_only and url.startswith("postgresql"):
+        # BEGIN READ ONLY por transacao (seguro com pgbouncer em modo transacao).
+        kwargs["execution_options"] = {"postgresql_readonly": True}
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args=connect_args
-)
+    novo_engine = create_engine(url, **kwargs)
+    if _is_sqlite(url):
+        _instalar_pragmas_sqlite(novo_engine, read_only)
+    instalar_instrumentacao_sql(novo_engine)
+    return novo_engine
+
+
+def describe_engine(target: Engine) -> Dict[str, Any]:
+    """Estado efetivo do pool e, no SQLite, dos PRAGMAs (lidos da conexao)."""
+    pool = target.pool
+    info: Dict[str, Any] = {
+        "dialect": target.dialect.name,
+        "url": target.url.render_as_string(hide_password=True),
+        "pool": type(pool).__name__,
+    }
+    for atributo, chave in (("size", "pool_size"), ("_max_overflow", "max_overflow"), ("_timeout", "pool_timeout")):
+        valor = getattr(pool, atributo, None)
+        if valor is not None:
+            info[chave] = valor() if callable(valor) else valor
+    info["pool_recycle"] = pool._recycle
+    info["pool_pre_ping"] = pool._pre_ping
+    if target.dialect.name == "sqlite":
+        pragmas = {}
+        with target.connect() as connection:
+            for nome in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size", "query_only"):
+                pragmas[nome] = connection.exec_driver_sql(f"PRAGMA {nome}").scalar()
+        info["pragmas"] = pragmas
+    elif target.dialect.name == "postgresql":
+        info["read_only"] = bool(target.get_execution_options().get("postgresql_readonly"))
+    return info
+
+
+engine = build_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Relatorios/consultas pesadas: engine somente leitura (DATABASE_READ_URL aponta
+# para uma replica; sem ela, a mesma base com transacoes read-only).
+if settings.DATABASE_READ_URL or not _is_sqlite_memory(settings.DATABASE_URL):
+    read_engine = build_engine(settings.DATABASE_READ_URL or settings.DATABASE_URL, read_only=True)
+else:
+    # SQLite em memoria: outro engine seria outra base vazia.
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -20,3 +130,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,10 +1,11 @@
+import hmac
 import json
 import os
 import logging
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy import inspect, text
 
 from app.api.v1.endpoints import (
@@ -12,6 +13,7 @@ from app.api.v1.endpoints import (
     agenda,
     atendimento,
     auth,
+    busca,
     clinicas,
     configuracoes,
     financeiro,
@@ -28,14 +30,28 @@ from app.api.v1.endpoints import (
     tutores,
     xml_import,
 )
-from app.core.runtime_checks import build_runtime_report, validate_startup_or_raise
+from app.core.config import settings
+from app.core.instrumentation import InstrumentacaoMiddleware
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, renderizar_metricas
+from app.core.runtime_checks import get_cached_runtime_report, validate_startup_or_raise
 from app.core.websocket import manager
-from app.db.database import engine
+from app.db.database import describe_engine, engine, read_engine
 from app.models import user, papel, agendamento
+from app.services import frases_service, frases_ultrassom_abdominal_service
+from app.services.auditoria_service import shutdown_auditoria_writer, start_auditoria_writer
+from app.services.imagem_thumbs import shutdown_imagem_thumbs
 from app.services.laudo_pdf_jobs import (
     restart_incomplete_laudo_pdf_jobs,
     shutdown_laudo_pdf_jobs,
 )
+from app.services.relatorio_pendencias_jobs import (
+    restart_incomplete_relatorio_pendencias_jobs,
+    shutdown_relatorio_pendencias_jobs,
+)
+from app.services.retention_sweeper import (
+    shutdown_retention_sweeper,
+    start_retention_sweeper,
+)
 from app.services.xml_import_jobs import (
     restart_incomplete_xml_import_jobs,
     shutdown_xml_import_jobs,
@@ -88,8 +104,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"],
+    expose_headers=["Content-Disposition", "Server-Timing"],
 )
+# Por ultimo = mais externo: mede tambem o tempo dos outros middlewares.
+app.add_middleware(InstrumentacaoMiddleware)
 
 # Rotas REST
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
@@ -112,23 +130,54 @@ app.include_router(tabelas_preco.router, prefix="/api/v1/tabelas-preco", tags=["
 app.include_router(ordens_servico.router, prefix="/api/v1/ordens-servico", tags=["ordens_servico"])
 app.include_router(configuracoes.router, prefix="/api/v1", tags=["configuracoes"])
 app.include_router(tutores.router, prefix="/api/v1/tutores", tags=["tutores"])
+app.include_router(busca.router, prefix="/api/v1/busca", tags=["busca"])
 app.include_router(referencias_eco.router, prefix="/api/v1/referencias-eco", tags=["referencias_eco"])
 app.include_router(atendimento.router, prefix="/api/v1/atendimentos", tags=["atendimento"])
 app.include_router(logistica.router, prefix="/api/v1/logistica", tags=["logistica"])
 
 
+def _compactar_frases_json() -> None:
+    """Incorpora os journals de frases aos arquivos base (versionados no Git)."""
+    for service in (frases_service, frases_ultrassom_abdominal_service):
+        try:
+            service.compactar_frases()
+        except Exception as exc:
+            print(f"[frases] WARN: falha ao compactar {service.FRASES_FILE.name}: {exc}")
+
+
+def _log_estado_banco() -> None:
+    engines = [("principal", engine)]
+    if read_engine is not engine:
+        engines.append(("leitura", read_engine))
+    for nome, alvo in engines:
+        try:
+            print(f"[db] {nome}: {json.dumps(describe_engine(alvo), default=str)}")
+        except Exception as exc:
+            print(f"[db] WARN: falha ao inspecionar engine {nome}: {exc}")
+
+
 @app.on_event("startup")
 def startup_schema_compatibility() -> None:
+    _log_estado_banco()
     _ensure_financeiro_schema_compat()
     validate_startup_or_raise()
+    _compactar_frases_json()
     restart_incomplete_laudo_pdf_jobs()
+    restart_incomplete_relatorio_pendencias_jobs()
     restart_incomplete_xml_import_jobs()
+    start_retention_sweeper()
+    start_auditoria_writer()
 
 
 @app.on_event("shutdown")
 def shutdown_background_workers() -> None:
+    shutdown_retention_sweeper()
     shutdown_laudo_pdf_jobs()
+    shutdown_relatorio_pendencias_jobs()
     shutdown_xml_import_jobs()
+    shutdown_imagem_thumbs()
+    _compactar_frases_json()
+    shutdown_auditoria_writer()
 
 
 # WebSocket endpoint
@@ -170,18 +219,35 @@ def _health_payload(report: dict) -> dict:
         },
         "compatibility_modes": report["compatibility_modes"],
         "warnings": report["warnings"],
+        "checked_at": report.get("checked_at"),
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    token = str(settings.METRICS_TOKEN or "").strip()
+    if token:
+        recebido = request.headers.get("authorization", "")
+        if not hmac.compare_digest(recebido.encode(), f"Bearer {token}".encode()):
+            return PlainTextResponse("unauthorized\n", status_code=401)
+    return PlainTextResponse(renderizar_metricas(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/live")
+def liveness_check():
+    # Liveness: o processo responde. Sem banco, disco ou migracoes.
+    return {"status": "alive"}
+
+
 @app.get("/health")
 def health_check():
-    report = build_runtime_report()
+    report = get_cached_runtime_report()
     return _health_payload(report)
 
 
 @app.get("/ready")
 def readiness_check():
-    report = build_runtime_report()
+    report = get_cached_runtime_report()
     payload = {
         **_health_payload(report),
         "readiness_issues": report["readiness_issues"],
@@ -11,6 +11,7 @@ from app.models.frase import FraseQualitativa, FraseQualitativaHistorico
 from app.models.imagem_laudo import ImagemLaudo, ImagemTemporaria
 from app.models.laudo_pdf_job import LaudoPdfJob
 from app.models.xml_import_job import XmlImportJob
+from app.models.relatorio_pendencias_job import RelatorioPendenciasJob
 from app.models.tabela_preco import TabelaPreco, PrecoServico, PrecoServicoClinica
 from app.models.ordem_servico import OrdemServico
 from app.models.referencia_eco import ReferenciaEco
@@ -24,3 +25,4 @@ from app.models.atendimento_clinico import (
 from app.models.auditoria_evento import AuditoriaEvento
 from app.models.clinica_deslocamento import ClinicaDeslocamento
 from app.models.cep_bairro_override import CepBairroOverride
+from app.models.geo_cache import GeoCacheEntrada
@@ -1,10 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from sqlalchemy.sql import func
 from app.db.database import Base
 
 class Agendamento(Base):
     __tablename__ = "agendamentos"
-    
+    __table_args__ = (
+        # Busca de sobreposicao por faixa de horario (_validar_slot_disponivel).
+        # No Postgres a migracao 20260321_17 tambem cria a constraint de exclusao.
+        Index("ix_agendamentos_inicio", "inicio"),
+        # Filtros por dia/mes (listagem e calendario mensal).
+        Index("ix_agendamentos_data", "data"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     paciente_id = Column(Integer, nullable=True)
     clinica_id = Column(Integer, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Float, Integer, String, Text
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String, Text
 from sqlalchemy.sql import func
 
 from app.db.database import Base
@@ -6,6 +6,10 @@ from app.db.database import Base
 
 class AtendimentoClinico(Base):
     __tablename__ = "atendimentos_clinicos"
+    __table_args__ = (
+        # Paginacao por cursor da listagem (ORDER BY data_atendimento DESC, id DESC).
+        Index("ix_atendimentos_clinicos_data_id", "data_atendimento", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     paciente_id = Column(Integer, nullable=False, index=True)
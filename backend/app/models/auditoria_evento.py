@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
 from sqlalchemy.sql import func
 
 from app.db.database import Base
@@ -6,6 +6,10 @@ from app.db.database import Base
 
 class AuditoriaEvento(Base):
     __tablename__ = "auditoria_eventos"
+    __table_args__ = (
+        # Ordem da listagem e chave da paginacao por cursor.
+        Index("ix_auditoria_eventos_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
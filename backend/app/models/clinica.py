@@ -8,6 +8,7 @@ class Clinica(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
+    nome_key = Column(Text)
     cnpj = Column(String)
     telefone = Column(String)
     email = Column(String)
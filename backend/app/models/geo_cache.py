@@ -0,0 +1,24 @@
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+
+
+class GeoCacheEntrada(Base):
+    """Resposta (ou falha) de um provedor geo externo, valida ate `expires_at`."""
+
+    __tablename__ = "geo_cache"
+    __table_args__ = (
+        UniqueConstraint("provedor", "chave", name="uq_geo_cache_provedor_chave"),
+        Index("ix_geo_cache_expires_at", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    provedor = Column(String(40), nullable=False)
+    chave = Column(String(64), nullable=False)  # sha256 da requisicao normalizada
+    requisicao = Column(Text, nullable=False)
+    resposta = Column(Text)  # JSON; vazio em falhas
+    sucesso = Column(Boolean, nullable=False, default=True)
+    erro = Column(Text)
+    created_at = Column(DateTime(timezone=True), default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
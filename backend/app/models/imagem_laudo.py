@@ -19,6 +19,7 @@ class ImagemLaudo(Base):
     # Dados da imagem (pode ser binário ou path)
     conteudo = Column(LargeBinary, nullable=True)  # Para armazenamento no banco
     caminho_arquivo = Column(String(500), nullable=True)  # Para armazenamento em disco
+    conteudo_sha256 = Column(String(64), nullable=True, index=True)  # Chave do cache de miniaturas
     
     # Posicionamento e tamanho no PDF
     ordem = Column(Integer, default=0)
@@ -47,6 +48,7 @@ class ImagemTemporaria(Base):
     tipo_mime = Column(String(100), default="image/jpeg")
     tamanho_bytes = Column(Integer)
     conteudo = Column(LargeBinary, nullable=False)
+    conteudo_sha256 = Column(String(64), nullable=True)
     
     ordem = Column(Integer, default=0)
     descricao = Column(Text, default="")
@@ -1,6 +1,18 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float
+from typing import Any, Dict
+
+from sqlalchemy import JSON, Column, Integer, String, DateTime, Text, ForeignKey, Float, event
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.db.database import Base
+from app.utils.laudo_dados import (
+    TIPOS_SEM_MEDIDAS_ECO,
+    carregar_anexos,
+    extrair_medidas,
+    extrair_qualitativa,
+)
+
+DadosJSON = JSON().with_variant(JSONB(), "postgresql")
 
 class Laudo(Base):
     __tablename__ = "laudos"
@@ -41,6 +53,65 @@ class Laudo(Base):
     criado_por_id = Column(Integer)
     criado_por_nome = Column(String)
 
+    # Dados estruturados (derivados de descricao/anexos na escrita)
+    medidas_json = Column(DadosJSON)  # {"DIVEd": 32.1, ...}
+    qualitativa_json = Column(DadosJSON)  # {"valvas": "...", ...}
+    pressao_arterial_json = Column(DadosJSON)  # {"pas_1": 150, ..., "pas_media": 155}
+
+    @property
+    def anexos_dados(self) -> Dict[str, Any]:
+        """`anexos` como dict, parseado uma vez enquanto o texto nao mudar (nao alterar)."""
+        raw = self.anexos
+        cache = self.__dict__.get("_anexos_cache")
+        if cache is None or cache[0] != raw:
+            cache = (raw, carregar_anexos(raw))
+            self.__dict__["_anexos_cache"] = cache
+        return cache[1]
+
+    @property
+    def medidas(self) -> Dict[str, float]:
+        return dict(self.medidas_json or {})
+
+    @property
+    def qualitativa(self) -> Dict[str, str]:
+        return dict(self.qualitativa_json or {})
+
+    @property
+    def pressao_arterial(self) -> Dict[str, Any]:
+        return dict(self.pressao_arterial_json or {})
+
+    def sincronizar_dados_estruturados(self) -> None:
+        """Recalcula as colunas *_json quando descricao/tipo/anexos mudam.
+
+        Valores atribuidos explicitamente as colunas no mesmo flush prevalecem.
+        """
+        estado = sa_inspect(self)
+        novo = not estado.has_identity
+
+        def mudou(atributo: str) -> bool:
+            return estado.attrs[atributo].history.has_changes()
+
+        def definido(atributo: str) -> bool:
+            return getattr(self, atributo) is not None if novo else mudou(atributo)
+
+        if novo or mudou("descricao") or mudou("tipo"):
+            eco = (self.tipo or "").lower() not in TIPOS_SEM_MEDIDAS_ECO
+            if not definido("medidas_json"):
+                self.medidas_json = (extrair_medidas(self.descricao) if eco else None) or None
+            if not definido("qualitativa_json"):
+                self.qualitativa_json = (extrair_qualitativa(self.descricao) if eco else None) or None
+
+        if (novo or mudou("anexos")) and not definido("pressao_arterial_json"):
+            pressao = self.anexos_dados.get("pressao_arterial")
+            self.pressao_arterial_json = pressao if isinstance(pressao, dict) and pressao else None
+
+
+@event.listens_for(Laudo, "before_insert")
+@event.listens_for(Laudo, "before_update")
+def _sincronizar_dados_estruturados(mapper, connection, target: Laudo) -> None:
+    target.sincronizar_dados_estruturados()
+
+
 class Exame(Base):
     __tablename__ = "exames"
     
@@ -8,7 +8,10 @@ class LaudoPdfJob(Base):
     __tablename__ = "laudo_pdf_jobs"
 
     id = Column(Integer, primary_key=True, index=True)
-    laudo_id = Column(Integer, nullable=False, index=True)
+    # laudo | prescricao | exames; os documentos do atendimento usam atendimento_id.
+    documento = Column(String(20), nullable=False, default="laudo", server_default="laudo", index=True)
+    laudo_id = Column(Integer, index=True)
+    atendimento_id = Column(Integer, index=True)
     requested_by_id = Column(Integer, nullable=False, index=True)
     status = Column(String(20), nullable=False, default="pending", index=True)
     cache_key = Column(String(64), nullable=False, index=True)
@@ -1,5 +1,5 @@
 """Modelo para Ordens de Serviço"""
-from sqlalchemy import Column, Integer, String, DateTime, Text, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Numeric, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.db.database import Base
 
@@ -7,6 +7,10 @@ from app.db.database import Base
 class OrdemServico(Base):
     """Ordem de Serviço gerada a partir de um agendamento realizado"""
     __tablename__ = "ordens_servico"
+    __table_args__ = (
+        # Paginacao por cursor da listagem (ORDER BY data_atendimento DESC, id DESC).
+        Index("ix_ordens_servico_data_id", "data_atendimento", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     numero_os = Column(String(50), unique=True, nullable=False)
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+
+
+class RelatorioPendenciasJob(Base):
+    __tablename__ = "relatorio_pendencias_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    requested_by_id = Column(Integer, nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    formato = Column(String(10), nullable=False, default="zip")  # zip | pdf
+    filtros_json = Column(Text)
+    cache_key = Column(String(64))
+
+    total_clinicas = Column(Integer, nullable=False, default=0)
+    clinicas_renderizadas = Column(Integer, nullable=False, default=0)
+    clinicas_reaproveitadas = Column(Integer, nullable=False, default=0)
+
+    arquivo_nome = Column(String(255))
+    arquivo_caminho = Column(String(500))
+    erro = Column(Text)
+    tentativas = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    expires_at = Column(DateTime(timezone=True))
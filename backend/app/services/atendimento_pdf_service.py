@@ -0,0 +1,450 @@
+"""
+PDFs do atendimento clinico (receita e solicitacao de exames).
+
+Gerados pelo mesmo pipeline de jobs dos laudos (app/services/laudo_pdf_jobs.py):
+o cache_key e um carimbo do conteudo impresso (atendimento, itens da
+receita, exames) e da configuracao, entao reimprimir um documento sem
+alteracoes vira so envio de arquivo.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from io import BytesIO
+from typing import Any, List, Optional
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from sqlalchemy.orm import Session
+
+from app.models.atendimento_clinico import AtendimentoClinico, PrescricaoClinica, PrescricaoItem
+from app.models.clinica import Clinica
+from app.models.configuracao import Configuracao
+from app.models.laudo import Exame
+from app.models.paciente import Paciente
+from app.models.tutor import Tutor
+
+DOCUMENTO_PRESCRICAO = "prescricao"
+DOCUMENTO_EXAMES = "exames"
+DOCUMENTOS_ATENDIMENTO = (DOCUMENTO_PRESCRICAO, DOCUMENTO_EXAMES)
+# Muda quando o layout dos PDFs muda, invalidando os arquivos em cache.
+VERSAO_LAYOUT = 1
+
+
+@dataclass(frozen=True)
+class GeneratedAtendimentoPdf:
+    content: bytes
+    filename: str
+    cache_key: str
+
+
+@dataclass
+class DocumentoAtendimento:
+    documento: str
+    atendimento: AtendimentoClinico
+    paciente: Optional[Paciente]
+    tutor: Optional[Tutor]
+    clinica: Optional[Clinica]
+    prescricao: Optional[PrescricaoClinica] = None
+    itens: Optional[List[PrescricaoItem]] = None
+    exames: Optional[List[Exame]] = None
+
+
+def _safe_iso(value: Any) -> str:
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _formatar_data_hora(value: Any) -> str:
+    if not value:
+        return "-"
+    if isinstance(value, datetime):
+        return value.strftime("%d/%m/%Y %H:%M")
+    raw = str(value).strip()
+    if raw.endswith("Z"):
+        raw = raw[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(raw).strftime("%d/%m/%Y %H:%M")
+    except ValueError:
+        return str(value)
+
+
+def _nome_arquivo_limpo(raw: str, fallback: str) -> str:
+    cleaned = re.sub(r"[^A-Za-z0-9_-]+", "_", (raw or "").strip()).strip("_")
+    return cleaned or fallback
+
+
+def _montar_story_cabecalho_atendimento(
+    atendimento: AtendimentoClinico,
+    paciente: Optional[Paciente],
+    tutor: Optional[Tutor],
+    clinica: Optional[Clinica],
+    titulo: str,
+) -> list:
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        "AtendimentoPdfTitle",
+        parent=styles["Heading1"],
+        fontName="Helvetica-Bold",
+        fontSize=16,
+        spaceAfter=8,
+    )
+    normal = ParagraphStyle(
+        "AtendimentoPdfNormal",
+        parent=styles["BodyText"],
+        fontName="Helvetica",
+        fontSize=10,
+        leading=13,
+    )
+
+    story: list = []
+    story.append(Paragraph(titulo, title_style))
+    story.append(Paragraph(f"<b>Atendimento:</b> #{atendimento.id}", normal))
+    story.append(Paragraph(f"<b>Data:</b> {_formatar_data_hora(atendimento.data_atendimento)}", normal))
+    story.append(Paragraph(f"<b>Status:</b> {atendimento.status or '-'}", normal))
+    story.append(Paragraph(f"<b>Paciente:</b> {(paciente.nome if paciente else '-')}", normal))
+    story.append(Paragraph(f"<b>Tutor:</b> {(tutor.nome if tutor else '-')}", normal))
+    story.append(Paragraph(f"<b>Clinica:</b> {(clinica.nome if clinica else '-')}", normal))
+    story.append(Paragraph(f"<b>Veterinario:</b> {atendimento.criado_por_nome or '-'}", normal))
+    story.append(Spacer(1, 4 * mm))
+    return story
+
+
+def _gerar_pdf_prescricao_bytes(
+    atendimento: AtendimentoClinico,
+    paciente: Optional[Paciente],
+    tutor: Optional[Tutor],
+    clinica: Optional[Clinica],
+    prescricao: PrescricaoClinica,
+    itens: List[PrescricaoItem],
+) -> bytes:
+    styles = getSampleStyleSheet()
+    normal = ParagraphStyle(
+        "AtendimentoPdfBody",
+        parent=styles["BodyText"],
+        fontName="Helvetica",
+        fontSize=10,
+        leading=13,
+    )
+    heading = ParagraphStyle(
+        "AtendimentoPdfHeading",
+        parent=styles["Heading3"],
+        fontName="Helvetica-Bold",
+        fontSize=12,
+        spaceAfter=5,
+    )
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=15 * mm,
+        rightMargin=15 * mm,
+        topMargin=12 * mm,
+        bottomMargin=12 * mm,
+        title=f"Receita - Atendimento {atendimento.id}",
+    )
+
+    story = _montar_story_cabecalho_atendimento(
+        atendimento,
+        paciente,
+        tutor,
+        clinica,
+        "Receita Veterinaria",
+    )
+
+    data = [[
+        "Medicamento",
+        "Dose",
+        "Frequencia",
+        "Duracao",
+        "Via",
+        "Instrucoes",
+    ]]
+    for idx, item in enumerate(itens, start=1):
+        data.append([
+            f"{idx}. {item.medicamento_nome or '-'}",
+            item.dose or "-",
+            item.frequencia or "-",
+            item.duracao or "-",
+            item.via or "-",
+            item.instrucoes or "-",
+        ])
+
+    table = Table(
+        data,
+        colWidths=[52 * mm, 20 * mm, 24 * mm, 19 * mm, 17 * mm, 48 * mm],
+        repeatRows=1,
+    )
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e5e7eb")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#111827")),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#d1d5db")),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 4),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+        ("TOPPADDING", (0, 0), (-1, -1), 4),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+    ]))
+    story.append(table)
+    story.append(Spacer(1, 5 * mm))
+
+    story.append(Paragraph("Orientacoes Gerais", heading))
+    story.append(Paragraph((prescricao.orientacoes_gerais or "-").replace("\n", "<br/>"), normal))
+    if prescricao.retorno_dias:
+        story.append(Spacer(1, 3 * mm))
+        story.append(Paragraph(f"<b>Retorno sugerido:</b> {prescricao.retorno_dias} dia(s)", normal))
+
+    doc.build(story)
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
+
+
+def _gerar_pdf_exames_bytes(
+    atendimento: AtendimentoClinico,
+    paciente: Optional[Paciente],
+    tutor: Optional[Tutor],
+    clinica: Optional[Clinica],
+    exames: List[Exame],
+) -> bytes:
+    styles = getSampleStyleSheet()
+    normal = ParagraphStyle(
+        "AtendimentoPdfBodyExames",
+        parent=styles["BodyText"],
+        fontName="Helvetica",
+        fontSize=10,
+        leading=13,
+    )
+    heading = ParagraphStyle(
+        "AtendimentoPdfHeadingExames",
+        parent=styles["Heading3"],
+        fontName="Helvetica-Bold",
+        fontSize=12,
+        spaceAfter=5,
+    )
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=15 * mm,
+        rightMargin=15 * mm,
+        topMargin=12 * mm,
+        bottomMargin=12 * mm,
+        title=f"Solicitacao de exames - Atendimento {atendimento.id}",
+    )
+
+    story = _montar_story_cabecalho_atendimento(
+        atendimento,
+        paciente,
+        tutor,
+        clinica,
+        "Solicitacao de Exames",
+    )
+
+    data = [[
+        "Exame",
+        "Prioridade",
+        "Status",
+        "Data solicitacao",
+        "Valor",
+        "Observacoes",
+    ]]
+    for idx, exame in enumerate(exames, start=1):
+        valor = "-"
+        if exame.valor not in (None, ""):
+            try:
+                valor = f"R$ {float(exame.valor):.2f}"
+            except Exception:
+                valor = str(exame.valor)
+
+        data.append([
+            f"{idx}. {exame.tipo_exame or '-'}",
+            exame.prioridade or "-",
+            exame.status or "-",
+            _formatar_data_hora(exame.data_solicitacao),
+            valor,
+            exame.observacoes or "-",
+        ])
+
+    table = Table(
+        data,
+        colWidths=[50 * mm, 24 * mm, 20 * mm, 25 * mm, 18 * mm, 43 * mm],
+        repeatRows=1,
+    )
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#dbeafe")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#111827")),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#d1d5db")),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 4),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+        ("TOPPADDING", (0, 0), (-1, -1), 4),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+    ]))
+    story.append(table)
+    story.append(Spacer(1, 5 * mm))
+
+    story.append(Paragraph("Observacoes clinicas", heading))
+    story.append(Paragraph((atendimento.observacoes or "-").replace("\n", "<br/>"), normal))
+
+    doc.build(story)
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
+
+
+def carregar_documento_atendimento(db: Session, atendimento_id: int, documento: str) -> DocumentoAtendimento:
+    """Carrega o que vai impresso no documento; ValueError quando nao ha o que imprimir."""
+    if documento not in DOCUMENTOS_ATENDIMENTO:
+        raise ValueError(f"Documento invalido: {documento}.")
+
+    atendimento = db.query(AtendimentoClinico).filter(AtendimentoClinico.id == atendimento_id).first()
+    if not atendimento:
+        raise ValueError("Atendimento nao encontrado.")
+
+    paciente = db.query(Paciente).filter(Paciente.id == atendimento.paciente_id).first()
+    tutor = db.query(Tutor).filter(Tutor.id == atendimento.tutor_id).first() if atendimento.tutor_id else None
+    clinica = db.query(Clinica).filter(Clinica.id == atendimento.clinica_id).first() if atendimento.clinica_id else None
+    dados = DocumentoAtendimento(documento, atendimento, paciente, tutor, clinica)
+
+    if documento == DOCUMENTO_PRESCRICAO:
+        dados.prescricao = (
+            db.query(PrescricaoClinica)
+            .filter(PrescricaoClinica.atendimento_id == atendimento.id)
+            .first()
+        )
+        if not dados.prescricao:
+            raise ValueError("Prescricao nao encontrada para este atendimento.")
+        dados.itens = (
+            db.query(PrescricaoItem)
+            .filter(PrescricaoItem.prescricao_id == dados.prescricao.id)
+            .order_by(PrescricaoItem.ordem.asc(), PrescricaoItem.id.asc())
+            .all()
+        )
+        if not dados.itens:
+            raise ValueError("Prescricao sem itens para gerar PDF.")
+    else:
+        dados.exames = (
+            db.query(Exame)
+            .filter(Exame.atendimento_id == atendimento.id)
+            .order_by(Exame.id.asc())
+            .all()
+        )
+        if not dados.exames:
+            raise ValueError("Nao ha exames para este atendimento.")
+    return dados
+
+
+def _carregar_stamp_cache(db: Session, dados: DocumentoAtendimento) -> dict[str, Any]:
+    # Os campos impressos entram por valor: edicoes que nao passam por
+    # updated_at (ex.: nome do tutor) tambem invalidam o cache.
+    atendimento = dados.atendimento
+    config_sistema = None
+    try:
+        config_sistema = db.query(
+            Configuracao.id,
+            Configuracao.updated_at,
+            Configuracao.created_at,
+        ).first()
+    except Exception:
+        db.rollback()
+
+    stamp: dict[str, Any] = {
+        "documento": dados.documento,
+        "versao_layout": VERSAO_LAYOUT,
+        "atendimento": [
+            atendimento.id,
+            _safe_iso(atendimento.data_atendimento),
+            atendimento.status,
+            atendimento.criado_por_nome,
+            atendimento.paciente_id,
+        ],
+        "paciente": dados.paciente.nome if dados.paciente else None,
+        "tutor": dados.tutor.nome if dados.tutor else None,
+        "clinica": dados.clinica.nome if dados.clinica else None,
+        "config_sistema_id": getattr(config_sistema, "id", None),
+        "config_sistema_updated_at": _safe_iso(
+            getattr(config_sistema, "updated_at", None) or getattr(config_sistema, "created_at", None)
+        ),
+    }
+    if dados.documento == DOCUMENTO_PRESCRICAO:
+        stamp["prescricao"] = [dados.prescricao.orientacoes_gerais, dados.prescricao.retorno_dias]
+        stamp["itens"] = [
+            [item.id, item.medicamento_nome, item.dose, item.frequencia, item.duracao, item.via, item.instrucoes]
+            for item in dados.itens or []
+        ]
+    else:
+        stamp["observacoes"] = atendimento.observacoes
+        stamp["exames"] = [
+            [
+                exame.id,
+                exame.tipo_exame,
+                exame.prioridade,
+                exame.status,
+                _safe_iso(exame.data_solicitacao),
+                exame.valor,
+                exame.observacoes,
+            ]
+            for exame in dados.exames or []
+        ]
+    return stamp
+
+
+def _cache_key(db: Session, dados: DocumentoAtendimento) -> str:
+    serialized = json.dumps(_carregar_stamp_cache(db, dados), sort_keys=True, ensure_ascii=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def compute_atendimento_pdf_cache_key(db: Session, atendimento_id: int, documento: str) -> str:
+    return _cache_key(db, carregar_documento_atendimento(db, atendimento_id, documento))
+
+
+def render_atendimento_pdf(db: Session, atendimento_id: int, documento: str) -> GeneratedAtendimentoPdf:
+    dados = carregar_documento_atendimento(db, atendimento_id, documento)
+    atendimento = dados.atendimento
+    if documento == DOCUMENTO_PRESCRICAO:
+        content = _gerar_pdf_prescricao_bytes(
+            atendimento,
+            dados.paciente,
+            dados.tutor,
+            dados.clinica,
+            dados.prescricao,
+            dados.itens,
+        )
+        prefixo = "receita_atendimento"
+    else:
+        content = _gerar_pdf_exames_bytes(
+            atendimento,
+            dados.paciente,
+            dados.tutor,
+            dados.clinica,
+            dados.exames,
+        )
+        prefixo = "solicitacao_exames_atendimento"
+
+    paciente_nome = _nome_arquivo_limpo(
+        dados.paciente.nome if dados.paciente else "",
+        f"paciente_{atendimento.paciente_id}",
+    )
+    return GeneratedAtendimentoPdf(
+        content=content,
+        filename=f"{prefixo}_{atendimento.id}_{paciente_nome}.pdf",
+        cache_key=_cache_key(db, dados),
+    )
@@ -0,0 +1,304 @@
+"""
+Arquivamento e particoes do log de auditoria.
+
+Eventos anteriores ao corte (inicio do mes que contem hoje menos
+AUDITORIA_RETENCAO_DIAS) saem do banco para arquivos NDJSON gzip, um por
+mes (`auditoria-AAAA-MM.ndjson.gz`) em AUDITORIA_ARQUIVO_DIR. Cada lote e
+anexado como um novo membro gzip e sincronizado em disco antes de apagar as
+linhas: uma falha no meio deixa no maximo eventos repetidos no arquivo,
+nunca perdidos.
+
+No PostgreSQL a tabela e particionada por mes (migracao 20260318_14); aqui
+as particoes que ficaram vazias sao removidas e as dos proximos
+MESES_A_FRENTE meses sao criadas. Roda junto com o retention sweeper.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.auditoria_evento import AuditoriaEvento
+from app.services.auditoria_service import invalidar_facetas_auditoria
+
+MESES_A_FRENTE = 2
+_PARTICAO_RE = re.compile(r"^auditoria_eventos_p(\d{4})(\d{2})$")
+
+
+def _fallback_storage_dir() -> str:
+    return os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            "..",
+            "..",
+            "generated",
+            "auditoria_arquivo",
+        )
+    )
+
+
+def get_auditoria_arquivo_dir() -> str:
+    preferred = str(settings.AUDITORIA_ARQUIVO_DIR or "").strip()
+    if not preferred:
+        upload_dir = str(settings.UPLOAD_DIR or "").strip()
+        if os.name == "nt" and upload_dir.startswith("/"):
+            upload_dir = ""
+        preferred = os.path.join(upload_dir, "auditoria_arquivo") if upload_dir else ""
+
+    for path in [preferred, _fallback_storage_dir()]:
+        if not path:
+            continue
+        try:
+            os.makedirs(path, exist_ok=True)
+            return path
+        except OSError:
+            continue
+
+    raise RuntimeError("Nao foi possivel criar diretorio para o arquivo de auditoria.")
+
+
+def _inicio_do_mes(valor: date) -> date:
+    return date(valor.year, valor.month, 1)
+
+
+def _proximo_mes(mes: date) -> date:
+    return date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+
+
+def corte_arquivamento(now: datetime, retencao_dias: int) -> datetime:
+    """Inicio do mes que contem `now - retencao_dias` (meses sempre inteiros)."""
+    mes = _inicio_do_mes((now - timedelta(days=retencao_dias)).date())
+    return datetime(mes.year, mes.month, 1)
+
+
+def _tabela_particionada(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    relkind = connection.execute(
+        text(
+            "SELECT c.relkind FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = 'auditoria_eventos' AND n.nspname = current_schema()"
+        )
+    ).scalar()
+    return relkind == "p"
+
+
+def _particoes_mensais(connection: Connection) -> dict[date, str]:
+    nomes = connection.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'auditoria_eventos'::regclass"
+        )
+    ).scalars()
+    particoes = {}
+    for nome in nomes:
+        match = _PARTICAO_RE.match(nome)
+        if match:
+            particoes[date(int(match.group(1)), int(match.group(2)), 1)] = nome
+    return particoes
+
+
+def garantir_particoes_auditoria(
+    connection: Connection,
+    hoje: Optional[date] = None,
+    meses_a_frente: int = MESES_A_FRENTE,
+) -> list[str]:
+    """Cria as particoes do mes atual e dos proximos meses (PostgreSQL)."""
+    if not _tabela_particionada(connection):
+        return []
+
+    existentes = _particoes_mensais(connection)
+    mes = _inicio_do_mes(hoje or date.today())
+    criadas = []
+    for _ in range(meses_a_frente + 1):
+        seguinte = _proximo_mes(mes)
+        if mes not in existentes:
+            nome = f"auditoria_eventos_p{mes:%Y%m}"
+            try:
+                with connection.begin_nested():
+                    connection.execute(
+                        text(
+                            f"CREATE TABLE IF NOT EXISTS {nome} PARTITION OF auditoria_eventos "
+                            f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{seguinte.isoformat()}')"
+                        )
+                    )
+                criadas.append(nome)
+            except Exception as exc:
+                # Tipicamente: a particao padrao ja tem linhas deste mes.
+                print(f"[auditoria-arquivo] WARN: nao foi possivel criar {nome}: {exc}")
+        mes = seguinte
+    return criadas
+
+
+def _remover_particoes_vazias(connection: Connection, corte: datetime) -> list[str]:
+    if not _tabela_particionada(connection):
+        return []
+
+    removidas = []
+    for mes, nome in sorted(_particoes_mensais(connection).items()):
+        if _proximo_mes(mes) > corte.date():
+            continue
+        if connection.execute(text(f"SELECT 1 FROM {nome} LIMIT 1")).first() is not None:
+            continue
+        connection.execute(text(f"DROP TABLE {nome}"))
+        removidas.append(nome)
+    return removidas
+
+
+def _formatar_data(valor: Any) -> Optional[str]:
+    if not isinstance(valor, datetime):
+        return str(valor) if valor is not None else None
+    if valor.tzinfo is None:
+        return valor.replace(tzinfo=timezone.utc).isoformat()
+    return valor.astimezone(timezone.utc).isoformat()
+
+
+def _linha_ndjson(evento: AuditoriaEvento) -> str:
+    registro = {
+        coluna.name: getattr(evento, coluna.name)
+        for coluna in AuditoriaEvento.__table__.columns
+    }
+    registro["created_at"] = _formatar_data(evento.created_at)
+    return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+def _anexar_ao_arquivo(caminho: str, linhas: list[str]) -> None:
+    with open(caminho, "ab") as bruto:
+        with gzip.GzipFile(fileobj=bruto, mode="ab") as arquivo:
+            arquivo.write(("\n".join(linhas) + "\n").encode("utf-8"))
+        bruto.flush()
+        os.fsync(bruto.fileno())
+
+
+def _mes_do_evento(valor: Any) -> str:
+    if isinstance(valor, datetime):
+        if valor.tzinfo is not None:
+            valor = valor.astimezone(timezone.utc)
+        return f"{valor:%Y-%m}"
+    return str(valor or "")[:7] or "sem-data"
+
+
+def _empty_report(dry_run: bool, corte: Optional[datetime]) -> dict[str, Any]:
+    return {
+        "dry_run": dry_run,
+        "corte": corte.isoformat() if corte else None,
+        "eventos": 0,
+        "arquivos": {},
+        "particoes_criadas": [],
+        "particoes_removidas": [],
+        "erros": [],
+    }
+
+
+def arquivar_auditoria(
+    session_factory: Callable[[], Session] = SessionLocal,
+    retencao_dias: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    dry_run: bool = False,
+    now: Optional[datetime] = None,
+    destino: Optional[str] = None,
+) -> dict[str, Any]:
+    """Move eventos anteriores ao corte para NDJSON gzip e mantem as particoes.
+
+    Com retencao <= 0 nada e arquivado, mas as particoes futuras continuam
+    sendo garantidas. `arquivos` do relatorio mapeia AAAA-MM -> eventos.
+    """
+    retencao_dias = int(settings.AUDITORIA_RETENCAO_DIAS if retencao_dias is None else retencao_dias)
+    batch_size = max(1, int(batch_size or settings.RETENTION_SWEEP_BATCH_SIZE))
+    now = now or datetime.utcnow()
+    corte = corte_arquivamento(now, retencao_dias) if retencao_dias > 0 else None
+    report = _empty_report(dry_run, corte)
+    started = time.perf_counter()
+
+    if corte is not None:
+        _arquivar_eventos(session_factory, corte, batch_size, dry_run, destino, report)
+
+    if not dry_run:
+        db = session_factory()
+        try:
+            connection = db.connection()
+            if corte is not None:
+                report["particoes_removidas"] = _remover_particoes_vazias(connection, corte)
+            report["particoes_criadas"] = garantir_particoes_auditoria(connection, now.date())
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            report["erros"].append(f"particoes: {exc}")
+        finally:
+            db.close()
+
+    report["duracao_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+
+def _arquivar_eventos(
+    session_factory: Callable[[], Session],
+    corte: datetime,
+    batch_size: int,
+    dry_run: bool,
+    destino: Optional[str],
+    report: dict[str, Any],
+) -> None:
+    pasta = None if dry_run else (destino or get_auditoria_arquivo_dir())
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+
+    ultimo: Optional[tuple[Any, int]] = None
+    while True:
+        db = session_factory()
+        try:
+            query = db.query(AuditoriaEvento).filter(AuditoriaEvento.created_at < corte)
+            if ultimo is not None:
+                # Em dry-run nada e apagado; o cursor evita reler o mesmo lote.
+                query = query.filter(
+                    or_(
+                        AuditoriaEvento.created_at > ultimo[0],
+                        and_(AuditoriaEvento.created_at == ultimo[0], AuditoriaEvento.id > ultimo[1]),
+                    )
+                )
+            eventos = query.order_by(AuditoriaEvento.created_at, AuditoriaEvento.id).limit(batch_size).all()
+            if not eventos:
+                break
+            ultimo = (eventos[-1].created_at, eventos[-1].id)
+
+            por_mes: dict[str, list[str]] = {}
+            for evento in eventos:
+                por_mes.setdefault(_mes_do_evento(evento.created_at), []).append(_linha_ndjson(evento))
+
+            if not dry_run:
+                for mes, linhas in por_mes.items():
+                    _anexar_ao_arquivo(os.path.join(pasta, f"auditoria-{mes}.ndjson.gz"), linhas)
+                ids = [evento.id for evento in eventos]
+                db.query(AuditoriaEvento).filter(
+                    AuditoriaEvento.id.in_(ids),
+                    AuditoriaEvento.created_at < corte,
+                ).delete(synchronize_session=False)
+                db.commit()
+
+            for mes, linhas in por_mes.items():
+                report["arquivos"][mes] = report["arquivos"].get(mes, 0) + len(linhas)
+            report["eventos"] += len(eventos)
+        except Exception as exc:
+            db.rollback()
+            report["erros"].append(f"auditoria_eventos: {exc}")
+            break
+        finally:
+            db.close()
+
+        if len(eventos) < batch_size:
+            break
+
+    if report["eventos"] and not dry_run:
+        invalidar_facetas_auditoria()
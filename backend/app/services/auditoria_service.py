@@ -1,14 +1,46 @@
+"""
+Registro de eventos de auditoria.
+
+`registrar_auditoria` so monta a linha e a coloca numa fila em memoria
+limitada (AUDITORIA_FILA_MAX); uma thread de fundo grava as linhas em lote
+(AUDITORIA_LOTE_MAX eventos ou a cada AUDITORIA_FLUSH_INTERVAL_MS). Com a
+fila cheia o evento e descartado e contado em `estatisticas_auditoria()`.
+A fila e esvaziada no shutdown da aplicacao (e no exit do processo, para
+scripts).
+
+AUDITORIA_MODO=sync grava cada evento na hora, como antes (testes/scripts).
+
+Os valores de modulo/acao usados como filtro na listagem vem de
+`facetas_auditoria()`: um SELECT DISTINCT a cada FACETAS_TTL_SECONDS,
+completado pelos eventos registrados neste processo nesse intervalo.
+"""
 from __future__ import annotations
 
+import atexit
 import json
+import queue
+import time
+from datetime import datetime, timezone
+from threading import Event, Lock, Thread
 from typing import Any, Optional
 
 from fastapi import Request
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.metrics import FILA_JOBS
 from app.db.database import SessionLocal
 from app.models.auditoria_evento import AuditoriaEvento
 from app.models.user import User
 
+MODO_ASYNC = "async"
+MODO_SYNC = "sync"
+
+SHUTDOWN_FLUSH_TIMEOUT_SECONDS = 10.0
+FACETAS_TTL_SECONDS = 600
+_AVISO_DESCARTE_A_CADA = 100
+
 
 def _json_safe(value: Any) -> str:
     try:
@@ -32,6 +64,227 @@ def _request_meta(request: Optional[Request]) -> tuple[Optional[str], Optional[s
     return ip, rota, metodo
 
 
+def _gravar_lote(linhas: list[dict[str, Any]]) -> tuple[int, int]:
+    """Insere as linhas num unico INSERT; se o lote falhar, tenta uma a uma.
+
+    Retorna (gravadas, falhas).
+    """
+    session = SessionLocal()
+    try:
+        try:
+            session.execute(insert(AuditoriaEvento.__table__), linhas)
+            session.commit()
+            return len(linhas), 0
+        except Exception as exc:
+            session.rollback()
+            if len(linhas) == 1:
+                print(f"[AUDITORIA] Falha ao registrar evento: {exc}")
+                return 0, 1
+            print(f"[AUDITORIA] WARN: lote de {len(linhas)} eventos falhou ({exc}); gravando um a um.")
+
+        gravadas = 0
+        for linha in linhas:
+            try:
+                session.execute(insert(AuditoriaEvento.__table__), [linha])
+                session.commit()
+                gravadas += 1
+            except Exception as exc:
+                session.rollback()
+                print(f"[AUDITORIA] Falha ao registrar evento: {exc}")
+        return gravadas, len(linhas) - gravadas
+    finally:
+        session.close()
+
+
+class _GravadorAuditoria:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._parar = Event()
+        self._thread: Optional[Thread] = None
+        self._fila: Optional[queue.Queue] = None
+        self._atexit_registrado = False
+        self.enfileirados = 0
+        self.gravados = 0
+        self.descartados = 0
+        self.falhas = 0
+        self.lotes = 0
+        self.ultimo_lote_em: Optional[str] = None
+
+    def _garantir_thread(self) -> queue.Queue:
+        fila = self._fila
+        thread = self._thread
+        if fila is not None and thread is not None and thread.is_alive():
+            return fila
+
+        with self._lock:
+            if self._fila is None:
+                self._fila = queue.Queue(maxsize=max(1, int(settings.AUDITORIA_FILA_MAX)))
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = Thread(target=self._loop, name="auditoria-writer", daemon=True)
+                self._thread.start()
+            if not self._atexit_registrado:
+                atexit.register(self.encerrar)
+                self._atexit_registrado = True
+            return self._fila
+
+    def iniciar(self) -> None:
+        self._garantir_thread()
+
+    def enfileirar(self, linha: dict[str, Any]) -> bool:
+        fila = self._garantir_thread()
+        try:
+            fila.put_nowait(linha)
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+                descartados = self.descartados
+            if descartados % _AVISO_DESCARTE_A_CADA == 1:
+                print(f"[AUDITORIA] WARN: fila cheia; {descartados} evento(s) descartado(s) ate agora.")
+            return False
+        with self._lock:
+            self.enfileirados += 1
+        return True
+
+    def _coletar_lote(self, fila: queue.Queue) -> list[dict[str, Any]]:
+        intervalo = max(0.01, int(settings.AUDITORIA_FLUSH_INTERVAL_MS) / 1000.0)
+        lote_max = max(1, int(settings.AUDITORIA_LOTE_MAX))
+        try:
+            lote = [fila.get(timeout=intervalo)]
+        except queue.Empty:
+            return []
+
+        prazo = time.monotonic() + intervalo
+        while len(lote) < lote_max:
+            restante = prazo - time.monotonic()
+            if restante <= 0 or self._parar.is_set():
+                # Encerrando: pega o que ja esta na fila sem esperar.
+                try:
+                    lote.append(fila.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                lote.append(fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _gravar(self, fila: queue.Queue, lote: list[dict[str, Any]]) -> None:
+        try:
+            gravadas, falhas = _gravar_lote(lote)
+        except Exception as exc:
+            print(f"[AUDITORIA] WARN: falha ao gravar lote: {exc}")
+            gravadas, falhas = 0, len(lote)
+        finally:
+            for _ in lote:
+                fila.task_done()
+        with self._lock:
+            self.gravados += gravadas
+            self.falhas += falhas
+            self.lotes += 1
+            self.ultimo_lote_em = datetime.now(timezone.utc).isoformat()
+
+    def _loop(self) -> None:
+        fila = self._fila
+        assert fila is not None
+        while True:
+            lote = self._coletar_lote(fila)
+            if lote:
+                self._gravar(fila, lote)
+            elif self._parar.is_set():
+                return
+
+    def aguardar(self, timeout: float = SHUTDOWN_FLUSH_TIMEOUT_SECONDS) -> bool:
+        """Espera a fila esvaziar (True) ou o timeout (False)."""
+        fila = self._fila
+        if fila is None:
+            return True
+        prazo = time.monotonic() + timeout
+        while fila.unfinished_tasks:
+            if time.monotonic() >= prazo or not (self._thread and self._thread.is_alive()):
+                return not fila.unfinished_tasks
+            time.sleep(0.01)
+        return True
+
+    def encerrar(self, timeout: float = SHUTDOWN_FLUSH_TIMEOUT_SECONDS) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        self._parar.set()
+        thread.join(timeout)
+        fila = self._fila
+        pendentes = fila.qsize() if fila is not None else 0
+        if thread.is_alive() or pendentes:
+            print(f"[AUDITORIA] WARN: encerrado com {pendentes} evento(s) pendente(s).")
+
+    def estatisticas(self) -> dict[str, Any]:
+        fila = self._fila
+        with self._lock:
+            return {
+                "modo": _modo(),
+                "ativo": bool(self._thread and self._thread.is_alive()),
+                "fila": fila.qsize() if fila is not None else 0,
+                "capacidade": fila.maxsize if fila is not None else int(settings.AUDITORIA_FILA_MAX),
+                "enfileirados": self.enfileirados,
+                "gravados": self.gravados,
+                "descartados": self.descartados,
+                "falhas": self.falhas,
+                "lotes": self.lotes,
+                "ultimo_lote_em": self.ultimo_lote_em,
+            }
+
+
+_GRAVADOR = _GravadorAuditoria()
+FILA_JOBS.set_function(lambda: _GRAVADOR.estatisticas()["fila"], fila="auditoria")
+
+
+class _FacetasAuditoria:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._modulos: set[str] = set()
+        self._acoes: set[str] = set()
+        self._carregado_em: Optional[float] = None
+
+    def registrar(self, modulo: str, acao: str) -> None:
+        with self._lock:
+            if self._carregado_em is None:
+                return
+            self._modulos.add(modulo)
+            self._acoes.add(acao)
+
+    def obter(self, db: Session) -> tuple[list[str], list[str]]:
+        with self._lock:
+            valido = (
+                self._carregado_em is not None
+                and time.monotonic() - self._carregado_em < FACETAS_TTL_SECONDS
+            )
+            if valido:
+                return sorted(self._modulos), sorted(self._acoes)
+
+        modulos = {row[0] for row in db.query(AuditoriaEvento.modulo).distinct().all() if row[0]}
+        acoes = {row[0] for row in db.query(AuditoriaEvento.acao).distinct().all() if row[0]}
+        with self._lock:
+            self._modulos = modulos
+            self._acoes = acoes
+            self._carregado_em = time.monotonic()
+        return sorted(modulos), sorted(acoes)
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._modulos = set()
+            self._acoes = set()
+            self._carregado_em = None
+
+
+_FACETAS = _FacetasAuditoria()
+
+
+def _modo() -> str:
+    modo = str(settings.AUDITORIA_MODO or MODO_ASYNC).strip().lower()
+    return MODO_SYNC if modo == MODO_SYNC else MODO_ASYNC
+
+
 def registrar_auditoria(
     *,
     current_user: Optional[User],
@@ -44,27 +297,57 @@ def registrar_auditoria(
     request: Optional[Request] = None,
 ) -> None:
     """Registra evento de auditoria em best-effort (nao interrompe fluxo principal)."""
-    session = SessionLocal()
     try:
         ip, rota, metodo = _request_meta(request)
-        evento = AuditoriaEvento(
-            usuario_id=getattr(current_user, "id", None),
-            usuario_nome=getattr(current_user, "nome", None),
-            usuario_email=getattr(current_user, "email", None),
-            modulo=(modulo or "").strip() or "sistema",
-            entidade=(entidade or "").strip() or "geral",
-            entidade_id=str(entidade_id) if entidade_id is not None else None,
-            acao=(acao or "").strip() or "ACAO",
-            descricao=(descricao or "").strip() or None,
-            detalhes_json=_json_safe(detalhes),
-            ip_origem=ip,
-            rota=rota,
-            metodo=metodo,
-        )
-        session.add(evento)
-        session.commit()
+        linha = {
+            "usuario_id": getattr(current_user, "id", None),
+            "usuario_nome": getattr(current_user, "nome", None),
+            "usuario_email": getattr(current_user, "email", None),
+            "modulo": (modulo or "").strip() or "sistema",
+            "entidade": (entidade or "").strip() or "geral",
+            "entidade_id": str(entidade_id) if entidade_id is not None else None,
+            "acao": (acao or "").strip() or "ACAO",
+            "descricao": (descricao or "").strip() or None,
+            "detalhes_json": _json_safe(detalhes),
+            "ip_origem": ip,
+            "rota": rota,
+            "metodo": metodo,
+            # Hora do evento, nao da gravacao do lote.
+            "created_at": datetime.now(timezone.utc),
+        }
     except Exception as exc:
-        session.rollback()
         print(f"[AUDITORIA] Falha ao registrar evento: {exc}")
-    finally:
-        session.close()
+        return
+
+    _FACETAS.registrar(linha["modulo"], linha["acao"])
+    if _modo() == MODO_SYNC:
+        _gravar_lote([linha])
+        return
+    _GRAVADOR.enfileirar(linha)
+
+
+def start_auditoria_writer() -> None:
+    if _modo() == MODO_ASYNC:
+        _GRAVADOR.iniciar()
+
+
+def flush_auditoria(timeout: float = SHUTDOWN_FLUSH_TIMEOUT_SECONDS) -> bool:
+    """Espera os eventos enfileirados serem gravados."""
+    return _GRAVADOR.aguardar(timeout)
+
+
+def shutdown_auditoria_writer() -> None:
+    _GRAVADOR.encerrar()
+
+
+def estatisticas_auditoria() -> dict[str, Any]:
+    return _GRAVADOR.estatisticas()
+
+
+def facetas_auditoria(db: Session) -> tuple[list[str], list[str]]:
+    """(modulos, acoes) distintos do log de auditoria, ordenados."""
+    return _FACETAS.obter(db)
+
+
+def invalidar_facetas_auditoria() -> None:
+    _FACETAS.invalidar()
@@ -0,0 +1,261 @@
+"""
+Busca textual de pacientes, tutores e clinicas.
+
+Postgres: indices GIN `pg_trgm` sobre `nome_key` (LIKE '%termo%' e o
+operador de similaridade usam o indice). SQLite: tabelas FTS5
+`<tabela>_fts` de conteudo externo, mantidas por triggers, com tokenizer
+sem acentos e ranking bm25; os filtros das listagens (substring) usam as
+tabelas FTS5 trigram `<tabela>_nome_key_fts`. Sem nenhum dos dois (extensao
+ausente, banco de teste criado via create_all) a busca cai no ILIKE sobre
+nome/nome_key.
+
+Os indices sao criados pelas migracoes 20260316_12 e 20260326_22.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from threading import Lock
+from typing import Any, Optional
+
+from sqlalchemy import Integer, String, bindparam, cast, column, func, literal_column, or_, table, text
+from sqlalchemy.orm import Query, Session
+
+from app.models.clinica import Clinica
+from app.models.paciente import Paciente
+from app.models.tutor import Tutor
+
+RECURSO_TRGM = "pg_trgm"
+RECURSO_FTS5 = "fts5"
+
+MIN_TERMO = 2
+LIMITE_PADRAO = 5
+LIMITE_MAXIMO = 20
+
+_TABELAS_FTS = ("pacientes_fts", "tutores_fts", "clinicas_fts")
+_TABELAS_TRIGRAMA = ("pacientes_nome_key_fts", "tutores_nome_key_fts", "clinicas_nome_key_fts")
+# O tokenizer trigram so usa o indice em padroes com 3+ caracteres seguidos.
+MIN_TRIGRAMA = 3
+
+_RECURSOS: dict[str, Optional[str]] = {}
+_TRIGRAMA: dict[str, bool] = {}
+_RECURSOS_LOCK = Lock()
+
+
+def gerar_nome_key(nome: Optional[str]) -> str:
+    """Chave normalizada (sem acento, minuscula, so [a-z0-9 ]), igual a dos cadastros."""
+    if not nome:
+        return ""
+    texto = unicodedata.normalize("NFKD", nome)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.lower().strip()
+    texto = re.sub(r"[^a-z0-9\s]", "", texto)
+    texto = re.sub(r"\s+", " ", texto)
+    return texto
+
+
+def _detectar_recurso(db: Session) -> Optional[str]:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        row = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+        return RECURSO_TRGM if row else None
+    if dialect == "sqlite":
+        rows = db.execute(
+            text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND name IN ('pacientes_fts', 'tutores_fts', 'clinicas_fts')"
+            )
+        ).fetchall()
+        return RECURSO_FTS5 if len(rows) == len(_TABELAS_FTS) else None
+    return None
+
+
+def recurso_busca(db: Session) -> Optional[str]:
+    """Indice disponivel no banco da sessao (cacheado por URL do engine)."""
+    cache_key = str(db.get_bind().url)
+    if cache_key in _RECURSOS:
+        return _RECURSOS[cache_key]
+
+    with _RECURSOS_LOCK:
+        if cache_key not in _RECURSOS:
+            try:
+                _RECURSOS[cache_key] = _detectar_recurso(db)
+            except Exception as exc:
+                print(f"[busca] WARN: falha ao detectar indice de busca: {exc}")
+                return None
+        return _RECURSOS[cache_key]
+
+
+def limpar_cache_recursos() -> None:
+    with _RECURSOS_LOCK:
+        _RECURSOS.clear()
+        _TRIGRAMA.clear()
+
+
+def _fts_match(termo_key: str) -> str:
+    # termo_key so tem [a-z0-9 ]: cada palavra vira um prefixo entre aspas.
+    return " ".join(f'"{token}"*' for token in termo_key.split())
+
+
+def _detectar_trigrama(db: Session) -> bool:
+    if db.get_bind().dialect.name != "sqlite":
+        return False
+    rows = db.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN :nomes").bindparams(
+            bindparam("nomes", expanding=True)
+        ),
+        {"nomes": list(_TABELAS_TRIGRAMA)},
+    ).fetchall()
+    return len(rows) == len(_TABELAS_TRIGRAMA)
+
+
+def trigrama_listagens(db: Session) -> bool:
+    """SQLite com as tabelas FTS5 trigram da migracao 20260326_22 (cacheado por URL)."""
+    cache_key = str(db.get_bind().url)
+    if cache_key in _TRIGRAMA:
+        return _TRIGRAMA[cache_key]
+
+    with _RECURSOS_LOCK:
+        if cache_key not in _TRIGRAMA:
+            try:
+                _TRIGRAMA[cache_key] = _detectar_trigrama(db)
+            except Exception as exc:
+                print(f"[busca] WARN: falha ao detectar indice trigram: {exc}")
+                return False
+        return _TRIGRAMA[cache_key]
+
+
+def filtro_nome(db: Session, model: Any, termo: Optional[str]):
+    """Condicao "nome contem termo" (substring) para os filtros das listagens.
+
+    Compara o termo normalizado com `nome_key` (a 20260326_22 preenche todas
+    as linhas): no Postgres o LIKE usa o indice trigram `pg_trgm`; no SQLite
+    passa pela tabela FTS5 trigram `<tabela>_nome_key_fts`, que indexa LIKE
+    com 3+ caracteres. O FTS5 por palavra de `buscar` nao serve aqui: so casa
+    prefixos ("ilva" nao acha "Silva").
+    """
+    termo = (termo or "").strip()
+    termo_key = gerar_nome_key(termo)
+    if not termo_key:
+        return model.nome.ilike(f"%{termo}%")
+
+    padrao = f"%{termo_key}%"
+    recurso = recurso_busca(db)
+    if recurso == RECURSO_TRGM:
+        return model.nome_key.like(padrao)
+    if len(termo_key) >= MIN_TRIGRAMA and trigrama_listagens(db):
+        fts = f"{model.__tablename__}_nome_key_fts"
+        param = f"{fts}_padrao"
+        rowids = text(f"SELECT rowid FROM {fts} WHERE nome_key LIKE :{param}").bindparams(
+            **{param: padrao}
+        ).columns(column("rowid", Integer))
+        return model.id.in_(rowids)
+    if recurso == RECURSO_FTS5:
+        return model.nome_key.like(padrao)
+
+    return or_(model.nome.ilike(f"%{termo}%"), func.coalesce(model.nome_key, "").ilike(padrao))
+
+
+def _pontuar(nome: Optional[str], termo_key: str) -> float:
+    """Ranking do fallback sem indice: inicio do nome > inicio de palavra > meio."""
+    nome_key = gerar_nome_key(nome)
+    if not nome_key or termo_key not in nome_key:
+        return 0.0
+    if nome_key.startswith(termo_key):
+        base = 1.0
+    elif f" {termo_key}" in nome_key:
+        base = 0.75
+    else:
+        base = 0.5
+    return round(base + base * len(termo_key) / len(nome_key), 4)
+
+
+def _ranquear(db: Session, query: Query, model: Any, termo_key: str, limite: int) -> list[tuple[Any, float]]:
+    recurso = recurso_busca(db)
+    tabela = model.__tablename__
+
+    if recurso == RECURSO_FTS5:
+        fts = table(f"{tabela}_fts", column("rowid"))
+        rank = literal_column(f"bm25({tabela}_fts)")
+        rows = (
+            query.join(fts, fts.c.rowid == model.id)
+            .filter(text(f"{tabela}_fts MATCH :termo_fts").bindparams(termo_fts=_fts_match(termo_key)))
+            .add_columns(rank.label("rank"))
+            .order_by(rank, model.nome)
+            .limit(limite)
+            .all()
+        )
+        # bm25 e negativo e menor = melhor.
+        return [(row, round(-float(row.rank or 0), 4)) for row in rows]
+
+    if recurso == RECURSO_TRGM:
+        similaridade = func.similarity(model.nome_key, termo_key)
+        rows = (
+            query.filter(or_(model.nome_key.like(f"%{termo_key}%"), model.nome_key.op("%")(termo_key)))
+            .add_columns(similaridade.label("rank"))
+            .order_by(model.nome_key.like(f"{termo_key}%").desc(), similaridade.desc(), model.nome)
+            .limit(limite)
+            .all()
+        )
+        return [(row, round(float(row.rank or 0), 4)) for row in rows]
+
+    rows = query.filter(filtro_nome(db, model, termo_key)).order_by(model.nome).limit(limite * 5).all()
+    pontuados = [(row, _pontuar(row.nome, termo_key)) for row in rows]
+    pontuados.sort(key=lambda item: (-item[1], str(item[0].nome or "").lower()))
+    return pontuados[:limite]
+
+
+def _filtro_paciente_ativo():
+    """Compatibilidade entre bancos legados com ativo como INTEGER/BOOLEAN/TEXT."""
+    return func.lower(func.coalesce(cast(Paciente.ativo, String), "1")).in_(["1", "true", "t"])
+
+
+def buscar(db: Session, q: Optional[str], limite: int = LIMITE_PADRAO) -> dict[str, Any]:
+    """Melhores resultados de pacientes, tutores e clinicas para `q`."""
+    termo_key = gerar_nome_key(q)
+    resultado: dict[str, Any] = {
+        "q": (q or "").strip(),
+        "pacientes": [],
+        "tutores": [],
+        "clinicas": [],
+    }
+    if len(termo_key) < MIN_TERMO:
+        return resultado
+
+    limite = max(1, min(int(limite or LIMITE_PADRAO), LIMITE_MAXIMO))
+
+    pacientes = (
+        db.query(
+            Paciente.id,
+            Paciente.nome,
+            Paciente.especie,
+            Paciente.tutor_id,
+            Tutor.nome.label("tutor_nome"),
+        )
+        .outerjoin(Tutor, Paciente.tutor_id == Tutor.id)
+        .filter(_filtro_paciente_ativo())
+    )
+    resultado["pacientes"] = [
+        {
+            "id": row.id,
+            "nome": row.nome,
+            "especie": row.especie,
+            "tutor_id": row.tutor_id,
+            "tutor": row.tutor_nome or "",
+            "score": score,
+        }
+        for row, score in _ranquear(db, pacientes, Paciente, termo_key, limite)
+    ]
+
+    tutores = db.query(Tutor.id, Tutor.nome, Tutor.telefone).filter(Tutor.ativo == 1)
+    resultado["tutores"] = [
+        {"id": row.id, "nome": row.nome, "telefone": row.telefone, "score": score}
+        for row, score in _ranquear(db, tutores, Tutor, termo_key, limite)
+    ]
+
+    clinicas = db.query(Clinica.id, Clinica.nome, Clinica.cidade).filter(Clinica.ativo == True)
+    resultado["clinicas"] = [
+        {"id": row.id, "nome": row.nome, "cidade": row.cidade, "score": score}
+        for row, score in _ranquear(db, clinicas, Clinica, termo_key, limite)
+    ]
+    return resultado
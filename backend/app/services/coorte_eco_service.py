@@ -0,0 +1,518 @@
+"""
+Analise de coortes das medidas ecocardiograficas.
+
+As medidas dos laudos de eco (`Laudo.medidas_json`) sao carregadas de uma
+vez para uma base colunar em memoria (uma linha por laudo, uma coluna por
+parametro de ReferenciaEco) e as consultas de coorte (especie, raca, faixa de
+peso, periodo) sao respondidas com operacoes vetorizadas do NumPy.
+
+A base e atualizada de forma incremental: a cada REFRESH_INTERVAL_SECONDS so
+os laudos novos ou com `updated_at` posterior a ultima leitura (e os pacientes
+alterados) sao relidos. Se o total de laudos no banco nao bater com o que a
+base ja viu (laudo excluido), ela e reconstruida.
+
+Z-score: a faixa de referencia e tratada como media +- 2 desvios padrao, ou
+seja, media = (min + max) / 2 e dp = (max - min) / 4. O percentil de
+referencia e a CDF normal do z-score.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta, timezone
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.models.laudo import Laudo
+from app.models.paciente import Paciente
+from app.services.busca_service import gerar_nome_key
+from app.services.referencias_eco_service import (
+    PARAMETROS,
+    normalizar_especie,
+    obter_tabela,
+    prefixo_da_medida,
+)
+from app.utils.pdf_laudo import MAPEAMENTO_REFERENCIA_ECO
+
+REFRESH_INTERVAL_SECONDS = 30.0
+TIPOS_NAO_ECO = ("pressao_arterial", "ultrassonografia_abdominal")
+PERCENTIS = (5, 25, 50, 75, 95)
+MAX_GRUPOS_RACA = 20
+
+_INDICE_PARAMETRO = {prefixo: indice for indice, prefixo in enumerate(PARAMETROS)}
+
+
+def _vetor_medidas(medidas: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """Linha da base para um laudo; None se nenhuma medida tem parametro de referencia."""
+    vetor = np.full(len(PARAMETROS), np.nan)
+    encontrou = False
+    for chave, valor in (medidas or {}).items():
+        prefixo = MAPEAMENTO_REFERENCIA_ECO.get(chave)
+        if prefixo is None:
+            continue
+        coluna = _INDICE_PARAMETRO[prefixo]
+        # Aorta e Ao_nivel_AP caem no mesmo parametro: vale a primeira do laudo.
+        if np.isnan(vetor[coluna]):
+            vetor[coluna] = float(valor)
+            encontrou = True
+    return vetor if encontrou else None
+
+
+def _data_dia(valor: Any) -> np.datetime64:
+    if isinstance(valor, datetime):
+        return np.datetime64(valor.date().isoformat(), "D")
+    if isinstance(valor, date):
+        return np.datetime64(valor.isoformat(), "D")
+    if isinstance(valor, str) and len(valor) >= 10:
+        try:
+            return np.datetime64(valor[:10], "D")
+        except ValueError:
+            pass
+    return np.datetime64("NaT", "D")
+
+
+def _sem_fuso(valor: Optional[datetime]) -> Optional[datetime]:
+    if valor is None or valor.tzinfo is None:
+        return valor
+    return valor.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass(frozen=True)
+class BaseCoorte:
+    """Base colunar: arrays alinhados, uma linha por laudo de eco com medidas."""
+    laudo_ids: np.ndarray
+    paciente_ids: np.ndarray
+    datas: np.ndarray
+    especies: np.ndarray
+    racas: np.ndarray
+    racas_nome: np.ndarray
+    pesos: np.ndarray
+    valores: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.laudo_ids.shape[0])
+
+
+def base_vazia() -> BaseCoorte:
+    return BaseCoorte(
+        laudo_ids=np.empty(0, dtype=np.int64),
+        paciente_ids=np.empty(0, dtype=np.int64),
+        datas=np.empty(0, dtype="datetime64[D]"),
+        especies=np.empty(0, dtype=object),
+        racas=np.empty(0, dtype=object),
+        racas_nome=np.empty(0, dtype=object),
+        pesos=np.empty(0, dtype=float),
+        valores=np.empty((0, len(PARAMETROS)), dtype=float),
+    )
+
+
+def _atributos_paciente(especie: Any, raca: Any, peso_kg: Any) -> Tuple[str, str, str, float]:
+    raca_nome = str(raca or "").strip()
+    return (
+        normalizar_especie(especie) or "",
+        gerar_nome_key(raca_nome),
+        raca_nome,
+        np.nan if peso_kg is None else float(peso_kg),
+    )
+
+
+def montar_base(linhas: Iterable[Any]) -> BaseCoorte:
+    """Base a partir de linhas (laudo_id, paciente_id, tipo, medidas_json, data, especie, raca, peso_kg)."""
+    colunas: Dict[str, List[Any]] = {campo: [] for campo in BaseCoorte.__dataclass_fields__}
+    for linha in linhas:
+        if (linha.tipo or "").lower() in TIPOS_NAO_ECO:
+            continue
+        vetor = _vetor_medidas(linha.medidas_json)
+        if vetor is None:
+            continue
+        especie, raca, raca_nome, peso = _atributos_paciente(linha.especie, linha.raca, linha.peso_kg)
+        colunas["laudo_ids"].append(int(linha.laudo_id))
+        colunas["paciente_ids"].append(int(linha.paciente_id or 0))
+        colunas["datas"].append(_data_dia(linha.data))
+        colunas["especies"].append(especie)
+        colunas["racas"].append(raca)
+        colunas["racas_nome"].append(raca_nome)
+        colunas["pesos"].append(peso)
+        colunas["valores"].append(vetor)
+
+    if not colunas["laudo_ids"]:
+        return base_vazia()
+
+    def objetos(valores: List[str]) -> np.ndarray:
+        array = np.empty(len(valores), dtype=object)
+        array[:] = valores
+        return array
+
+    return BaseCoorte(
+        laudo_ids=np.array(colunas["laudo_ids"], dtype=np.int64),
+        paciente_ids=np.array(colunas["paciente_ids"], dtype=np.int64),
+        datas=np.array(colunas["datas"], dtype="datetime64[D]"),
+        especies=objetos(colunas["especies"]),
+        racas=objetos(colunas["racas"]),
+        racas_nome=objetos(colunas["racas_nome"]),
+        pesos=np.array(colunas["pesos"], dtype=float),
+        valores=np.vstack(colunas["valores"]),
+    )
+
+
+def _concatenar(base: BaseCoorte, nova: BaseCoorte) -> BaseCoorte:
+    return BaseCoorte(
+        **{
+            campo: np.concatenate([getattr(base, campo), getattr(nova, campo)])
+            for campo in BaseCoorte.__dataclass_fields__
+        }
+    )
+
+
+def _filtrar_linhas(base: BaseCoorte, manter: np.ndarray) -> BaseCoorte:
+    return BaseCoorte(
+        **{campo: getattr(base, campo)[manter] for campo in BaseCoorte.__dataclass_fields__}
+    )
+
+
+def _consulta_laudos(db: Session):
+    return (
+        db.query(
+            Laudo.id.label("laudo_id"),
+            Laudo.paciente_id,
+            Laudo.tipo,
+            Laudo.medidas_json,
+            func.coalesce(Laudo.data_exame, Laudo.data_laudo, Laudo.created_at).label("data"),
+            Laudo.updated_at,
+            Laudo.created_at,
+            Paciente.especie,
+            Paciente.raca,
+            Paciente.peso_kg,
+        )
+        .outerjoin(Paciente, Paciente.id == Laudo.paciente_id)
+    )
+
+
+class _CacheCoorte:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._base: Optional[BaseCoorte] = None
+        self._verificado_em = 0.0
+        self._atualizado_em: Optional[datetime] = None
+        # Marcas d'agua da leitura incremental.
+        self._laudos_vistos: set[int] = set()
+        self._max_laudo_id = 0
+        self._marca_laudo: Optional[datetime] = None
+        self._marca_paciente: Optional[str] = None
+
+    def _avancar_marcas(self, linhas: Sequence[Any]) -> None:
+        for linha in linhas:
+            self._laudos_vistos.add(int(linha.laudo_id))
+            self._max_laudo_id = max(self._max_laudo_id, int(linha.laudo_id))
+            alterado = _sem_fuso(linha.updated_at or linha.created_at)
+            if alterado is not None and (self._marca_laudo is None or alterado > self._marca_laudo):
+                self._marca_laudo = alterado
+
+    def _carregar_tudo(self, db: Session) -> BaseCoorte:
+        self._laudos_vistos = set()
+        self._max_laudo_id = 0
+        self._marca_laudo = None
+        self._marca_paciente = db.query(func.max(Paciente.updated_at)).scalar()
+
+        linhas = _consulta_laudos(db).all()
+        self._avancar_marcas(linhas)
+        return montar_base(linhas)
+
+    def _carregar_delta(self, db: Session, base: BaseCoorte) -> BaseCoorte:
+        filtro = Laudo.id > self._max_laudo_id
+        if self._marca_laudo is not None:
+            # Margem de 1s: func.now() do SQLite grava sem fracao de segundo.
+            marca = self._marca_laudo - timedelta(seconds=1)
+            filtro = or_(filtro, Laudo.updated_at >= marca)
+        linhas = _consulta_laudos(db).filter(filtro).all()
+        if linhas:
+            self._avancar_marcas(linhas)
+            relidos = np.array([int(linha.laudo_id) for linha in linhas], dtype=np.int64)
+            # Laudo relido substitui a linha antiga (ou sai da base se deixou de ser eco).
+            base = _filtrar_linhas(base, ~np.isin(base.laudo_ids, relidos))
+            base = _concatenar(base, montar_base(linhas))
+
+        pacientes_query = db.query(Paciente.id, Paciente.especie, Paciente.raca, Paciente.peso_kg, Paciente.updated_at)
+        if self._marca_paciente is not None:
+            pacientes_query = pacientes_query.filter(Paciente.updated_at >= self._marca_paciente)
+        else:
+            pacientes_query = pacientes_query.filter(Paciente.updated_at.isnot(None))
+        pacientes = pacientes_query.all()
+        if pacientes and len(base):
+            especies = base.especies.copy()
+            racas = base.racas.copy()
+            racas_nome = base.racas_nome.copy()
+            pesos = base.pesos.copy()
+            for paciente in pacientes:
+                linhas_paciente = base.paciente_ids == int(paciente.id)
+                if not linhas_paciente.any():
+                    continue
+                especie, raca, raca_nome, peso = _atributos_paciente(paciente.especie, paciente.raca, paciente.peso_kg)
+                especies[linhas_paciente] = especie
+                racas[linhas_paciente] = raca
+                racas_nome[linhas_paciente] = raca_nome
+                pesos[linhas_paciente] = peso
+            base = replace(base, especies=especies, racas=racas, racas_nome=racas_nome, pesos=pesos)
+        marcas = [str(paciente.updated_at) for paciente in pacientes if paciente.updated_at]
+        if marcas:
+            self._marca_paciente = max(marcas + ([self._marca_paciente] if self._marca_paciente else []))
+        return base
+
+    def base(self, db: Session) -> Tuple[BaseCoorte, Optional[datetime]]:
+        base = self._base
+        if base is not None and time.monotonic() - self._verificado_em < REFRESH_INTERVAL_SECONDS:
+            return base, self._atualizado_em
+
+        with self._lock:
+            if self._base is not None and time.monotonic() - self._verificado_em < REFRESH_INTERVAL_SECONDS:
+                return self._base, self._atualizado_em
+
+            if self._base is None:
+                base = self._carregar_tudo(db)
+            else:
+                base = self._carregar_delta(db, self._base)
+                total = db.query(func.count(Laudo.id)).scalar() or 0
+                if total != len(self._laudos_vistos):
+                    base = self._carregar_tudo(db)
+
+            self._base = base
+            self._verificado_em = time.monotonic()
+            self._atualizado_em = datetime.now(timezone.utc)
+            return base, self._atualizado_em
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._base = None
+            self._verificado_em = 0.0
+
+
+_CACHE = _CacheCoorte()
+
+
+def invalidar_cache_coorte() -> None:
+    _CACHE.invalidar()
+
+
+def obter_base(db: Session) -> BaseCoorte:
+    return _CACHE.base(db)[0]
+
+
+def _erf(x: np.ndarray) -> np.ndarray:
+    # Abramowitz & Stegun 7.1.26 (erro < 1.5e-7), vetorizado.
+    sinal = np.sign(x)
+    x = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    polinomio = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return sinal * (1.0 - polinomio * np.exp(-x * x))
+
+
+def percentil_normal(z: np.ndarray) -> np.ndarray:
+    """Percentil (0-100) de cada z-score na distribuicao normal padrao."""
+    return 50.0 * (1.0 + _erf(np.asarray(z, dtype=float) / np.sqrt(2.0)))
+
+
+def faixas_da_coorte(
+    db: Session,
+    base: BaseCoorte,
+    linhas: np.ndarray,
+    interpolar: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Minimos/maximos de referencia para as linhas (indices) da base, por especie e peso."""
+    minimos = np.full((len(linhas), len(PARAMETROS)), np.nan)
+    maximos = np.full((len(linhas), len(PARAMETROS)), np.nan)
+    especies = base.especies[linhas]
+    pesos = base.pesos[linhas]
+    for especie in np.unique(especies):
+        tabela = obter_tabela(db, especie) if especie else None
+        if tabela is None:
+            continue
+        alvo = (especies == especie) & ~np.isnan(pesos)
+        if alvo.any():
+            minimos[alvo], maximos[alvo] = tabela.faixas(pesos[alvo], interpolar=interpolar)
+    return minimos, maximos
+
+
+def calcular_z_scores(valores: np.ndarray, minimos: np.ndarray, maximos: np.ndarray) -> np.ndarray:
+    """Z-score de cada medida tratando [min, max] como media +- 2 dp; NaN sem faixa."""
+    media = (minimos + maximos) / 2.0
+    dp = (maximos - minimos) / 4.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(dp > 0, (valores - media) / dp, np.nan)
+
+
+def _arredondar(valor: Any, casas: int = 3) -> Optional[float]:
+    valor = float(valor)
+    return None if np.isnan(valor) else round(valor, casas)
+
+
+def _resumo_parametros(
+    valores: np.ndarray,
+    minimos: np.ndarray,
+    maximos: np.ndarray,
+    z: np.ndarray,
+    colunas: Sequence[int],
+) -> List[Dict[str, Any]]:
+    com_valor = ~np.isnan(valores)
+    com_faixa = com_valor & ~np.isnan(minimos) & ~np.isnan(maximos)
+    acima = (com_faixa & (valores > maximos)).sum(axis=0)
+    abaixo = (com_faixa & (valores < minimos)).sum(axis=0)
+    n_valores = com_valor.sum(axis=0)
+    n_faixa = com_faixa.sum(axis=0)
+
+    resumos: List[Dict[str, Any]] = []
+    for coluna in colunas:
+        n = int(n_valores[coluna])
+        if n == 0:
+            continue
+        coluna_valores = valores[com_valor[:, coluna], coluna]
+        coluna_z = z[~np.isnan(z[:, coluna]), coluna]
+        resumo: Dict[str, Any] = {
+            "parametro": PARAMETROS[coluna],
+            "n": n,
+            "n_com_referencia": int(n_faixa[coluna]),
+            "acima": int(acima[coluna]),
+            "abaixo": int(abaixo[coluna]),
+            "normal": int(n_faixa[coluna] - acima[coluna] - abaixo[coluna]),
+            "pct_acima": _arredondar(100.0 * acima[coluna] / n_faixa[coluna], 1) if n_faixa[coluna] else None,
+            "pct_abaixo": _arredondar(100.0 * abaixo[coluna] / n_faixa[coluna], 1) if n_faixa[coluna] else None,
+            "media": _arredondar(coluna_valores.mean()),
+            "percentis": {
+                f"p{p}": _arredondar(v)
+                for p, v in zip(PERCENTIS, np.percentile(coluna_valores, PERCENTIS))
+            },
+            "z_media": None,
+            "z_dp": None,
+            "z_percentis": {},
+            "percentil_referencia_mediano": None,
+        }
+        if coluna_z.size:
+            resumo["z_media"] = _arredondar(coluna_z.mean())
+            resumo["z_dp"] = _arredondar(coluna_z.std(ddof=1)) if coluna_z.size > 1 else 0.0
+            resumo["z_percentis"] = {
+                f"p{p}": _arredondar(v)
+                for p, v in zip(PERCENTIS, np.percentile(coluna_z, PERCENTIS))
+            }
+            resumo["percentil_referencia_mediano"] = _arredondar(
+                np.median(percentil_normal(coluna_z)), 1
+            )
+        resumos.append(resumo)
+    return resumos
+
+
+def _parse_data(valor: Optional[str], campo: str) -> Optional[np.datetime64]:
+    if not valor:
+        return None
+    try:
+        return np.datetime64(date.fromisoformat(valor[:10]).isoformat(), "D")
+    except ValueError:
+        raise ValueError(f"{campo} invalida; use AAAA-MM-DD.")
+
+
+def consultar_coorte(
+    db: Session,
+    especie: Optional[str] = None,
+    raca: Optional[str] = None,
+    peso_min: Optional[float] = None,
+    peso_max: Optional[float] = None,
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None,
+    parametro: Optional[str] = None,
+    faixas_peso: Optional[Sequence[float]] = None,
+    interpolar: bool = False,
+) -> Dict[str, Any]:
+    """Distribuicao das medidas de uma coorte contra a referencia.
+
+    `parametro` aceita a chave do laudo (AE_Ao) ou o prefixo da tabela
+    (la_ao). Sem parametro, resume todos os que tem medidas na coorte; com
+    parametro, inclui tambem a quebra por raca e, se `faixas_peso` for dado
+    (limites em kg), por faixa de peso. ValueError para filtros invalidos.
+    """
+    colunas: Sequence[int] = range(len(PARAMETROS))
+    if parametro:
+        prefixo = prefixo_da_medida(parametro.strip())
+        if prefixo is None:
+            raise ValueError(f"Parametro desconhecido: {parametro}")
+        colunas = [_INDICE_PARAMETRO[prefixo]]
+    inicio = _parse_data(data_inicio, "data_inicio")
+    fim = _parse_data(data_fim, "data_fim")
+
+    base, atualizado_em = _CACHE.base(db)
+
+    mascara = np.ones(len(base), dtype=bool)
+    especie_norm = normalizar_especie(especie)
+    if especie_norm:
+        mascara &= base.especies == especie_norm
+    raca_key = gerar_nome_key(raca)
+    if raca_key:
+        mascara &= base.racas == raca_key
+    if peso_min is not None:
+        mascara &= base.pesos >= float(peso_min)
+    if peso_max is not None:
+        mascara &= base.pesos <= float(peso_max)
+    if inicio is not None:
+        mascara &= base.datas >= inicio
+    if fim is not None:
+        mascara &= base.datas <= fim
+    if parametro:
+        mascara &= ~np.isnan(base.valores[:, colunas[0]])
+
+    linhas = np.flatnonzero(mascara)
+    valores = base.valores[linhas]
+    minimos, maximos = faixas_da_coorte(db, base, linhas, interpolar=interpolar)
+    z = calcular_z_scores(valores, minimos, maximos)
+
+    resultado: Dict[str, Any] = {
+        "total_laudos": int(linhas.size),
+        "total_pacientes": int(np.unique(base.paciente_ids[linhas]).size),
+        "filtros": {
+            "especie": especie_norm,
+            "raca": raca,
+            "peso_min": peso_min,
+            "peso_max": peso_max,
+            "data_inicio": data_inicio,
+            "data_fim": data_fim,
+            "parametro": PARAMETROS[colunas[0]] if parametro else None,
+            "interpolar": interpolar,
+        },
+        "base_laudos": len(base),
+        "base_atualizada_em": atualizado_em.isoformat() if atualizado_em else None,
+        "parametros": _resumo_parametros(valores, minimos, maximos, z, colunas),
+    }
+    if not parametro:
+        return resultado
+
+    racas = base.racas[linhas]
+    nomes = base.racas_nome[linhas]
+    chaves, contagens = np.unique(racas, return_counts=True)
+    por_raca: List[Dict[str, Any]] = []
+    for indice in np.argsort(-contagens, kind="stable")[:MAX_GRUPOS_RACA]:
+        grupo = racas == chaves[indice]
+        resumo = _resumo_parametros(valores[grupo], minimos[grupo], maximos[grupo], z[grupo], colunas)
+        if resumo:
+            por_raca.append({"raca": nomes[grupo][0] or "Sem raca", **resumo[0]})
+    resultado["por_raca"] = por_raca
+
+    if faixas_peso:
+        limites = np.array(sorted({float(limite) for limite in faixas_peso}), dtype=float)
+        pesos = base.pesos[linhas]
+        grupos = np.digitize(pesos, limites)
+        por_faixa: List[Dict[str, Any]] = []
+        for grupo_id in range(len(limites) + 1):
+            grupo = (grupos == grupo_id) & ~np.isnan(pesos)
+            resumo = _resumo_parametros(valores[grupo], minimos[grupo], maximos[grupo], z[grupo], colunas)
+            if not resumo:
+                continue
+            por_faixa.append(
+                {
+                    "peso_de": float(limites[grupo_id - 1]) if grupo_id > 0 else None,
+                    "peso_ate": float(limites[grupo_id]) if grupo_id < len(limites) else None,
+                    **resumo[0],
+                }
+            )
+        resultado["por_faixa_peso"] = por_faixa
+
+    return resultado
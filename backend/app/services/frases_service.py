@@ -3,11 +3,22 @@ Service para gerenciamento de frases qualitativas via arquivos JSON.
 As frases são armazenadas em arquivos versionados no Git em vez do banco de dados.
 """
 import json
-import os
-from typing import List, Optional, Dict, Any, Set
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime
 from pathlib import Path
 
+from app.services.json_store import (
+    InterProcessLock,
+    JournaledJsonStore,
+    JsonSnapshotCache,
+    atomic_write_json,
+    build_token_index,
+    candidatos_por_termo,
+    normalizar_texto_busca,
+    tokenizar,
+)
+
 # Diretório onde os arquivos JSON estão localizados
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 FRASES_FILE = DATA_DIR / "frases.json"
@@ -31,10 +42,9 @@ def _load_json(filepath: Path, default: Any = None) -> Any:
 
 
 def _save_json(filepath: Path, data: Any):
-    """Salva dados em um arquivo JSON."""
+    """Salva dados em um arquivo JSON (escrita atômica)."""
     _ensure_data_dir()
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    atomic_write_json(filepath, data)
 
 
 def _to_int(value: Any) -> Optional[int]:
@@ -84,9 +94,8 @@ def _normalize_frases_ids(frases: List[Dict[str, Any]]) -> bool:
     return changed
 
 
-def _load_frases_data() -> Dict[str, Any]:
-    """Carrega frases garantindo estrutura e IDs válidos."""
-    data = _load_json(FRASES_FILE, {"frases": [], "version": "1.0"})
+def _normalizar_frases_data(data: Any) -> Tuple[Dict[str, Any], bool]:
+    """Garante estrutura e IDs válidos; indica se precisou corrigir algo."""
     if not isinstance(data, dict):
         data = {"frases": [], "version": "1.0"}
 
@@ -95,11 +104,268 @@ def _load_frases_data() -> Dict[str, Any]:
         frases = []
     data["frases"] = frases
 
-    if _normalize_frases_ids(frases):
+    changed = _normalize_frases_ids(frases)
+    if changed:
         data["last_updated"] = datetime.now().isoformat()
-        _save_json(FRASES_FILE, data)
 
-    return data
+    return data, changed
+
+
+# =============================================================================
+# SNAPSHOT INDEXADO (caminho de leitura)
+# =============================================================================
+
+@dataclass(frozen=True)
+class _FrasesSnapshot:
+    """Frases em ordem do arquivo, com índices por posição."""
+    payload: Dict[str, Any]
+    ids_normalizados: bool
+    frases: Tuple[Dict[str, Any], ...]
+    posicao_por_id: Dict[int, int]
+    posicao_por_chave: Dict[str, int]
+    posicoes_por_ativo: Dict[Any, frozenset]
+    posicoes_por_patologia: Dict[str, frozenset]
+    posicoes_por_grau: Dict[str, frozenset]
+    posicao_por_patologia_grau: Dict[Tuple[str, str], int]
+    textos_busca: Tuple[Tuple[str, str, str], ...]
+    tokens: Dict[str, frozenset]
+    patologias_map: Dict[str, frozenset]
+    posicoes_por_chave: Dict[str, frozenset]
+
+
+def _agrupar(pares: List[Tuple[Any, int]]) -> Dict[Any, frozenset]:
+    grupos: Dict[Any, Set[int]] = {}
+    for chave, posicao in pares:
+        grupos.setdefault(chave, set()).add(posicao)
+    return {chave: frozenset(posicoes) for chave, posicoes in grupos.items()}
+
+
+def _build_frases_snapshot(raw: Any) -> _FrasesSnapshot:
+    payload, ids_normalizados = _normalizar_frases_data(raw)
+    frases = tuple(payload["frases"])
+
+    posicao_por_id: Dict[int, int] = {}
+    posicao_por_chave: Dict[str, int] = {}
+    posicao_por_patologia_grau: Dict[Tuple[str, str], int] = {}
+    patologias_map: Dict[str, Set[str]] = {}
+    textos_busca = []
+
+    for posicao, frase in enumerate(frases):
+        posicao_por_id.setdefault(frase["id"], posicao)
+        ativa = frase.get("ativo", 1) == 1
+        patologia = (frase.get("patologia") or "").strip()
+        grau = (frase.get("grau") or "").strip()
+
+        if ativa:
+            chave = frase.get("chave")
+            if chave is not None:
+                posicao_por_chave.setdefault(chave, posicao)
+            posicao_por_patologia_grau.setdefault((patologia.lower(), grau.lower()), posicao)
+            if patologia:
+                patologias_map.setdefault(patologia, set())
+                if grau:
+                    patologias_map[patologia].add(grau)
+
+        textos_busca.append(_textos_busca(frase))
+
+    return _FrasesSnapshot(
+        payload=payload,
+        ids_normalizados=ids_normalizados,
+        frases=frases,
+        posicao_por_id=posicao_por_id,
+        posicao_por_chave=posicao_por_chave,
+        posicoes_por_ativo=_agrupar([(f.get("ativo", 1), i) for i, f in enumerate(frases)]),
+        posicoes_por_patologia=_agrupar([((f.get("patologia") or "").lower(), i) for i, f in enumerate(frases)]),
+        posicoes_por_grau=_agrupar([((f.get("grau") or "").lower(), i) for i, f in enumerate(frases)]),
+        posicao_por_patologia_grau=posicao_por_patologia_grau,
+        textos_busca=tuple(textos_busca),
+        tokens=build_token_index((i, " ".join(textos)) for i, textos in enumerate(textos_busca)),
+        patologias_map={nome: frozenset(graus) for nome, graus in patologias_map.items()},
+        posicoes_por_chave=_agrupar([(f.get("chave"), i) for i, f in enumerate(frases) if f.get("chave") is not None]),
+    )
+
+
+def _textos_busca(frase: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (
+        normalizar_texto_busca(frase.get("patologia", "")),
+        normalizar_texto_busca(frase.get("chave", "")),
+        normalizar_texto_busca(frase.get("conclusao", "")),
+    )
+
+
+def _mover_posicao(grupos: Dict[Any, frozenset], antigas: Set[Any], novas: Set[Any], posicao: int) -> Dict[Any, frozenset]:
+    """Copia de `grupos` com `posicao` tirada das chaves `antigas` e posta nas `novas`."""
+    if antigas == novas:
+        return grupos
+    grupos = dict(grupos)
+    for chave in antigas - novas:
+        restantes = grupos.get(chave, frozenset()) - {posicao}
+        if restantes:
+            grupos[chave] = restantes
+        else:
+            grupos.pop(chave, None)
+    for chave in novas - antigas:
+        grupos[chave] = grupos.get(chave, frozenset()) | {posicao}
+    return grupos
+
+
+def _aplicar_frase(snapshot: _FrasesSnapshot, frase: Dict[str, Any], meta: Dict[str, Any]) -> _FrasesSnapshot:
+    """Snapshot com `frase` inserida/substituida, reindexando so o que ela toca.
+
+    As estruturas sao copiadas rasas; normalizacao e tokenizacao rodam apenas
+    para a frase alterada. A reconstrucao completa (_build_frases_snapshot)
+    fica para a leitura do disco apos a compactacao.
+    """
+    posicao = snapshot.posicao_por_id.get(frase["id"])
+    frases = list(snapshot.frases)
+    textos_busca = list(snapshot.textos_busca)
+    if posicao is None:
+        posicao = len(frases)
+        antiga: Optional[Dict[str, Any]] = None
+        frases.append(frase)
+        textos_busca.append(_textos_busca(frase))
+    else:
+        antiga = frases[posicao]
+        frases[posicao] = frase
+        textos_busca[posicao] = _textos_busca(frase)
+
+    def chaves_de(item: Optional[Dict[str, Any]], extrair: Callable[[Dict[str, Any]], Any]) -> Set[Any]:
+        return {extrair(item)} if item is not None else set()
+
+    def chave_de(item: Dict[str, Any]) -> Any:
+        return item.get("chave")
+
+    def patologia_de(item: Dict[str, Any]) -> str:
+        return (item.get("patologia") or "").lower()
+
+    posicoes_por_ativo = _mover_posicao(
+        snapshot.posicoes_por_ativo,
+        chaves_de(antiga, lambda item: item.get("ativo", 1)),
+        chaves_de(frase, lambda item: item.get("ativo", 1)),
+        posicao,
+    )
+    posicoes_por_patologia = _mover_posicao(
+        snapshot.posicoes_por_patologia, chaves_de(antiga, patologia_de), chaves_de(frase, patologia_de), posicao
+    )
+    posicoes_por_grau = _mover_posicao(
+        snapshot.posicoes_por_grau,
+        chaves_de(antiga, lambda item: (item.get("grau") or "").lower()),
+        chaves_de(frase, lambda item: (item.get("grau") or "").lower()),
+        posicao,
+    )
+    posicoes_por_chave = _mover_posicao(
+        snapshot.posicoes_por_chave,
+        chaves_de(antiga, chave_de) - {None},
+        chaves_de(frase, chave_de) - {None},
+        posicao,
+    )
+    tokens = _mover_posicao(
+        snapshot.tokens,
+        set(tokenizar(" ".join(snapshot.textos_busca[posicao]))) if antiga is not None else set(),
+        set(tokenizar(" ".join(textos_busca[posicao]))),
+        posicao,
+    )
+
+    def ativa(pos: int) -> bool:
+        return frases[pos].get("ativo", 1) == 1
+
+    # Indices "primeira frase ativa": recalculados so para as chaves afetadas,
+    # a partir dos grupos de posicoes (pequenos).
+    posicao_por_chave = dict(snapshot.posicao_por_chave)
+    for chave in (chaves_de(antiga, chave_de) | {chave_de(frase)}) - {None}:
+        ativas = [pos for pos in posicoes_por_chave.get(chave, ()) if ativa(pos)]
+        if ativas:
+            posicao_por_chave[chave] = min(ativas)
+        else:
+            posicao_por_chave.pop(chave, None)
+
+    def posicoes_da_patologia(patologia: str) -> List[int]:
+        alvo = patologia.lower()
+        return [
+            pos
+            for chave, grupo in posicoes_por_patologia.items() if chave.strip() == alvo
+            for pos in grupo if ativa(pos) and (frases[pos].get("patologia") or "").strip().lower() == alvo
+        ]
+
+    afetadas = [item for item in (antiga, frase) if item is not None]
+    posicao_por_patologia_grau = dict(snapshot.posicao_por_patologia_grau)
+    patologias_map = dict(snapshot.patologias_map)
+    for item in afetadas:
+        patologia = (item.get("patologia") or "").strip()
+        grau = (item.get("grau") or "").strip().lower()
+        candidatas = posicoes_da_patologia(patologia)
+        mesmo_grau = [pos for pos in candidatas if (frases[pos].get("grau") or "").strip().lower() == grau]
+        if mesmo_grau:
+            posicao_por_patologia_grau[(patologia.lower(), grau)] = min(mesmo_grau)
+        else:
+            posicao_por_patologia_grau.pop((patologia.lower(), grau), None)
+
+        if patologia:
+            exatas = [pos for pos in candidatas if (frases[pos].get("patologia") or "").strip() == patologia]
+            if exatas:
+                patologias_map[patologia] = frozenset(
+                    (frases[pos].get("grau") or "").strip() for pos in exatas
+                ) - {""}
+            else:
+                patologias_map.pop(patologia, None)
+
+    return _FrasesSnapshot(
+        payload={**snapshot.payload, **meta, "frases": list(frases)},
+        ids_normalizados=False,
+        frases=tuple(frases),
+        posicao_por_id={**snapshot.posicao_por_id, frase["id"]: posicao},
+        posicao_por_chave=posicao_por_chave,
+        posicoes_por_ativo=posicoes_por_ativo,
+        posicoes_por_patologia=posicoes_por_patologia,
+        posicoes_por_grau=posicoes_por_grau,
+        posicao_por_patologia_grau=posicao_por_patologia_grau,
+        textos_busca=tuple(textos_busca),
+        tokens=tokens,
+        patologias_map=patologias_map,
+        posicoes_por_chave=posicoes_por_chave,
+    )
+
+
+_FRASES_STORE = JournaledJsonStore(FRASES_FILE, "frases")
+_FRASES_CACHE: JsonSnapshotCache[_FrasesSnapshot] = JsonSnapshotCache(_FRASES_STORE, _build_frases_snapshot)
+_PATOLOGIAS_LOCK = InterProcessLock(PATOLOGIAS_FILE.with_name(PATOLOGIAS_FILE.name + ".lock"))
+_PATOLOGIAS_CACHE: JsonSnapshotCache[Dict[str, Any]] = JsonSnapshotCache(
+    PATOLOGIAS_FILE,
+    lambda raw: raw if isinstance(raw, dict) else {"patologias": []},
+)
+
+
+def _gravar_frase(snapshot: _FrasesSnapshot, frase: Dict[str, Any]) -> None:
+    """Persiste uma frase alterada e publica o novo snapshot.
+
+    Deve ser chamada com `_FRASES_STORE.lock` adquirido e `snapshot` lido
+    dentro dele. No disco a escrita é só uma linha no journal, e em memória
+    só a frase alterada é reindexada; o arquivo inteiro é regravado (e o
+    snapshot reconstruído) apenas na compactação.
+    """
+    meta = {"last_updated": datetime.now().isoformat()}
+    novo = _aplicar_frase(snapshot, frase, meta)
+    _FRASES_STORE.commit(novo.payload, [frase], meta, force_compact=snapshot.ids_normalizados)
+    _FRASES_CACHE.install(novo, _FRASES_STORE.stamp())
+
+
+def compactar_frases() -> None:
+    """Incorpora o journal ao frases.json (chamada no startup/shutdown da API)."""
+    with _FRASES_STORE.lock:
+        snapshot = _FRASES_CACHE.get(force=True)
+        if _FRASES_STORE.has_journal() or snapshot.ids_normalizados:
+            _FRASES_STORE.compact(snapshot.payload)
+            _FRASES_CACHE.invalidate()
+
+
+def _posicoes_por_substring(indice: Dict[str, frozenset], termo: str) -> Set[int]:
+    """União das posições cujas chaves do índice contêm `termo` (vocabulário pequeno)."""
+    termo = termo.lower()
+    posicoes: Set[int] = set()
+    for chave, chave_posicoes in indice.items():
+        if termo in chave:
+            posicoes.update(chave_posicoes)
+    return posicoes
 
 
 def _generate_id(frases: List[Dict]) -> int:
@@ -127,66 +393,76 @@ def listar_frases(
     limit: int = 100
 ) -> Dict[str, Any]:
     """Lista todas as frases qualitativas com filtros opcionais."""
-    data = _load_frases_data()
-    frases = data.get("frases", [])
-    
-    # Aplicar filtros
+    snapshot = _FRASES_CACHE.get()
+    posicoes: Optional[Set[int]] = None
+
+    def restringir(candidatas: Set[int]) -> Set[int]:
+        return set(candidatas) if posicoes is None else posicoes & candidatas
+
     if ativo is not None:
-        frases = [f for f in frases if f.get("ativo", 1) == ativo]
-    
+        posicoes = restringir(snapshot.posicoes_por_ativo.get(ativo, frozenset()))
+
     if patologia:
-        frases = [f for f in frases if patologia.lower() in f.get("patologia", "").lower()]
-    
+        posicoes = restringir(_posicoes_por_substring(snapshot.posicoes_por_patologia, patologia))
+
     if grau:
-        frases = [f for f in frases if grau.lower() in f.get("grau", "").lower()]
-    
+        posicoes = restringir(_posicoes_por_substring(snapshot.posicoes_por_grau, grau))
+
     if busca:
-        busca_lower = busca.lower()
-        frases = [
-            f for f in frases 
-            if (busca_lower in f.get("patologia", "").lower() or
-                busca_lower in f.get("chave", "").lower() or
-                busca_lower in f.get("conclusao", "").lower())
-        ]
-    
-    total = len(frases)
-    items = frases[skip:skip + limit]
+        termo = normalizar_texto_busca(busca)
+        candidatas = candidatos_por_termo(snapshot.tokens, termo)
+        if candidatas is not None:
+            posicoes = restringir(candidatas)
+        elif posicoes is None:
+            posicoes = set(range(len(snapshot.frases)))
+        posicoes = {
+            posicao for posicao in posicoes
+            if any(termo in texto for texto in snapshot.textos_busca[posicao])
+        }
+
+    ordenadas = sorted(posicoes) if posicoes is not None else range(len(snapshot.frases))
+    total = len(ordenadas)
+    items = [dict(snapshot.frases[posicao]) for posicao in ordenadas[skip:skip + limit]]
     
     return {"items": items, "total": total}
 
 
 def obter_frase(frase_id: int) -> Optional[Dict]:
     """Obtém uma frase específica pelo ID."""
-    data = _load_frases_data()
+    snapshot = _FRASES_CACHE.get()
     frase_id = _to_int(frase_id) or frase_id
-    for frase in data.get("frases", []):
-        if _to_int(frase.get("id")) == frase_id and frase.get("ativo", 1) == 1:
-            return frase
-    return None
+    posicao = snapshot.posicao_por_id.get(frase_id)
+    if posicao is None:
+        return None
+    frase = snapshot.frases[posicao]
+    return dict(frase) if frase.get("ativo", 1) == 1 else None
 
 
 def obter_frase_por_chave(chave: str) -> Optional[Dict]:
     """Obtém uma frase específica pela chave."""
-    data = _load_frases_data()
-    for frase in data.get("frases", []):
-        if frase.get("chave") == chave and frase.get("ativo", 1) == 1:
-            return frase
-    return None
+    snapshot = _FRASES_CACHE.get()
+    posicao = snapshot.posicao_por_chave.get(chave)
+    return dict(snapshot.frases[posicao]) if posicao is not None else None
 
 
 def criar_frase(frase_data: Dict[str, Any]) -> Dict[str, Any]:
     """Cria uma nova frase qualitativa."""
-    data = _load_frases_data()
-    frases = data.get("frases", [])
-    
-    # Verificar se já existe chave
-    chave = frase_data.get("chave")
-    if chave and any(f.get("chave") == chave for f in frases):
-        raise ValueError(f"Já existe uma frase com a chave '{chave}'")
-    
-    # Criar nova frase
-    nova_frase = {
-        "id": _generate_id(frases),
+    with _FRASES_STORE.lock:
+        snapshot = _FRASES_CACHE.get(force=True)
+
+        # Verificar se já existe chave
+        chave = frase_data.get("chave")
+        if chave and chave in snapshot.posicoes_por_chave:
+            raise ValueError(f"Já existe uma frase com a chave '{chave}'")
+
+        nova_frase = _nova_frase(_generate_id(list(snapshot.frases)), frase_data)
+        _gravar_frase(snapshot, nova_frase)
+        return dict(nova_frase)
+
+
+def _nova_frase(frase_id: int, frase_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": frase_id,
         "chave": frase_data.get("chave", ""),
         "patologia": frase_data.get("patologia", ""),
         "grau": frase_data.get("grau", "Normal"),
@@ -203,75 +479,49 @@ def criar_frase(frase_data: Dict[str, Any]) -> Dict[str, Any]:
         "created_at": datetime.now().isoformat(),
         "updated_at": datetime.now().isoformat(),
     }
-    
-    frases.append(nova_frase)
-    data["frases"] = frases
-    data["last_updated"] = datetime.now().isoformat()
-    
-    _save_json(FRASES_FILE, data)
-    return nova_frase
 
 
 def atualizar_frase(frase_id: int, frase_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """Atualiza uma frase existente."""
-    data = _load_frases_data()
-    frases = data.get("frases", [])
-    frase_id = _to_int(frase_id) or frase_id
-    
-    for i, frase in enumerate(frases):
-        if _to_int(frase.get("id")) == frase_id:
-            # Atualizar apenas os campos fornecidos
-            for key, value in frase_data.items():
-                if value is not None and key not in ["id", "created_at"]:
-                    frase[key] = value
-            
-            frase["updated_at"] = datetime.now().isoformat()
-            frases[i] = frase
-            
-            data["frases"] = frases
-            data["last_updated"] = datetime.now().isoformat()
-            _save_json(FRASES_FILE, data)
-            return frase
-    
-    return None
+    with _FRASES_STORE.lock:
+        snapshot = _FRASES_CACHE.get(force=True)
+        posicao = snapshot.posicao_por_id.get(_to_int(frase_id) or frase_id)
+        if posicao is None:
+            return None
+
+        frase = dict(snapshot.frases[posicao])
+        # Atualizar apenas os campos fornecidos
+        for key, value in frase_data.items():
+            if value is not None and key not in ["id", "created_at"]:
+                frase[key] = value
+        frase["updated_at"] = datetime.now().isoformat()
+
+        _gravar_frase(snapshot, frase)
+        return dict(frase)
+
+
+def _definir_ativo(frase_id: int, ativo: int) -> bool:
+    with _FRASES_STORE.lock:
+        snapshot = _FRASES_CACHE.get(force=True)
+        posicao = snapshot.posicao_por_id.get(_to_int(frase_id) or frase_id)
+        if posicao is None:
+            return False
+
+        frase = dict(snapshot.frases[posicao])
+        frase["ativo"] = ativo
+        frase["updated_at"] = datetime.now().isoformat()
+        _gravar_frase(snapshot, frase)
+        return True
 
 
 def deletar_frase(frase_id: int) -> bool:
     """Remove uma frase (soft delete - apenas marca como inativo)."""
-    data = _load_frases_data()
-    frases = data.get("frases", [])
-    frase_id = _to_int(frase_id) or frase_id
-    
-    for frase in frases:
-        if _to_int(frase.get("id")) == frase_id:
-            frase["ativo"] = 0
-            frase["updated_at"] = datetime.now().isoformat()
-            
-            data["frases"] = frases
-            data["last_updated"] = datetime.now().isoformat()
-            _save_json(FRASES_FILE, data)
-            return True
-    
-    return False
+    return _definir_ativo(frase_id, 0)
 
 
 def restaurar_frase(frase_id: int) -> bool:
     """Restaura uma frase removida."""
-    data = _load_frases_data()
-    frases = data.get("frases", [])
-    frase_id = _to_int(frase_id) or frase_id
-    
-    for frase in frases:
-        if _to_int(frase.get("id")) == frase_id:
-            frase["ativo"] = 1
-            frase["updated_at"] = datetime.now().isoformat()
-            
-            data["frases"] = frases
-            data["last_updated"] = datetime.now().isoformat()
-            _save_json(FRASES_FILE, data)
-            return True
-    
-    return False
+    return _definir_ativo(frase_id, 1)
 
 
 def buscar_frase_por_patologia_grau(
@@ -282,23 +532,29 @@ def buscar_frase_por_patologia_grau(
     """Busca uma frase específica por patologia e grau."""
     # Montar a chave esperada
     if patologia == "Normal":
-        chave = "Normal (Normal)"
+        grau = "Normal"
     elif patologia == "Endocardiose Mitral":
-        chave = f"{patologia} ({grau_refluxo or 'Leve'})"
+        grau = grau_refluxo or "Leve"
     else:
-        chave = f"{patologia} ({grau_geral or 'Leve'})"
+        grau = grau_geral or "Leve"
+    chave = f"{patologia} ({grau})"
     
     # Tentar buscar pela chave exata
     frase = obter_frase_por_chave(chave)
     if frase:
         return frase
+
+    # Depois pelo par (patologia, grau), caso a chave esteja fora do padrão
+    snapshot = _FRASES_CACHE.get()
+    posicao = snapshot.posicao_por_patologia_grau.get((patologia.strip().lower(), grau.lower()))
+    if posicao is not None:
+        return dict(snapshot.frases[posicao])
     
     # Se não encontrar, buscar apenas pela patologia
-    data = _load_frases_data()
-    for f in data.get("frases", []):
-        if (patologia.lower() in f.get("patologia", "").lower() and 
-            f.get("ativo", 1) == 1):
-            return f
+    ativas = snapshot.posicoes_por_ativo.get(1, frozenset())
+    candidatas = _posicoes_por_substring(snapshot.posicoes_por_patologia, patologia) & ativas
+    if candidatas:
+        return dict(snapshot.frases[min(candidatas)])
     
     return None
 
@@ -307,25 +563,9 @@ def buscar_frase_por_patologia_grau(
 # OPERAÇÕES COM PATOLOGIAS
 # =============================================================================
 
-def _listar_patologias_das_frases() -> Dict[str, Set[str]]:
+def _listar_patologias_das_frases() -> Dict[str, frozenset]:
     """Monta mapa de patologias->graus a partir das frases ativas."""
-    data = _load_frases_data()
-    patologias_map: Dict[str, Set[str]] = {}
-
-    for frase in data.get("frases", []):
-        if frase.get("ativo", 1) != 1:
-            continue
-
-        patologia = (frase.get("patologia") or "").strip()
-        if not patologia:
-            continue
-
-        grau = (frase.get("grau") or "").strip()
-        patologias_map.setdefault(patologia, set())
-        if grau:
-            patologias_map[patologia].add(grau)
-
-    return patologias_map
+    return _FRASES_CACHE.get().patologias_map
 
 
 def listar_patologias() -> List[str]:
@@ -335,7 +575,7 @@ def listar_patologias() -> List[str]:
         return sorted(patologias_map.keys())
 
     # Fallback legado: usa patologias.json quando não houver frases.
-    data = _load_json(PATOLOGIAS_FILE, {"patologias": []})
+    data = _PATOLOGIAS_CACHE.get()
     patologias = [p.get("nome") for p in data.get("patologias", []) if p.get("nome")]
     return sorted(patologias)
 
@@ -378,7 +618,7 @@ def listar_graus_por_patologia(patologia: Optional[str] = None) -> List[str]:
         return _normalizar_graus_sidebar(list(graus_set))
 
     # Fallback legado: usa patologias.json quando não houver frases.
-    data = _load_json(PATOLOGIAS_FILE, {"patologias": []})
+    data = _PATOLOGIAS_CACHE.get()
 
     if patologia:
         for p in data.get("patologias", []):
@@ -395,32 +635,36 @@ def listar_graus_por_patologia(patologia: Optional[str] = None) -> List[str]:
 
 def adicionar_patologia(nome: str, graus: List[str]) -> bool:
     """Adiciona uma nova patologia ao arquivo."""
-    data = _load_json(PATOLOGIAS_FILE, {"patologias": [], "version": "1.0"})
-    patologias = data.get("patologias", [])
-    
-    # Verificar se já existe
-    if any(p.get("nome") == nome for p in patologias):
-        return False
-    
-    patologias.append({"nome": nome, "graus": graus})
-    data["patologias"] = patologias
-    data["last_updated"] = datetime.now().isoformat()
-    
-    _save_json(PATOLOGIAS_FILE, data)
-    return True
+    with _PATOLOGIAS_LOCK:
+        data = _load_json(PATOLOGIAS_FILE, {"patologias": [], "version": "1.0"})
+        patologias = data.get("patologias", [])
+
+        # Verificar se já existe
+        if any(p.get("nome") == nome for p in patologias):
+            return False
+
+        patologias.append({"nome": nome, "graus": graus})
+        data["patologias"] = patologias
+        data["last_updated"] = datetime.now().isoformat()
+
+        _save_json(PATOLOGIAS_FILE, data)
+        _PATOLOGIAS_CACHE.invalidate()
+        return True
 
 
 def atualizar_patologia(nome: str, graus: List[str]) -> bool:
     """Atualiza os graus de uma patologia existente."""
-    data = _load_json(PATOLOGIAS_FILE, {"patologias": []})
-    patologias = data.get("patologias", [])
-    
-    for p in patologias:
-        if p.get("nome") == nome:
-            p["graus"] = graus
-            data["patologias"] = patologias
-            data["last_updated"] = datetime.now().isoformat()
-            _save_json(PATOLOGIAS_FILE, data)
-            return True
-    
-    return False
+    with _PATOLOGIAS_LOCK:
+        data = _load_json(PATOLOGIAS_FILE, {"patologias": []})
+        patologias = data.get("patologias", [])
+
+        for p in patologias:
+            if p.get("nome") == nome:
+                p["graus"] = graus
+                data["patologias"] = patologias
+                data["last_updated"] = datetime.now().isoformat()
+                _save_json(PATOLOGIAS_FILE, data)
+                _PATOLOGIAS_CACHE.invalidate()
+                return True
+
+        return False
@@ -4,20 +4,25 @@ Service para gerenciamento das frases de ultrassonografia abdominal.
 As frases ficam versionadas em JSON para facilitar ajustes pela equipe sem
 dependencia de migracao de banco.
 """
-import json
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.json_store import (
+    JournaledJsonStore,
+    JsonSnapshotCache,
+    build_token_index,
+    candidatos_por_termo,
+    normalizar_texto_busca,
+    tokenizar,
+)
 
 
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 FRASES_FILE = DATA_DIR / "frases_ultrassom_abdominal.json"
 
 
-def _ensure_data_dir() -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-
-
 def _default_payload() -> Dict[str, Any]:
     return {
         "version": "1.0",
@@ -26,22 +31,10 @@ def _default_payload() -> Dict[str, Any]:
     }
 
 
-def _load_payload() -> Dict[str, Any]:
-    if not FRASES_FILE.exists():
-        payload = _default_payload()
-        _save_payload(payload)
-        return payload
-
-    try:
-        with open(FRASES_FILE, "r", encoding="utf-8") as file:
-            data = json.load(file)
-    except (OSError, json.JSONDecodeError):
-        data = _default_payload()
-        _save_payload(data)
-        return data
-
+def _coerce_payload(data: Any) -> Dict[str, Any]:
+    """Garante a estrutura do payload; `None` indica arquivo ausente ou invalido."""
     if not isinstance(data, dict):
-        data = _default_payload()
+        return _default_payload()
 
     frases = data.get("frases")
     if not isinstance(frases, list):
@@ -50,12 +43,6 @@ def _load_payload() -> Dict[str, Any]:
     return data
 
 
-def _save_payload(payload: Dict[str, Any]) -> None:
-    _ensure_data_dir()
-    with open(FRASES_FILE, "w", encoding="utf-8") as file:
-        json.dump(payload, file, indent=2, ensure_ascii=False)
-
-
 def _to_int(value: Any) -> Optional[int]:
     if isinstance(value, bool):
         return None
@@ -120,6 +107,161 @@ def _normalizar_ids(frases: List[Dict[str, Any]]) -> bool:
     return changed
 
 
+def _ordem_listagem(item: Dict[str, Any]) -> Tuple[str, str, str, int]:
+    return (
+        str(item.get("orgao", "")),
+        str(item.get("sexo", "")),
+        str(item.get("titulo", "")).lower(),
+        _to_int(item.get("id")) or 0,
+    )
+
+
+@dataclass(frozen=True)
+class _FrasesSnapshot:
+    """Frases na ordem do arquivo, com indices por posicao e a chave de listagem de cada uma."""
+    payload: Dict[str, Any]
+    precisa_compactar: bool
+    frases: Tuple[Dict[str, Any], ...]
+    chaves_ordem: Tuple[Tuple[str, str, str, int], ...]
+    posicao_por_id: Dict[int, int]
+    posicoes_por_ativo: Dict[int, frozenset]
+    posicoes_por_orgao: Dict[str, frozenset]
+    posicoes_por_sexo: Dict[str, frozenset]
+    textos_busca: Tuple[Tuple[str, str, str], ...]
+    tokens: Dict[str, frozenset]
+
+
+def _agrupar(pares: List[Tuple[Any, int]]) -> Dict[Any, frozenset]:
+    grupos: Dict[Any, Set[int]] = {}
+    for chave, posicao in pares:
+        grupos.setdefault(chave, set()).add(posicao)
+    return {chave: frozenset(posicoes) for chave, posicoes in grupos.items()}
+
+
+def _textos_busca(item: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (
+        normalizar_texto_busca(item.get("titulo", "")),
+        normalizar_texto_busca(item.get("texto", "")),
+        normalizar_texto_busca(item.get("orgao", "")),
+    )
+
+
+def _build_frases_snapshot(raw: Any) -> _FrasesSnapshot:
+    payload = _coerce_payload(raw)
+    # Arquivo ausente/invalido ou IDs corrigidos: a proxima escrita regrava o base.
+    precisa_compactar = not isinstance(raw, dict)
+    if _normalizar_ids(payload["frases"]):
+        payload["last_updated"] = datetime.now().isoformat()
+        precisa_compactar = True
+
+    frases = tuple(payload["frases"])
+    textos_busca = tuple(_textos_busca(item) for item in frases)
+
+    posicao_por_id: Dict[int, int] = {}
+    for posicao, item in enumerate(frases):
+        posicao_por_id.setdefault(item["id"], posicao)
+
+    return _FrasesSnapshot(
+        payload=payload,
+        precisa_compactar=precisa_compactar,
+        frases=frases,
+        chaves_ordem=tuple(_ordem_listagem(item) for item in frases),
+        posicao_por_id=posicao_por_id,
+        posicoes_por_ativo=_agrupar([(int(item.get("ativo", 1)), i) for i, item in enumerate(frases)]),
+        posicoes_por_orgao=_agrupar([(item["orgao"], i) for i, item in enumerate(frases)]),
+        posicoes_por_sexo=_agrupar([(item["sexo"], i) for i, item in enumerate(frases)]),
+        textos_busca=textos_busca,
+        tokens=build_token_index((i, " ".join(textos)) for i, textos in enumerate(textos_busca)),
+    )
+
+
+def _mover_posicao(grupos: Dict[Any, frozenset], antigas: Set[Any], novas: Set[Any], posicao: int) -> Dict[Any, frozenset]:
+    """Copia de `grupos` com `posicao` tirada das chaves `antigas` e posta nas `novas`."""
+    if antigas == novas:
+        return grupos
+    grupos = dict(grupos)
+    for chave in antigas - novas:
+        restantes = grupos.get(chave, frozenset()) - {posicao}
+        if restantes:
+            grupos[chave] = restantes
+        else:
+            grupos.pop(chave, None)
+    for chave in novas - antigas:
+        grupos[chave] = grupos.get(chave, frozenset()) | {posicao}
+    return grupos
+
+
+def _aplicar_frase(snapshot: _FrasesSnapshot, frase: Dict[str, Any], meta: Dict[str, Any]) -> _FrasesSnapshot:
+    """Snapshot com `frase` inserida/substituida, reindexando so o que ela toca.
+
+    Mesmo esquema de frases_service: as posicoes seguem a ordem do arquivo,
+    entao a frase nova entra no fim e nenhuma outra muda de posicao.
+    """
+    posicao = snapshot.posicao_por_id.get(frase["id"])
+    frases = list(snapshot.frases)
+    textos_busca = list(snapshot.textos_busca)
+    chaves_ordem = list(snapshot.chaves_ordem)
+    antiga: Optional[Dict[str, Any]] = None
+    if posicao is None:
+        posicao = len(frases)
+        frases.append(frase)
+        textos_busca.append(_textos_busca(frase))
+        chaves_ordem.append(_ordem_listagem(frase))
+    else:
+        antiga = frases[posicao]
+        frases[posicao] = frase
+        textos_busca[posicao] = _textos_busca(frase)
+        chaves_ordem[posicao] = _ordem_listagem(frase)
+
+    def chaves_de(extrair) -> Tuple[Set[Any], Set[Any]]:
+        return ({extrair(antiga)} if antiga is not None else set()), {extrair(frase)}
+
+    return _FrasesSnapshot(
+        payload={**snapshot.payload, **meta, "frases": list(frases)},
+        precisa_compactar=False,
+        frases=tuple(frases),
+        chaves_ordem=tuple(chaves_ordem),
+        posicao_por_id={**snapshot.posicao_por_id, frase["id"]: posicao},
+        posicoes_por_ativo=_mover_posicao(
+            snapshot.posicoes_por_ativo, *chaves_de(lambda item: int(item.get("ativo", 1))), posicao
+        ),
+        posicoes_por_orgao=_mover_posicao(snapshot.posicoes_por_orgao, *chaves_de(lambda item: item["orgao"]), posicao),
+        posicoes_por_sexo=_mover_posicao(snapshot.posicoes_por_sexo, *chaves_de(lambda item: item["sexo"]), posicao),
+        textos_busca=tuple(textos_busca),
+        tokens=_mover_posicao(
+            snapshot.tokens,
+            set(tokenizar(" ".join(snapshot.textos_busca[posicao]))) if antiga is not None else set(),
+            set(tokenizar(" ".join(textos_busca[posicao]))),
+            posicao,
+        ),
+    )
+
+
+_FRASES_STORE = JournaledJsonStore(FRASES_FILE, "frases")
+_FRASES_CACHE: JsonSnapshotCache[_FrasesSnapshot] = JsonSnapshotCache(_FRASES_STORE, _build_frases_snapshot)
+
+
+def _gravar_frase(snapshot: _FrasesSnapshot, frase: Dict[str, Any]) -> None:
+    """Persiste uma frase alterada; exige `_FRASES_STORE.lock` adquirido.
+
+    So a frase alterada e reindexada em memoria; o snapshot e reconstruido
+    do zero apenas na leitura do disco apos a compactacao.
+    """
+    meta = {"last_updated": frase["updated_at"]}
+    novo = _aplicar_frase(snapshot, frase, meta)
+    _FRASES_STORE.commit(novo.payload, [frase], meta, force_compact=snapshot.precisa_compactar)
+    _FRASES_CACHE.install(novo, _FRASES_STORE.stamp())
+
+
+def compactar_frases() -> None:
+    """Incorpora o journal ao arquivo base (chamada no startup/shutdown da API)."""
+    with _FRASES_STORE.lock:
+        snapshot = _FRASES_CACHE.get(force=True)
+        if _FRASES_STORE.has_journal() or (snapshot.precisa_compactar and FRASES_FILE.exists()):
+            _FRASES_STORE.compact(snapshot.payload)
+            _FRASES_CACHE.invalidate()
+
+
 def listar_frases(
     orgao: Optional[str] = None,
     sexo: Optional[str] = None,
@@ -128,61 +270,51 @@ def listar_frases(
     skip: int = 0,
     limit: int = 200,
 ) -> Dict[str, Any]:
-    payload = _load_payload()
-    frases = payload.get("frases", [])
+    snapshot = _FRASES_CACHE.get()
+    posicoes: Optional[Set[int]] = None
 
-    if _normalizar_ids(frases):
-        payload["last_updated"] = datetime.now().isoformat()
-        _save_payload(payload)
+    def restringir(candidatas: Set[int]) -> Set[int]:
+        return set(candidatas) if posicoes is None else posicoes & candidatas
 
     if ativo is not None:
-        frases = [item for item in frases if int(item.get("ativo", 1)) == int(ativo)]
+        posicoes = restringir(snapshot.posicoes_por_ativo.get(int(ativo), frozenset()))
 
     orgao_norm = _normalize_orgao(orgao)
     if orgao_norm:
-        frases = [item for item in frases if _normalize_orgao(item.get("orgao")) == orgao_norm]
+        posicoes = restringir(snapshot.posicoes_por_orgao.get(orgao_norm, frozenset()))
 
     sexo_norm = _normalize_sexo(sexo) if sexo else ""
     if sexo_norm:
-        frases = [item for item in frases if _normalize_sexo(item.get("sexo")) == sexo_norm]
+        posicoes = restringir(snapshot.posicoes_por_sexo.get(sexo_norm, frozenset()))
 
     if busca:
-        termo = busca.strip().lower()
-        frases = [
-            item
-            for item in frases
-            if termo in str(item.get("titulo", "")).lower()
-            or termo in str(item.get("texto", "")).lower()
-            or termo in str(item.get("orgao", "")).lower()
-        ]
-
-    frases.sort(
-        key=lambda item: (
-            str(item.get("orgao", "")),
-            str(item.get("sexo", "")),
-            str(item.get("titulo", "")).lower(),
-            _to_int(item.get("id")) or 0,
-        )
-    )
-
-    total = len(frases)
-    items = frases[skip : skip + limit]
+        termo = normalizar_texto_busca(busca)
+        candidatas = candidatos_por_termo(snapshot.tokens, termo)
+        if candidatas is not None:
+            posicoes = restringir(candidatas)
+        elif posicoes is None:
+            posicoes = set(range(len(snapshot.frases)))
+        posicoes = {
+            posicao
+            for posicao in posicoes
+            if any(termo in texto for texto in snapshot.textos_busca[posicao])
+        }
+
+    candidatas = posicoes if posicoes is not None else range(len(snapshot.frases))
+    ordenadas = sorted(candidatas, key=snapshot.chaves_ordem.__getitem__)
+    total = len(ordenadas)
+    items = [dict(snapshot.frases[posicao]) for posicao in ordenadas[skip : skip + limit]]
     return {"items": items, "total": total}
 
 
 def obter_frase(frase_id: int) -> Optional[Dict[str, Any]]:
-    payload = _load_payload()
+    snapshot = _FRASES_CACHE.get()
     frase_id = _to_int(frase_id) or frase_id
-    for item in payload.get("frases", []):
-        if _to_int(item.get("id")) == frase_id:
-            return item
-    return None
+    posicao = snapshot.posicao_por_id.get(frase_id)
+    return dict(snapshot.frases[posicao]) if posicao is not None else None
 
 
 def criar_frase(data: Dict[str, Any]) -> Dict[str, Any]:
-    payload = _load_payload()
-    frases = payload.get("frases", [])
-
     orgao = _normalize_orgao(data.get("orgao"))
     if not orgao:
         raise ValueError("Orgao e obrigatorio.")
@@ -195,33 +327,30 @@ def criar_frase(data: Dict[str, Any]) -> Dict[str, Any]:
     sexo = _normalize_sexo(data.get("sexo"))
     agora = datetime.now().isoformat()
 
-    nova_frase = {
-        "id": _next_id(frases),
-        "orgao": orgao,
-        "sexo": sexo,
-        "titulo": titulo,
-        "texto": texto,
-        "ativo": 1,
-        "created_at": agora,
-        "updated_at": agora,
-    }
-
-    frases.append(nova_frase)
-    payload["frases"] = frases
-    payload["last_updated"] = agora
-    _save_payload(payload)
-    return nova_frase
+    with _FRASES_STORE.lock:
+        snapshot = _FRASES_CACHE.get(force=True)
+        nova_frase = {
+            "id": _next_id(list(snapshot.frases)),
+            "orgao": orgao,
+            "sexo": sexo,
+            "titulo": titulo,
+            "texto": texto,
+            "ativo": 1,
+            "created_at": agora,
+            "updated_at": agora,
+        }
+        _gravar_frase(snapshot, nova_frase)
+    return dict(nova_frase)
 
 
 def atualizar_frase(frase_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    payload = _load_payload()
-    frases = payload.get("frases", [])
-    frase_id = _to_int(frase_id) or frase_id
-
-    for index, frase in enumerate(frases):
-        if _to_int(frase.get("id")) != frase_id:
-            continue
+    with _FRASES_STORE.lock:
+        snapshot = _FRASES_CACHE.get(force=True)
+        posicao = snapshot.posicao_por_id.get(_to_int(frase_id) or frase_id)
+        if posicao is None:
+            return None
 
+        frase = dict(snapshot.frases[posicao])
         if "orgao" in data:
             orgao = _normalize_orgao(data.get("orgao"))
             if not orgao:
@@ -244,13 +373,8 @@ def atualizar_frase(frase_id: int, data: Dict[str, Any]) -> Optional[Dict[str, A
             frase["ativo"] = 1 if int(data.get("ativo") or 0) == 1 else 0
 
         frase["updated_at"] = datetime.now().isoformat()
-        frases[index] = frase
-        payload["frases"] = frases
-        payload["last_updated"] = frase["updated_at"]
-        _save_payload(payload)
-        return frase
-
-    return None
+        _gravar_frase(snapshot, frase)
+    return dict(frase)
 
 
 def deletar_frase(frase_id: int) -> bool:
@@ -0,0 +1,233 @@
+"""
+Cache persistente das consultas geo externas (Google Routes, Distance
+Matrix, Geocoding e ViaCEP).
+
+A chave e o sha256 da requisicao normalizada (JSON com chaves ordenadas,
+nunca com a API key), separada por provedor. Respostas valem o TTL do
+provedor; respostas definitivas sem resultado tambem ficam guardadas por
+GEO_CACHE_TTL_FALHA_SECONDS, para que um CEP inexistente ou um endereco sem
+resultado nao custe uma ida ao provedor (ate 8 s) a cada tela. Falhas de
+transporte nao entram no cache. Como mora no banco, o cache vale para
+todos os workers.
+
+Dentro do processo, chamadas simultaneas para a mesma chave sao
+coalescidas: so a primeira vai ao provedor e as demais esperam por ela.
+
+Problema no banco nunca derruba a consulta: o provedor e chamado direto.
+Acertos e erros aparecem em /metrics (fortcordis_geo_cache_consultas).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.metrics import counter
+from app.db.database import SessionLocal
+from app.models.geo_cache import GeoCacheEntrada
+
+PROVEDOR_GOOGLE_ROUTES = "google_routes"
+PROVEDOR_GOOGLE_DISTANCE_MATRIX = "google_distance_matrix"
+PROVEDOR_GOOGLE_GEOCODING = "google_geocoding"
+PROVEDOR_VIACEP = "viacep"
+
+_TTL_POR_PROVEDOR = {
+    PROVEDOR_GOOGLE_ROUTES: "GEO_CACHE_TTL_ROTAS_SECONDS",
+    PROVEDOR_GOOGLE_DISTANCE_MATRIX: "GEO_CACHE_TTL_ROTAS_SECONDS",
+    PROVEDOR_GOOGLE_GEOCODING: "GEO_CACHE_TTL_GEOCODING_SECONDS",
+    PROVEDOR_VIACEP: "GEO_CACHE_TTL_VIACEP_SECONDS",
+}
+# Quem espera uma consulta coalescida desiste apos isso e consulta sozinho.
+ESPERA_COALESCIDA_SECONDS = 30.0
+
+CONSULTAS = counter(
+    "fortcordis_geo_cache_consultas",
+    "Consultas geo externas por resultado do cache (hit, hit_negativo, miss, coalescida, erro_banco).",
+    ("provedor", "resultado"),
+)
+_RESULTADOS = ("hit", "hit_negativo", "miss", "coalescida", "erro_banco")
+
+
+class ConsultaIndisponivelError(Exception):
+    """Falha transitoria do provedor (rede, cota, erro interno).
+
+    Nunca vai para o cache, mesmo quando tambem e `excecao_cacheada`: a
+    proxima consulta tenta o provedor de novo.
+    """
+
+
+@dataclass
+class _EmAndamento:
+    evento: threading.Event = field(default_factory=threading.Event)
+    resultado: Any = None
+    erro: Optional[BaseException] = None
+
+
+_LOCK = threading.Lock()
+_EM_ANDAMENTO: dict[tuple[str, str], _EmAndamento] = {}
+
+
+def chave_requisicao(requisicao: Any) -> tuple[str, str]:
+    """(sha256, JSON normalizado) da requisicao."""
+    texto = json.dumps(requisicao, sort_keys=True, ensure_ascii=True, separators=(",", ":"))
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest(), texto
+
+
+def _ttl_segundos(provedor: str, sucesso: bool) -> int:
+    if not sucesso:
+        return max(0, int(settings.GEO_CACHE_TTL_FALHA_SECONDS))
+    atributo = _TTL_POR_PROVEDOR.get(provedor, "GEO_CACHE_TTL_ROTAS_SECONDS")
+    return max(0, int(getattr(settings, atributo)))
+
+
+def _ler(provedor: str, chave: str, agora: datetime) -> Optional[tuple[bool, Optional[str], Optional[str]]]:
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(GeoCacheEntrada.sucesso, GeoCacheEntrada.resposta, GeoCacheEntrada.erro)
+            .filter(
+                GeoCacheEntrada.provedor == provedor,
+                GeoCacheEntrada.chave == chave,
+                GeoCacheEntrada.expires_at > agora,
+            )
+            .first()
+        )
+        return (bool(row.sucesso), row.resposta, row.erro) if row else None
+    finally:
+        db.close()
+
+
+def _gravar(
+    provedor: str,
+    chave: str,
+    requisicao: str,
+    *,
+    resposta: Optional[str],
+    erro: Optional[str],
+) -> None:
+    sucesso = erro is None
+    ttl = _ttl_segundos(provedor, sucesso)
+    if ttl <= 0:
+        return
+    agora = datetime.utcnow()
+    valores = {
+        "requisicao": requisicao,
+        "resposta": resposta,
+        "sucesso": sucesso,
+        "erro": erro,
+        "created_at": agora,
+        "expires_at": agora + timedelta(seconds=ttl),
+    }
+
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(GeoCacheEntrada)
+            .filter(GeoCacheEntrada.provedor == provedor, GeoCacheEntrada.chave == chave)
+            .first()
+        )
+        if row is None:
+            db.add(GeoCacheEntrada(provedor=provedor, chave=chave, **valores))
+        else:
+            for coluna, valor in valores.items():
+                setattr(row, coluna, valor)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Outro worker gravou a mesma chave ao mesmo tempo; vale a dele.
+            db.rollback()
+    except Exception as exc:
+        db.rollback()
+        print(f"[geo-cache] WARN: falha ao gravar {provedor}: {exc}")
+    finally:
+        db.close()
+
+
+def consultar(
+    provedor: str,
+    requisicao: Any,
+    buscar: Callable[[], Optional[Any]],
+    *,
+    excecao_cacheada: Optional[type[Exception]] = None,
+) -> Optional[Any]:
+    """Resultado de `buscar()` para a requisicao, do cache quando possivel.
+
+    `buscar` devolve algo serializavel em JSON, ou None quando o provedor
+    responde que nao ha resultado (guardado como falha). Falha transitoria
+    (rede, cota, erro do provedor) deve levantar ConsultaIndisponivelError,
+    nunca devolver None. Se levantar `excecao_cacheada`, a mensagem fica guardada e a mesma
+    excecao volta a ser levantada nos acertos seguintes; outras excecoes
+    passam sem cache.
+    """
+    if not settings.GEO_CACHE_ATIVO:
+        return buscar()
+
+    chave, texto = chave_requisicao(requisicao)
+    try:
+        entrada = _ler(provedor, chave, datetime.utcnow())
+    except Exception as exc:
+        print(f"[geo-cache] WARN: falha ao ler {provedor}: {exc}")
+        CONSULTAS.inc(provedor=provedor, resultado="erro_banco")
+        return buscar()
+
+    if entrada is not None:
+        sucesso, resposta, erro = entrada
+        if sucesso:
+            CONSULTAS.inc(provedor=provedor, resultado="hit")
+            return json.loads(resposta) if resposta else None
+        CONSULTAS.inc(provedor=provedor, resultado="hit_negativo")
+        if excecao_cacheada is not None and erro:
+            raise excecao_cacheada(erro)
+        return None
+
+    with _LOCK:
+        andamento = _EM_ANDAMENTO.get((provedor, chave))
+        lider = andamento is None
+        if lider:
+            andamento = _EM_ANDAMENTO[(provedor, chave)] = _EmAndamento()
+
+    if not lider:
+        CONSULTAS.inc(provedor=provedor, resultado="coalescida")
+        if not andamento.evento.wait(ESPERA_COALESCIDA_SECONDS):
+            return buscar()
+        if andamento.erro is not None:
+            raise andamento.erro
+        return andamento.resultado
+
+    CONSULTAS.inc(provedor=provedor, resultado="miss")
+    try:
+        try:
+            resultado = buscar()
+        except Exception as exc:
+            andamento.erro = exc
+            if (
+                excecao_cacheada is not None
+                and isinstance(exc, excecao_cacheada)
+                and not isinstance(exc, ConsultaIndisponivelError)
+            ):
+                _gravar(provedor, chave, texto, resposta=None, erro=str(exc) or exc.__class__.__name__)
+            raise
+        andamento.resultado = resultado
+        if resultado is None:
+            _gravar(provedor, chave, texto, resposta=None, erro="sem_resultado")
+        else:
+            _gravar(provedor, chave, texto, resposta=json.dumps(resultado, ensure_ascii=False), erro=None)
+        return resultado
+    finally:
+        with _LOCK:
+            _EM_ANDAMENTO.pop((provedor, chave), None)
+        andamento.evento.set()
+
+
+def estatisticas(provedor: str) -> dict[str, Any]:
+    """Contadores do processo atual e a taxa de acerto (acertos / consultas)."""
+    contagens = {resultado: int(CONSULTAS.valor(provedor=provedor, resultado=resultado)) for resultado in _RESULTADOS}
+    total = sum(contagens.values())
+    acertos = contagens["hit"] + contagens["hit_negativo"] + contagens["coalescida"]
+    return {**contagens, "total": total, "taxa_acerto": round(acertos / total, 4) if total else None}
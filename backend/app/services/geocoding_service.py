@@ -2,16 +2,31 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+import re
+from dataclasses import asdict, dataclass
 from typing import Optional
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+from app.services import geo_cache
+
+VIACEP_URL = "https://viacep.com.br/ws/{cep}/json/"
+GOOGLE_GEOCODING_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+
 
 class GeocodingError(Exception):
     pass
 
 
+class GeocodingIndisponivelError(GeocodingError, geo_cache.ConsultaIndisponivelError):
+    """Rede, cota ou erro interno do provedor: nao fica no cache negativo."""
+
+
+# Status do Google Geocoding que dizem algo sobre o endereco; os demais
+# (OVER_QUERY_LIMIT, REQUEST_DENIED, UNKNOWN_ERROR...) sao do servico.
+GOOGLE_GEOCODING_STATUS_DEFINITIVOS = {"ZERO_RESULTS", "INVALID_REQUEST"}
+
+
 def normalizar_cep(cep: Optional[str]) -> str:
     digits = "".join(ch for ch in str(cep or "") if ch.isdigit())
     return digits[:8]
@@ -35,11 +50,20 @@ def buscar_cep_viacep(cep: str) -> dict:
     if len(cep_norm) != 8:
         raise GeocodingError("CEP invalido. Informe 8 digitos.")
 
-    url = f"https://viacep.com.br/ws/{cep_norm}/json/"
+    return geo_cache.consultar(
+        geo_cache.PROVEDOR_VIACEP,
+        {"cep": cep_norm},
+        lambda: _buscar_cep_viacep_remoto(cep_norm),
+        excecao_cacheada=GeocodingError,
+    )
+
+
+def _buscar_cep_viacep_remoto(cep_norm: str) -> dict:
+    url = VIACEP_URL.format(cep=cep_norm)
     try:
         data = _http_get_json(url)
     except Exception as exc:
-        raise GeocodingError(f"Falha ao consultar ViaCEP: {exc}") from exc
+        raise GeocodingIndisponivelError(f"Falha ao consultar ViaCEP: {exc}") from exc
 
     if data.get("erro"):
         raise GeocodingError("CEP nao encontrado no ViaCEP.")
@@ -106,6 +130,18 @@ def geocodificar_endereco_google(endereco_completo: str, api_key: str) -> Geocod
     if not str(endereco_completo or "").strip():
         raise GeocodingError("Endereco vazio para geocoding.")
 
+    # Caixa e espacos nao mudam o resultado do Google; o cache ignora os dois.
+    endereco_chave = re.sub(r"\s+", " ", str(endereco_completo).strip().lower())
+    dados = geo_cache.consultar(
+        geo_cache.PROVEDOR_GOOGLE_GEOCODING,
+        {"address": endereco_chave},
+        lambda: asdict(_geocodificar_endereco_google_remoto(endereco_completo, api_key)),
+        excecao_cacheada=GeocodingError,
+    )
+    return GeocodeResult(**dados)
+
+
+def _geocodificar_endereco_google_remoto(endereco_completo: str, api_key: str) -> GeocodeResult:
     params = urlencode(
         {
             "address": endereco_completo,
@@ -114,18 +150,19 @@ def geocodificar_endereco_google(endereco_completo: str, api_key: str) -> Geocod
             "region": "br",
         }
     )
-    url = f"https://maps.googleapis.com/maps/api/geocode/json?{params}"
+    url = f"{GOOGLE_GEOCODING_URL}?{params}"
 
     try:
         data = _http_get_json(url)
     except Exception as exc:
-        raise GeocodingError(f"Falha ao consultar Google Geocoding: {exc}") from exc
+        raise GeocodingIndisponivelError(f"Falha ao consultar Google Geocoding: {exc}") from exc
 
     status = str(data.get("status") or "").strip().upper()
     if status != "OK":
         message = str(data.get("error_message") or "").strip()
         detail = f"{status}: {message}" if message else status or "erro_desconhecido"
-        raise GeocodingError(f"Google Geocoding retornou erro ({detail}).")
+        erro = GeocodingError if status in GOOGLE_GEOCODING_STATUS_DEFINITIVOS else GeocodingIndisponivelError
+        raise erro(f"Google Geocoding retornou erro ({detail}).")
 
     results = data.get("results") or []
     if not isinstance(results, list) or not results:
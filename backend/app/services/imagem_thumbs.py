@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+THUMB_WIDTHS = (160, 320, 640, 1024)
+DEFAULT_THUMB_WIDTH = 320
+DEFAULT_THUMB_FORMAT = "webp"
+PREGENERATED_THUMBS = ((160, "webp"), (320, "webp"))
+
+# formato -> (formato Pillow, media type, extensao)
+THUMB_FORMATS = {
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+}
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="imagem-thumbs")
+_SUBMITTED_HASHES: set[str] = set()
+_SUBMIT_LOCK = Lock()
+
+
+def _fallback_storage_dir() -> str:
+    return os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            "..",
+            "..",
+            "generated",
+            "imagem_thumbs",
+        )
+    )
+
+
+def get_thumb_storage_dir() -> str:
+    preferred = str(settings.UPLOAD_DIR or "").strip()
+    if os.name == "nt" and preferred.startswith("/"):
+        preferred = ""
+    candidate = os.path.join(preferred, "imagem_thumbs") if preferred else ""
+
+    for path in [candidate, _fallback_storage_dir()]:
+        if not path:
+            continue
+        try:
+            os.makedirs(path, exist_ok=True)
+            return path
+        except OSError:
+            continue
+
+    raise RuntimeError("Nao foi possivel criar diretorio para miniaturas de imagens.")
+
+
+def compute_image_hash(content: bytes) -> str:
+    return hashlib.sha256(content or b"").hexdigest()
+
+
+def normalize_thumb_width(width: int | None) -> int:
+    """Arredonda a largura pedida para o tamanho padrao imediatamente acima.
+
+    Limitar as larguras a um conjunto fixo mantem o cache em disco finito.
+    """
+    if not width or width <= 0:
+        return DEFAULT_THUMB_WIDTH
+    for candidate in THUMB_WIDTHS:
+        if width <= candidate:
+            return candidate
+    return THUMB_WIDTHS[-1]
+
+
+def normalize_thumb_format(formato: str | None) -> str:
+    normalized = str(formato or DEFAULT_THUMB_FORMAT).strip().lower()
+    if normalized == "jpg":
+        normalized = "jpeg"
+    if normalized not in THUMB_FORMATS:
+        raise ValueError(f"Formato de miniatura invalido. Use: {', '.join(THUMB_FORMATS)}")
+    return normalized
+
+
+def thumb_media_type(formato: str) -> str:
+    return THUMB_FORMATS[formato][1]
+
+
+def get_thumb_path(content_hash: str, width: int, formato: str) -> str:
+    extension = THUMB_FORMATS[formato][2]
+    return os.path.join(
+        get_thumb_storage_dir(),
+        content_hash[:2],
+        f"{content_hash}_w{width}{extension}",
+    )
+
+
+def find_cached_thumbnail(content_hash: str | None, width: int, formato: str) -> str | None:
+    if not content_hash:
+        return None
+    path = get_thumb_path(content_hash, width, formato)
+    return path if os.path.exists(path) else None
+
+
+def render_thumbnail(content: bytes, width: int, formato: str) -> bytes:
+    pil_format = THUMB_FORMATS[formato][0]
+
+    with Image.open(BytesIO(content)) as source:
+        # Em JPEG o draft decodifica direto numa escala reduzida, sem ler o quadro inteiro.
+        source.draft("RGB", (width, width))
+        image = ImageOps.exif_transpose(source)
+
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+
+        if pil_format == "JPEG" and image.mode in {"RGBA", "LA", "P"}:
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode not in {"RGB", "RGBA", "L"}:
+            image = image.convert("RGB")
+
+        buffer = BytesIO()
+        if pil_format == "WEBP":
+            image.save(buffer, format="WEBP", quality=80, method=4)
+        else:
+            image.save(buffer, format="JPEG", quality=82, optimize=True, progressive=True)
+        return buffer.getvalue()
+
+
+def _write_thumb_file(target_path: str, thumb_bytes: bytes) -> None:
+    target_dir = os.path.dirname(target_path)
+    os.makedirs(target_dir, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix="thumb_", dir=target_dir)
+    try:
+        with os.fdopen(fd, "wb") as file_obj:
+            file_obj.write(thumb_bytes)
+        os.replace(tmp_path, target_path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def ensure_thumbnail(
+    content: bytes,
+    width: int,
+    formato: str,
+    content_hash: str | None = None,
+) -> str:
+    """Retorna o caminho da miniatura em cache, gerando-a se necessario."""
+    content_hash = content_hash or compute_image_hash(content)
+    target_path = get_thumb_path(content_hash, width, formato)
+    if os.path.exists(target_path):
+        return target_path
+
+    _write_thumb_file(target_path, render_thumbnail(content, width, formato))
+    return target_path
+
+
+def _pregenerate_thumbnails(content: bytes, content_hash: str) -> None:
+    try:
+        for width, formato in PREGENERATED_THUMBS:
+            ensure_thumbnail(content, width, formato, content_hash=content_hash)
+    except Exception as exc:
+        print(f"[imagem-thumbs] WARN: falha ao pre-gerar miniaturas de {content_hash[:12]}: {exc}")
+    finally:
+        with _SUBMIT_LOCK:
+            _SUBMITTED_HASHES.discard(content_hash)
+
+
+def submit_thumbnail_pregeneration(content: bytes, content_hash: str | None = None) -> None:
+    if not content:
+        return
+    content_hash = content_hash or compute_image_hash(content)
+
+    with _SUBMIT_LOCK:
+        if content_hash in _SUBMITTED_HASHES:
+            return
+        _SUBMITTED_HASHES.add(content_hash)
+
+    _EXECUTOR.submit(_pregenerate_thumbnails, content, content_hash)
+
+
+def shutdown_imagem_thumbs() -> None:
+    _EXECUTOR.shutdown(wait=False, cancel_futures=True)
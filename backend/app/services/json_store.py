@@ -0,0 +1,412 @@
+"""
+Armazenamento dos arquivos JSON de frases.
+
+Leitura: o conteudo vira um snapshot imutavel e indexado, que so e
+reconstruido quando o mtime/tamanho dos arquivos muda; entre uma
+verificacao e outra (STAT_INTERVAL_SECONDS) as leituras nao tocam o disco.
+
+Escrita: cada edicao acrescenta uma linha NDJSON ao journal
+(`<arquivo>.journal`) com os registros alterados, sob um lock entre
+processos (`<arquivo>.lock`). Quando o journal cresce, ele e compactado no
+arquivo base com escrita atomica (arquivo temporario + os.replace), entao
+leitores nunca veem um arquivo pela metade.
+
+A primeira linha do journal guarda o SHA-256 do arquivo base sobre o qual
+ele foi escrito. Se o base for substituido por fora (deploy, scp, git), o
+journal antigo deixa de ser aplicado.
+"""
+import hashlib
+import json
+import os
+import re
+import stat
+import tempfile
+import time
+import unicodedata
+from pathlib import Path
+from threading import RLock
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+T = TypeVar("T")
+
+STAT_INTERVAL_SECONDS = 1.0
+JOURNAL_MAX_BYTES = 256 * 1024
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalizar_texto_busca(value: Any) -> str:
+    """Minusculas e sem acentos, no mesmo espirito do nome_key de pacientes."""
+    texto = unicodedata.normalize("NFKD", str(value or ""))
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    return texto.lower().strip()
+
+
+def tokenizar(value: Any) -> list[str]:
+    return _TOKEN_RE.findall(normalizar_texto_busca(value))
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        file_stat = path.stat()
+    except OSError:
+        return None
+    return (file_stat.st_mtime_ns, file_stat.st_size)
+
+
+def atomic_write_json(path: Path, data: Any) -> bytes:
+    """Grava `data` em `path` via arquivo temporario + os.replace. Retorna os bytes gravados."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+    try:
+        mode = stat.S_IMODE(path.stat().st_mode)
+    except OSError:
+        mode = 0o644
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as file_obj:
+            file_obj.write(content)
+            file_obj.flush()
+            os.fsync(file_obj.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return content
+
+
+class InterProcessLock:
+    """Lock exclusivo entre processos (flock/msvcrt), reentrante dentro do processo."""
+
+    def __init__(self, lock_path: Path):
+        self.lock_path = lock_path
+        self._thread_lock = RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> "InterProcessLock":
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(fd, fcntl.LOCK_EX)
+                    else:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                except Exception:
+                    os.close(fd)
+                    raise
+            except Exception:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._thread_lock.release()
+
+
+def _id_key(value: Any) -> Any:
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return value
+
+
+def apply_upserts(
+    payload: Dict[str, Any],
+    records: Iterable[Dict[str, Any]],
+    collection_key: str,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Retorna um novo payload com `records` substituidos (por id) ou acrescentados."""
+    items = list(payload.get(collection_key) or [])
+    positions = {_id_key(item.get("id")): index for index, item in enumerate(items) if isinstance(item, dict)}
+    for record in records:
+        key = _id_key(record.get("id"))
+        if key in positions:
+            items[positions[key]] = record
+        else:
+            positions[key] = len(items)
+            items.append(record)
+
+    updated = {**payload, **(meta or {})}
+    updated[collection_key] = items
+    return updated
+
+
+class JsonFileSource:
+    """Fonte simples: um unico arquivo JSON."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def stamp(self) -> Any:
+        return _file_stamp(self.path)
+
+    def read(self) -> Any:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+
+class JournaledJsonStore:
+    """Arquivo JSON base + journal NDJSON de upserts por id."""
+
+    def __init__(self, path: Path, collection_key: str, journal_max_bytes: int = JOURNAL_MAX_BYTES):
+        self.path = path
+        self.collection_key = collection_key
+        self.journal_path = path.with_name(path.name + ".journal")
+        self.lock = InterProcessLock(path.with_name(path.name + ".lock"))
+        self.journal_max_bytes = journal_max_bytes
+        self._base_hash_cache: Tuple[Any, Optional[str]] = (None, None)
+
+    def stamp(self) -> Any:
+        return (_file_stamp(self.path), _file_stamp(self.journal_path))
+
+    def _read_base(self) -> Tuple[Optional[bytes], Any]:
+        try:
+            with open(self.path, "rb") as file_obj:
+                content = file_obj.read()
+        except OSError:
+            return None, None
+        try:
+            return content, json.loads(content.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return content, None
+
+    def _base_hash(self) -> Optional[str]:
+        """SHA-256 do arquivo base, recalculado so quando o stamp dele muda."""
+        base_stamp = _file_stamp(self.path)
+        cached_stamp, cached_hash = self._base_hash_cache
+        if base_stamp is not None and base_stamp == cached_stamp:
+            return cached_hash
+        content, _ = self._read_base()
+        base_hash = hashlib.sha256(content).hexdigest() if content is not None else None
+        self._base_hash_cache = (base_stamp, base_hash)
+        return base_hash
+
+    def _read_journal(self, base_hash: Optional[str]) -> List[Dict[str, Any]]:
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as file:
+                lines = file.read().splitlines()
+        except OSError:
+            return []
+        if not lines:
+            return []
+
+        try:
+            header = json.loads(lines[0])
+        except json.JSONDecodeError:
+            return []
+        if not isinstance(header, dict) or header.get("base_sha256") != base_hash:
+            return []
+
+        entries: List[Dict[str, Any]] = []
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Linha final incompleta de uma escrita interrompida.
+                break
+            if isinstance(entry, dict):
+                entries.append(entry)
+        return entries
+
+    def read(self) -> Any:
+        """Payload do base com o journal aplicado; None se o base nao existir ou for invalido."""
+        base_stamp = _file_stamp(self.path)
+        content, data = self._read_base()
+        base_hash = hashlib.sha256(content).hexdigest() if content is not None else None
+        self._base_hash_cache = (base_stamp, base_hash)
+
+        entries = self._read_journal(base_hash)
+        if not entries or not isinstance(data, dict):
+            return data
+
+        payload = data
+        for entry in entries:
+            payload = apply_upserts(
+                payload,
+                entry.get("upsert") or [],
+                self.collection_key,
+                entry.get("meta"),
+            )
+        return payload
+
+    def _append(self, records: List[Dict[str, Any]], meta: Optional[Dict[str, Any]]) -> None:
+        base_hash = self._base_hash()
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as file:
+                header = json.loads(file.readline() or "null")
+            header_ok = isinstance(header, dict) and header.get("base_sha256") == base_hash
+        except (OSError, json.JSONDecodeError):
+            header_ok = False
+
+        line = json.dumps({"upsert": records, "meta": meta or {}}, ensure_ascii=False)
+        with open(self.journal_path, "a" if header_ok else "w", encoding="utf-8") as file:
+            if not header_ok:
+                file.write(json.dumps({"base_sha256": base_hash}) + "\n")
+            file.write(line + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def compact(self, payload: Dict[str, Any]) -> None:
+        """Grava `payload` inteiro como novo base e descarta o journal."""
+        with self.lock:
+            content = atomic_write_json(self.path, payload)
+            self._base_hash_cache = (_file_stamp(self.path), hashlib.sha256(content).hexdigest())
+            try:
+                os.unlink(self.journal_path)
+            except FileNotFoundError:
+                pass
+
+    def commit(
+        self,
+        payload: Dict[str, Any],
+        records: List[Dict[str, Any]],
+        meta: Optional[Dict[str, Any]] = None,
+        force_compact: bool = False,
+    ) -> None:
+        """Persiste `records`, ja aplicados em `payload` (o estado completo resultante).
+
+        Normalmente so acrescenta uma linha ao journal; compacta quando ele
+        passa de `journal_max_bytes`, quando o base ainda nao existe ou
+        quando `force_compact` e pedido.
+        """
+        with self.lock:
+            journal_stamp = _file_stamp(self.journal_path)
+            journal_size = journal_stamp[1] if journal_stamp else 0
+            if force_compact or journal_size >= self.journal_max_bytes or not self.path.exists():
+                self.compact(payload)
+            else:
+                self._append(records, meta)
+
+    def has_journal(self) -> bool:
+        return self.journal_path.exists()
+
+
+class JsonSnapshotCache(Generic[T]):
+    """Mantem um snapshot imutavel construido a partir de uma fonte JSON.
+
+    `builder` recebe o conteudo ja parseado (ou None se o arquivo nao existir
+    ou estiver invalido) e devolve o snapshot com os indices prontos. O
+    builder nao grava no disco.
+    """
+
+    def __init__(self, source: Union[Path, JsonFileSource, JournaledJsonStore], builder: Callable[[Any], T]):
+        self.source = JsonFileSource(source) if isinstance(source, Path) else source
+        self._builder = builder
+        self._lock = RLock()
+        self._snapshot: Optional[T] = None
+        self._stamp: Any = None
+        self._checked_at = 0.0
+
+    def get(self, force: bool = False) -> T:
+        """Snapshot atual; com `force` o stamp e conferido mesmo dentro do intervalo."""
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and not force and now - self._checked_at < STAT_INTERVAL_SECONDS:
+            return snapshot
+
+        stamp = self.source.stamp()
+        if snapshot is not None and stamp == self._stamp:
+            self._checked_at = now
+            return snapshot
+
+        with self._lock:
+            # Outra thread pode ter recarregado enquanto esperavamos o lock.
+            if self._snapshot is not None and self._stamp == stamp:
+                self._checked_at = now
+                return self._snapshot
+            # O stamp e lido antes do conteudo: se o arquivo mudar durante a
+            # leitura, a proxima verificacao recarrega.
+            self._snapshot = self._builder(self.source.read())
+            self._stamp = stamp
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def install(self, snapshot: T, stamp: Any) -> None:
+        """Publica o snapshot resultante de uma escrita feita por este processo."""
+        with self._lock:
+            self._snapshot = snapshot
+            self._stamp = stamp
+            self._checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+            self._stamp = None
+            self._checked_at = 0.0
+
+
+def build_token_index(documents: Iterable[Tuple[int, str]]) -> dict[str, frozenset]:
+    """Indice invertido token normalizado -> posicoes dos documentos."""
+    index: dict[str, set[int]] = {}
+    for position, texto in documents:
+        for token in tokenizar(texto):
+            index.setdefault(token, set()).add(position)
+    return {token: frozenset(positions) for token, positions in index.items()}
+
+
+def candidatos_por_termo(token_index: dict[str, frozenset], termo_normalizado: str) -> Optional[set[int]]:
+    """Posicoes que podem conter `termo_normalizado` como substring.
+
+    Cada token do termo e comparado com o vocabulario (pequeno) do indice e
+    os conjuntos sao intersectados; o chamador confirma a substring no texto
+    normalizado de cada candidato. Retorna None quando o termo nao tem
+    tokens (sem restricao).
+    """
+    tokens = _TOKEN_RE.findall(termo_normalizado)
+    if not tokens:
+        return None
+
+    # Tokens internos precisam bater inteiros; o primeiro e o ultimo podem ser
+    # sufixo/prefixo de uma palavra maior.
+    resultado: Optional[set[int]] = None
+    for ordem, token in enumerate(tokens):
+        ultimo = ordem == len(tokens) - 1
+        primeiro = ordem == 0
+        posicoes: set[int] = set()
+        for vocab, vocab_posicoes in token_index.items():
+            if primeiro and ultimo:
+                match = token in vocab
+            elif primeiro:
+                match = vocab.endswith(token)
+            elif ultimo:
+                match = vocab.startswith(token)
+            else:
+                match = vocab == token
+            if match:
+                posicoes.update(vocab_posicoes)
+        resultado = posicoes if resultado is None else resultado & posicoes
+        if not resultado:
+            return set()
+    return resultado
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import os
 import tempfile
-from concurrent.futures import ThreadPoolExecutor
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
 from threading import Lock
 from typing import Any
@@ -10,9 +12,15 @@ from typing import Any
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.metrics import FILA_JOBS, PDF_RENDER_SECONDS
 from app.db.database import SessionLocal
 from app.models.laudo_pdf_job import LaudoPdfJob
 from app.models.user import User
+from app.services.atendimento_pdf_service import (
+    DOCUMENTOS_ATENDIMENTO,
+    compute_atendimento_pdf_cache_key,
+    render_atendimento_pdf,
+)
 from app.services.laudo_pdf_service import compute_laudo_pdf_cache_key, render_laudo_pdf
 
 JOB_STATUS_PENDING = "pending"
@@ -20,10 +28,16 @@ JOB_STATUS_PROCESSING = "processing"
 JOB_STATUS_COMPLETED = "completed"
 JOB_STATUS_FAILED = "failed"
 JOB_TTL_DAYS = 14
+# Alem dos laudos, o pipeline gera a receita e a solicitacao de exames do
+# atendimento (documento = "prescricao" | "exames", ver atendimento_pdf_service).
+JOB_DOCUMENTO_LAUDO = "laudo"
 
 _EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="laudo-pdf")
 _SUBMITTED_JOB_IDS: set[int] = set()
+_FUTURES: dict[int, Future] = {}
+_ENQUEUE_LOCK = Lock()
 _SUBMIT_LOCK = Lock()
+FILA_JOBS.set_function(lambda: len(_SUBMITTED_JOB_IDS), fila="laudo_pdf")
 
 
 def _fallback_storage_dir() -> str:
@@ -60,14 +74,23 @@ def _file_exists(job: LaudoPdfJob) -> bool:
     return bool(job.arquivo_caminho and os.path.exists(job.arquivo_caminho))
 
 
+def _documento(job: LaudoPdfJob) -> str:
+    return job.documento or JOB_DOCUMENTO_LAUDO
+
+
 def _build_payload(job: LaudoPdfJob) -> dict[str, Any]:
     download_url = None
     if job.status == JOB_STATUS_COMPLETED and _file_exists(job):
-        download_url = f"/api/v1/laudos/pdf-jobs/{job.id}/download"
+        if _documento(job) == JOB_DOCUMENTO_LAUDO:
+            download_url = f"/api/v1/laudos/pdf-jobs/{job.id}/download"
+        else:
+            download_url = f"/api/v1/atendimentos/pdf-jobs/{job.id}/download"
 
     return {
         "job_id": job.id,
+        "documento": _documento(job),
         "laudo_id": job.laudo_id,
+        "atendimento_id": job.atendimento_id,
         "status": job.status,
         "arquivo_nome": job.arquivo_nome,
         "erro": job.erro,
@@ -89,11 +112,31 @@ def get_cached_laudo_pdf_job(
     cache_key: str,
 ) -> LaudoPdfJob | None:
     jobs = db.query(LaudoPdfJob).filter(
+        LaudoPdfJob.documento == JOB_DOCUMENTO_LAUDO,
         LaudoPdfJob.laudo_id == laudo_id,
         LaudoPdfJob.requested_by_id == requested_by_id,
         LaudoPdfJob.cache_key == cache_key,
     ).order_by(LaudoPdfJob.id.desc()).all()
+    return _pick_cached_job(jobs)
+
 
+def get_cached_atendimento_pdf_job(
+    db: Session,
+    atendimento_id: int,
+    documento: str,
+    cache_key: str,
+) -> LaudoPdfJob | None:
+    # Receita e exames nao dependem da configuracao do usuario: o job de
+    # qualquer solicitante serve.
+    jobs = db.query(LaudoPdfJob).filter(
+        LaudoPdfJob.documento == documento,
+        LaudoPdfJob.atendimento_id == atendimento_id,
+        LaudoPdfJob.cache_key == cache_key,
+    ).order_by(LaudoPdfJob.id.desc()).all()
+    return _pick_cached_job(jobs)
+
+
+def _pick_cached_job(jobs: list[LaudoPdfJob]) -> LaudoPdfJob | None:
     for job in jobs:
         if job.status == JOB_STATUS_COMPLETED and _file_exists(job):
             return job
@@ -105,11 +148,11 @@ def get_cached_laudo_pdf_job(
     return None
 
 
-def _write_pdf_file(job_id: int, cache_key: str, pdf_bytes: bytes) -> str:
+def _write_pdf_file(job_id: int, cache_key: str, pdf_bytes: bytes, prefixo: str = JOB_DOCUMENTO_LAUDO) -> str:
     storage_dir = get_laudo_pdf_storage_dir()
-    target_path = os.path.join(storage_dir, f"laudo_{job_id}_{cache_key[:12]}.pdf")
+    target_path = os.path.join(storage_dir, f"{prefixo}_{job_id}_{cache_key[:12]}.pdf")
 
-    fd, tmp_path = tempfile.mkstemp(suffix=".pdf", prefix=f"laudo_{job_id}_", dir=storage_dir)
+    fd, tmp_path = tempfile.mkstemp(suffix=".pdf", prefix=f"{prefixo}_{job_id}_", dir=storage_dir)
     try:
         with os.fdopen(fd, "wb") as file_obj:
             file_obj.write(pdf_bytes)
@@ -148,12 +191,21 @@ def _process_laudo_pdf_job(job_id: int) -> None:
         job.tentativas = int(job.tentativas or 0) + 1
         db.commit()
 
-        current_user = db.query(User).filter(User.id == job.requested_by_id).first()
-        if not current_user:
-            raise RuntimeError("Usuario solicitante do PDF nao encontrado.")
-
-        pdf = render_laudo_pdf(db, job.laudo_id, current_user)
-        arquivo_caminho = _write_pdf_file(job.id, pdf.cache_key, pdf.content)
+        documento = _documento(job)
+        inicio = time.perf_counter()
+        try:
+            if documento == JOB_DOCUMENTO_LAUDO:
+                current_user = db.query(User).filter(User.id == job.requested_by_id).first()
+                if not current_user:
+                    raise RuntimeError("Usuario solicitante do PDF nao encontrado.")
+                pdf = render_laudo_pdf(db, job.laudo_id, current_user)
+            else:
+                pdf = render_atendimento_pdf(db, job.atendimento_id, documento)
+        except Exception:
+            PDF_RENDER_SECONDS.observe(time.perf_counter() - inicio, resultado="erro")
+            raise
+        PDF_RENDER_SECONDS.observe(time.perf_counter() - inicio, resultado="ok")
+        arquivo_caminho = _write_pdf_file(job.id, pdf.cache_key, pdf.content, prefixo=documento)
 
         job = db.query(LaudoPdfJob).filter(LaudoPdfJob.id == job_id).first()
         if not job:
@@ -173,6 +225,7 @@ def _process_laudo_pdf_job(job_id: int) -> None:
         db.close()
         with _SUBMIT_LOCK:
             _SUBMITTED_JOB_IDS.discard(job_id)
+            _FUTURES.pop(job_id, None)
 
 
 def submit_laudo_pdf_job(job_id: int) -> None:
@@ -180,8 +233,21 @@ def submit_laudo_pdf_job(job_id: int) -> None:
         if job_id in _SUBMITTED_JOB_IDS:
             return
         _SUBMITTED_JOB_IDS.add(job_id)
+        # Registrado sob o lock: o worker so remove depois de pegar o mesmo lock.
+        _FUTURES[job_id] = _EXECUTOR.submit(_process_laudo_pdf_job, job_id)
 
-    _EXECUTOR.submit(_process_laudo_pdf_job, job_id)
+
+def wait_for_pdf_job(job_id: int, timeout: float) -> bool:
+    """Espera o job sair da fila deste processo; False se estourar o timeout."""
+    with _SUBMIT_LOCK:
+        future = _FUTURES.get(job_id)
+    if future is None:
+        return True
+    try:
+        future.result(timeout=timeout)
+    except FutureTimeoutError:
+        return False
+    return True
 
 
 def enqueue_laudo_pdf_job(db: Session, laudo_id: int, requested_by_id: int) -> dict[str, Any]:
@@ -208,11 +274,61 @@ def enqueue_laudo_pdf_job(db: Session, laudo_id: int, requested_by_id: int) -> d
     return serialize_laudo_pdf_job(job)
 
 
+def enqueue_atendimento_pdf_job(
+    db: Session,
+    atendimento_id: int,
+    documento: str,
+    requested_by_id: int,
+    cache_key: str | None = None,
+) -> LaudoPdfJob:
+    """Enfileira receita/exames do atendimento, reaproveitando o job (de qualquer
+    usuario) com o mesmo carimbo de conteudo."""
+    if documento not in DOCUMENTOS_ATENDIMENTO:
+        raise ValueError(f"Documento invalido: {documento}.")
+    cache_key = cache_key or compute_atendimento_pdf_cache_key(db, atendimento_id, documento)
+
+    # Cliques simultaneos na mesma reimpressao devem cair num unico job.
+    with _ENQUEUE_LOCK:
+        existing = get_cached_atendimento_pdf_job(db, atendimento_id, documento, cache_key)
+        if not existing:
+            job = LaudoPdfJob(
+                documento=documento,
+                atendimento_id=atendimento_id,
+                requested_by_id=requested_by_id,
+                status=JOB_STATUS_PENDING,
+                cache_key=cache_key,
+                erro=None,
+                tentativas=0,
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+    if existing:
+        if existing.status == JOB_STATUS_PENDING:
+            submit_laudo_pdf_job(existing.id)
+        return existing
+
+    submit_laudo_pdf_job(job.id)
+    return job
+
+
 def get_laudo_pdf_job_for_user(db: Session, job_id: int, user_id: int) -> LaudoPdfJob | None:
     job = db.query(LaudoPdfJob).filter(
         LaudoPdfJob.id == job_id,
         LaudoPdfJob.requested_by_id == user_id,
     ).first()
+    return _check_job_file(db, job)
+
+
+def get_atendimento_pdf_job(db: Session, job_id: int) -> LaudoPdfJob | None:
+    job = db.query(LaudoPdfJob).filter(
+        LaudoPdfJob.id == job_id,
+        LaudoPdfJob.documento.in_(DOCUMENTOS_ATENDIMENTO),
+    ).first()
+    return _check_job_file(db, job)
+
+
+def _check_job_file(db: Session, job: LaudoPdfJob | None) -> LaudoPdfJob | None:
     if not job:
         return None
 
@@ -110,7 +110,7 @@ def render_laudo_pdf(db: Session, laudo_id: int, current_user: User) -> Generate
     from app.models.configuracao import Configuracao, ConfiguracaoUsuario
     from app.models.imagem_laudo import ImagemLaudo
     from app.models.paciente import Paciente
-    from app.models.referencia_eco import ReferenciaEco
+    from app.services.referencias_eco_service import buscar_referencia
     from app.models.tutor import Tutor
     from app.utils.pdf_laudo import (
         gerar_pdf_laudo_eco,
@@ -200,7 +200,7 @@ def render_laudo_pdf(db: Session, laudo_id: int, current_user: User) -> Generate
             "data_exame": data_exame_str,
         }
         ecocardiograma_cabecalho = (
-            laudos_endpoint._extrair_ecocardiograma_cabecalho_de_anexos(laudo.anexos) or {}
+            laudos_endpoint._extrair_ecocardiograma_cabecalho_de_anexos(laudo.anexos_dados) or {}
         )
         dados_paciente["ritmo"] = str(ecocardiograma_cabecalho.get("ritmo") or "").strip()
         dados_paciente["estado"] = str(ecocardiograma_cabecalho.get("estado") or "").strip()
@@ -232,7 +232,7 @@ def render_laudo_pdf(db: Session, laudo_id: int, current_user: User) -> Generate
         tipo_laudo = (laudo.tipo or "").lower()
 
         if tipo_laudo == "pressao_arterial":
-            pressao_arterial = laudos_endpoint._extrair_pressao_arterial_de_anexos(laudo.anexos) or {}
+            pressao_arterial = laudos_endpoint._normalizar_pressao_arterial(laudo.pressao_arterial_json) or {}
             classificacao = laudo.diagnostico or laudos_endpoint._classificar_pressao_media(
                 pressao_arterial.get("pas_media")
             )
@@ -257,7 +257,7 @@ def render_laudo_pdf(db: Session, laudo_id: int, current_user: User) -> Generate
             )
             filename = f"{filename_base}__PA.pdf"
         elif tipo_laudo == "ultrassonografia_abdominal":
-            ultrassonografia_abdominal = laudos_endpoint._extrair_ultrassonografia_abdominal_de_anexos(laudo.anexos)
+            ultrassonografia_abdominal = laudos_endpoint._extrair_ultrassonografia_abdominal_de_anexos(laudo.anexos_dados)
             if not ultrassonografia_abdominal:
                 ultrassonografia_abdominal = laudos_endpoint._extrair_ultrassonografia_abdominal_do_descricao(
                     laudo.descricao
@@ -290,48 +290,14 @@ def render_laudo_pdf(db: Session, laudo_id: int, current_user: User) -> Generate
             )
             filename = f"{filename_base}__US_abdominal.pdf"
         else:
-            medidas: dict[str, Any] = {}
-            qualitativa: dict[str, Any] = {}
-            pressao_arterial = laudos_endpoint._extrair_pressao_arterial_de_anexos(laudo.anexos)
-            if laudo.descricao:
-                descricao = laudo.descricao
-                for match in re.finditer(r"-\s*([\w_]+):\s*([\d.,]+)", descricao):
-                    chave = match.group(1)
-                    valor = match.group(2).replace(",", ".")
-                    medidas[chave] = valor
-
-                qualitativa_match = re.search(
-                    r"Avalia(?:Ã§|c)Ã£o Qualitativa[\s\n]*(-.*?)(?=\n##|\Z)",
-                    descricao,
-                    re.DOTALL,
-                )
-                if not qualitativa_match:
-                    qualitativa_match = re.search(
-                        r"Avaliacao Qualitativa[\s\n]*(-.*?)(?=\n##|\Z)",
-                        descricao,
-                        re.DOTALL,
-                    )
-                if qualitativa_match:
-                    qualitativa_texto = qualitativa_match.group(1)
-                    for match in re.finditer(r"-\s*(\w+):?\s*(.+?)(?=\n-|\Z)", qualitativa_texto, re.DOTALL):
-                        campo = match.group(1).lower().strip()
-                        valor = match.group(2).strip()
-                        if campo in ["valvas", "camaras", "funcao", "pericardio", "vasos", "ad_vd"]:
-                            qualitativa[campo] = valor
+            medidas = laudo.medidas
+            qualitativa = laudo.qualitativa
+            pressao_arterial = laudos_endpoint._normalizar_pressao_arterial(laudo.pressao_arterial_json)
 
             referencia_eco = None
             if paciente and paciente.especie and paciente.peso_kg is not None:
                 try:
-                    ref = db.query(ReferenciaEco).filter(
-                        ReferenciaEco.especie.ilike(paciente.especie)
-                    ).order_by(
-                        func.abs(ReferenciaEco.peso_kg - float(paciente.peso_kg))
-                    ).first()
-                    if ref:
-                        referencia_eco = {
-                            col.name: getattr(ref, col.name)
-                            for col in ref.__table__.columns
-                        }
+                    referencia_eco = buscar_referencia(db, paciente.especie, float(paciente.peso_kg))
                 except Exception as exc:
                     db.rollback()
                     print(f"[WARN] ReferenciaEco indisponivel para PDF: {exc}")
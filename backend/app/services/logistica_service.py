@@ -3,17 +3,21 @@ from __future__ import annotations
 
 import json
 import math
+from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
-from typing import Iterable, Optional
+from typing import Iterable, Optional, Sequence
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+import numpy as np
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.clinica import Clinica
 from app.models.clinica_deslocamento import ClinicaDeslocamento
+from app.services import geo_cache
 
 PERFIS_VALIDOS = {"comercial", "plantao"}
 VELOCIDADE_MEDIA_KMH = {
@@ -215,8 +219,8 @@ def _consultar_google_routes_api_raw(
 
     try:
         data = _http_post_json(GOOGLE_ROUTES_API_URL, body, headers=headers)
-    except Exception:
-        return None
+    except Exception as exc:
+        raise geo_cache.ConsultaIndisponivelError(f"Falha ao consultar Google Routes: {exc}") from exc
 
     routes = data.get("routes") or []
     if not isinstance(routes, list) or not routes:
@@ -279,12 +283,14 @@ def _consultar_google_distance_matrix_raw(
 
     try:
         data = _http_get_json(url)
-    except Exception:
-        return None
+    except Exception as exc:
+        raise geo_cache.ConsultaIndisponivelError(f"Falha ao consultar Google Distance Matrix: {exc}") from exc
 
+    # Status da requisicao diferente de OK e cota, chave ou erro do Google; "sem
+    # rota" vem no status do elemento (NOT_FOUND/ZERO_RESULTS) e pode ir ao cache.
     status = str(data.get("status") or "").strip().upper()
     if status != "OK":
-        return None
+        raise geo_cache.ConsultaIndisponivelError(f"Google Distance Matrix retornou {status or 'erro_desconhecido'}.")
 
     rows = data.get("rows") or []
     if not isinstance(rows, list) or not rows:
@@ -333,6 +339,33 @@ def _consultar_google_distance_matrix_raw(
     }
 
 
+def _consultar_google_routes_api(origem_waypoint: dict, destino_waypoint: dict) -> Optional[dict]:
+    if not str(settings.GOOGLE_MAPS_API_KEY or "").strip():
+        return None
+    try:
+        return geo_cache.consultar(
+            geo_cache.PROVEDOR_GOOGLE_ROUTES,
+            {"origin": origem_waypoint, "destination": destino_waypoint},
+            lambda: _consultar_google_routes_api_raw(origem_waypoint, destino_waypoint),
+        )
+    except geo_cache.ConsultaIndisponivelError:
+        # Sem cache negativo: a proxima estimativa tenta o Google de novo.
+        return None
+
+
+def _consultar_google_distance_matrix(origem_ref: str, destino_ref: str) -> Optional[dict]:
+    if not str(settings.GOOGLE_MAPS_API_KEY or "").strip() or not origem_ref or not destino_ref:
+        return None
+    try:
+        return geo_cache.consultar(
+            geo_cache.PROVEDOR_GOOGLE_DISTANCE_MATRIX,
+            {"origins": origem_ref, "destinations": destino_ref},
+            lambda: _consultar_google_distance_matrix_raw(origem_ref, destino_ref),
+        )
+    except geo_cache.ConsultaIndisponivelError:
+        return None
+
+
 def estimar_deslocamento(
     origem: Clinica,
     destino: Clinica,
@@ -371,9 +404,9 @@ def estimar_deslocamento(
             google_result = cache.get(cache_key)
         else:
             if origem_waypoint and destino_waypoint:
-                google_result = _consultar_google_routes_api_raw(origem_waypoint, destino_waypoint)
+                google_result = _consultar_google_routes_api(origem_waypoint, destino_waypoint)
             if google_result is None and origem_ref and destino_ref:
-                google_result = _consultar_google_distance_matrix_raw(origem_ref, destino_ref)
+                google_result = _consultar_google_distance_matrix(origem_ref, destino_ref)
             if cache is not None:
                 cache[cache_key] = google_result
 
@@ -416,6 +449,152 @@ def estimar_deslocamento(
     return round(max(0.0, distancia_km), 2), duracao_min, fonte
 
 
+FONTES_HEURISTICAS = (
+    "heuristica_haversine",
+    "heuristica_mesma_cidade",
+    "heuristica_regional",
+    "mesma_clinica",
+)
+
+
+@dataclass
+class MatrizHeuristica:
+    """Heuristic travel matrix for a set of clinics, as NumPy arrays.
+
+    Row = origin, column = destination, in the order of `ids`. Cells follow
+    the fallback rules of estimar_deslocamento exactly.
+    """
+
+    ids: np.ndarray
+    distancia_km: np.ndarray
+    fonte: np.ndarray
+    duracao_min: dict[str, np.ndarray]
+
+    def __post_init__(self) -> None:
+        self._posicoes = {int(cid): indice for indice, cid in enumerate(self.ids.tolist())}
+
+    def indice(self, clinica_id: int) -> Optional[int]:
+        return self._posicoes.get(int(clinica_id))
+
+    def estimativa(self, origem: int, destino: int, perfil: str) -> tuple[float, int, str]:
+        """Same tuple as estimar_deslocamento, for row/column positions."""
+        return (
+            round(max(0.0, float(self.distancia_km[origem, destino])), 2),
+            int(self.duracao_min[normalizar_perfil(perfil)][origem, destino]),
+            FONTES_HEURISTICAS[int(self.fonte[origem, destino])],
+        )
+
+
+def montar_matriz_heuristica(
+    clinicas: Sequence[Clinica],
+    perfis: Optional[Iterable[str]] = None,
+) -> MatrizHeuristica:
+    """Build the full haversine/city fallback matrix in one broadcast.
+
+    Replaces n*n calls to the per-pair heuristic of estimar_deslocamento.
+    """
+    perfis_norm = normalizar_perfis(perfis)
+    ids = np.array([int(c.id) for c in clinicas], dtype=np.int64)
+
+    def _coordenada(valor) -> float:
+        numero = _safe_float(valor)
+        return np.nan if numero is None else numero
+
+    lat = np.radians(np.array([_coordenada(c.latitude) for c in clinicas], dtype=float))
+    lon = np.radians(np.array([_coordenada(c.longitude) for c in clinicas], dtype=float))
+    tem_coordenadas = ~(np.isnan(lat) | np.isnan(lon))
+
+    # Mesma formula de _haversine_km: linha = origem (1), coluna = destino (2).
+    with np.errstate(invalid="ignore"):
+        a = (
+            np.sin((lat[None, :] - lat[:, None]) / 2) ** 2
+            + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lon[None, :] - lon[:, None]) / 2) ** 2
+        )
+        a = np.clip(a, 0.0, 1.0)
+        haversine = 6371.0 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    cidade = np.array([_cidade_estado(c.cidade) for c in clinicas], dtype=object)
+    estado = np.array([_cidade_estado(c.estado) for c in clinicas], dtype=object)
+    cidade_informada = cidade != ""
+    estado_informado = estado != ""
+    mesma_cidade = (
+        cidade_informada[:, None]
+        & cidade_informada[None, :]
+        & (cidade[:, None] == cidade[None, :])
+        & ~(estado_informado[:, None] & estado_informado[None, :] & (estado[:, None] != estado[None, :]))
+    )
+
+    ambos_com_coordenadas = tem_coordenadas[:, None] & tem_coordenadas[None, :]
+    distancia = np.where(
+        ambos_com_coordenadas,
+        haversine,
+        np.where(mesma_cidade, DEFAULT_KM_MESMA_CIDADE, DEFAULT_KM_OUTRA_CIDADE),
+    )
+    fonte = np.where(ambos_com_coordenadas, 0, np.where(mesma_cidade, 1, 2)).astype(np.int8)
+    mesma_clinica = ids[:, None] == ids[None, :]
+    distancia = np.where(mesma_clinica, 0.0, distancia)
+    fonte = np.where(mesma_clinica, 3, fonte).astype(np.int8)
+
+    duracoes = {}
+    for perfil in perfis_norm:
+        velocidade = VELOCIDADE_MEDIA_KMH.get(perfil, VELOCIDADE_MEDIA_KMH["comercial"])
+        buffer_min = BUFFER_MINUTOS.get(perfil, BUFFER_MINUTOS["comercial"])
+        duracao = np.maximum(
+            MIN_DURACAO_MINUTOS,
+            np.ceil((distancia / max(1.0, velocidade)) * 60.0 + buffer_min),
+        ).astype(np.int64)
+        duracoes[perfil] = np.where(mesma_clinica, 0, duracao)
+
+    return MatrizHeuristica(ids=ids, distancia_km=distancia, fonte=fonte, duracao_min=duracoes)
+
+
+def clinicas_proximas(
+    matriz: MatrizHeuristica,
+    clinica_id: int,
+    *,
+    perfil: str = "comercial",
+    k: Optional[int] = None,
+    max_minutos: Optional[int] = None,
+) -> list[dict]:
+    """Nearest clinics to `clinica_id` (closest first), optionally capped by k and travel minutes."""
+    origem = matriz.indice(clinica_id)
+    if origem is None:
+        return []
+    perfil_norm = normalizar_perfil(perfil)
+    duracoes = matriz.duracao_min[perfil_norm][origem]
+    distancias = matriz.distancia_km[origem]
+
+    candidatos = np.arange(len(matriz.ids)) != origem
+    if max_minutos is not None:
+        candidatos &= duracoes <= int(max_minutos)
+    indices = np.flatnonzero(candidatos)
+    if k is not None and 0 < int(k) < len(indices):
+        indices = indices[np.argpartition(distancias[indices], int(k) - 1)[: int(k)]]
+    indices = indices[np.lexsort((matriz.ids[indices], distancias[indices]))]
+
+    resultado = []
+    for destino in indices.tolist():
+        distancia_km, duracao_min, fonte = matriz.estimativa(origem, destino, perfil_norm)
+        resultado.append(
+            {
+                "clinica_id": int(matriz.ids[destino]),
+                "distancia_km": distancia_km,
+                "duracao_min": duracao_min,
+                "fonte": fonte,
+            }
+        )
+    return resultado
+
+
+def _google_configurado() -> bool:
+    return bool(str(settings.GOOGLE_MAPS_API_KEY or "").strip())
+
+
+def _carregar_linhas_matriz(db: Session, *filtros) -> dict[tuple[int, int, str], ClinicaDeslocamento]:
+    rows = db.query(ClinicaDeslocamento).filter(*filtros).all()
+    return {(int(r.origem_clinica_id), int(r.destino_clinica_id), str(r.perfil)): r for r in rows}
+
+
 def upsert_deslocamento(
     db: Session,
     *,
@@ -426,21 +605,29 @@ def upsert_deslocamento(
     duracao_min: int,
     fonte: str,
     force_override: bool = False,
+    linhas_existentes: Optional[dict] = None,
 ) -> tuple[ClinicaDeslocamento, bool, bool]:
     """Upsert matrix record.
 
+    `linhas_existentes` (from _carregar_linhas_matriz) replaces the lookup
+    query in bulk recalculations; new rows are added to it.
+
     Returns: (row, changed, skipped_manual_override).
     """
     perfil_norm = normalizar_perfil(perfil)
-    row = (
-        db.query(ClinicaDeslocamento)
-        .filter(
-            ClinicaDeslocamento.origem_clinica_id == origem_clinica_id,
-            ClinicaDeslocamento.destino_clinica_id == destino_clinica_id,
-            ClinicaDeslocamento.perfil == perfil_norm,
+    chave = (int(origem_clinica_id), int(destino_clinica_id), perfil_norm)
+    if linhas_existentes is not None:
+        row = linhas_existentes.get(chave)
+    else:
+        row = (
+            db.query(ClinicaDeslocamento)
+            .filter(
+                ClinicaDeslocamento.origem_clinica_id == origem_clinica_id,
+                ClinicaDeslocamento.destino_clinica_id == destino_clinica_id,
+                ClinicaDeslocamento.perfil == perfil_norm,
+            )
+            .first()
         )
-        .first()
-    )
 
     if row and row.manual_override and not force_override:
         return row, False, True
@@ -462,6 +649,8 @@ def upsert_deslocamento(
             updated_at=datetime.utcnow(),
         )
         db.add(row)
+        if linhas_existentes is not None:
+            linhas_existentes[chave] = row
         return row, True, False
 
     if row.distancia_km != distancia_decimal:
@@ -503,6 +692,16 @@ def recalcular_matriz_para_clinica(
     updated = 0
     skipped_manual = 0
     google_cache: dict = {}
+    heuristica = None if _google_configurado() else montar_matriz_heuristica(clinicas, perfis_norm)
+    principal = int(origem_principal.id)
+    linhas = _carregar_linhas_matriz(
+        db,
+        ClinicaDeslocamento.perfil.in_(perfis_norm),
+        or_(
+            ClinicaDeslocamento.origem_clinica_id == principal,
+            ClinicaDeslocamento.destino_clinica_id == principal,
+        ),
+    )
 
     for destino in clinicas:
         pares = [(origem_principal, destino)]
@@ -511,12 +710,19 @@ def recalcular_matriz_para_clinica(
 
         for origem, destino_real in pares:
             for perfil in perfis_norm:
-                distancia_km, duracao_min, fonte = estimar_deslocamento(
-                    origem,
-                    destino_real,
-                    perfil=perfil,
-                    google_cache=google_cache,
-                )
+                if heuristica is not None:
+                    distancia_km, duracao_min, fonte = heuristica.estimativa(
+                        heuristica.indice(origem.id),
+                        heuristica.indice(destino_real.id),
+                        perfil,
+                    )
+                else:
+                    distancia_km, duracao_min, fonte = estimar_deslocamento(
+                        origem,
+                        destino_real,
+                        perfil=perfil,
+                        google_cache=google_cache,
+                    )
                 _row, changed, skipped = upsert_deslocamento(
                     db,
                     origem_clinica_id=int(origem.id),
@@ -526,6 +732,7 @@ def recalcular_matriz_para_clinica(
                     duracao_min=duracao_min,
                     fonte=fonte,
                     force_override=force_override,
+                    linhas_existentes=linhas,
                 )
                 if changed:
                     updated += 1
@@ -557,16 +764,29 @@ def recalcular_matriz_completa(
     updated = 0
     skipped_manual = 0
     google_cache: dict = {}
+    # Sem Google a matriz inteira sai de um broadcast; as linhas existentes
+    # vem numa consulta so, em vez de uma por celula.
+    heuristica = None if _google_configurado() else montar_matriz_heuristica(clinicas, perfis_norm)
+    ids = [int(c.id) for c in clinicas]
+    linhas = _carregar_linhas_matriz(
+        db,
+        ClinicaDeslocamento.perfil.in_(perfis_norm),
+        ClinicaDeslocamento.origem_clinica_id.in_(ids),
+        ClinicaDeslocamento.destino_clinica_id.in_(ids),
+    ) if ids else {}
 
-    for origem in clinicas:
-        for destino in clinicas:
+    for i, origem in enumerate(clinicas):
+        for j, destino in enumerate(clinicas):
             for perfil in perfis_norm:
-                distancia_km, duracao_min, fonte = estimar_deslocamento(
-                    origem,
-                    destino,
-                    perfil=perfil,
-                    google_cache=google_cache,
-                )
+                if heuristica is not None:
+                    distancia_km, duracao_min, fonte = heuristica.estimativa(i, j, perfil)
+                else:
+                    distancia_km, duracao_min, fonte = estimar_deslocamento(
+                        origem,
+                        destino,
+                        perfil=perfil,
+                        google_cache=google_cache,
+                    )
                 _row, changed, skipped = upsert_deslocamento(
                     db,
                     origem_clinica_id=int(origem.id),
@@ -576,6 +796,7 @@ def recalcular_matriz_completa(
                     duracao_min=duracao_min,
                     fonte=fonte,
                     force_override=force_override,
+                    linhas_existentes=linhas,
                 )
                 if changed:
                     updated += 1
@@ -682,6 +903,71 @@ def obter_duracao_deslocamento(
     return max(0, int(duracao_min or 0)), fonte
 
 
+def carregar_matriz_duracoes(
+    db: Session,
+    clinica_ids: Iterable[int],
+    *,
+    perfil: str = "comercial",
+    permitir_estimativa_fallback: bool = True,
+) -> dict[tuple[int, int], int]:
+    """Travel minutes for every ordered pair of clinics, loaded in one pass.
+
+    Same rules as obter_duracao_deslocamento, but one matrix query for all
+    pairs instead of one per pair; missing pairs are estimated in memory.
+    """
+    ids = sorted({int(cid) for cid in clinica_ids if cid and int(cid) > 0})
+    if len(ids) < 2:
+        return {}
+
+    perfil_norm = normalizar_perfil(perfil)
+    rows = (
+        db.query(
+            ClinicaDeslocamento.origem_clinica_id,
+            ClinicaDeslocamento.destino_clinica_id,
+            ClinicaDeslocamento.duracao_min,
+        )
+        .filter(
+            ClinicaDeslocamento.perfil == perfil_norm,
+            ClinicaDeslocamento.origem_clinica_id.in_(ids),
+            ClinicaDeslocamento.destino_clinica_id.in_(ids),
+        )
+        .all()
+    )
+    matriz = {
+        (int(origem), int(destino)): max(0, int(duracao))
+        for origem, destino, duracao in rows
+        if duracao is not None
+    }
+
+    faltantes = [(o, d) for o in ids for d in ids if o != d and (o, d) not in matriz]
+    if faltantes and permitir_estimativa_fallback:
+        clinicas = {int(c.id): c for c in db.query(Clinica).filter(Clinica.id.in_(ids)).all()}
+        heuristica = None
+        if not _google_configurado():
+            heuristica = montar_matriz_heuristica(list(clinicas.values()), [perfil_norm])
+        google_cache: dict = {}
+        for origem_id, destino_id in faltantes:
+            origem = clinicas.get(origem_id)
+            destino = clinicas.get(destino_id)
+            if not origem or not destino:
+                continue
+            if heuristica is not None:
+                _distancia_km, duracao_min, _fonte = heuristica.estimativa(
+                    heuristica.indice(origem_id),
+                    heuristica.indice(destino_id),
+                    perfil_norm,
+                )
+            else:
+                _distancia_km, duracao_min, _fonte = estimar_deslocamento(
+                    origem,
+                    destino,
+                    perfil=perfil_norm,
+                    google_cache=google_cache,
+                )
+            matriz[(origem_id, destino_id)] = max(0, int(duracao_min or 0))
+    return matriz
+
+
 def serialize_deslocamento(row: ClinicaDeslocamento) -> dict:
     return {
         "id": row.id,
@@ -0,0 +1,365 @@
+"""
+Tabelas de referencia ecocardiografica em memoria.
+
+Cada especie vira uma tabela NumPy com os pesos ordenados e as matrizes de
+minimos/maximos de todos os parametros (NaN onde a tabela nao tem valor).
+A busca por peso usa `searchsorted` (mais proximo ou interpolacao linear
+entre os pesos vizinhos) e a avaliacao de medidas e feita de uma vez para
+um ou varios pacientes.
+
+As tabelas sao reconstruidas apos escritas em /referencias-eco (importacao
+e CRUD chamam `invalidar_cache_referencias`) e, como rede de seguranca para
+outros workers/scripts, depois de CACHE_TTL_SECONDS.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.referencia_eco import ReferenciaEco
+from app.utils.pdf_laudo import MAPEAMENTO_REFERENCIA_ECO
+
+CACHE_TTL_SECONDS = 300.0
+
+# Prefixos dos parametros, na ordem das colunas do modelo (lvid_d, lvid_s, ...).
+PARAMETROS: Tuple[str, ...] = tuple(
+    column.name[: -len("_min")]
+    for column in ReferenciaEco.__table__.columns
+    if column.name.endswith("_min")
+)
+_INDICE_PARAMETRO = {prefixo: indice for indice, prefixo in enumerate(PARAMETROS)}
+
+STATUS_ABAIXO = "Abaixo"
+STATUS_NORMAL = "Normal"
+STATUS_ACIMA = "Acima"
+_STATUS_POR_CODIGO = {-1: STATUS_ABAIXO, 0: STATUS_NORMAL, 1: STATUS_ACIMA}
+
+
+def normalizar_especie(especie: Optional[str]) -> Optional[str]:
+    """Normaliza texto de especie para Canina/Felina."""
+    if not especie:
+        return None
+
+    valor = especie.strip().lower()
+    if valor.startswith("fel") or "gato" in valor or "cat" in valor:
+        return "Felina"
+    if valor.startswith("can") or "cao" in valor or "cão" in valor or "dog" in valor:
+        return "Canina"
+
+    return especie.strip()
+
+
+def _especie_da_linha(especie: Optional[str]) -> Optional[str]:
+    """Especie gravada na tabela (legado: canino/caninos/felino/felinos)."""
+    valor = (especie or "").strip().lower()
+    if valor.startswith("canin"):
+        return "Canina"
+    if valor.startswith("felin"):
+        return "Felina"
+    return (especie or "").strip() or None
+
+
+def _float_ou_none(valor: Any) -> Optional[float]:
+    if valor is None:
+        return None
+    valor = float(valor)
+    return None if np.isnan(valor) else valor
+
+
+@dataclass(frozen=True)
+class TabelaReferencia:
+    """Referencias de uma especie, ordenadas por peso."""
+    especie: str
+    ids: np.ndarray
+    especies: Tuple[str, ...]
+    pesos: np.ndarray
+    minimos: np.ndarray
+    maximos: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.pesos.shape[0])
+
+    def indices_mais_proximos(self, pesos: Any) -> np.ndarray:
+        """Linha de peso mais proximo para cada peso (empate fica com o menor peso)."""
+        pesos = np.atleast_1d(np.asarray(pesos, dtype=float))
+        if len(self) == 1:
+            return np.zeros(pesos.shape, dtype=np.intp)
+
+        direita = np.clip(np.searchsorted(self.pesos, pesos), 1, len(self) - 1)
+        esquerda = direita - 1
+        usa_direita = (self.pesos[direita] - pesos) < (pesos - self.pesos[esquerda])
+        return np.where(usa_direita, direita, esquerda)
+
+    def faixas(self, pesos: Any, interpolar: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Matrizes (n_pesos, n_parametros) de minimos e maximos para os pesos dados."""
+        pesos = np.atleast_1d(np.asarray(pesos, dtype=float))
+        if not interpolar or len(self) == 1:
+            indices = self.indices_mais_proximos(pesos)
+            return self.minimos[indices], self.maximos[indices]
+
+        # Fora da faixa da tabela vale a linha da ponta (sem extrapolar).
+        direita = np.clip(np.searchsorted(self.pesos, pesos), 1, len(self) - 1)
+        esquerda = direita - 1
+        peso_esq = self.pesos[esquerda]
+        intervalo = self.pesos[direita] - peso_esq
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fracao = np.where(intervalo > 0, (pesos - peso_esq) / intervalo, 0.0)
+        fracao = np.clip(fracao, 0.0, 1.0)[:, np.newaxis]
+
+        def interpolar_matriz(matriz: np.ndarray) -> np.ndarray:
+            baixo = matriz[esquerda]
+            cima = matriz[direita]
+            valores = baixo + fracao * (cima - baixo)
+            # Se so um dos vizinhos tem o parametro, usa o que existir.
+            valores = np.where(np.isnan(baixo), cima, valores)
+            return np.where(np.isnan(cima), baixo, valores)
+
+        return interpolar_matriz(self.minimos), interpolar_matriz(self.maximos)
+
+    def referencia(self, peso: float, interpolar: bool = False) -> Dict[str, Any]:
+        """Referencia para um peso no formato das colunas de `referencias_eco`."""
+        indice = int(self.indices_mais_proximos(peso)[0])
+        minimos, maximos = self.faixas(peso, interpolar=interpolar)
+
+        referencia: Dict[str, Any] = {
+            "id": int(self.ids[indice]),
+            "especie": self.especies[indice],
+            "peso_kg": float(peso) if interpolar else float(self.pesos[indice]),
+        }
+        for coluna, prefixo in enumerate(PARAMETROS):
+            referencia[f"{prefixo}_min"] = _float_ou_none(minimos[0, coluna])
+            referencia[f"{prefixo}_max"] = _float_ou_none(maximos[0, coluna])
+        if interpolar:
+            referencia["interpolada"] = True
+        return referencia
+
+    def avaliar(
+        self,
+        pesos: Any,
+        valores: np.ndarray,
+        interpolar: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Compara `valores` (n_pesos, n_parametros; NaN = sem medida) com as faixas.
+
+        Retorna (codigos, minimos, maximos). Codigo -1 abaixo, 0 normal,
+        1 acima e -2 quando falta medida ou referencia.
+        """
+        minimos, maximos = self.faixas(pesos, interpolar=interpolar)
+        valores = np.asarray(valores, dtype=float)
+        codigos = np.where(valores < minimos, -1, np.where(valores > maximos, 1, 0)).astype(np.int8)
+        sem_dado = np.isnan(valores) | np.isnan(minimos) | np.isnan(maximos)
+        codigos[sem_dado] = -2
+        return codigos, minimos, maximos
+
+
+def construir_tabela(especie: str, linhas: Iterable[Any]) -> Optional[TabelaReferencia]:
+    """Monta a tabela NumPy a partir de linhas com os atributos do modelo."""
+    linhas = [linha for linha in linhas if linha.peso_kg is not None]
+    if not linhas:
+        return None
+
+    linhas.sort(key=lambda linha: (float(linha.peso_kg), linha.id))
+
+    def matriz(sufixo: str) -> np.ndarray:
+        # dtype=float converte None em NaN.
+        return np.array(
+            [[getattr(linha, f"{prefixo}{sufixo}") for prefixo in PARAMETROS] for linha in linhas],
+            dtype=float,
+        ).reshape(len(linhas), len(PARAMETROS))
+
+    return TabelaReferencia(
+        especie=especie,
+        ids=np.array([linha.id for linha in linhas], dtype=np.int64),
+        especies=tuple(linha.especie for linha in linhas),
+        pesos=np.array([float(linha.peso_kg) for linha in linhas], dtype=float),
+        minimos=matriz("_min"),
+        maximos=matriz("_max"),
+    )
+
+
+class _CacheReferencias:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._tabelas: Optional[Dict[str, TabelaReferencia]] = None
+        self._carregado_em = 0.0
+
+    def tabelas(self, db: Session) -> Dict[str, TabelaReferencia]:
+        tabelas = self._tabelas
+        if tabelas is not None and time.monotonic() - self._carregado_em < CACHE_TTL_SECONDS:
+            return tabelas
+
+        with self._lock:
+            if self._tabelas is not None and time.monotonic() - self._carregado_em < CACHE_TTL_SECONDS:
+                return self._tabelas
+
+            colunas = [column for column in ReferenciaEco.__table__.columns]
+            linhas = db.query(*colunas).all()
+            por_especie: Dict[str, List[Any]] = {}
+            for linha in linhas:
+                especie = _especie_da_linha(linha.especie)
+                if especie:
+                    por_especie.setdefault(especie, []).append(linha)
+
+            novas: Dict[str, TabelaReferencia] = {}
+            for especie, linhas_especie in por_especie.items():
+                tabela = construir_tabela(especie, linhas_especie)
+                if tabela is not None:
+                    novas[especie] = tabela
+
+            self._tabelas = novas
+            self._carregado_em = time.monotonic()
+            return novas
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._tabelas = None
+            self._carregado_em = 0.0
+
+
+_CACHE = _CacheReferencias()
+
+
+def invalidar_cache_referencias() -> None:
+    _CACHE.invalidar()
+
+
+def obter_tabela(db: Session, especie: Optional[str]) -> Optional[TabelaReferencia]:
+    especie_norm = normalizar_especie(especie)
+    if not especie_norm:
+        return None
+    return _CACHE.tabelas(db).get(especie_norm)
+
+
+def buscar_referencia(
+    db: Session,
+    especie: Optional[str],
+    peso_kg: Optional[float],
+    interpolar: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """Referencia mais proxima (ou interpolada) para especie/peso; None se nao houver."""
+    if peso_kg is None:
+        return None
+    tabela = obter_tabela(db, especie)
+    if tabela is None:
+        return None
+    return tabela.referencia(float(peso_kg), interpolar=interpolar)
+
+
+def prefixo_da_medida(chave: str) -> Optional[str]:
+    """Aceita tanto a chave do laudo (DIVEd) quanto o prefixo da tabela (lvid_d)."""
+    if chave in _INDICE_PARAMETRO:
+        return chave
+    return MAPEAMENTO_REFERENCIA_ECO.get(chave)
+
+
+def _matriz_medidas(
+    lista_medidas: Sequence[Mapping[str, Any]],
+) -> Tuple[np.ndarray, List[List[Tuple[str, int]]], List[Tuple[int, str, int, float]]]:
+    valores = np.full((len(lista_medidas), len(PARAMETROS)), np.nan)
+    # Varias chaves do laudo podem cair no mesmo parametro (Aorta/Ao_nivel_AP):
+    # cada uma e avaliada separadamente.
+    chaves: List[List[Tuple[str, int]]] = []
+    extras: List[Tuple[int, str, int, float]] = []
+    for linha, medidas in enumerate(lista_medidas):
+        chaves_linha: List[Tuple[str, int]] = []
+        for chave, valor in (medidas or {}).items():
+            prefixo = prefixo_da_medida(str(chave))
+            if prefixo is None:
+                continue
+            try:
+                numero = float(valor)
+            except (TypeError, ValueError):
+                continue
+            coluna = _INDICE_PARAMETRO[prefixo]
+            if not np.isnan(valores[linha, coluna]):
+                extras.append((linha, str(chave), coluna, numero))
+                continue
+            valores[linha, coluna] = numero
+            chaves_linha.append((str(chave), coluna))
+        chaves.append(chaves_linha)
+    return valores, chaves, extras
+
+
+def _resultado(valor: float, codigo: int, ref_min: float, ref_max: float, prefixo: str) -> Dict[str, Any]:
+    return {
+        "parametro": prefixo,
+        "valor": valor,
+        "ref_min": _float_ou_none(ref_min),
+        "ref_max": _float_ou_none(ref_max),
+        "status": _STATUS_POR_CODIGO.get(int(codigo)),
+    }
+
+
+def avaliar_lote(
+    db: Session,
+    especie: Optional[str],
+    pacientes: Sequence[Mapping[str, Any]],
+    interpolar: bool = False,
+) -> Optional[List[Dict[str, Dict[str, Any]]]]:
+    """Avalia as medidas de varios pacientes da mesma especie numa unica passada.
+
+    Cada item de `pacientes` tem `peso_kg` e `medidas` ({chave: valor}).
+    Retorna, na mesma ordem, {chave: {parametro, valor, ref_min, ref_max,
+    status}} so para as chaves com parametro de referencia; status e None
+    quando a tabela nao tem faixa para o parametro. None se a especie nao
+    tiver tabela.
+    """
+    tabela = obter_tabela(db, especie)
+    if tabela is None:
+        return None
+    if not pacientes:
+        return []
+
+    pesos = np.array(
+        [np.nan if item.get("peso_kg") is None else float(item["peso_kg"]) for item in pacientes],
+        dtype=float,
+    )
+    sem_peso = np.isnan(pesos)
+    valores, chaves, extras = _matriz_medidas([item.get("medidas") or {} for item in pacientes])
+    codigos, minimos, maximos = tabela.avaliar(np.where(sem_peso, 0.0, pesos), valores, interpolar=interpolar)
+    # Sem peso nao ha faixa: a medida volta sem status.
+    codigos[sem_peso] = -2
+    minimos[sem_peso] = np.nan
+    maximos[sem_peso] = np.nan
+
+    resultados: List[Dict[str, Dict[str, Any]]] = []
+    for linha, chaves_linha in enumerate(chaves):
+        resultado_linha: Dict[str, Dict[str, Any]] = {}
+        for chave, coluna in chaves_linha:
+            resultado_linha[chave] = _resultado(
+                float(valores[linha, coluna]),
+                codigos[linha, coluna],
+                minimos[linha, coluna],
+                maximos[linha, coluna],
+                PARAMETROS[coluna],
+            )
+        resultados.append(resultado_linha)
+
+    for linha, chave, coluna, numero in extras:
+        ref_min, ref_max = minimos[linha, coluna], maximos[linha, coluna]
+        if np.isnan(ref_min) or np.isnan(ref_max):
+            codigo = -2
+        else:
+            codigo = -1 if numero < ref_min else (1 if numero > ref_max else 0)
+        resultados[linha][chave] = _resultado(numero, codigo, ref_min, ref_max, PARAMETROS[coluna])
+
+    return resultados
+
+
+def avaliar_medidas(
+    db: Session,
+    especie: Optional[str],
+    peso_kg: Optional[float],
+    medidas: Mapping[str, Any],
+    interpolar: bool = False,
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Versao de `avaliar_lote` para um unico paciente."""
+    resultados = avaliar_lote(db, especie, [{"peso_kg": peso_kg, "medidas": medidas}], interpolar=interpolar)
+    if resultados is None:
+        return None
+    return resultados[0]
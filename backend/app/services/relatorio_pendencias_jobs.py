@@ -0,0 +1,576 @@
+"""
+Relatorio de cobranca de pendencias como job em background.
+
+O job percorre as OS filtradas em streaming, agrupadas por clinica, e cada
+clinica vira um extrato proprio. Extratos sao renderizados em paralelo em
+processos separados (RELATORIO_PENDENCIAS_PROCESSOS) e guardados em disco
+pelo hash das suas linhas de OS e do cabecalho: numa nova execucao so as
+clinicas que mudaram sao renderizadas de novo. O resultado e um ZIP com um
+PDF por clinica ou um PDF unico, montado incrementalmente a partir dos
+extratos a medida que ficam prontos.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import unicodedata
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from itertools import groupby
+from threading import Lock
+from typing import Any, Optional
+
+from pypdf import PdfReader, PdfWriter
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.core.metrics import FILA_JOBS
+from app.db.database import SessionLocal
+from app.models.clinica import Clinica
+from app.models.configuracao import Configuracao
+from app.models.ordem_servico import OrdemServico
+from app.models.paciente import Paciente
+from app.models.relatorio_pendencias_job import RelatorioPendenciasJob
+from app.models.servico import Servico
+from app.models.tutor import Tutor
+from app.services.relatorio_pendencias_pdf import renderizar_extrato_clinica
+
+JOB_STATUS_PENDING = "pending"
+JOB_STATUS_PROCESSING = "processing"
+JOB_STATUS_COMPLETED = "completed"
+JOB_STATUS_FAILED = "failed"
+JOB_TTL_DAYS = 14
+FORMATOS = ("zip", "pdf")
+# Muda quando o layout do extrato muda, invalidando os extratos em cache.
+VERSAO_EXTRATO = 1
+LOTE_LEITURA = 500
+# Extratos por processo de renderizacao enviados e ainda nao concluidos.
+EXTRATOS_EM_VOO_POR_PROCESSO = 2
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="relatorio-pendencias")
+_SUBMITTED_JOB_IDS: set[int] = set()
+_SUBMIT_LOCK = Lock()
+FILA_JOBS.set_function(lambda: len(_SUBMITTED_JOB_IDS), fila="relatorio_pendencias")
+
+
+class SemPendenciasError(ValueError):
+    pass
+
+
+@dataclass
+class FiltrosPendencias:
+    status: Optional[str] = "Pendente"
+    clinica_id: Optional[int] = None
+    clinica_nome: Optional[str] = None
+    servico_id: Optional[int] = None
+    tipo_horario: Optional[str] = None
+    data_inicio: Optional[str] = None
+    data_fim: Optional[str] = None
+    busca: Optional[str] = None
+    mensagem: Optional[str] = None
+
+
+def _fallback_storage_dir(nome: str) -> str:
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "generated", nome))
+
+
+def _storage_dir(nome: str) -> str:
+    preferred = str(settings.UPLOAD_DIR or "").strip()
+    if os.name == "nt" and preferred.startswith("/"):
+        preferred = ""
+    candidate = os.path.join(preferred, nome) if preferred else ""
+
+    for path in [candidate, _fallback_storage_dir(nome)]:
+        if not path:
+            continue
+        try:
+            os.makedirs(path, exist_ok=True)
+            return path
+        except OSError:
+            continue
+
+    raise RuntimeError("Nao foi possivel criar diretorio para o relatorio de pendencias.")
+
+
+def get_relatorio_pendencias_storage_dir() -> str:
+    """Arquivos finais (ZIP/PDF) dos jobs."""
+    return _storage_dir("relatorio_pendencias_jobs")
+
+
+def get_extratos_clinica_storage_dir() -> str:
+    """Cache dos extratos por clinica, nomeados pelo hash do conteudo."""
+    return _storage_dir("relatorio_pendencias_extratos")
+
+
+def consulta_pendencias(db: Session, filtros: FiltrosPendencias) -> Query:
+    """OS do relatorio com os nomes relacionados, na ordem do relatorio (clinica, data, id)."""
+    query = (
+        db.query(
+            OrdemServico,
+            Paciente.nome.label("paciente_nome"),
+            Tutor.nome.label("tutor_nome"),
+            Clinica.nome.label("clinica_nome"),
+            Clinica.telefone.label("clinica_telefone"),
+            Servico.nome.label("servico_nome"),
+        )
+        .outerjoin(Paciente, OrdemServico.paciente_id == Paciente.id)
+        .outerjoin(Tutor, Paciente.tutor_id == Tutor.id)
+        .outerjoin(Clinica, OrdemServico.clinica_id == Clinica.id)
+        .outerjoin(Servico, OrdemServico.servico_id == Servico.id)
+    )
+
+    if filtros.status and filtros.status != "todos":
+        query = query.filter(OrdemServico.status == filtros.status)
+    if filtros.clinica_id:
+        query = query.filter(OrdemServico.clinica_id == filtros.clinica_id)
+    elif filtros.clinica_nome:
+        nome_limpo = filtros.clinica_nome.strip().lower()
+        if nome_limpo == "clinica nao informada":
+            query = query.filter(OrdemServico.clinica_id.is_(None))
+        else:
+            query = query.filter(func.lower(Clinica.nome) == nome_limpo)
+    if filtros.servico_id:
+        query = query.filter(OrdemServico.servico_id == filtros.servico_id)
+    if filtros.tipo_horario:
+        query = query.filter(OrdemServico.tipo_horario == filtros.tipo_horario)
+    if filtros.data_inicio:
+        query = query.filter(func.date(OrdemServico.data_atendimento) >= filtros.data_inicio)
+    if filtros.data_fim:
+        query = query.filter(func.date(OrdemServico.data_atendimento) <= filtros.data_fim)
+    if filtros.busca:
+        termo = f"%{filtros.busca.strip()}%"
+        query = query.filter(
+            or_(
+                OrdemServico.numero_os.ilike(termo),
+                Paciente.nome.ilike(termo),
+                Tutor.nome.ilike(termo),
+                Clinica.nome.ilike(termo),
+                Servico.nome.ilike(termo),
+            )
+        )
+
+    # clinica_id no meio mantem juntas as OS de clinicas homonimas.
+    return query.order_by(
+        Clinica.nome.asc(),
+        OrdemServico.clinica_id.asc(),
+        OrdemServico.data_atendimento.asc(),
+        OrdemServico.id.asc(),
+    )
+
+
+def item_relatorio(row: Any) -> dict[str, Any]:
+    os_data, paciente_nome, tutor_nome, clinica_nome, clinica_telefone, servico_nome = row
+    nome_clinica = (clinica_nome or "Clinica nao informada").strip()
+    chave = f"id:{os_data.clinica_id}" if os_data.clinica_id else f"nome:{nome_clinica.lower()}"
+    data_atendimento = os_data.data_atendimento
+    return {
+        "chave": chave,
+        "numero_os": os_data.numero_os or "",
+        "paciente": paciente_nome or "",
+        "tutor": tutor_nome or "",
+        "clinica_nome": nome_clinica,
+        "clinica_telefone": (clinica_telefone or "").strip(),
+        "servico": servico_nome or "",
+        "data_atendimento": data_atendimento.isoformat() if data_atendimento else None,
+        "valor_final": float(os_data.valor_final or 0),
+    }
+
+
+def montar_cabecalho_pendencias(db: Session, filtros: FiltrosPendencias) -> dict[str, Any]:
+    """Argumentos de cabecalho/rodape de gerar_pdf_cobranca_pendencias (empresa, filtros, logo)."""
+    configuracao = db.query(Configuracao).first()
+    nome_empresa = (
+        (configuracao.nome_empresa or "").strip()
+        if configuracao and configuracao.nome_empresa
+        else "Fort Cordis Cardiologia Veterinaria"
+    )
+
+    contato_partes: list[str] = []
+    if configuracao:
+        if configuracao.telefone:
+            contato_partes.append(str(configuracao.telefone).strip())
+        if configuracao.email:
+            contato_partes.append(str(configuracao.email).strip())
+        cidade_estado = " ".join(
+            [parte for parte in [configuracao.cidade or "", configuracao.estado or ""] if parte]
+        ).strip()
+        if cidade_estado:
+            contato_partes.append(cidade_estado)
+    contato_empresa = " | ".join([p for p in contato_partes if p])
+
+    filtros_aplicados: list[str] = []
+    if filtros.status and filtros.status != "todos":
+        filtros_aplicados.append(f"status={filtros.status}")
+    if filtros.clinica_id:
+        clinica_ref = db.query(Clinica).filter(Clinica.id == filtros.clinica_id).first()
+        filtros_aplicados.append(f"clinica={clinica_ref.nome if clinica_ref else filtros.clinica_id}")
+    elif filtros.clinica_nome:
+        filtros_aplicados.append(f"clinica={filtros.clinica_nome}")
+    if filtros.servico_id:
+        servico_ref = db.query(Servico).filter(Servico.id == filtros.servico_id).first()
+        filtros_aplicados.append(f"servico={servico_ref.nome if servico_ref else filtros.servico_id}")
+    if filtros.tipo_horario:
+        filtros_aplicados.append(f"tipo_horario={filtros.tipo_horario}")
+    if filtros.data_inicio:
+        filtros_aplicados.append(f"de={filtros.data_inicio}")
+    if filtros.data_fim:
+        filtros_aplicados.append(f"ate={filtros.data_fim}")
+    if filtros.busca:
+        filtros_aplicados.append(f"busca={filtros.busca}")
+    filtros_texto = ", ".join(filtros_aplicados) if filtros_aplicados else "sem filtros especificos"
+
+    logomarca = None
+    texto_rodape = ""
+    if configuracao:
+        if configuracao.mostrar_logomarca and configuracao.logomarca_dados:
+            logomarca = configuracao.logomarca_dados
+        texto_rodape = (configuracao.texto_rodape_laudo or "").strip()
+
+    return {
+        "nome_empresa": nome_empresa,
+        "contato_empresa": contato_empresa,
+        "texto_rodape": texto_rodape,
+        "filtros_texto": filtros_texto,
+        "mensagem_cobranca": filtros.mensagem,
+        "logomarca_dados": logomarca,
+    }
+
+
+def hash_extrato(itens: list[dict[str, Any]], cabecalho: dict[str, Any]) -> str:
+    """Hash das linhas de OS da clinica e do cabecalho (a logo entra pelo sha256)."""
+    logo = cabecalho.get("logomarca_dados")
+    estavel = {
+        **{chave: valor for chave, valor in cabecalho.items() if chave != "logomarca_dados"},
+        "logomarca_sha256": hashlib.sha256(logo).hexdigest() if logo else None,
+        "itens": itens,
+        "versao": VERSAO_EXTRATO,
+    }
+    texto = json.dumps(estavel, sort_keys=True, ensure_ascii=True, separators=(",", ":"))
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def _nome_arquivo_clinica(posicao: int, nome_clinica: str) -> str:
+    ascii_nome = unicodedata.normalize("NFKD", nome_clinica).encode("ascii", "ignore").decode("ascii")
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", ascii_nome).strip("_").lower() or "clinica"
+    return f"{posicao:03d}_{slug[:60]}.pdf"
+
+
+def _serialize_job(job: RelatorioPendenciasJob) -> dict[str, Any]:
+    download_url = None
+    if job.status == JOB_STATUS_COMPLETED and job.arquivo_caminho and os.path.exists(job.arquivo_caminho):
+        download_url = f"/api/v1/ordens-servico/relatorios/pendencias/jobs/{job.id}/download"
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "formato": job.formato,
+        "total_clinicas": int(job.total_clinicas or 0),
+        "clinicas_renderizadas": int(job.clinicas_renderizadas or 0),
+        "clinicas_reaproveitadas": int(job.clinicas_reaproveitadas or 0),
+        "arquivo_nome": job.arquivo_nome,
+        "erro": job.erro,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "download_url": download_url,
+    }
+
+
+def serialize_relatorio_pendencias_job(job: RelatorioPendenciasJob) -> dict[str, Any]:
+    return _serialize_job(job)
+
+
+def _criar_pool_processos() -> Optional[ProcessPoolExecutor]:
+    processos = int(settings.RELATORIO_PENDENCIAS_PROCESSOS or 0)
+    if processos <= 0:
+        return None
+    # spawn: o job roda numa thread; fork de processo com threads nao e seguro.
+    return ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn"))
+
+
+class _ArquivoFinal:
+    """ZIP ou PDF final do job, montado extrato a extrato na ordem do relatorio."""
+
+    def __init__(self, job_id: int, formato: str) -> None:
+        pasta = get_relatorio_pendencias_storage_dir()
+        self.formato = formato
+        self.destino = os.path.join(pasta, f"pendencias_{job_id}.{formato}")
+        fd, self.tmp_path = tempfile.mkstemp(suffix=f".{formato}", prefix=f"pendencias_{job_id}_", dir=pasta)
+        self._arquivo = os.fdopen(fd, "wb")
+        self._pacote: Optional[zipfile.ZipFile] = None
+        self._writer: Optional[PdfWriter] = None
+        self._posicao = 0
+        if formato == "zip":
+            # PDF ja e comprimido; STORED so empacota, lendo extrato por extrato do disco.
+            self._pacote = zipfile.ZipFile(self._arquivo, "w", compression=zipfile.ZIP_STORED)
+        else:
+            self._writer = PdfWriter()
+
+    def adicionar(self, nome_clinica: str, caminho: str) -> None:
+        self._posicao += 1
+        if self._pacote is not None:
+            self._pacote.write(caminho, arcname=_nome_arquivo_clinica(self._posicao, nome_clinica))
+        else:
+            for pagina in PdfReader(caminho).pages:
+                self._writer.add_page(pagina)
+
+    def concluir(self) -> str:
+        if self._pacote is not None:
+            self._pacote.close()
+        else:
+            self._writer.write(self._arquivo)
+        self._arquivo.close()
+        os.replace(self.tmp_path, self.destino)
+        return self.destino
+
+    def descartar(self) -> None:
+        try:
+            if self._pacote is not None:
+                self._pacote.close()
+            self._arquivo.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp_path)
+        except OSError:
+            pass
+
+
+def _renderizar_extratos(
+    db: Session,
+    filtros: FiltrosPendencias,
+    cabecalho: dict[str, Any],
+    arquivo: _ArquivoFinal,
+) -> tuple[list[tuple[str, str]], int, int]:
+    """[(nome da clinica, caminho do extrato)] na ordem do relatorio, renderizados e reaproveitados.
+
+    Cada clinica e enviada ao pool assim que suas linhas terminam, com no maximo
+    EXTRATOS_EM_VOO_POR_PROCESSO extratos por processo em andamento, e entra no
+    `arquivo` final assim que ela e as anteriores estao em disco: so as linhas
+    das clinicas em voo ficam em memoria, nao o relatorio inteiro.
+    """
+    pasta = get_extratos_clinica_storage_dir()
+    extratos: list[tuple[str, str]] = []
+    # Extratos ainda fora do arquivo final, na ordem do relatorio (futuro None = ja em disco).
+    na_fila: deque[tuple[str, str, Optional[Future]]] = deque()
+    em_voo: set[Future] = set()
+    limite_em_voo = max(1, int(settings.RELATORIO_PENDENCIAS_PROCESSOS or 0)) * EXTRATOS_EM_VOO_POR_PROCESSO
+    pool: Optional[ProcessPoolExecutor] = None
+    renderizados = 0
+    reaproveitados = 0
+
+    def _descarregar_fila() -> None:
+        while na_fila and (na_fila[0][2] is None or na_fila[0][2].done()):
+            nome_clinica, destino, futuro = na_fila.popleft()
+            if futuro is not None:
+                futuro.result()
+            arquivo.adicionar(nome_clinica, destino)
+
+    try:
+        linhas = consulta_pendencias(db, filtros).yield_per(LOTE_LEITURA)
+        itens = (item_relatorio(row) for row in linhas)
+        for _, grupo in groupby(itens, key=lambda item: item["chave"]):
+            itens_clinica = list(grupo)
+            nome_clinica = itens_clinica[0]["clinica_nome"]
+            destino = os.path.join(pasta, f"{hash_extrato(itens_clinica, cabecalho)}.pdf")
+            extratos.append((nome_clinica, destino))
+            futuro: Optional[Future] = None
+            if os.path.exists(destino):
+                os.utime(destino)  # mantem o extrato vivo para a limpeza por idade
+                reaproveitados += 1
+            else:
+                renderizados += 1
+                if pool is None and renderizados == 1:
+                    pool = _criar_pool_processos()
+                if pool is None:
+                    renderizar_extrato_clinica(destino, itens_clinica, cabecalho)
+                else:
+                    while len(em_voo) >= limite_em_voo:
+                        concluidos, em_voo = wait(em_voo, return_when=FIRST_COMPLETED)
+                        for concluido in concluidos:
+                            concluido.result()
+                    futuro = pool.submit(renderizar_extrato_clinica, destino, itens_clinica, cabecalho)
+                    em_voo.add(futuro)
+            na_fila.append((nome_clinica, destino, futuro))
+            _descarregar_fila()
+
+        if not extratos:
+            raise SemPendenciasError("Nao ha ordens para gerar relatorio com os filtros selecionados.")
+
+        for _, _, futuro in na_fila:
+            if futuro is not None:
+                futuro.result()
+        _descarregar_fila()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    return extratos, renderizados, reaproveitados
+
+
+def _mark_job_failed(db: Session, job_id: int, message: str) -> None:
+    job = db.query(RelatorioPendenciasJob).filter(RelatorioPendenciasJob.id == job_id).first()
+    if not job:
+        return
+
+    job.status = JOB_STATUS_FAILED
+    job.erro = message[:4000]
+    job.finished_at = datetime.utcnow()
+    db.commit()
+
+
+def _process_relatorio_pendencias_job(job_id: int) -> None:
+    db = SessionLocal()
+    try:
+        job = db.query(RelatorioPendenciasJob).filter(RelatorioPendenciasJob.id == job_id).first()
+        if not job:
+            return
+
+        job.status = JOB_STATUS_PROCESSING
+        job.started_at = datetime.utcnow()
+        job.finished_at = None
+        job.erro = None
+        job.tentativas = int(job.tentativas or 0) + 1
+        db.commit()
+
+        filtros = FiltrosPendencias(**json.loads(job.filtros_json or "{}"))
+        formato = job.formato if job.formato in FORMATOS else "zip"
+        cabecalho = montar_cabecalho_pendencias(db, filtros)
+        arquivo = _ArquivoFinal(job_id, formato)
+        try:
+            extratos, renderizados, reaproveitados = _renderizar_extratos(db, filtros, cabecalho, arquivo)
+            arquivo_caminho = arquivo.concluir()
+        except Exception:
+            arquivo.descartar()
+            raise
+        cache_key = hashlib.sha256(
+            "|".join([formato] + [os.path.basename(caminho) for _, caminho in extratos]).encode("ascii")
+        ).hexdigest()
+
+        job = db.query(RelatorioPendenciasJob).filter(RelatorioPendenciasJob.id == job_id).first()
+        if not job:
+            return
+        job.status = JOB_STATUS_COMPLETED
+        job.cache_key = cache_key
+        job.total_clinicas = len(extratos)
+        job.clinicas_renderizadas = renderizados
+        job.clinicas_reaproveitadas = reaproveitados
+        job.arquivo_nome = f"relatorio_cobranca_pendencias_{datetime.now().strftime('%Y%m%d_%H%M')}.{formato}"
+        job.arquivo_caminho = arquivo_caminho
+        job.erro = None
+        job.finished_at = datetime.utcnow()
+        job.expires_at = datetime.utcnow() + timedelta(days=JOB_TTL_DAYS)
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        _mark_job_failed(db, job_id, str(exc))
+    finally:
+        db.close()
+        with _SUBMIT_LOCK:
+            _SUBMITTED_JOB_IDS.discard(job_id)
+
+
+def submit_relatorio_pendencias_job(job_id: int) -> None:
+    with _SUBMIT_LOCK:
+        if job_id in _SUBMITTED_JOB_IDS:
+            return
+        _SUBMITTED_JOB_IDS.add(job_id)
+
+    _EXECUTOR.submit(_process_relatorio_pendencias_job, job_id)
+
+
+def enqueue_relatorio_pendencias_job(
+    db: Session,
+    filtros: FiltrosPendencias,
+    formato: str,
+    requested_by_id: int,
+) -> dict[str, Any]:
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato invalido: {formato}.")
+    filtros_json = json.dumps(asdict(filtros), sort_keys=True)
+
+    # Mesmo pedido ainda em andamento: devolve o job existente.
+    existente = (
+        db.query(RelatorioPendenciasJob)
+        .filter(
+            RelatorioPendenciasJob.requested_by_id == requested_by_id,
+            RelatorioPendenciasJob.formato == formato,
+            RelatorioPendenciasJob.filtros_json == filtros_json,
+            RelatorioPendenciasJob.status.in_([JOB_STATUS_PENDING, JOB_STATUS_PROCESSING]),
+        )
+        .order_by(RelatorioPendenciasJob.id.desc())
+        .first()
+    )
+    if existente:
+        if existente.status == JOB_STATUS_PENDING:
+            submit_relatorio_pendencias_job(existente.id)
+        return serialize_relatorio_pendencias_job(existente)
+
+    job = RelatorioPendenciasJob(
+        requested_by_id=requested_by_id,
+        status=JOB_STATUS_PENDING,
+        formato=formato,
+        filtros_json=filtros_json,
+        tentativas=0,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    submit_relatorio_pendencias_job(job.id)
+    return serialize_relatorio_pendencias_job(job)
+
+
+def get_relatorio_pendencias_job_for_user(db: Session, job_id: int, user_id: int) -> RelatorioPendenciasJob | None:
+    job = db.query(RelatorioPendenciasJob).filter(
+        RelatorioPendenciasJob.id == job_id,
+        RelatorioPendenciasJob.requested_by_id == user_id,
+    ).first()
+    if not job:
+        return None
+
+    if job.status == JOB_STATUS_COMPLETED and not (job.arquivo_caminho and os.path.exists(job.arquivo_caminho)):
+        job.status = JOB_STATUS_FAILED
+        job.erro = "Arquivo gerado nao encontrado no armazenamento."
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        db.refresh(job)
+    return job
+
+
+def restart_incomplete_relatorio_pendencias_jobs() -> None:
+    db = SessionLocal()
+    try:
+        try:
+            jobs = db.query(RelatorioPendenciasJob).filter(
+                RelatorioPendenciasJob.status.in_([JOB_STATUS_PENDING, JOB_STATUS_PROCESSING])
+            ).all()
+        except Exception as exc:
+            db.rollback()
+            print(f"[relatorio-pendencias] WARN: nao foi possivel retomar jobs pendentes: {exc}")
+            return
+
+        if not jobs:
+            return
+
+        for job in jobs:
+            job.status = JOB_STATUS_PENDING
+            job.erro = None
+        db.commit()
+
+        for job in jobs:
+            submit_relatorio_pendencias_job(job.id)
+    finally:
+        db.close()
+
+
+def shutdown_relatorio_pendencias_jobs() -> None:
+    _EXECUTOR.shutdown(wait=False, cancel_futures=False)
@@ -0,0 +1,298 @@
+"""
+Renderizacao (ReportLab) do relatorio de cobranca de OS pendentes.
+
+So depende do ReportLab: roda tanto na requisicao quanto nos processos de
+renderizacao do job por clinica (relatorio_pendencias_jobs), onde importar o
+app inteiro em cada processo seria desperdicio.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from datetime import datetime
+from html import escape
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+
+def _formatar_moeda_brl(valor: Any) -> str:
+    try:
+        numero = float(valor or 0)
+    except (TypeError, ValueError):
+        numero = 0.0
+    inteiro, casas = f"{numero:,.2f}".split(".")
+    return f"R$ {inteiro.replace(',', '.')},{casas}"
+
+
+def _formatar_data_ddmmaa(valor: Any) -> str:
+    if not valor:
+        return "-"
+    if isinstance(valor, datetime):
+        return valor.strftime("%d/%m/%Y")
+    texto = str(valor).strip()
+    if not texto:
+        return "-"
+    if texto.endswith("Z"):
+        texto = texto[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(texto).strftime("%d/%m/%Y")
+    except ValueError:
+        return texto
+
+
+def _texto_pdf(valor: Any, fallback: str = "-") -> str:
+    texto = str(valor or "").strip()
+    if not texto:
+        texto = fallback
+    return escape(texto)
+
+
+def _desenhar_rodape_relatorio(canvas, doc, texto_rodape: str):
+    canvas.saveState()
+    canvas.setStrokeColor(colors.HexColor("#D1D5DB"))
+    canvas.setLineWidth(0.5)
+    canvas.line(doc.leftMargin, 12 * mm, A4[0] - doc.rightMargin, 12 * mm)
+    canvas.setFont("Helvetica", 8)
+    canvas.setFillColor(colors.HexColor("#6B7280"))
+    canvas.drawString(doc.leftMargin, 8 * mm, (texto_rodape or "")[:120])
+    canvas.drawRightString(A4[0] - doc.rightMargin, 8 * mm, f"Pagina {canvas.getPageNumber()}")
+    canvas.restoreState()
+
+
+def gerar_pdf_cobranca_pendencias(
+    itens: List[Dict[str, Any]],
+    nome_empresa: str,
+    contato_empresa: str,
+    texto_rodape: str,
+    filtros_texto: str,
+    mensagem_cobranca: Optional[str] = None,
+    logomarca_dados: Optional[bytes] = None,
+) -> bytes:
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=14 * mm,
+        rightMargin=14 * mm,
+        topMargin=14 * mm,
+        bottomMargin=18 * mm,
+        title="Relatorio de Cobranca - Valores Pendentes",
+    )
+
+    styles = getSampleStyleSheet()
+    style_titulo = ParagraphStyle(
+        "RelatorioTitulo",
+        parent=styles["Heading1"],
+        fontName="Helvetica-Bold",
+        fontSize=15,
+        textColor=colors.HexColor("#0F172A"),
+        spaceAfter=3,
+    )
+    style_normal = ParagraphStyle(
+        "RelatorioNormal",
+        parent=styles["BodyText"],
+        fontName="Helvetica",
+        fontSize=9.5,
+        leading=13,
+        textColor=colors.HexColor("#111827"),
+    )
+    style_secao = ParagraphStyle(
+        "RelatorioSecao",
+        parent=styles["Heading3"],
+        fontName="Helvetica-Bold",
+        fontSize=11,
+        textColor=colors.HexColor("#1F2937"),
+        spaceAfter=2,
+        spaceBefore=6,
+    )
+
+    story: List[Any] = []
+
+    logo = None
+    if logomarca_dados:
+        try:
+            logo_reader = ImageReader(BytesIO(logomarca_dados))
+            largura, altura = logo_reader.getSize()
+            max_largura = 34 * mm
+            max_altura = 24 * mm
+            escala = min(max_largura / largura, max_altura / altura)
+            logo = Image(BytesIO(logomarca_dados), width=largura * escala, height=altura * escala)
+            logo.hAlign = "LEFT"
+        except Exception:
+            logo = None
+
+    emissao = datetime.now().strftime("%d/%m/%Y %H:%M")
+    texto_cabecalho = [
+        "Relatorio de Cobranca - Valores Pendentes",
+        _texto_pdf(nome_empresa, "Fort Cordis"),
+        f"Emissao: {emissao}",
+    ]
+    if contato_empresa:
+        texto_cabecalho.append(_texto_pdf(contato_empresa, ""))
+    if filtros_texto:
+        texto_cabecalho.append(f"Filtros: {_texto_pdf(filtros_texto, '-')} ")
+
+    cabecalho_info = [
+        Paragraph(texto_cabecalho[0], style_titulo),
+        Paragraph("<br/>".join(texto_cabecalho[1:]), style_normal),
+    ]
+    if logo:
+        tabela_cabecalho = Table(
+            [[logo, cabecalho_info]],
+            colWidths=[38 * mm, doc.width - (38 * mm)],
+        )
+        tabela_cabecalho.setStyle(
+            TableStyle(
+                [
+                    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                    ("LEFTPADDING", (0, 0), (-1, -1), 0),
+                    ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+                    ("TOPPADDING", (0, 0), (-1, -1), 0),
+                    ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+                ]
+            )
+        )
+        story.append(tabela_cabecalho)
+    else:
+        story.extend(cabecalho_info)
+
+    story.append(Spacer(1, 4 * mm))
+    story.append(Paragraph("Mensagem", style_secao))
+    mensagem_pdf = (
+        str(mensagem_cobranca or "").strip()
+        or "Prezados parceiros, segue o demonstrativo atualizado das ordens de servico em aberto para conferencia e programacao de pagamento."
+    )
+    story.append(
+        Paragraph(
+            _texto_pdf(mensagem_pdf, "-").replace("\n", "<br/>"),
+            style_normal,
+        )
+    )
+
+    grupos: Dict[str, Dict[str, Any]] = {}
+    for item in itens:
+        chave = item["chave"]
+        grupo = grupos.get(chave)
+        if not grupo:
+            grupo = {
+                "clinica_nome": item["clinica_nome"],
+                "clinica_telefone": item["clinica_telefone"],
+                "ordens": [],
+                "total": 0.0,
+            }
+            grupos[chave] = grupo
+
+        grupo["ordens"].append(item)
+        grupo["total"] += float(item["valor_final"] or 0)
+
+    total_geral = 0.0
+    for grupo in grupos.values():
+        story.append(Spacer(1, 3 * mm))
+        story.append(Paragraph(f"Clinica: {_texto_pdf(grupo['clinica_nome'], 'Nao informada')}", style_secao))
+        story.append(
+            Paragraph(
+                f"Telefone: {_texto_pdf(grupo['clinica_telefone'], 'nao informado')}",
+                style_normal,
+            )
+        )
+
+        linhas_tabela = [["OS", "Data", "Paciente", "Tutor", "Servico", "Valor"]]
+        for ordem in grupo["ordens"]:
+            linhas_tabela.append(
+                [
+                    str(ordem["numero_os"] or "-"),
+                    _formatar_data_ddmmaa(ordem["data_atendimento"]),
+                    str(ordem["paciente"] or "-"),
+                    str(ordem["tutor"] or "-"),
+                    str(ordem["servico"] or "-"),
+                    _formatar_moeda_brl(ordem["valor_final"]),
+                ]
+            )
+
+        linhas_tabela.append(["", "", "", "", "Subtotal", _formatar_moeda_brl(grupo["total"])])
+        tabela = Table(
+            linhas_tabela,
+            colWidths=[22 * mm, 22 * mm, 36 * mm, 30 * mm, 48 * mm, 24 * mm],
+            repeatRows=1,
+        )
+
+        subtotal_row = len(linhas_tabela) - 1
+        tabela.setStyle(
+            TableStyle(
+                [
+                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E8EEF8")),
+                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0F172A")),
+                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                    ("FONTNAME", (0, 1), (-1, -2), "Helvetica"),
+                    ("FONTNAME", (0, subtotal_row), (-1, subtotal_row), "Helvetica-Bold"),
+                    ("FONTSIZE", (0, 0), (-1, -1), 8.8),
+                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#D1D5DB")),
+                    ("ALIGN", (-1, 1), (-1, -1), "RIGHT"),
+                    ("ALIGN", (0, 0), (0, -1), "CENTER"),
+                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                    ("LEFTPADDING", (0, 0), (-1, -1), 4),
+                    ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+                    ("TOPPADDING", (0, 0), (-1, -1), 3),
+                    ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+                    ("BACKGROUND", (0, subtotal_row), (-1, subtotal_row), colors.HexColor("#F3F4F6")),
+                ]
+            )
+        )
+        story.append(Spacer(1, 1.5 * mm))
+        story.append(tabela)
+        total_geral += grupo["total"]
+
+    story.append(Spacer(1, 5 * mm))
+    story.append(
+        Paragraph(
+            f"<b>Total pendente geral:</b> {_formatar_moeda_brl(total_geral)}",
+            style_normal,
+        )
+    )
+    story.append(Spacer(1, 2 * mm))
+    story.append(
+        Paragraph(
+            "Agradecemos a parceria e permanecemos a disposicao para qualquer duvida.",
+            style_normal,
+        )
+    )
+    story.append(Paragraph("Atenciosamente,", style_normal))
+    story.append(Paragraph(f"<b>{_texto_pdf(nome_empresa, 'Fort Cordis')}</b>", style_normal))
+
+    rodape_final = texto_rodape.strip() if texto_rodape else nome_empresa
+    doc.build(
+        story,
+        onFirstPage=lambda c, d: _desenhar_rodape_relatorio(c, d, rodape_final),
+        onLaterPages=lambda c, d: _desenhar_rodape_relatorio(c, d, rodape_final),
+    )
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    return pdf_bytes
+
+
+def renderizar_extrato_clinica(destino: str, itens: List[Dict[str, Any]], cabecalho: Dict[str, Any]) -> str:
+    """Grava em `destino` o extrato de uma clinica (escrita atomica) e devolve o caminho.
+
+    Ponto de entrada dos processos de renderizacao: recebe so dados simples.
+    """
+    pdf_bytes = gerar_pdf_cobranca_pendencias(itens=itens, **cabecalho)
+    pasta = os.path.dirname(destino)
+    fd, tmp_path = tempfile.mkstemp(suffix=".pdf", prefix="extrato_", dir=pasta)
+    try:
+        with os.fdopen(fd, "wb") as arquivo:
+            arquivo.write(pdf_bytes)
+        os.replace(tmp_path, destino)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return destino
@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Iterable
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.geo_cache import GeoCacheEntrada
+from app.models.imagem_laudo import ImagemLaudo, ImagemTemporaria
+from app.models.laudo_pdf_job import LaudoPdfJob
+from app.models.relatorio_pendencias_job import RelatorioPendenciasJob
+from app.models.xml_import_job import XmlImportJob
+from app.services import laudo_pdf_jobs, relatorio_pendencias_jobs, xml_import_jobs
+from app.services.auditoria_arquivo import arquivar_auditoria
+from app.services.imagem_thumbs import get_thumb_storage_dir
+
+# Arquivos mais novos que isso nunca sao tratados como orfaos: podem ser
+# temporarios de um worker que ainda nao gravou o caminho no banco.
+ORPHAN_GRACE_SECONDS = 6 * 3600
+
+_FINISHED_STATUSES = (
+    laudo_pdf_jobs.JOB_STATUS_COMPLETED,
+    laudo_pdf_jobs.JOB_STATUS_FAILED,
+)
+
+_SWEEP_LOCK = Lock()
+_STOP_EVENT = Event()
+_THREAD: Thread | None = None
+
+
+def _empty_report(dry_run: bool) -> dict[str, Any]:
+    return {
+        "dry_run": dry_run,
+        "imagens_temporarias": 0,
+        "laudo_pdf_jobs": 0,
+        "relatorio_pendencias_jobs": 0,
+        "xml_import_jobs": 0,
+        "geo_cache": 0,
+        "auditoria_arquivados": 0,
+        "arquivos_removidos": 0,
+        "arquivos_orfaos": 0,
+        "bytes_liberados": 0,
+        "erros": [],
+    }
+
+
+def _unlink(path: str | None, report: dict[str, Any], dry_run: bool) -> None:
+    if not path:
+        return
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+
+    if not dry_run:
+        try:
+            os.unlink(path)
+        except OSError as exc:
+            report["erros"].append(f"{path}: {exc}")
+            return
+
+    report["arquivos_removidos"] += 1
+    report["bytes_liberados"] += size
+
+
+def _delete_in_batches(
+    session_factory: Callable[[], Session],
+    model: Any,
+    condition: Any,
+    batch_size: int,
+    report: dict[str, Any],
+    dry_run: bool,
+    with_files: bool = False,
+) -> int:
+    """Remove linhas de `model` que atendem `condition`, em lotes limitados.
+
+    Cada lote usa uma transacao curta para nao segurar locks de escrita
+    enquanto os workers de PDF/XML estao ativos.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            columns = [model.id, model.arquivo_caminho] if with_files else [model.id]
+            rows = db.query(*columns).filter(
+                condition,
+                model.id > last_id,
+            ).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            ids = [row.id for row in rows]
+            last_id = ids[-1]
+            if not dry_run:
+                db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+
+            if with_files:
+                for row in rows:
+                    _unlink(row.arquivo_caminho, report, dry_run)
+            total += len(ids)
+        except Exception as exc:
+            db.rollback()
+            report["erros"].append(f"{model.__tablename__}: {exc}")
+            break
+        finally:
+            db.close()
+
+        if len(rows) < batch_size:
+            break
+    return total
+
+
+def _expired_job_condition(model: Any, now: datetime, ttl_days: int) -> Any:
+    # Jobs com falha nao recebem expires_at; expiram pelo finished_at.
+    return or_(
+        model.expires_at <= now,
+        and_(
+            model.expires_at.is_(None),
+            model.status.in_(_FINISHED_STATUSES),
+            model.finished_at <= now - timedelta(days=ttl_days),
+        ),
+    )
+
+
+def _iter_files(directory: str) -> Iterable[os.DirEntry]:
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from _iter_files(entry.path)
+        elif entry.is_file(follow_symlinks=False):
+            yield entry
+
+
+def _sweep_orphan_files(
+    directory: str,
+    is_referenced: Callable[[str], bool],
+    report: dict[str, Any],
+    dry_run: bool,
+    grace_seconds: float = ORPHAN_GRACE_SECONDS,
+) -> None:
+    cutoff = time.time() - grace_seconds
+    for entry in _iter_files(directory):
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                continue
+        except OSError:
+            continue
+        if is_referenced(entry.path):
+            continue
+        removed_before = report["arquivos_removidos"]
+        _unlink(entry.path, report, dry_run)
+        if report["arquivos_removidos"] > removed_before:
+            report["arquivos_orfaos"] += 1
+
+
+def _referenced_paths(db: Session, model: Any) -> set[str]:
+    rows = db.query(model.arquivo_caminho).filter(model.arquivo_caminho.isnot(None)).all()
+    return {os.path.abspath(row[0]) for row in rows if row[0]}
+
+
+def _referenced_hashes(db: Session) -> set[str]:
+    hashes: set[str] = set()
+    for model in (ImagemLaudo, ImagemTemporaria):
+        rows = db.query(model.conteudo_sha256).filter(
+            model.conteudo_sha256.isnot(None)
+        ).distinct().all()
+        hashes.update(row[0] for row in rows if row[0])
+    return hashes
+
+
+def _sweep_orphans(
+    session_factory: Callable[[], Session],
+    report: dict[str, Any],
+    dry_run: bool,
+) -> None:
+    db = session_factory()
+    try:
+        pdf_paths = _referenced_paths(db, LaudoPdfJob)
+        pendencias_paths = _referenced_paths(db, RelatorioPendenciasJob)
+        xml_paths = _referenced_paths(db, XmlImportJob)
+        thumb_hashes = _referenced_hashes(db)
+    except Exception as exc:
+        db.rollback()
+        report["erros"].append(f"arquivos orfaos: {exc}")
+        return
+    finally:
+        db.close()
+
+    targets = [
+        (laudo_pdf_jobs.get_laudo_pdf_storage_dir, lambda path: os.path.abspath(path) in pdf_paths),
+        (
+            relatorio_pendencias_jobs.get_relatorio_pendencias_storage_dir,
+            lambda path: os.path.abspath(path) in pendencias_paths,
+        ),
+        (xml_import_jobs.get_xml_import_storage_dir, lambda path: os.path.abspath(path) in xml_paths),
+        # Miniaturas sao nomeadas "<sha256>_w<largura>.<ext>".
+        (get_thumb_storage_dir, lambda path: os.path.basename(path).split("_w", 1)[0] in thumb_hashes),
+    ]
+    for get_dir, is_referenced in targets:
+        try:
+            directory = get_dir()
+        except Exception as exc:
+            report["erros"].append(str(exc))
+            continue
+        _sweep_orphan_files(directory, is_referenced, report, dry_run)
+
+    # Extratos por clinica nao sao referenciados pelo banco (sao cache por hash);
+    # cada reuso renova o mtime, entao saem quando ficam sem uso por um TTL.
+    try:
+        extratos_dir = relatorio_pendencias_jobs.get_extratos_clinica_storage_dir()
+    except Exception as exc:
+        report["erros"].append(str(exc))
+        return
+    _sweep_orphan_files(
+        extratos_dir,
+        lambda path: False,
+        report,
+        dry_run,
+        grace_seconds=relatorio_pendencias_jobs.JOB_TTL_DAYS * 86400,
+    )
+
+
+def run_retention_sweep(
+    session_factory: Callable[[], Session] = SessionLocal,
+    batch_size: int | None = None,
+    dry_run: bool = False,
+    now: datetime | None = None,
+) -> dict[str, Any]:
+    """Remove imagens temporarias, jobs e cache geo expirados e apaga arquivos orfaos.
+
+    Tambem arquiva a auditoria antiga e mantem suas particoes (ver
+    app/services/auditoria_arquivo.py).
+
+    Retorna um relatorio com o que foi (ou seria, em dry-run) liberado.
+    """
+    batch_size = max(1, int(batch_size or settings.RETENTION_SWEEP_BATCH_SIZE))
+    now = now or datetime.utcnow()
+    report = _empty_report(dry_run)
+    started = time.perf_counter()
+
+    with _SWEEP_LOCK:
+        report["imagens_temporarias"] = _delete_in_batches(
+            session_factory,
+            ImagemTemporaria,
+            ImagemTemporaria.expira_em <= now,
+            batch_size,
+            report,
+            dry_run,
+        )
+        report["laudo_pdf_jobs"] = _delete_in_batches(
+            session_factory,
+            LaudoPdfJob,
+            _expired_job_condition(LaudoPdfJob, now, laudo_pdf_jobs.JOB_TTL_DAYS),
+            batch_size,
+            report,
+            dry_run,
+            with_files=True,
+        )
+        report["relatorio_pendencias_jobs"] = _delete_in_batches(
+            session_factory,
+            RelatorioPendenciasJob,
+            _expired_job_condition(RelatorioPendenciasJob, now, relatorio_pendencias_jobs.JOB_TTL_DAYS),
+            batch_size,
+            report,
+            dry_run,
+            with_files=True,
+        )
+        report["xml_import_jobs"] = _delete_in_batches(
+            session_factory,
+            XmlImportJob,
+            _expired_job_condition(XmlImportJob, now, xml_import_jobs.JOB_TTL_DAYS),
+            batch_size,
+            report,
+            dry_run,
+            with_files=True,
+        )
+        report["geo_cache"] = _delete_in_batches(
+            session_factory,
+            GeoCacheEntrada,
+            GeoCacheEntrada.expires_at <= now,
+            batch_size,
+            report,
+            dry_run,
+        )
+        _sweep_orphans(session_factory, report, dry_run)
+
+        auditoria = arquivar_auditoria(session_factory, batch_size=batch_size, dry_run=dry_run, now=now)
+        report["auditoria_arquivados"] = auditoria["eventos"]
+        report["erros"].extend(auditoria["erros"])
+
+    report["duracao_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+
+def _format_report(report: dict[str, Any]) -> str:
+    return (
+        f"imagens_temporarias={report['imagens_temporarias']} "
+        f"laudo_pdf_jobs={report['laudo_pdf_jobs']} "
+        f"relatorio_pendencias_jobs={report['relatorio_pendencias_jobs']} "
+        f"xml_import_jobs={report['xml_import_jobs']} "
+        f"geo_cache={report['geo_cache']} "
+        f"auditoria_arquivados={report['auditoria_arquivados']} "
+        f"arquivos={report['arquivos_removidos']} (orfaos={report['arquivos_orfaos']}) "
+        f"bytes={report['bytes_liberados']} erros={len(report['erros'])} "
+        f"em {report['duracao_ms']}ms"
+    )
+
+
+def _sweeper_loop(interval_seconds: float) -> None:
+    while not _STOP_EVENT.wait(interval_seconds):
+        try:
+            report = run_retention_sweep()
+            print(f"[retention-sweeper] {_format_report(report)}")
+        except Exception as exc:
+            print(f"[retention-sweeper] WARN: falha na limpeza periodica: {exc}")
+
+
+def start_retention_sweeper() -> None:
+    global _THREAD
+
+    interval_minutes = int(settings.RETENTION_SWEEP_INTERVAL_MINUTES or 0)
+    if interval_minutes <= 0 or (_THREAD and _THREAD.is_alive()):
+        return
+
+    _STOP_EVENT.clear()
+    _THREAD = Thread(
+        target=_sweeper_loop,
+        args=(interval_minutes * 60,),
+        name="retention-sweeper",
+        daemon=True,
+    )
+    _THREAD.start()
+
+
+def shutdown_retention_sweeper() -> None:
+    _STOP_EVENT.set()
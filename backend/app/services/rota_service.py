@@ -0,0 +1,271 @@
+"""
+Roteirizacao do dia: ordem de visitas as clinicas que minimiza o tempo de
+deslocamento respeitando a jornada e a janela de cada visita.
+
+Horarios sao minutos desde 00:00 do dia. A matriz de tempos e carregada uma
+unica vez (ver logistica_service.carregar_matriz_duracoes) e indexada por
+posicao da visita, entao avaliar uma ordem nao toca no banco.
+
+Ate LIMITE_EXATO visitas a ordem e exata: programacao dinamica sobre
+subconjuntos (Held-Karp), guardando por (subconjunto, ultima visita) os
+rotulos nao dominados em (deslocamento, horario de termino) -- com janelas,
+chegar mais cedo pode valer um deslocamento maior. Acima disso, ou quando
+nenhuma ordem cabe nas janelas, vale a heuristica: vizinho mais proximo e
+ordem atual como pontos de partida, refinados com 2-opt e or-opt ate nao
+haver melhora, ate MAX_PASSADAS_BUSCA passadas ou ate acabar o orcamento de
+TEMPO_MAXIMO_BUSCA_S (a rota roda dentro da requisicao). Interromper a busca
+so deixa de melhorar: a proposta nunca e pior que a ordem atual.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Sequence
+
+LIMITE_EXATO = 10
+OR_OPT_MAX_SEGMENTO = 3
+MAX_VISITAS = 60
+MAX_PASSADAS_BUSCA = 20
+TEMPO_MAXIMO_BUSCA_S = 0.4
+
+
+@dataclass(frozen=True)
+class Visita:
+    referencia: Any
+    clinica_id: int
+    duracao_min: int
+    # Janela para o *inicio* da visita; None = qualquer horario da jornada.
+    janela_inicio_min: Optional[int] = None
+    janela_fim_min: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class _Avaliacao:
+    violacao_min: int
+    deslocamento_min: int
+    termino_min: int
+    etapas: tuple
+
+    @property
+    def custo(self) -> tuple[int, int, int]:
+        return self.violacao_min, self.deslocamento_min, self.termino_min
+
+
+class _Problema:
+    def __init__(
+        self,
+        visitas: Sequence[Visita],
+        matriz: Mapping[tuple[int, int], int],
+        inicio_jornada_min: int,
+        fim_jornada_min: int,
+        origem_clinica_id: Optional[int],
+    ) -> None:
+        self.visitas = list(visitas)
+        self.inicio_jornada = int(inicio_jornada_min)
+        self.fim_jornada = int(fim_jornada_min)
+
+        def tempo(origem: Optional[int], destino: int) -> int:
+            if origem is None or origem == destino:
+                return 0
+            return max(0, int(matriz.get((origem, destino), 0)))
+
+        clinicas = [v.clinica_id for v in self.visitas]
+        self.tempos = [[tempo(o, d) for d in clinicas] for o in clinicas]
+        self.tempos_origem = [tempo(origem_clinica_id, d) for d in clinicas]
+
+    def avaliar(self, ordem: Sequence[int]) -> _Avaliacao:
+        relogio = self.inicio_jornada
+        anterior: Optional[int] = None
+        deslocamento = 0
+        violacao = 0
+        etapas = []
+        for indice in ordem:
+            visita = self.visitas[indice]
+            trecho = self.tempos_origem[indice] if anterior is None else self.tempos[anterior][indice]
+            deslocamento += trecho
+            chegada = relogio + trecho
+            inicio = max(chegada, visita.janela_inicio_min or 0)
+            if visita.janela_fim_min is not None:
+                violacao += max(0, inicio - visita.janela_fim_min)
+            relogio = inicio + visita.duracao_min
+            etapas.append((indice, trecho, chegada, inicio, relogio))
+            anterior = indice
+        violacao += max(0, relogio - self.fim_jornada)
+        return _Avaliacao(violacao, deslocamento, relogio, tuple(etapas))
+
+
+def _exato(problema: _Problema) -> Optional[list[int]]:
+    """Menor deslocamento entre as ordens viaveis; None se nenhuma couber."""
+    n = len(problema.visitas)
+    visitas = problema.visitas
+    # rotulos[(mascara, ultima)] = [(deslocamento, relogio, rotulo_anterior, ultima)]
+    rotulos: dict[tuple[int, int], list[tuple]] = {}
+
+    def estender(relogio: int, trecho: int, indice: int) -> Optional[int]:
+        visita = visitas[indice]
+        inicio = max(relogio + trecho, visita.janela_inicio_min or 0)
+        if visita.janela_fim_min is not None and inicio > visita.janela_fim_min:
+            return None
+        termino = inicio + visita.duracao_min
+        return termino if termino <= problema.fim_jornada else None
+
+    def inserir(chave: tuple[int, int], novo: tuple) -> None:
+        atuais = rotulos.setdefault(chave, [])
+        if any(r[0] <= novo[0] and r[1] <= novo[1] for r in atuais):
+            return
+        atuais[:] = [r for r in atuais if not (novo[0] <= r[0] and novo[1] <= r[1])]
+        atuais.append(novo)
+
+    for j in range(n):
+        termino = estender(problema.inicio_jornada, problema.tempos_origem[j], j)
+        if termino is not None:
+            inserir((1 << j, j), (problema.tempos_origem[j], termino, None, j))
+
+    # Mascaras em ordem crescente: todo subconjunto vem antes dos que o contem.
+    for mascara in range(1, 1 << n):
+        for ultima in range(n):
+            for deslocamento, relogio, anterior, _ in rotulos.get((mascara, ultima), ()):
+                rotulo = (deslocamento, relogio, anterior, ultima)
+                for j in range(n):
+                    if mascara & (1 << j):
+                        continue
+                    trecho = problema.tempos[ultima][j]
+                    termino = estender(relogio, trecho, j)
+                    if termino is not None:
+                        inserir((mascara | (1 << j), j), (deslocamento + trecho, termino, rotulo, j))
+
+    completa = (1 << n) - 1
+    finais = [r for ultima in range(n) for r in rotulos.get((completa, ultima), ())]
+    if not finais:
+        return None
+    rotulo = min(finais, key=lambda r: (r[0], r[1]))
+    ordem = []
+    while rotulo is not None:
+        ordem.append(rotulo[3])
+        rotulo = rotulo[2]
+    return ordem[::-1]
+
+
+def _vizinho_mais_proximo(problema: _Problema) -> list[int]:
+    restantes = set(range(len(problema.visitas)))
+    ordem: list[int] = []
+    while restantes:
+        if ordem:
+            linha = problema.tempos[ordem[-1]]
+        else:
+            linha = problema.tempos_origem
+        # Janela que fecha mais cedo desempata trechos iguais.
+        proximo = min(
+            restantes,
+            key=lambda j: (
+                linha[j],
+                problema.visitas[j].janela_fim_min if problema.visitas[j].janela_fim_min is not None else 1 << 30,
+                j,
+            ),
+        )
+        ordem.append(proximo)
+        restantes.remove(proximo)
+    return ordem
+
+
+def _busca_local(problema: _Problema, ordem: list[int], prazo: float) -> tuple[list[int], _Avaliacao]:
+    """2-opt + or-opt ate nao haver melhora, `MAX_PASSADAS_BUSCA` ou `prazo` (perf_counter)."""
+    melhor = problema.avaliar(ordem)
+    n = len(ordem)
+    melhorou = True
+    passadas = 0
+    while melhorou and passadas < MAX_PASSADAS_BUSCA:
+        melhorou = False
+        passadas += 1
+        # 2-opt: inverte o trecho ordem[i..k].
+        for i in range(n - 1):
+            if time.perf_counter() >= prazo:
+                return ordem, melhor
+            for k in range(i + 1, n):
+                candidata = ordem[:i] + ordem[i:k + 1][::-1] + ordem[k + 1:]
+                avaliacao = problema.avaliar(candidata)
+                if avaliacao.custo < melhor.custo:
+                    ordem, melhor, melhorou = candidata, avaliacao, True
+        # or-opt: move um bloco de 1 a 3 visitas para outra posicao.
+        for tamanho in range(1, min(OR_OPT_MAX_SEGMENTO, n - 1) + 1):
+            for i in range(n - tamanho + 1):
+                if time.perf_counter() >= prazo:
+                    return ordem, melhor
+                bloco = ordem[i:i + tamanho]
+                resto = ordem[:i] + ordem[i + tamanho:]
+                for posicao in range(len(resto) + 1):
+                    if posicao == i:
+                        continue
+                    candidata = resto[:posicao] + bloco + resto[posicao:]
+                    avaliacao = problema.avaliar(candidata)
+                    if avaliacao.custo < melhor.custo:
+                        ordem, melhor, melhorou = candidata, avaliacao, True
+                        break
+    return ordem, melhor
+
+
+def _serializar(problema: _Problema, avaliacao: _Avaliacao) -> dict:
+    return {
+        "viavel": avaliacao.violacao_min == 0,
+        "violacao_min": avaliacao.violacao_min,
+        "deslocamento_total_min": avaliacao.deslocamento_min,
+        "termino_min": avaliacao.termino_min,
+        "etapas": [
+            {
+                "indice": indice,
+                "referencia": problema.visitas[indice].referencia,
+                "clinica_id": problema.visitas[indice].clinica_id,
+                "deslocamento_min": trecho,
+                "chegada_min": chegada,
+                "inicio_min": inicio,
+                "fim_min": fim,
+                "espera_min": inicio - chegada,
+            }
+            for indice, trecho, chegada, inicio, fim in avaliacao.etapas
+        ],
+    }
+
+
+def otimizar_rota(
+    visitas: Sequence[Visita],
+    matriz: Mapping[tuple[int, int], int],
+    *,
+    inicio_jornada_min: int,
+    fim_jornada_min: int,
+    origem_clinica_id: Optional[int] = None,
+) -> dict:
+    """Ordem de visitas com menor deslocamento; compara com a ordem recebida.
+
+    `matriz[(origem, destino)]` da o tempo em minutos entre clinicas.
+    Ordens que furam janelas ou a jornada so sao escolhidas se nenhuma cabe,
+    e nesse caso a de menor atraso total vence.
+    """
+    problema = _Problema(visitas, matriz, inicio_jornada_min, fim_jornada_min, origem_clinica_id)
+    atual = problema.avaliar(range(len(problema.visitas)))
+
+    ordem = None
+    metodo = "heuristica"
+    if len(problema.visitas) <= LIMITE_EXATO:
+        ordem = _exato(problema)
+        if ordem is not None:
+            metodo = "exato"
+
+    if ordem is not None:
+        melhor = problema.avaliar(ordem)
+    else:
+        partidas = [_vizinho_mais_proximo(problema), list(range(len(problema.visitas)))]
+        prazo = time.perf_counter() + TEMPO_MAXIMO_BUSCA_S
+        avaliacoes = []
+        for posicao, partida in enumerate(partidas):
+            # Cada partida fica com sua fatia do tempo que sobrou.
+            restante = prazo - time.perf_counter()
+            fatia = time.perf_counter() + restante / (len(partidas) - posicao)
+            avaliacoes.append(_busca_local(problema, partida, fatia)[1])
+        melhor = min(avaliacoes, key=lambda a: a.custo)
+
+    return {
+        "metodo": metodo,
+        "proposta": _serializar(problema, melhor),
+        "atual": _serializar(problema, atual),
+        "economia_min": atual.deslocamento_min - melhor.deslocamento_min,
+    }
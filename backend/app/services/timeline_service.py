@@ -0,0 +1,224 @@
+"""
+Linha do tempo do paciente: agendamentos, atendimentos, laudos, ordens de
+servico e transacoes num unico fluxo, do mais recente para o mais antigo.
+
+Cada fonte e lida com uma consulta limitada a `limite + 1` linhas a partir
+do cursor, e as listas ja ordenadas sao intercaladas com heapq.merge. Uma
+pagina custa uma consulta por fonte, independente do tamanho do historico.
+
+Ordem: (momento DESC, fonte DESC, id DESC). No mesmo instante a fonte mais
+"adiante" no fluxo (transacao > OS > laudo > atendimento > agendamento)
+aparece primeiro. O cursor guarda essa chave da ultima linha da pagina.
+"""
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.models.agendamento import Agendamento
+from app.models.atendimento_clinico import AtendimentoClinico
+from app.models.financeiro import Transacao
+from app.models.laudo import Laudo
+from app.models.ordem_servico import OrdemServico
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+
+
+def _valor(numero: Any) -> float:
+    return float(numero or 0)
+
+
+@dataclass(frozen=True)
+class _Fonte:
+    tipo: str
+    modelo: Any
+    momento: Callable[[], Any]
+    colunas: Callable[[], Sequence[Any]]
+    montar: Callable[[Any], Dict[str, Any]]
+
+
+FONTES: Tuple[_Fonte, ...] = (
+    _Fonte(
+        tipo="agendamento",
+        modelo=Agendamento,
+        momento=lambda: Agendamento.inicio,
+        colunas=lambda: (Agendamento.servico, Agendamento.clinica, Agendamento.status),
+        montar=lambda row: {
+            "titulo": row.servico or "Agendamento",
+            "status": row.status,
+            "detalhes": {"clinica": row.clinica or ""},
+        },
+    ),
+    _Fonte(
+        tipo="atendimento",
+        modelo=AtendimentoClinico,
+        momento=lambda: AtendimentoClinico.data_atendimento,
+        colunas=lambda: (
+            AtendimentoClinico.queixa_principal,
+            AtendimentoClinico.diagnostico_principal,
+            AtendimentoClinico.status,
+        ),
+        montar=lambda row: {
+            "titulo": row.queixa_principal or "Atendimento clinico",
+            "status": row.status,
+            "detalhes": {"diagnostico": row.diagnostico_principal or ""},
+        },
+    ),
+    _Fonte(
+        tipo="laudo",
+        modelo=Laudo,
+        momento=lambda: func.coalesce(Laudo.data_exame, Laudo.data_laudo, Laudo.created_at),
+        colunas=lambda: (Laudo.titulo, Laudo.tipo, Laudo.status),
+        montar=lambda row: {
+            "titulo": row.titulo,
+            "status": row.status,
+            "detalhes": {"tipo": row.tipo},
+        },
+    ),
+    _Fonte(
+        tipo="ordem_servico",
+        modelo=OrdemServico,
+        momento=lambda: func.coalesce(OrdemServico.data_atendimento, OrdemServico.created_at),
+        colunas=lambda: (OrdemServico.numero_os, OrdemServico.valor_final, OrdemServico.status),
+        montar=lambda row: {
+            "titulo": f"OS {row.numero_os}",
+            "status": row.status,
+            "detalhes": {"valor_final": _valor(row.valor_final)},
+        },
+    ),
+    _Fonte(
+        tipo="transacao",
+        modelo=Transacao,
+        momento=lambda: func.coalesce(Transacao.data_transacao, Transacao.created_at),
+        colunas=lambda: (Transacao.descricao, Transacao.tipo, Transacao.valor_final, Transacao.status),
+        montar=lambda row: {
+            "titulo": row.descricao or "Transacao",
+            "status": row.status,
+            "detalhes": {"tipo": row.tipo, "valor_final": _valor(row.valor_final)},
+        },
+    ),
+)
+TIPOS = tuple(fonte.tipo for fonte in FONTES)
+_ORDEM_FONTE = {fonte.tipo: indice for indice, fonte in enumerate(FONTES)}
+
+
+def normalizar_momento(valor: datetime) -> datetime:
+    """Momento em UTC com fuso; datas sem fuso (SQLite) sao lidas como UTC."""
+    if valor.tzinfo is None:
+        return valor.replace(tzinfo=timezone.utc)
+    return valor.astimezone(timezone.utc)
+
+
+# SQLite guarda `func.now()`/server_default como 'YYYY-MM-DD HH:MM:SS' e os
+# datetimes do Python com '.ffffff'; comparadas como texto, as duas formas nao
+# batem. A chave de ordenacao no SQLite e sempre esta forma normalizada (ms).
+_FORMATO_SQLITE = "%Y-%m-%d %H:%M:%f"
+
+
+def _chave_momento(momento: Any, dialeto: str) -> Any:
+    """Expressao usada para ordenar e comparar o momento de uma fonte."""
+    if dialeto == "sqlite":
+        return func.strftime(_FORMATO_SQLITE, momento)
+    return momento
+
+
+def momento_para_coluna(momento: datetime, dialeto: str) -> Any:
+    """Valor do cursor para comparar com `_chave_momento`.
+
+    No Postgres as colunas sao `timestamptz` e o cursor segue com fuso: um
+    valor sem fuso seria lido no TimeZone da sessao e a pagina pularia ou
+    repetiria itens. No SQLite vira o texto normalizado da chave, em UTC.
+    """
+    if dialeto == "sqlite":
+        utc = momento.astimezone(timezone.utc)
+        return utc.strftime("%Y-%m-%d %H:%M:%S.") + f"{utc.microsecond // 1000:03d}"
+    return momento
+
+
+def _momento_item(valor: datetime, dialeto: str) -> datetime:
+    momento = normalizar_momento(valor)
+    if dialeto == "sqlite":
+        # Mesma precisao da chave do SQLite, para o merge seguir a ordem do banco.
+        momento = momento.replace(microsecond=momento.microsecond // 1000 * 1000)
+    return momento
+
+
+@dataclass(frozen=True)
+class CursorTimeline:
+    momento: datetime
+    tipo: str
+    item_id: int
+
+
+def _consultar_fonte(
+    db: Session,
+    fonte: _Fonte,
+    paciente_id: int,
+    cursor: Optional[CursorTimeline],
+    limite: int,
+) -> List[Tuple[Tuple[datetime, int, int], Dict[str, Any]]]:
+    dialeto = db.get_bind().dialect.name
+    momento = fonte.momento()
+    chave = _chave_momento(momento, dialeto)
+    coluna_id = fonte.modelo.id
+    query = db.query(coluna_id.label("id"), momento.label("momento"), *fonte.colunas()).filter(
+        fonte.modelo.paciente_id == paciente_id,
+        momento.isnot(None),
+    )
+    if cursor is not None:
+        momento_cursor = momento_para_coluna(cursor.momento, dialeto)
+        ordem, ordem_cursor = _ORDEM_FONTE[fonte.tipo], _ORDEM_FONTE[cursor.tipo]
+        if ordem < ordem_cursor:
+            query = query.filter(chave <= momento_cursor)
+        elif ordem == ordem_cursor:
+            query = query.filter(
+                or_(chave < momento_cursor, and_(chave == momento_cursor, coluna_id < cursor.item_id))
+            )
+        else:
+            query = query.filter(chave < momento_cursor)
+
+    itens = []
+    for row in query.order_by(chave.desc(), coluna_id.desc()).limit(limite):
+        momento_item = _momento_item(row.momento, dialeto)
+        itens.append(
+            (
+                (momento_item, _ORDEM_FONTE[fonte.tipo], row.id),
+                {"tipo": fonte.tipo, "id": row.id, "momento": momento_item.isoformat(), **fonte.montar(row)},
+            )
+        )
+    return itens
+
+
+def montar_timeline(
+    db: Session,
+    paciente_id: int,
+    cursor: Optional[CursorTimeline] = None,
+    limite: int = LIMITE_PADRAO,
+    tipos: Optional[Iterable[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[CursorTimeline]]:
+    """Uma pagina da linha do tempo e o cursor da proxima (None no fim)."""
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+    selecionados = set(tipos) if tipos else set(TIPOS)
+    listas = [
+        _consultar_fonte(db, fonte, paciente_id, cursor, limite + 1)
+        for fonte in FONTES
+        if fonte.tipo in selecionados
+    ]
+
+    pagina = []
+    for chave, item in heapq.merge(*listas, key=lambda par: par[0], reverse=True):
+        pagina.append((chave, item))
+        if len(pagina) > limite:
+            break
+
+    proximo = None
+    if len(pagina) > limite:
+        momento, ordem, item_id = pagina[limite - 1][0]
+        proximo = CursorTimeline(momento=momento, tipo=FONTES[ordem].tipo, item_id=item_id)
+    return [item for _, item in pagina[:limite]], proximo
@@ -4,6 +4,7 @@ import base64
 import json
 import os
 import tempfile
+import time
 from binascii import Error as BinasciiError
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
@@ -13,6 +14,7 @@ from typing import Any
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.metrics import FILA_JOBS, XML_PARSE_SECONDS
 from app.db.database import SessionLocal
 from app.models.xml_import_job import XmlImportJob
 from app.utils.xml_parser import parse_xml_eco
@@ -27,6 +29,7 @@ MAX_XML_IMPORT_SIZE = 5 * 1024 * 1024
 _EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="xml-import")
 _SUBMITTED_JOB_IDS: set[int] = set()
 _SUBMIT_LOCK = Lock()
+FILA_JOBS.set_function(lambda: len(_SUBMITTED_JOB_IDS), fila="xml_import")
 
 
 def _fallback_storage_dir() -> str:
@@ -86,7 +89,14 @@ def decode_xml_import_base64(content_b64: str) -> bytes:
 def parse_xml_import_content(filename: str | None, content: bytes) -> dict[str, Any]:
     validate_xml_import_filename(filename)
     validate_xml_import_size(content)
-    return parse_xml_eco(content)
+    inicio = time.perf_counter()
+    resultado = "erro"
+    try:
+        dados = parse_xml_eco(content)
+        resultado = "ok"
+        return dados
+    finally:
+        XML_PARSE_SECONDS.observe(time.perf_counter() - inicio, resultado=resultado)
 
 
 def _parse_result_json(value: str | None) -> dict[str, Any] | None:
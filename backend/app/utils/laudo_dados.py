@@ -0,0 +1,62 @@
+"""
+Extracao dos dados estruturados de um laudo a partir do texto legado.
+
+Laudos de eco guardam medidas e avaliacao qualitativa na descricao (linhas
+"- CHAVE: valor") e a pressao arterial no JSON de `anexos`. Estas funcoes so
+rodam na escrita (listener do modelo Laudo) e no backfill da migracao
+20260317_13; a leitura usa as colunas `*_json` do laudo.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict
+
+TIPOS_SEM_MEDIDAS_ECO = ("pressao_arterial", "ultrassonografia_abdominal")
+CAMPOS_QUALITATIVA_ECO = ("valvas", "camaras", "funcao", "pericardio", "vasos", "ad_vd")
+
+_MEDIDA_RE = re.compile(r"-\s*([\w_]+):\s*([\d.,]+)")
+_QUALITATIVA_SECAO_RE = re.compile(
+    r"Avalia(?:ç|c)(?:ã|a)o Qualitativa[\s\n]*(-.*?)(?=\n##|\Z)",
+    re.DOTALL,
+)
+_QUALITATIVA_ITEM_RE = re.compile(r"-\s*(\w+):?\s*(.+?)(?=\n-|\Z)", re.DOTALL)
+
+
+def carregar_anexos(anexos_raw: Any) -> Dict[str, Any]:
+    """JSON de anexos como dict ({} se vazio ou invalido)."""
+    if isinstance(anexos_raw, dict):
+        return dict(anexos_raw)
+    if isinstance(anexos_raw, str) and anexos_raw.strip():
+        try:
+            parsed = json.loads(anexos_raw)
+        except json.JSONDecodeError:
+            return {}
+        if isinstance(parsed, dict):
+            return parsed
+    return {}
+
+
+def extrair_medidas(descricao: Any) -> Dict[str, float]:
+    """Medidas numericas "- CHAVE: valor" da descricao (virgula decimal aceita)."""
+    medidas: Dict[str, float] = {}
+    for match in _MEDIDA_RE.finditer(str(descricao or "")):
+        try:
+            medidas[match.group(1)] = float(match.group(2).replace(",", "."))
+        except ValueError:
+            continue
+    return medidas
+
+
+def extrair_qualitativa(descricao: Any) -> Dict[str, str]:
+    """Campos da secao "Avaliacao Qualitativa" do laudo de eco."""
+    secao = _QUALITATIVA_SECAO_RE.search(str(descricao or ""))
+    if not secao:
+        return {}
+
+    qualitativa: Dict[str, str] = {}
+    for match in _QUALITATIVA_ITEM_RE.finditer(secao.group(1)):
+        campo = match.group(1).lower().strip()
+        if campo in CAMPOS_QUALITATIVA_ECO:
+            qualitativa[campo] = match.group(2).strip()
+    return qualitativa
@@ -0,0 +1 @@
+"""Gerador de base sintetica e benchmark dos endpoints (ver executar.py)."""
@@ -0,0 +1,379 @@
+"""
+Gerador deterministico de uma base sintetica "clinica grande".
+
+Mesma semente + mesmo perfil = mesmos dados. Gera clinicas, tutores,
+pacientes, anos de agendamentos, laudos de eco (com medidas e imagens),
+ordens de servico e transacoes, tudo com INSERT em lote (Core, sem ORM),
+ids atribuidos aqui e sequencias do PostgreSQL acertadas no fim.
+
+Uso:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.dados_sinteticos --perfil medio
+
+A base precisa estar vazia: o gerador cria o schema (create_all +
+migracoes) e recusa tabelas ja populadas.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+@dataclass(frozen=True)
+class PerfilDados:
+    clinicas: int
+    pacientes_por_clinica: int
+    agendamentos_por_paciente: int
+    laudos_por_paciente: int
+    imagens_por_laudo: int
+    anos: int = 3
+    semente: int = 20260318
+
+
+PERFIS: Dict[str, PerfilDados] = {
+    # Rapido o bastante para CI / smoke local.
+    "pequeno": PerfilDados(clinicas=5, pacientes_por_clinica=40, agendamentos_por_paciente=3,
+                           laudos_por_paciente=1, imagens_por_laudo=1, anos=1),
+    "medio": PerfilDados(clinicas=20, pacientes_por_clinica=250, agendamentos_por_paciente=5,
+                         laudos_por_paciente=2, imagens_por_laudo=2),
+    # Ordem de grandeza da operacao: anos de agenda, dezenas de milhares de laudos.
+    "clinica_grande": PerfilDados(clinicas=60, pacientes_por_clinica=600, agendamentos_por_paciente=8,
+                                  laudos_por_paciente=3, imagens_por_laudo=3, anos=5),
+}
+
+ESPECIES = (("Canina", 0.7), ("Felina", 0.3))
+RACAS = {
+    "Canina": ("SRD", "Poodle", "Shih Tzu", "Yorkshire", "Labrador", "Pinscher", "Golden Retriever", "Lhasa Apso"),
+    "Felina": ("SRD", "Persa", "Siames", "Maine Coon"),
+}
+NOMES_PACIENTE = (
+    "Thor", "Luna", "Mel", "Bob", "Nina", "Fred", "Bela", "Toby", "Lola", "Max",
+    "Amora", "Pipoca", "Zeus", "Maya", "Simba", "Kiara", "Paçoca", "Jade", "Theo", "Cacau",
+)
+NOMES = ("Ana", "Bruno", "Carla", "Diego", "Elaine", "Fábio", "Gabriela", "Hugo", "Iara", "João",
+         "Karen", "Lucas", "Marina", "Nelson", "Olga", "Paulo", "Raquel", "Sérgio", "Tânia", "Vitor")
+SOBRENOMES = ("Silva", "Souza", "Oliveira", "Lima", "Pereira", "Costa", "Ribeiro", "Almeida",
+              "Carvalho", "Gomes", "Martins", "Araújo", "Barbosa", "Rocha", "Teixeira")
+BAIRROS = ("Aldeota", "Meireles", "Cocó", "Fátima", "Benfica", "Messejana", "Parangaba", "Montese",
+           "Papicu", "Dionísio Torres")
+SERVICOS = (
+    ("Ecocardiograma", 40, 280.0),
+    ("Eletrocardiograma", 20, 120.0),
+    ("Pressão arterial", 15, 80.0),
+    ("Ultrassonografia abdominal", 30, 200.0),
+)
+STATUS_AGENDA = (("Concluido", 0.72), ("Cancelado", 0.1), ("Faltou", 0.05), ("Confirmado", 0.08), ("Agendado", 0.05))
+CATEGORIAS_SAIDA = ("Combustivel", "Manutencao", "Material", "Impostos", "Aluguel")
+MEDIDAS_ECO = {
+    "Ao": (1.0, 2.6), "LA": (1.2, 3.4), "LA_Ao": (1.1, 1.9), "IVSd": (0.5, 1.1), "LVIDd": (2.0, 4.8),
+    "LVPWd": (0.5, 1.1), "IVSs": (0.7, 1.5), "LVIDs": (1.1, 3.2), "LVPWs": (0.7, 1.5),
+    "FS": (25.0, 45.0), "EF": (50.0, 80.0), "TAPSE": (0.8, 1.8), "MAPSE": (0.5, 1.2),
+}
+QUALITATIVA = {
+    "valvas": ("Sem alteracoes", "Espessamento leve da mitral", "Degeneracao mixomatosa moderada"),
+    "camaras": ("Dimensoes preservadas", "Aumento leve de atrio esquerdo"),
+    "funcao": ("Preservada", "Discreta disfuncao diastolica"),
+    "pericardio": ("Sem efusao",),
+}
+
+LOTE_PADRAO = 2000
+
+
+def _png_sintetico(largura: int = 64, altura: int = 48, semente: int = 0) -> bytes:
+    """PNG pequeno e valido para as imagens dos laudos (PDF renderiza de verdade)."""
+    from PIL import Image
+
+    rng = random.Random(semente)
+    imagem = Image.new("RGB", (largura, altura))
+    imagem.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(largura * altura)])
+    buffer = io.BytesIO()
+    imagem.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _escolher_ponderado(rng: random.Random, opcoes: Iterable[tuple]) -> Any:
+    valores, pesos = zip(*opcoes)
+    return rng.choices(valores, weights=pesos, k=1)[0]
+
+
+def _nome_pessoa(rng: random.Random) -> str:
+    return f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+
+def _descricao_eco(rng: random.Random) -> tuple[str, dict, dict]:
+    medidas = {chave: round(rng.uniform(minimo, maximo), 2) for chave, (minimo, maximo) in MEDIDAS_ECO.items()}
+    qualitativa = {chave: rng.choice(opcoes) for chave, opcoes in QUALITATIVA.items()}
+    linhas = ["## Medidas Ecocardiográficas"]
+    linhas += [f"- {chave}: {valor}" for chave, valor in medidas.items()]
+    linhas += ["", "## Avaliação Qualitativa"]
+    linhas += [f"- {chave}: {valor}" for chave, valor in qualitativa.items()]
+    return "\n".join(linhas), medidas, qualitativa
+
+
+class _Inseridor:
+    """Acumula linhas por tabela e descarrega em executemany de `lote` linhas."""
+
+    def __init__(self, connection, lote: int) -> None:
+        self.connection = connection
+        self.lote = max(1, lote)
+        self.pendentes: Dict[Any, List[dict]] = {}
+        self.contagem: Dict[str, int] = {}
+
+    def adicionar(self, tabela, linha: dict) -> None:
+        linhas = self.pendentes.setdefault(tabela, [])
+        linhas.append(linha)
+        if len(linhas) >= self.lote:
+            self.descarregar(tabela)
+
+    def descarregar(self, tabela=None) -> None:
+        from sqlalchemy import insert
+
+        tabelas = [tabela] if tabela is not None else list(self.pendentes)
+        for atual in tabelas:
+            linhas = self.pendentes.get(atual) or []
+            if not linhas:
+                continue
+            self.connection.execute(insert(atual), linhas)
+            self.contagem[atual.name] = self.contagem.get(atual.name, 0) + len(linhas)
+            self.pendentes[atual] = []
+
+
+def _tabelas_populadas(connection, tabelas) -> List[str]:
+    from sqlalchemy import select
+
+    return [
+        tabela.name
+        for tabela in tabelas
+        if connection.execute(select(tabela.c.id).limit(1)).first() is not None
+    ]
+
+
+def _acertar_sequencias(connection, tabelas) -> None:
+    from sqlalchemy import text
+
+    if connection.dialect.name != "postgresql":
+        return
+    for tabela in tabelas:
+        connection.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{tabela.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {tabela.name}), 0) + 1, false)"
+            )
+        )
+
+
+def gerar_dados(engine, perfil: PerfilDados, lote: int = LOTE_PADRAO, hoje: Optional[date] = None) -> Dict[str, Any]:
+    """Popula a base (vazia) do engine e retorna as contagens por tabela."""
+    from app.models.agendamento import Agendamento
+    from app.models.clinica import Clinica
+    from app.models.financeiro import Transacao
+    from app.models.imagem_laudo import ImagemLaudo
+    from app.models.laudo import Laudo
+    from app.models.ordem_servico import OrdemServico
+    from app.models.paciente import Paciente
+    from app.models.servico import Servico
+    from app.models.tutor import Tutor
+    from app.services.busca_service import gerar_nome_key
+
+    tabelas = [model.__table__ for model in (
+        Clinica, Servico, Tutor, Paciente, Agendamento, Laudo, ImagemLaudo, OrdemServico, Transacao,
+    )]
+    rng = random.Random(perfil.semente)
+    hoje = hoje or date.today()
+    inicio_periodo = hoje - timedelta(days=365 * perfil.anos)
+    dias_periodo = (hoje - inicio_periodo).days
+    imagens = [_png_sintetico(semente=perfil.semente + i) for i in range(4)]
+    iniciado = time.perf_counter()
+
+    with engine.begin() as connection:
+        populadas = _tabelas_populadas(connection, tabelas)
+        if populadas:
+            raise RuntimeError(f"Base ja tem dados em: {', '.join(populadas)}. Use uma base vazia.")
+
+        ins = _Inseridor(connection, lote)
+        agora = datetime.combine(hoje, datetime.min.time())
+
+        for servico_id, (nome, duracao, preco) in enumerate(SERVICOS, start=1):
+            ins.adicionar(Servico.__table__, {
+                "id": servico_id, "nome": nome, "duracao_minutos": duracao, "ativo": True,
+                "preco": preco, "preco_fortaleza_comercial": preco, "preco_fortaleza_plantao": preco * 1.5,
+                "created_at": agora,
+            })
+
+        clinicas = []
+        for clinica_id in range(1, perfil.clinicas + 1):
+            nome = f"Clínica Veterinária {rng.choice(SOBRENOMES)} {clinica_id}"
+            clinicas.append((clinica_id, nome))
+            ins.adicionar(Clinica.__table__, {
+                "id": clinica_id, "nome": nome, "nome_key": gerar_nome_key(nome),
+                "telefone": f"(85) 3{rng.randrange(10**7):07d}", "bairro": rng.choice(BAIRROS),
+                "cidade": "Fortaleza", "estado": "CE",
+                "latitude": round(-3.73 + rng.uniform(-0.12, 0.12), 6),
+                "longitude": round(-38.52 + rng.uniform(-0.12, 0.12), 6),
+                "ativo": True, "created_at": agora,
+            })
+
+        paciente_id = tutor_id = agendamento_id = laudo_id = imagem_id = os_id = transacao_id = 0
+        for clinica_id, clinica_nome in clinicas:
+            for _ in range(perfil.pacientes_por_clinica):
+                tutor_id += 1
+                tutor_nome = _nome_pessoa(rng)
+                telefone = f"(85) 9{rng.randrange(10**8):08d}"
+                ins.adicionar(Tutor.__table__, {
+                    "id": tutor_id, "nome": tutor_nome, "nome_key": gerar_nome_key(tutor_nome),
+                    "telefone": telefone, "ativo": 1, "created_at": agora.isoformat(),
+                })
+
+                paciente_id += 1
+                especie = _escolher_ponderado(rng, ESPECIES)
+                paciente_nome = f"{rng.choice(NOMES_PACIENTE)} {rng.choice(SOBRENOMES)}"
+                peso = round(rng.uniform(2, 8) if especie == "Felina" else rng.lognormvariate(2.0, 0.6), 1)
+                ins.adicionar(Paciente.__table__, {
+                    "id": paciente_id, "tutor_id": tutor_id, "nome": paciente_nome,
+                    "nome_key": gerar_nome_key(paciente_nome), "especie": especie,
+                    "raca": rng.choice(RACAS[especie]), "sexo": rng.choice(("Macho", "Femea")),
+                    "peso_kg": peso, "ativo": 1,
+                    "created_at": agora.isoformat(), "updated_at": agora.isoformat(),
+                })
+
+                concluidos = []
+                for _ in range(perfil.agendamentos_por_paciente):
+                    agendamento_id += 1
+                    dia = inicio_periodo + timedelta(days=rng.randrange(dias_periodo + 30))
+                    inicio = datetime.combine(dia, datetime.min.time()) + timedelta(
+                        hours=rng.randrange(8, 18), minutes=rng.choice((0, 15, 30, 45))
+                    )
+                    servico_id = rng.randrange(1, len(SERVICOS) + 1)
+                    nome_servico, duracao, preco = SERVICOS[servico_id - 1]
+                    status = "Agendado" if dia > hoje else _escolher_ponderado(rng, STATUS_AGENDA)
+                    ins.adicionar(Agendamento.__table__, {
+                        "id": agendamento_id, "paciente_id": paciente_id, "clinica_id": clinica_id,
+                        "servico_id": servico_id, "inicio": inicio, "fim": inicio + timedelta(minutes=duracao),
+                        "data": inicio.date().isoformat(), "hora": inicio.strftime("%H:%M"), "status": status,
+                        "paciente": paciente_nome, "tutor": tutor_nome, "telefone": telefone,
+                        "servico": nome_servico, "clinica": clinica_nome,
+                        "created_at": inicio - timedelta(days=rng.randrange(1, 20)),
+                    })
+                    if status == "Concluido":
+                        concluidos.append((agendamento_id, inicio, servico_id, preco))
+
+                        os_id += 1
+                        desconto = rng.choice((0, 0, 0, 10, 20))
+                        ins.adicionar(OrdemServico.__table__, {
+                            "id": os_id, "numero_os": f"OS{inicio:%Y%m}-{os_id:07d}",
+                            "agendamento_id": agendamento_id, "paciente_id": paciente_id,
+                            "clinica_id": clinica_id, "servico_id": servico_id, "data_atendimento": inicio,
+                            "tipo_horario": "comercial", "valor_servico": preco, "desconto": desconto,
+                            "valor_final": preco - desconto,
+                            "status": "Pago" if inicio.date() < hoje - timedelta(days=30) else "Pendente",
+                            "created_at": inicio,
+                        })
+                        transacao_id += 1
+                        pago = inicio.date() < hoje - timedelta(days=30)
+                        ins.adicionar(Transacao.__table__, {
+                            "id": transacao_id, "tipo": "entrada", "categoria": nome_servico,
+                            "valor": preco, "desconto": desconto, "valor_final": preco - desconto,
+                            "forma_pagamento": rng.choice(("pix", "cartao", "dinheiro", "boleto")),
+                            "status": "Pago" if pago else "Pendente", "paciente_id": paciente_id,
+                            "paciente_nome": paciente_nome, "agendamento_id": agendamento_id,
+                            "clinica_id": clinica_id, "descricao": f"{nome_servico} - {paciente_nome}",
+                            "data_transacao": inicio, "data_vencimento": inicio + timedelta(days=30),
+                            "data_pagamento": inicio + timedelta(days=rng.randrange(0, 30)) if pago else None,
+                            "created_at": inicio,
+                        })
+                        if rng.random() < 0.15:
+                            transacao_id += 1
+                            valor = round(rng.uniform(30, 600), 2)
+                            ins.adicionar(Transacao.__table__, {
+                                "id": transacao_id, "tipo": "saida", "categoria": rng.choice(CATEGORIAS_SAIDA),
+                                "valor": valor, "desconto": 0, "valor_final": valor,
+                                "forma_pagamento": rng.choice(("pix", "boleto")), "status": "Pago",
+                                "paciente_id": None, "paciente_nome": None, "agendamento_id": None,
+                                "clinica_id": clinica_id, "descricao": "Despesa operacional",
+                                "data_transacao": inicio, "data_vencimento": inicio,
+                                "data_pagamento": inicio, "created_at": inicio,
+                            })
+
+                for agendamento_ref, inicio, _servico_id, _preco in concluidos[: perfil.laudos_por_paciente]:
+                    laudo_id += 1
+                    descricao, medidas, qualitativa = _descricao_eco(rng)
+                    ins.adicionar(Laudo.__table__, {
+                        "id": laudo_id, "paciente_id": paciente_id, "agendamento_id": agendamento_ref,
+                        "veterinario_id": 1, "tipo": "ecocardiograma",
+                        "titulo": f"Ecocardiograma - {paciente_nome}", "descricao": descricao,
+                        "diagnostico": rng.choice(("Sem alteracoes", "DMVM estagio B1", "CMH discreta")),
+                        "status": "Finalizado", "data_laudo": inicio, "data_exame": inicio,
+                        "created_at": inicio, "updated_at": inicio, "clinic_id": clinica_id,
+                        "medidas_json": medidas, "qualitativa_json": qualitativa,
+                        "criado_por_id": 1, "criado_por_nome": "Benchmark",
+                    })
+                    for ordem in range(perfil.imagens_por_laudo):
+                        imagem_id += 1
+                        conteudo = imagens[(laudo_id + ordem) % len(imagens)]
+                        ins.adicionar(ImagemLaudo.__table__, {
+                            "id": imagem_id, "laudo_id": laudo_id, "nome_arquivo": f"eco_{laudo_id}_{ordem}.png",
+                            "tipo_mime": "image/png", "tamanho_bytes": len(conteudo), "conteudo": conteudo,
+                            "conteudo_sha256": hashlib.sha256(conteudo).hexdigest(),
+                            "ordem": ordem, "ativo": 1, "created_at": inicio,
+                        })
+
+        ins.descarregar()
+        _acertar_sequencias(connection, tabelas)
+
+    return {
+        "perfil": asdict(perfil),
+        "tabelas": ins.contagem,
+        "duracao_s": round(time.perf_counter() - iniciado, 2),
+    }
+
+
+def preparar_schema(engine) -> None:
+    """create_all + migracoes, como o setup_database.py."""
+    import app.models  # noqa: F401  (registra os modelos no metadata)
+    from app.models import atendimento_clinico, configuracao  # noqa: F401
+    from app.db.database import Base
+    from migrations.runner import run_migrations
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Gera uma base sintetica deterministica para benchmarks.")
+    parser.add_argument("--perfil", choices=sorted(PERFIS), default="medio")
+    parser.add_argument("--semente", type=int, default=None, help="Sobrescreve a semente do perfil.")
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO, help="Linhas por INSERT em lote.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, str(BACKEND_DIR))
+    if not os.environ.get("DATABASE_URL"):
+        print("Defina DATABASE_URL apontando para uma base vazia.", file=sys.stderr)
+        return 2
+
+    from app.db.database import engine
+
+    perfil = PERFIS[args.perfil]
+    if args.semente is not None:
+        perfil = replace(perfil, semente=args.semente)
+    preparar_schema(engine)
+    print(json.dumps(gerar_dados(engine, perfil, lote=args.lote), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
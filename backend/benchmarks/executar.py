@@ -0,0 +1,293 @@
+"""
+Benchmark dos endpoints principais contra uma base sintetica.
+
+Dirige o app FastAPI em processo (TestClient, sem startup hooks/threads de
+fundo) com um usuario admin real (JWT + matriz de permissoes). Cada cenario
+roda `--aquecimento` vezes sem medir e `--repeticoes` vezes medindo latencia
+e numero de consultas SQL; o resultado (p50/p95 e consultas) vai para um
+JSON que pode ser comparado entre commits:
+
+    python -m benchmarks.executar --perfil pequeno --saida benchmarks/resultados/sqlite.json
+    DATABASE_URL=postgresql://bench@localhost/bench python -m benchmarks.executar --perfil medio
+    python -m benchmarks.executar --comparar antes.json depois.json --tolerancia 20
+
+Sem DATABASE_URL usa um SQLite temporario. Com base ja populada pelo
+gerador, `--reusar-base` pula a geracao.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+RESULTADOS_DIR = BACKEND_DIR / "benchmarks" / "resultados"
+BENCH_EMAIL = "benchmark@fortcordis.local"
+
+
+@dataclass
+class Cenario:
+    nome: str
+    metodo: str
+    # Recebe o indice da execucao: permite variar ids (ex.: PDF sem cache).
+    caminho: Callable[[int], str]
+    params: Dict[str, Any] = field(default_factory=dict)
+    json: Optional[Dict[str, Any]] = None
+    repeticoes: Optional[int] = None
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por nearest-rank (p em 0..100)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = max(1, math.ceil(p / 100 * len(ordenados)))
+    return ordenados[posicao - 1]
+
+
+def contar_falhas(medicao: Dict[str, Any]) -> int:
+    """Execucoes sem resposta 2xx (status HTTP de erro ou excecao no cliente)."""
+    return sum(qtd for codigo, qtd in (medicao.get("status") or {}).items() if not str(codigo).startswith("2"))
+
+
+def _commit_atual() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def _garantir_usuario_admin(db) -> str:
+    from app.api.v1.endpoints.auth import create_access_token
+    from app.models.papel import Papel
+    from app.models.user import User
+
+    papel = db.query(Papel).filter(Papel.nome == "admin").first()
+    if papel is None:
+        papel = Papel(nome="admin", descricao="Administrador")
+        db.add(papel)
+    usuario = db.query(User).filter(User.email == BENCH_EMAIL).first()
+    if usuario is None:
+        usuario = User(nome="Benchmark", email=BENCH_EMAIL, senha_hash="!", ativo=1)
+        db.add(usuario)
+    if papel not in usuario.papeis:
+        usuario.papeis.append(papel)
+    db.commit()
+    return create_access_token({"sub": BENCH_EMAIL}, expires_delta=timedelta(hours=12))
+
+
+def montar_cenarios(db, hoje: date) -> List[Cenario]:
+    from sqlalchemy import func
+
+    from app.models.agendamento import Agendamento
+    from app.models.clinica import Clinica
+    from app.models.laudo import Laudo
+
+    laudo_ids = [row[0] for row in db.query(Laudo.id).order_by(Laudo.id.desc()).limit(50).all()]
+    clinica_id = db.query(func.min(Clinica.id)).scalar() or 1
+    ultimo_dia = db.query(func.max(Agendamento.data)).filter(Agendamento.data <= hoje.isoformat()).scalar()
+    ultimo_dia = date.fromisoformat(ultimo_dia) if ultimo_dia else hoje
+    inicio_mes = ultimo_dia.replace(day=1)
+    inicio_ano = hoje - timedelta(days=365)
+
+    cenarios = [
+        Cenario("agenda_lista_mes", "GET", lambda i: "/api/v1/agenda",
+                {"data_inicio": inicio_mes.isoformat(), "data_fim": ultimo_dia.isoformat(), "limit": 500}),
+        Cenario("agenda_sugestoes", "POST", lambda i: "/api/v1/agenda/sugestoes-horario",
+                json={"data": ultimo_dia.isoformat(), "clinica_id": clinica_id, "servico_id": 1}),
+        Cenario("laudos_lista", "GET", lambda i: "/api/v1/laudos", {"limit": 100}),
+        Cenario("financeiro_resumo", "GET", lambda i: "/api/v1/financeiro/resumo", {"periodo": "ano"}),
+        Cenario("financeiro_fluxo_caixa", "GET", lambda i: "/api/v1/financeiro/relatorios/fluxo-caixa",
+                {"data_inicio": inicio_ano.isoformat(), "data_fim": hoje.isoformat()}),
+        Cenario("financeiro_dre", "GET", lambda i: "/api/v1/financeiro/relatorios/dre",
+                {"data_inicio": inicio_ano.isoformat(), "data_fim": hoje.isoformat()}),
+        Cenario("financeiro_comparativo", "GET", lambda i: "/api/v1/financeiro/relatorios/comparativo-mensal",
+                {"meses": 12}),
+        Cenario("busca", "GET", lambda i: "/api/v1/busca", {"q": "thor silva"}),
+    ]
+    if laudo_ids:
+        # Um laudo diferente por execucao: mede a renderizacao, nao o cache de PDF.
+        cenarios.append(
+            Cenario("laudo_pdf", "GET", lambda i: f"/api/v1/laudos/{laudo_ids[i % len(laudo_ids)]}/pdf",
+                    repeticoes=min(len(laudo_ids), 10))
+        )
+    return cenarios
+
+
+def executar_cenario(client, cenario: Cenario, token: str, repeticoes: int, aquecimento: int) -> Dict[str, Any]:
+    from app.core.diagnostico_sql import monitorar_consultas
+
+    headers = {"Authorization": f"Bearer {token}"}
+    total = cenario.repeticoes or repeticoes
+    latencias: List[float] = []
+    consultas: List[int] = []
+    status: Dict[str, int] = {}
+
+    for indice in range(aquecimento + total):
+        with monitorar_consultas() as coleta:
+            inicio = time.perf_counter()
+            try:
+                resposta = client.request(
+                    cenario.metodo, cenario.caminho(indice), params=cenario.params, json=cenario.json, headers=headers
+                )
+                codigo = str(resposta.status_code)
+            except Exception as exc:
+                codigo = f"erro:{type(exc).__name__}"
+            duracao = time.perf_counter() - inicio
+        if indice < aquecimento:
+            continue
+        status[codigo] = status.get(codigo, 0) + 1
+        # Falha nao entra na latencia: mediria o erro, nao o endpoint.
+        if codigo.startswith("2"):
+            latencias.append(duracao * 1000)
+            consultas.append(coleta.total)
+
+    medicao = {
+        "repeticoes": total,
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "media_ms": round(sum(latencias) / len(latencias), 2) if latencias else 0.0,
+        "max_ms": round(max(latencias), 2) if latencias else 0.0,
+        "consultas_p50": percentil(consultas, 50),
+        "consultas_max": max(consultas) if consultas else 0,
+        "status": status,
+    }
+    medicao["falhas"] = contar_falhas(medicao)
+    return medicao
+
+
+def comparar(base: Dict[str, Any], novo: Dict[str, Any], tolerancia: float) -> tuple[str, bool]:
+    """Tabela de diferencas e se algum p95/consultas piorou alem da tolerancia (%).
+
+    Cenario com execucoes que falharam (nao 2xx ou excecao) em qualquer dos
+    lados conta como regressao: a latencia dele nao mede o endpoint.
+    """
+    linhas = [f"{'cenario':28} {'p95 antes':>10} {'p95 depois':>11} {'delta':>8} {'consultas':>12}"]
+    regrediu = False
+    for nome in sorted(set(base["cenarios"]) | set(novo["cenarios"])):
+        antes = base["cenarios"].get(nome)
+        depois = novo["cenarios"].get(nome)
+        if not antes or not depois:
+            linhas.append(f"{nome:28} {'(so em ' + ('depois' if depois else 'antes') + ')':>10}")
+            continue
+        falhas_antes, falhas_depois = contar_falhas(antes), contar_falhas(depois)
+        if falhas_antes or falhas_depois:
+            regrediu = True
+            status = depois.get("status") if falhas_depois else antes.get("status")
+            linhas.append(f"{nome:28} falhas {falhas_antes}->{falhas_depois} {status}  <-- regressao")
+            continue
+        delta = (depois["p95_ms"] - antes["p95_ms"]) / antes["p95_ms"] * 100 if antes["p95_ms"] else 0.0
+        consultas = f"{antes['consultas_max']}->{depois['consultas_max']}"
+        marca = ""
+        if delta > tolerancia or depois["consultas_max"] > antes["consultas_max"]:
+            regrediu = True
+            marca = "  <-- regressao"
+        linhas.append(
+            f"{nome:28} {antes['p95_ms']:>10.1f} {depois['p95_ms']:>11.1f} {delta:>+7.1f}% {consultas:>12}{marca}"
+        )
+    return "\n".join(linhas), regrediu
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark dos endpoints com base sintetica.")
+    parser.add_argument("--perfil", default="pequeno", help="Perfil do gerador de dados (benchmarks.dados_sinteticos).")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--aquecimento", type=int, default=2)
+    parser.add_argument("--cenario", action="append", default=[], help="Roda so os cenarios informados.")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON do resultado.")
+    parser.add_argument("--reusar-base", action="store_true", help="Nao gera dados (base ja populada).")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"), help="Compara dois resultados.")
+    parser.add_argument("--tolerancia", type=float, default=20.0, help="Regressao aceita no p95 (%%).")
+    return parser.parse_args(argv)
+
+
+def _preparar_ambiente(tmp_dir: str) -> None:
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmp_dir}/benchmark.db")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-0123456789-abcdefghijklmnop")
+    os.environ.setdefault("UPLOAD_DIR", tmp_dir)
+    # Auditoria sincrona: nenhum custo fica escondido numa thread de fundo.
+    os.environ.setdefault("AUDITORIA_MODO", "sync")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    if args.comparar:
+        antes, depois = (json.loads(Path(caminho).read_text(encoding="utf-8")) for caminho in args.comparar)
+        tabela, regrediu = comparar(antes, depois, args.tolerancia)
+        print(tabela)
+        return 1 if regrediu else 0
+
+    with tempfile.TemporaryDirectory(prefix="fortcordis-bench-") as tmp_dir:
+        _preparar_ambiente(tmp_dir)
+
+        from fastapi.testclient import TestClient
+
+        from app.db.database import SessionLocal, engine
+        from app.main import app
+        from benchmarks.dados_sinteticos import PERFIS, gerar_dados, preparar_schema
+
+        if args.perfil not in PERFIS:
+            print(f"Perfil desconhecido: {args.perfil} ({', '.join(sorted(PERFIS))})", file=sys.stderr)
+            return 2
+
+        preparar_schema(engine)
+        contagens = None
+        if not args.reusar_base:
+            contagens = gerar_dados(engine, PERFIS[args.perfil])
+            print(f"[benchmark] base gerada em {contagens['duracao_s']}s: {contagens['tabelas']}")
+
+        db = SessionLocal()
+        try:
+            token = _garantir_usuario_admin(db)
+            cenarios = montar_cenarios(db, date.today())
+        finally:
+            db.close()
+        if args.cenario:
+            cenarios = [cenario for cenario in cenarios if cenario.nome in set(args.cenario)]
+
+        client = TestClient(app)
+        resultado = {
+            "gerado_em": datetime.now(timezone.utc).isoformat(),
+            "commit": _commit_atual(),
+            "dialeto": engine.dialect.name,
+            "perfil": args.perfil,
+            "dados": contagens["tabelas"] if contagens else None,
+            "cenarios": {},
+        }
+        falhas = 0
+        for cenario in cenarios:
+            medicao = executar_cenario(client, cenario, token, args.repeticoes, args.aquecimento)
+            resultado["cenarios"][cenario.nome] = medicao
+            falhas += medicao["falhas"]
+            print(
+                f"[benchmark] {cenario.nome:26} p50={medicao['p50_ms']:>8.1f}ms "
+                f"p95={medicao['p95_ms']:>8.1f}ms consultas={medicao['consultas_max']:>4} {medicao['status']}"
+            )
+        engine.dispose()
+
+    saida = Path(args.saida) if args.saida else RESULTADOS_DIR / f"{resultado['dialeto']}-{args.perfil}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(resultado, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"[benchmark] resultado em {saida}")
+    if falhas:
+        print(f"[benchmark] {falhas} execucoes falharam (status nao 2xx ou excecao)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
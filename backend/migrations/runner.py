@@ -9,7 +9,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from importlib import util
 from pathlib import Path
-from typing import Callable, List, Set
+from threading import Lock
+from typing import Callable, Dict, List, Set, Tuple
 
 from sqlalchemy import inspect, text
 from sqlalchemy.engine import Connection
@@ -27,6 +28,12 @@ class Migration:
     source: Path
 
 
+# Migration modules only change with a deploy (i.e. a restart), so they are
+# loaded once per directory instead of on every readiness check.
+_DISCOVERED: Dict[Path, Tuple[Migration, ...]] = {}
+_DISCOVERY_LOCK = Lock()
+
+
 def _load_migration(module_path: Path) -> Migration:
     module_name = f"migrations.versions.{module_path.stem}"
     spec = util.spec_from_file_location(module_name, module_path)
@@ -54,13 +61,13 @@ def _load_migration(module_path: Path) -> Migration:
     )
 
 
-def _discover_migrations() -> List[Migration]:
-    if not VERSIONS_DIR.exists():
+def _load_all_migrations(versions_dir: Path) -> List[Migration]:
+    if not versions_dir.exists():
         return []
 
     migrations: List[Migration] = []
     seen_versions: Set[str] = set()
-    for file_path in sorted(VERSIONS_DIR.glob("*.py")):
+    for file_path in sorted(versions_dir.glob("*.py")):
         if file_path.name == "__init__.py":
             continue
         migration = _load_migration(file_path)
@@ -71,6 +78,23 @@ def _discover_migrations() -> List[Migration]:
     return migrations
 
 
+def _discover_migrations() -> List[Migration]:
+    versions_dir = VERSIONS_DIR
+    cached = _DISCOVERED.get(versions_dir)
+    if cached is None:
+        with _DISCOVERY_LOCK:
+            cached = _DISCOVERED.get(versions_dir)
+            if cached is None:
+                cached = tuple(_load_all_migrations(versions_dir))
+                _DISCOVERED[versions_dir] = cached
+    return list(cached)
+
+
+def clear_migration_cache() -> None:
+    with _DISCOVERY_LOCK:
+        _DISCOVERED.clear()
+
+
 def list_migrations() -> List[Migration]:
     return _discover_migrations()
 
@@ -105,7 +129,7 @@ def get_migration_status() -> dict:
     tracking_table_exists = False
     with engine.connect() as connection:
         inspector = inspect(connection)
-        tracking_table_exists = "schema_migrations" in inspector.get_table_names()
+        tracking_table_exists = inspector.has_table("schema_migrations")
         if tracking_table_exists:
             rows = connection.execute(text("SELECT version FROM schema_migrations")).fetchall()
             applied_versions = {str(row[0]) for row in rows}
@@ -0,0 +1,34 @@
+"""Adds content hash columns used as key for the image thumbnail cache."""
+from __future__ import annotations
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260315_11"
+DESCRIPTION = "Adiciona hash de conteudo nas imagens para cache de miniaturas"
+
+
+def _table_exists(connection: Connection, table_name: str) -> bool:
+    return table_name in inspect(connection).get_table_names()
+
+
+def _column_names(connection: Connection, table_name: str) -> set[str]:
+    return {column["name"] for column in inspect(connection).get_columns(table_name)}
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    for table_name in ("imagens_laudo", "imagens_temporarias"):
+        if not _table_exists(connection, table_name):
+            continue
+        if "conteudo_sha256" not in _column_names(connection, table_name):
+            connection.execute(
+                text(f"ALTER TABLE {table_name} ADD COLUMN conteudo_sha256 VARCHAR(64)")
+            )
+
+    if _table_exists(connection, "imagens_laudo"):
+        connection.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_imagens_laudo_conteudo_sha256 "
+                "ON imagens_laudo (conteudo_sha256)"
+            )
+        )
@@ -0,0 +1,160 @@
+"""Search indexes for pacientes, tutores and clinicas (pg_trgm / FTS5)."""
+from __future__ import annotations
+
+import re
+import unicodedata
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260316_12"
+DESCRIPTION = "Indices de busca textual (pg_trgm no Postgres, FTS5 no SQLite)"
+
+TABELAS_BUSCA = ("pacientes", "tutores", "clinicas")
+
+# Mesmo tokenizer usado em app/services/busca_service.py.
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+
+
+def _table_exists(connection: Connection, table_name: str) -> bool:
+    return table_name in inspect(connection).get_table_names()
+
+
+def _column_names(connection: Connection, table_name: str) -> set[str]:
+    return {column["name"] for column in inspect(connection).get_columns(table_name)}
+
+
+def _gerar_nome_key(nome: str | None) -> str:
+    if not nome:
+        return ""
+    texto = unicodedata.normalize("NFKD", nome)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.lower().strip()
+    texto = re.sub(r"[^a-z0-9\s]", "", texto)
+    texto = re.sub(r"\s+", " ", texto)
+    return texto
+
+
+def _backfill_nome_key(connection: Connection, table_name: str, unique: bool) -> None:
+    rows = connection.execute(
+        text(f"SELECT id, nome FROM {table_name} WHERE nome_key IS NULL AND nome IS NOT NULL")
+    ).fetchall()
+    if not rows:
+        return
+
+    usadas: set[str] = set()
+    if unique:
+        # Tutores legados tem indice unico em nome_key: homonimos ficam sem chave.
+        usadas = {
+            str(row[0])
+            for row in connection.execute(
+                text(f"SELECT nome_key FROM {table_name} WHERE nome_key IS NOT NULL")
+            ).fetchall()
+        }
+
+    updates = []
+    for row_id, nome in rows:
+        nome_key = _gerar_nome_key(nome)
+        if not nome_key or nome_key in usadas:
+            continue
+        if unique:
+            usadas.add(nome_key)
+        updates.append({"id": row_id, "nome_key": nome_key})
+
+    if updates:
+        connection.execute(
+            text(f"UPDATE {table_name} SET nome_key = :nome_key WHERE id = :id"),
+            updates,
+        )
+
+
+def _upgrade_postgres(connection: Connection) -> None:
+    disponivel = connection.execute(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first()
+    if not disponivel:
+        print("[Migrations] pg_trgm indisponivel; busca segue com LIKE sem indice.")
+        return
+
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as exc:
+        print(f"[Migrations] Sem permissao para pg_trgm ({exc}); busca segue com LIKE.")
+        return
+
+    for table_name in TABELAS_BUSCA:
+        if not _table_exists(connection, table_name):
+            continue
+        connection.execute(
+            text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table_name}_nome_key_trgm "
+                f"ON {table_name} USING gin (nome_key gin_trgm_ops)"
+            )
+        )
+
+
+def _fts5_disponivel(connection: Connection) -> bool:
+    try:
+        with connection.begin_nested():
+            connection.execute(
+                text(f"CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x, tokenize='{FTS_TOKENIZER}')")
+            )
+            connection.execute(text("DROP TABLE temp.fts5_probe"))
+        return True
+    except Exception:
+        return False
+
+
+def _upgrade_sqlite(connection: Connection) -> None:
+    if not _fts5_disponivel(connection):
+        print("[Migrations] SQLite sem FTS5; busca segue com LIKE.")
+        return
+
+    for table_name in TABELAS_BUSCA:
+        if not _table_exists(connection, table_name):
+            continue
+        fts = f"{table_name}_fts"
+        # Tabela FTS5 de conteudo externo: guarda so o indice, o texto vem da
+        # tabela original. Triggers mantem o indice em sincronia.
+        connection.execute(
+            text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"nome, content='{table_name}', content_rowid='id', "
+                f"tokenize='{FTS_TOKENIZER}')"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+                f"INSERT INTO {fts}(rowid, nome) VALUES (new.id, new.nome); END"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, nome) VALUES ('delete', old.id, old.nome); END"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF nome ON {table_name} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, nome) VALUES ('delete', old.id, old.nome); "
+                f"INSERT INTO {fts}(rowid, nome) VALUES (new.id, new.nome); END"
+            )
+        )
+        connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    if _table_exists(connection, "clinicas") and "nome_key" not in _column_names(connection, "clinicas"):
+        connection.execute(text("ALTER TABLE clinicas ADD COLUMN nome_key TEXT"))
+
+    for table_name in TABELAS_BUSCA:
+        if _table_exists(connection, table_name) and "nome_key" in _column_names(connection, table_name):
+            _backfill_nome_key(connection, table_name, unique=table_name == "tutores")
+
+    if dialect == "postgresql":
+        _upgrade_postgres(connection)
+    elif dialect == "sqlite":
+        _upgrade_sqlite(connection)
@@ -0,0 +1,117 @@
+"""Structured JSON columns on laudos (medidas, qualitativa, pressao arterial) + backfill."""
+from __future__ import annotations
+
+import json
+import re
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260317_13"
+DESCRIPTION = "Colunas JSON estruturadas em laudos (medidas, qualitativa, pressao) com backfill"
+
+COLUNAS = ("medidas_json", "qualitativa_json", "pressao_arterial_json")
+BATCH_SIZE = 500
+
+# Mesma extracao de app/utils/laudo_dados.py (migracao nao depende do app).
+TIPOS_SEM_MEDIDAS_ECO = ("pressao_arterial", "ultrassonografia_abdominal")
+CAMPOS_QUALITATIVA_ECO = ("valvas", "camaras", "funcao", "pericardio", "vasos", "ad_vd")
+_MEDIDA_RE = re.compile(r"-\s*([\w_]+):\s*([\d.,]+)")
+_QUALITATIVA_SECAO_RE = re.compile(
+    r"Avalia(?:ç|c)(?:ã|a)o Qualitativa[\s\n]*(-.*?)(?=\n##|\Z)",
+    re.DOTALL,
+)
+_QUALITATIVA_ITEM_RE = re.compile(r"-\s*(\w+):?\s*(.+?)(?=\n-|\Z)", re.DOTALL)
+
+
+def _column_names(connection: Connection, table_name: str) -> set[str]:
+    return {column["name"] for column in inspect(connection).get_columns(table_name)}
+
+
+def _medidas(descricao: str) -> dict:
+    medidas = {}
+    for match in _MEDIDA_RE.finditer(descricao):
+        try:
+            medidas[match.group(1)] = float(match.group(2).replace(",", "."))
+        except ValueError:
+            continue
+    return medidas
+
+
+def _qualitativa(descricao: str) -> dict:
+    secao = _QUALITATIVA_SECAO_RE.search(descricao)
+    if not secao:
+        return {}
+    qualitativa = {}
+    for match in _QUALITATIVA_ITEM_RE.finditer(secao.group(1)):
+        campo = match.group(1).lower().strip()
+        if campo in CAMPOS_QUALITATIVA_ECO:
+            qualitativa[campo] = match.group(2).strip()
+    return qualitativa
+
+
+def _pressao(anexos: str | None) -> dict:
+    if not anexos or not str(anexos).strip():
+        return {}
+    try:
+        parsed = json.loads(anexos)
+    except (TypeError, ValueError):
+        return {}
+    pressao = parsed.get("pressao_arterial") if isinstance(parsed, dict) else None
+    return pressao if isinstance(pressao, dict) else {}
+
+
+def _json_ou_none(valor: dict) -> str | None:
+    return json.dumps(valor, ensure_ascii=False) if valor else None
+
+
+def _backfill(connection: Connection, dialect: str) -> None:
+    valor_sql = "CAST(:{0} AS JSONB)" if dialect == "postgresql" else ":{0}"
+    update_sql = text(
+        "UPDATE laudos SET "
+        + ", ".join(f"{coluna} = {valor_sql.format(coluna)}" for coluna in COLUNAS)
+        + " WHERE id = :id"
+    )
+
+    ultimo_id = 0
+    while True:
+        rows = connection.execute(
+            text(
+                "SELECT id, tipo, descricao, anexos FROM laudos "
+                "WHERE id > :ultimo_id AND medidas_json IS NULL "
+                "AND qualitativa_json IS NULL AND pressao_arterial_json IS NULL "
+                "ORDER BY id LIMIT :limite"
+            ),
+            {"ultimo_id": ultimo_id, "limite": BATCH_SIZE},
+        ).fetchall()
+        if not rows:
+            return
+        ultimo_id = rows[-1][0]
+
+        updates = []
+        for row_id, tipo, descricao, anexos in rows:
+            eco = str(tipo or "").lower() not in TIPOS_SEM_MEDIDAS_ECO
+            descricao = str(descricao or "")
+            valores = {
+                "medidas_json": _json_ou_none(_medidas(descricao)) if eco else None,
+                "qualitativa_json": _json_ou_none(_qualitativa(descricao)) if eco else None,
+                "pressao_arterial_json": _json_ou_none(_pressao(anexos)),
+            }
+            if any(valores.values()):
+                updates.append({"id": row_id, **valores})
+
+        if updates:
+            connection.execute(update_sql, updates)
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    if "laudos" not in inspect(connection).get_table_names():
+        return
+
+    tipo_coluna = "JSONB" if dialect == "postgresql" else "JSON"
+    existentes = _column_names(connection, "laudos")
+    for coluna in COLUNAS:
+        if coluna not in existentes:
+            connection.execute(text(f"ALTER TABLE laudos ADD COLUMN {coluna} {tipo_coluna}"))
+
+    _backfill(connection, dialect)
@@ -0,0 +1,172 @@
+"""Keyset index on auditoria_eventos and monthly RANGE partitioning on PostgreSQL."""
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260318_14"
+DESCRIPTION = "Indice (created_at, id) em auditoria_eventos e particionamento mensal no PostgreSQL"
+
+# Mesmo valor de app/services/auditoria_arquivo.py (migracao nao depende do app).
+MESES_A_FRENTE = 2
+
+COLUNAS = (
+    "id",
+    "usuario_id",
+    "usuario_nome",
+    "usuario_email",
+    "modulo",
+    "entidade",
+    "entidade_id",
+    "acao",
+    "descricao",
+    "detalhes_json",
+    "ip_origem",
+    "rota",
+    "metodo",
+    "created_at",
+)
+INDICES = (
+    ("ix_auditoria_eventos_created_at_id", "created_at, id"),
+    ("ix_auditoria_eventos_usuario_id", "usuario_id"),
+    ("ix_auditoria_eventos_modulo", "modulo"),
+    ("ix_auditoria_eventos_acao", "acao"),
+    ("ix_auditoria_eventos_entidade", "entidade"),
+    ("ix_auditoria_eventos_entidade_id", "entidade_id"),
+)
+
+
+def _inicio_do_mes(valor: date) -> date:
+    return date(valor.year, valor.month, 1)
+
+
+def _proximo_mes(mes: date) -> date:
+    return date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+
+
+def _criar_particoes(connection: Connection, primeiro: date, ultimo: date) -> None:
+    mes = _inicio_do_mes(primeiro)
+    while mes <= ultimo:
+        seguinte = _proximo_mes(mes)
+        connection.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS auditoria_eventos_p{mes:%Y%m} "
+                f"PARTITION OF auditoria_eventos "
+                f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{seguinte.isoformat()}')"
+            )
+        )
+        mes = seguinte
+
+
+def _particionar_postgres(connection: Connection) -> None:
+    relkind = connection.execute(
+        text(
+            "SELECT c.relkind FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = 'auditoria_eventos' AND n.nspname = current_schema()"
+        )
+    ).scalar()
+    if relkind == "p":
+        return
+
+    tipo_created_at = connection.execute(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = 'auditoria_eventos' "
+            "AND column_name = 'created_at'"
+        )
+    ).scalar()
+    tipo_created_at = "TIMESTAMPTZ" if "with time zone" in str(tipo_created_at or "") else "TIMESTAMP"
+
+    sequencia = connection.execute(text("SELECT pg_get_serial_sequence('auditoria_eventos', 'id')")).scalar()
+    if not sequencia:
+        sequencia = "auditoria_eventos_id_seq"
+        connection.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {sequencia}"))
+        connection.execute(
+            text(f"SELECT setval('{sequencia}', COALESCE((SELECT MAX(id) FROM auditoria_eventos), 0) + 1, false)")
+        )
+
+    pkey = connection.execute(
+        text(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = 'auditoria_eventos'::regclass AND contype = 'p'"
+        )
+    ).scalar()
+
+    # A tabela antiga sai do caminho mantendo dados e sequencia; nomes de
+    # constraint/indice sao unicos por schema, por isso o rename da PK.
+    connection.execute(text("ALTER TABLE auditoria_eventos RENAME TO auditoria_eventos_legado"))
+    if pkey:
+        connection.execute(
+            text(f'ALTER TABLE auditoria_eventos_legado RENAME CONSTRAINT "{pkey}" TO auditoria_eventos_legado_pkey')
+        )
+    connection.execute(text(f"ALTER SEQUENCE {sequencia} OWNED BY NONE"))
+
+    connection.execute(
+        text(
+            f"""
+            CREATE TABLE auditoria_eventos (
+                id INTEGER NOT NULL DEFAULT nextval('{sequencia}'::regclass),
+                usuario_id INTEGER NULL,
+                usuario_nome VARCHAR(255) NULL,
+                usuario_email VARCHAR(255) NULL,
+                modulo VARCHAR(80) NOT NULL,
+                entidade VARCHAR(80) NOT NULL,
+                entidade_id VARCHAR(80) NULL,
+                acao VARCHAR(80) NOT NULL,
+                descricao TEXT NULL,
+                detalhes_json TEXT NULL,
+                ip_origem VARCHAR(64) NULL,
+                rota VARCHAR(255) NULL,
+                metodo VARCHAR(10) NULL,
+                created_at {tipo_created_at} NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+            """
+        )
+    )
+    # Rede de seguranca para datas fora das particoes mensais.
+    connection.execute(text("CREATE TABLE auditoria_eventos_padrao PARTITION OF auditoria_eventos DEFAULT"))
+
+    menor, maior = connection.execute(
+        text("SELECT MIN(created_at), MAX(created_at) FROM auditoria_eventos_legado")
+    ).one()
+    hoje = date.today()
+    ultimo = _inicio_do_mes(hoje)
+    for _ in range(MESES_A_FRENTE):
+        ultimo = _proximo_mes(ultimo)
+    _criar_particoes(
+        connection,
+        menor.date() if menor is not None else hoje,
+        max(ultimo, _inicio_do_mes(maior.date())) if maior is not None else ultimo,
+    )
+
+    colunas = ", ".join(COLUNAS)
+    connection.execute(
+        text(f"INSERT INTO auditoria_eventos ({colunas}) SELECT {colunas} FROM auditoria_eventos_legado")
+    )
+    connection.execute(text("DROP TABLE auditoria_eventos_legado"))
+    connection.execute(text(f"ALTER SEQUENCE {sequencia} OWNED BY auditoria_eventos.id"))
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    if "auditoria_eventos" not in inspect(connection).get_table_names():
+        return
+
+    if dialect == "postgresql":
+        _particionar_postgres(connection)
+    else:
+        # CURRENT_TIMESTAMP grava sem fracao de segundo e o SQLAlchemy grava
+        # com microssegundos; o cursor da listagem compara o texto, entao os
+        # dois formatos precisam ordenar igual.
+        connection.execute(
+            text(
+                "UPDATE auditoria_eventos SET created_at = created_at || '.000000' "
+                "WHERE typeof(created_at) = 'text' AND length(created_at) = 19"
+            )
+        )
+
+    for nome, colunas in INDICES:
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {nome} ON auditoria_eventos ({colunas})"))
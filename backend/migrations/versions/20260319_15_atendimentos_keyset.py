@@ -0,0 +1,23 @@
+"""Composite index for keyset pagination of atendimentos_clinicos."""
+from __future__ import annotations
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260319_15"
+DESCRIPTION = "Indice (data_atendimento, id) para paginacao por cursor dos atendimentos"
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    _ = dialect
+    tabelas = set(inspect(connection).get_table_names())
+    if "atendimentos_clinicos" in tabelas:
+        connection.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_atendimentos_clinicos_data_id "
+                "ON atendimentos_clinicos (data_atendimento, id)"
+            )
+        )
+    if "exames" in tabelas:
+        # Ja criado pela 20260225_11; garante em bases que pularam aquela etapa.
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_exames_atendimento_id ON exames (atendimento_id)"))
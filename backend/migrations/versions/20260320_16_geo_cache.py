@@ -0,0 +1,42 @@
+"""Persistent cache for external geo lookups (Google, ViaCEP)."""
+from __future__ import annotations
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260320_16"
+DESCRIPTION = "Cache persistente de consultas geo externas (Google Routes/Distance Matrix, Geocoding, ViaCEP)"
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    if "geo_cache" not in inspect(connection).get_table_names():
+        if dialect == "postgresql":
+            id_coluna = "id SERIAL PRIMARY KEY"
+            tipo_data = "TIMESTAMP"
+            agora = "NOW()"
+            tipo_sucesso = "BOOLEAN NOT NULL DEFAULT true"
+        else:
+            id_coluna = "id INTEGER PRIMARY KEY AUTOINCREMENT"
+            tipo_data = "DATETIME"
+            agora = "CURRENT_TIMESTAMP"
+            tipo_sucesso = "INTEGER NOT NULL DEFAULT 1"
+        connection.execute(
+            text(
+                f"""
+                CREATE TABLE geo_cache (
+                    {id_coluna},
+                    provedor VARCHAR(40) NOT NULL,
+                    chave VARCHAR(64) NOT NULL,
+                    requisicao TEXT NOT NULL,
+                    resposta TEXT,
+                    sucesso {tipo_sucesso},
+                    erro TEXT,
+                    created_at {tipo_data} DEFAULT {agora},
+                    expires_at {tipo_data} NOT NULL,
+                    CONSTRAINT uq_geo_cache_provedor_chave UNIQUE (provedor, chave)
+                )
+                """
+            )
+        )
+
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_geo_cache_expires_at ON geo_cache (expires_at)"))
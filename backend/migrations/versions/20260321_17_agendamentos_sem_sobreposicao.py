@@ -0,0 +1,82 @@
+"""Index-backed overlap checks for agendamentos (+ exclusion constraint on Postgres)."""
+from __future__ import annotations
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260321_17"
+DESCRIPTION = "Indice em agendamentos.inicio e, no Postgres, constraint de exclusao contra sobreposicao de horarios"
+
+CONSTRAINT = "ex_agendamentos_sem_sobreposicao"
+
+
+def _tipo_range(connection: Connection) -> str:
+    # tstzrange sobre "timestamp without time zone" dependeria do TimeZone da
+    # sessao (nao imutavel) e o Postgres recusaria o indice.
+    tipo = connection.execute(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'agendamentos' AND column_name = 'inicio' "
+            "AND table_schema = current_schema()"
+        )
+    ).scalar()
+    return "tstzrange" if tipo == "timestamp with time zone" else "tsrange"
+
+
+def _criar_constraint_postgres(connection: Connection) -> None:
+    existe = connection.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :nome"), {"nome": CONSTRAINT}
+    ).scalar()
+    if existe:
+        return
+
+    # A aplicacao ja trata fim ausente/invalido como inicio + 30 min; gravar isso
+    # deixa a faixa [inicio, fim) sempre definida para a constraint.
+    connection.execute(
+        text(
+            "UPDATE agendamentos SET fim = inicio + INTERVAL '30 minutes' "
+            "WHERE inicio IS NOT NULL AND (fim IS NULL OR fim <= inicio)"
+        )
+    )
+
+    conflitos = connection.execute(
+        text(
+            """
+            SELECT a.id, b.id
+            FROM agendamentos a
+            JOIN agendamentos b
+              ON a.id < b.id
+             AND b.inicio < a.fim
+             AND a.inicio < b.fim
+            WHERE a.status <> 'Cancelado' AND b.status <> 'Cancelado'
+            LIMIT 10
+            """
+        )
+    ).fetchall()
+    if conflitos:
+        pares = ", ".join(f"{a}x{b}" for a, b in conflitos)
+        print(
+            f"[migrations] WARN: {CONSTRAINT} nao criada; agendamentos sobrepostos ja existentes ({pares}). "
+            "A validacao da aplicacao continua ativa; resolva os conflitos e crie a constraint manualmente."
+        )
+        return
+
+    funcao = _tipo_range(connection)
+    connection.execute(
+        text(
+            f"""
+            ALTER TABLE agendamentos ADD CONSTRAINT {CONSTRAINT}
+            EXCLUDE USING gist ({funcao}(inicio, fim, '[)') WITH &&)
+            WHERE (status <> 'Cancelado' AND fim > inicio)
+            """
+        )
+    )
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    if "agendamentos" not in inspect(connection).get_table_names():
+        return
+
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_agendamentos_inicio ON agendamentos (inicio)"))
+    if dialect == "postgresql":
+        _criar_constraint_postgres(connection)
@@ -0,0 +1,14 @@
+"""Index on agendamentos.data for day/month filters (agenda list and month calendar)."""
+from __future__ import annotations
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260322_18"
+DESCRIPTION = "Indice em agendamentos.data para listagem por periodo e calendario mensal"
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    _ = dialect
+    if "agendamentos" in inspect(connection).get_table_names():
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_agendamentos_data ON agendamentos (data)"))
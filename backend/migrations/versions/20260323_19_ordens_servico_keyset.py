@@ -0,0 +1,20 @@
+"""Composite index for keyset pagination of ordens_servico."""
+from __future__ import annotations
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260323_19"
+DESCRIPTION = "Indice (data_atendimento, id) para paginacao por cursor das ordens de servico"
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    if "ordens_servico" not in inspect(connection).get_table_names():
+        return
+    if dialect == "postgresql":
+        # Mesma ordem da listagem (DESC NULLS LAST); no Postgres o DESC padrao poe NULL primeiro.
+        colunas = "data_atendimento DESC NULLS LAST, id DESC"
+    else:
+        # No SQLite NULL e o menor valor: a varredura reversa ja o deixa por ultimo.
+        colunas = "data_atendimento, id"
+    connection.execute(text(f"CREATE INDEX IF NOT EXISTS ix_ordens_servico_data_id ON ordens_servico ({colunas})"))
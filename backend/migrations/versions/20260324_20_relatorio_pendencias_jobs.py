@@ -0,0 +1,53 @@
+"""Adds persisted async jobs for the per-clinic pendencias billing report."""
+from __future__ import annotations
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260324_20"
+DESCRIPTION = "Adiciona jobs persistidos para o relatorio de cobranca de pendencias por clinica"
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    if "relatorio_pendencias_jobs" not in inspect(connection).get_table_names():
+        if dialect == "postgresql":
+            id_coluna = "id SERIAL PRIMARY KEY"
+            tipo_data = "TIMESTAMP"
+            agora = "NOW()"
+        else:
+            id_coluna = "id INTEGER PRIMARY KEY AUTOINCREMENT"
+            tipo_data = "DATETIME"
+            agora = "CURRENT_TIMESTAMP"
+        connection.execute(
+            text(
+                f"""
+                CREATE TABLE relatorio_pendencias_jobs (
+                    {id_coluna},
+                    requested_by_id INTEGER NOT NULL,
+                    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                    formato VARCHAR(10) NOT NULL DEFAULT 'zip',
+                    filtros_json TEXT,
+                    cache_key VARCHAR(64),
+                    total_clinicas INTEGER NOT NULL DEFAULT 0,
+                    clinicas_renderizadas INTEGER NOT NULL DEFAULT 0,
+                    clinicas_reaproveitadas INTEGER NOT NULL DEFAULT 0,
+                    arquivo_nome VARCHAR(255),
+                    arquivo_caminho VARCHAR(500),
+                    erro TEXT,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    created_at {tipo_data} NOT NULL DEFAULT {agora},
+                    started_at {tipo_data},
+                    finished_at {tipo_data},
+                    expires_at {tipo_data}
+                )
+                """
+            )
+        )
+
+    for coluna in ("requested_by_id", "status"):
+        connection.execute(
+            text(
+                f"CREATE INDEX IF NOT EXISTS ix_relatorio_pendencias_jobs_{coluna} "
+                f"ON relatorio_pendencias_jobs ({coluna})"
+            )
+        )
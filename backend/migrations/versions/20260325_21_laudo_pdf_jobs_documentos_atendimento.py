@@ -0,0 +1,67 @@
+"""Lets laudo_pdf_jobs also hold atendimento prescription/exam PDFs."""
+from __future__ import annotations
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260325_21"
+DESCRIPTION = "Jobs de PDF passam a gerar receita e solicitacao de exames do atendimento (documento, atendimento_id)"
+
+COLUNAS = (
+    "id, laudo_id, requested_by_id, status, cache_key, arquivo_nome, arquivo_caminho, "
+    "erro, tentativas, created_at, started_at, finished_at, expires_at"
+)
+
+
+def _recriar_tabela_sqlite(connection: Connection) -> None:
+    # SQLite nao remove NOT NULL de coluna existente: recria a tabela copiando os jobs.
+    connection.execute(text("ALTER TABLE laudo_pdf_jobs RENAME TO laudo_pdf_jobs_antiga"))
+    connection.execute(
+        text(
+            """
+            CREATE TABLE laudo_pdf_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                documento VARCHAR(20) NOT NULL DEFAULT 'laudo',
+                laudo_id INTEGER,
+                atendimento_id INTEGER,
+                requested_by_id INTEGER NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                cache_key VARCHAR(64) NOT NULL,
+                arquivo_nome VARCHAR(255),
+                arquivo_caminho VARCHAR(500),
+                erro TEXT,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                started_at DATETIME,
+                finished_at DATETIME,
+                expires_at DATETIME
+            )
+            """
+        )
+    )
+    connection.execute(
+        text(f"INSERT INTO laudo_pdf_jobs ({COLUNAS}) SELECT {COLUNAS} FROM laudo_pdf_jobs_antiga")
+    )
+    connection.execute(text("DROP TABLE laudo_pdf_jobs_antiga"))
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    inspector = inspect(connection)
+    if "laudo_pdf_jobs" not in inspector.get_table_names():
+        return
+
+    colunas = {coluna["name"] for coluna in inspector.get_columns("laudo_pdf_jobs")}
+    if "documento" not in colunas:
+        if dialect == "postgresql":
+            connection.execute(
+                text("ALTER TABLE laudo_pdf_jobs ADD COLUMN documento VARCHAR(20) NOT NULL DEFAULT 'laudo'")
+            )
+            connection.execute(text("ALTER TABLE laudo_pdf_jobs ADD COLUMN atendimento_id INTEGER"))
+            connection.execute(text("ALTER TABLE laudo_pdf_jobs ALTER COLUMN laudo_id DROP NOT NULL"))
+        else:
+            _recriar_tabela_sqlite(connection)
+
+    for coluna in ("laudo_id", "requested_by_id", "status", "cache_key", "documento", "atendimento_id"):
+        connection.execute(
+            text(f"CREATE INDEX IF NOT EXISTS ix_laudo_pdf_jobs_{coluna} ON laudo_pdf_jobs ({coluna})")
+        )
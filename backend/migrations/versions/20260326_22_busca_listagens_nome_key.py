@@ -0,0 +1,119 @@
+"""nome_key for every row and trigram FTS5 tables for the name filters of listings."""
+from __future__ import annotations
+
+import re
+import unicodedata
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = "20260326_22"
+DESCRIPTION = "nome_key em todas as linhas e FTS5 trigram para os filtros das listagens"
+
+TABELAS_BUSCA = ("pacientes", "tutores", "clinicas")
+
+# Mesmo tokenizer usado em app/services/busca_service.py (LIKE '%termo%' indexado).
+FTS_TOKENIZER_TRIGRAMA = "trigram"
+
+
+def _gerar_nome_key(nome: str | None) -> str:
+    if not nome:
+        return ""
+    texto = unicodedata.normalize("NFKD", nome)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.lower().strip()
+    texto = re.sub(r"[^a-z0-9\s]", "", texto)
+    texto = re.sub(r"\s+", " ", texto)
+    return texto
+
+
+def _remover_unicidade_nome_key_tutores(connection: Connection, dialect: str) -> None:
+    # Bancos legados tem indice unico em tutores.nome_key, e a 20260316_12
+    # deixou os homonimos sem chave. O cadastro ja deduplica por nome_key no
+    # codigo; o indice passa a ser comum para a chave valer em todas as linhas.
+    inspector = inspect(connection)
+    for indice in inspector.get_indexes("tutores"):
+        if indice.get("unique") and indice.get("column_names") == ["nome_key"]:
+            connection.execute(text(f'DROP INDEX IF EXISTS "{indice["name"]}"'))
+    if dialect == "postgresql":
+        for restricao in inspector.get_unique_constraints("tutores"):
+            if restricao.get("column_names") == ["nome_key"]:
+                connection.execute(text(f'ALTER TABLE tutores DROP CONSTRAINT IF EXISTS "{restricao["name"]}"'))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_tutores_nome_key ON tutores (nome_key)"))
+
+
+def _backfill_nome_key(connection: Connection, table_name: str) -> None:
+    rows = connection.execute(
+        text(f"SELECT id, nome FROM {table_name} WHERE nome_key IS NULL AND nome IS NOT NULL")
+    ).fetchall()
+    updates = [{"id": row_id, "nome_key": _gerar_nome_key(nome)} for row_id, nome in rows]
+    if updates:
+        connection.execute(text(f"UPDATE {table_name} SET nome_key = :nome_key WHERE id = :id"), updates)
+
+
+def _trigram_disponivel(connection: Connection) -> bool:
+    try:
+        with connection.begin_nested():
+            connection.execute(
+                text(f"CREATE VIRTUAL TABLE temp.fts5_trigram_probe USING fts5(x, tokenize='{FTS_TOKENIZER_TRIGRAMA}')")
+            )
+            connection.execute(text("DROP TABLE temp.fts5_trigram_probe"))
+        return True
+    except Exception:
+        return False
+
+
+def _upgrade_sqlite(connection: Connection, tabelas: list[str]) -> None:
+    if not _trigram_disponivel(connection):
+        print("[Migrations] SQLite sem FTS5 trigram; filtros das listagens seguem com LIKE.")
+        return
+
+    for table_name in tabelas:
+        fts = f"{table_name}_nome_key_fts"
+        # Conteudo externo sobre nome_key (sem acento): LIKE '%termo%' com 3+
+        # caracteres usa o indice de trigramas em vez de varrer a tabela.
+        connection.execute(
+            text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"nome_key, content='{table_name}', content_rowid='id', "
+                f"tokenize='{FTS_TOKENIZER_TRIGRAMA}')"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+                f"INSERT INTO {fts}(rowid, nome_key) VALUES (new.id, new.nome_key); END"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, nome_key) VALUES ('delete', old.id, old.nome_key); END"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF nome_key ON {table_name} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, nome_key) VALUES ('delete', old.id, old.nome_key); "
+                f"INSERT INTO {fts}(rowid, nome_key) VALUES (new.id, new.nome_key); END"
+            )
+        )
+        connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def upgrade(connection: Connection, dialect: str) -> None:
+    existentes = set(inspect(connection).get_table_names())
+    tabelas = [
+        table_name
+        for table_name in TABELAS_BUSCA
+        if table_name in existentes
+        and "nome_key" in {column["name"] for column in inspect(connection).get_columns(table_name)}
+    ]
+
+    if "tutores" in tabelas:
+        _remover_unicidade_nome_key_tutores(connection, dialect)
+    for table_name in tabelas:
+        _backfill_nome_key(connection, table_name)
+
+    if dialect == "sqlite":
+        _upgrade_sqlite(connection, tabelas)
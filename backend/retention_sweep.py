@@ -0,0 +1,47 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Remove imagens temporarias expiradas, jobs de PDF/XML vencidos "
+            "e arquivos orfaos do UPLOAD_DIR."
+        ),
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Apenas informa o que seria removido, sem apagar nada.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Quantidade maxima de linhas removidas por transacao.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    backend_dir = Path(__file__).resolve().parent
+    os.chdir(backend_dir)
+    sys.path.insert(0, str(backend_dir))
+
+    from app.services.retention_sweeper import run_retention_sweep
+
+    report = run_retention_sweep(
+        batch_size=args.batch_size,
+        dry_run=bool(args.dry_run),
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 1 if report["erros"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
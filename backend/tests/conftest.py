@@ -0,0 +1,30 @@
+from contextlib import contextmanager
+
+import pytest
+
+
+@pytest.fixture
+def orcamento_consultas():
+    """Falha o teste se o bloco passar do orcamento de consultas SQL.
+
+        def test_lista(orcamento_consultas):
+            with orcamento_consultas(max_consultas=5, max_repeticoes=2):
+                client.get("/api/v1/laudos")
+
+    `max_repeticoes` limita quantas vezes a mesma consulta normalizada pode
+    rodar numa requisicao (N+1). A coleta fica disponivel no `as`.
+    """
+
+    # Import tardio: os modulos de teste definem DATABASE_URL/SECRET_KEY antes
+    # de carregar as settings do app.
+    from app.core.diagnostico_sql import monitorar_consultas
+
+    @contextmanager
+    def _orcamento(max_consultas=None, max_repeticoes=None):
+        with monitorar_consultas() as coleta:
+            yield coleta
+        falhas = coleta.violacoes(max_consultas, max_repeticoes)
+        if falhas:
+            pytest.fail("Orcamento de consultas estourado:\n" + "\n".join(falhas), pytrace=False)
+
+    return _orcamento
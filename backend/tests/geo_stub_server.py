@@ -0,0 +1,120 @@
+"""
+Servidor HTTP local que imita o ViaCEP e as APIs do Google usadas pelo
+backend (Routes, Distance Matrix e Geocoding), para testes sem rede.
+
+    with GeoStubServer(latencia=0.2) as stub:
+        patch.object(geocoding_service, "VIACEP_URL", stub.url("/ws/{cep}/json/"))
+        ...
+        stub.contagem["/ws/60115000/json/"]
+
+O CEP 00000000 responde {"erro": true}, como o ViaCEP faz para CEP inexistente.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+CEP_INEXISTENTE = "00000000"
+
+
+def _resposta(caminho: str) -> dict:
+    if caminho.startswith("/ws/"):
+        cep = caminho.split("/")[2]
+        if cep == CEP_INEXISTENTE:
+            return {"erro": True}
+        return {
+            "cep": f"{cep[:5]}-{cep[5:]}",
+            "logradouro": "Rua Canuto de Aguiar",
+            "complemento": "",
+            "bairro": "Meireles",
+            "localidade": "Fortaleza",
+            "uf": "CE",
+            "ibge": "2304400",
+        }
+    if caminho == "/maps/api/geocode/json":
+        return {
+            "status": "OK",
+            "results": [
+                {
+                    "formatted_address": "R. Canuto de Aguiar, 500 - Meireles, Fortaleza - CE",
+                    "place_id": "stub-place",
+                    "geometry": {"location": {"lat": -3.7303, "lng": -38.4937}},
+                    "address_components": [
+                        {"long_name": "Meireles", "short_name": "Meireles", "types": ["sublocality"]},
+                        {"long_name": "Fortaleza", "short_name": "Fortaleza", "types": ["locality"]},
+                        {"long_name": "Ceara", "short_name": "CE", "types": ["administrative_area_level_1"]},
+                        {"long_name": "60160-040", "short_name": "60160-040", "types": ["postal_code"]},
+                    ],
+                }
+            ],
+        }
+    if caminho == "/maps/api/distancematrix/json":
+        return {
+            "status": "OK",
+            "rows": [
+                {
+                    "elements": [
+                        {
+                            "status": "OK",
+                            "distance": {"value": 8300},
+                            "duration": {"value": 1200},
+                            "duration_in_traffic": {"value": 1500},
+                        }
+                    ]
+                }
+            ],
+        }
+    if caminho == "/directions/v2:computeRoutes":
+        return {"routes": [{"distanceMeters": 8100, "duration": "1380s", "staticDuration": "1140s"}]}
+    return {}
+
+
+class GeoStubServer:
+    def __init__(self, latencia: float = 0.0) -> None:
+        self.latencia = latencia
+        self.contagem: Counter = Counter()
+        self._lock = threading.Lock()
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def _responder(self) -> None:
+                caminho = urlparse(self.path).path
+                with stub._lock:
+                    stub.contagem[caminho] += 1
+                if stub.latencia:
+                    time.sleep(stub.latencia)
+                corpo = json.dumps(_resposta(caminho)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def do_GET(self) -> None:
+                self._responder()
+
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self._responder()
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, caminho: str) -> str:
+        host, porta = self._server.server_address[:2]
+        return f"http://{host}:{porta}{caminho}"
+
+    def __enter__(self) -> "GeoStubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,122 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "agenda-calendario-test-secret-key-1234567890",
+)
+
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints.agenda import LOCAL_TZ, calendario_mensal
+from app.core.diagnostico_sql import monitorar_consultas
+from app.core.instrumentation import instalar_instrumentacao_sql
+from app.models.agendamento import Agendamento
+from app.models.clinica import Clinica
+from app.models.configuracao import Configuracao
+
+USUARIO = SimpleNamespace(id=1, nome="Vet")
+
+
+def _agendamento(dia: int, hora: int, minutos: int | None, clinica_id: int, status: str, mes: int = 3) -> Agendamento:
+    inicio = datetime(2026, mes, dia, hora, 0, tzinfo=LOCAL_TZ)
+    fim = None
+    if minutos is not None:
+        fim = datetime(2026, mes, dia, hora + minutos // 60, minutos % 60, tzinfo=LOCAL_TZ)
+    return Agendamento(
+        inicio=inicio,
+        fim=fim,
+        data=inicio.strftime("%Y-%m-%d"),
+        hora=inicio.strftime("%H:%M"),
+        clinica_id=clinica_id,
+        status=status,
+    )
+
+
+class CalendarioMensalTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/calendario.db")
+        self.addCleanup(self.engine.dispose)
+        instalar_instrumentacao_sql(self.engine)
+        for modelo in (Agendamento, Clinica, Configuracao):
+            modelo.__table__.create(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.db.close)
+
+        self.db.add_all(
+            [
+                Clinica(id=1, nome="Aldeota"),
+                Clinica(id=2, nome="Meireles"),
+                Configuracao(
+                    agenda_feriados=json.dumps([{"data": "2026-03-19", "descricao": "Sao Jose"}]),
+                    agenda_excecoes=json.dumps(
+                        [{"data": "2026-03-07", "ativo": True, "inicio": "08:00", "fim": "18:00"}]
+                    ),
+                ),
+                _agendamento(2, 9, 60, 1, "Agendado"),
+                _agendamento(2, 10, None, 1, "Confirmado"),
+                _agendamento(2, 11, 60, 2, "Cancelado"),
+                _agendamento(7, 8, 90, 2, "Realizado"),
+                _agendamento(1, 9, 60, 1, "Agendado", mes=4),
+            ]
+        )
+        self.db.commit()
+
+    def test_month_heatmap_from_one_grouped_query(self) -> None:
+        with monitorar_consultas() as coleta:
+            resposta = calendario_mensal(mes="2026-03", db=self.db, current_user=USUARIO)
+        self.assertEqual(coleta.total, 2)  # agregacao + configuracao da agenda
+
+        self.assertEqual(resposta["mes"], "2026-03")
+        dias = {dia["data"]: dia for dia in resposta["dias"]}
+        self.assertEqual(len(dias), 31)
+
+        segunda = dias["2026-03-02"]
+        self.assertEqual(segunda["total"], 3)
+        self.assertEqual(segunda["por_status"], {"Agendado": 1, "Confirmado": 1, "Cancelado": 1})
+        self.assertEqual(segunda["por_clinica"], [{"clinica_id": 1, "total": 2}, {"clinica_id": 2, "total": 1}])
+        self.assertEqual(segunda["minutos_agendados"], 90)  # cancelado nao ocupa; sem fim = 30 min
+        self.assertEqual(segunda["minutos_disponiveis"], 360)
+        self.assertEqual(segunda["ocupacao"], 0.25)
+
+        self.assertEqual(dias["2026-03-07"]["minutos_disponiveis"], 600)  # excecao 08:00-18:00
+        self.assertEqual(dias["2026-03-07"]["minutos_agendados"], 90)
+        self.assertTrue(dias["2026-03-01"]["fechado"])  # domingo
+        self.assertIsNone(dias["2026-03-01"]["ocupacao"])
+        self.assertIn("Sao Jose", dias["2026-03-19"]["motivo_fechamento"])
+        self.assertEqual(dias["2026-03-03"]["total"], 0)
+
+        self.assertEqual(
+            resposta["clinicas"],
+            [
+                {"clinica_id": 1, "nome": "Aldeota", "total": 2},
+                {"clinica_id": 2, "nome": "Meireles", "total": 2},
+            ],
+        )
+        self.assertEqual(resposta["totais"]["total"], 4)
+        self.assertEqual(resposta["totais"]["minutos_agendados"], 180)
+
+    def test_invalid_month(self) -> None:
+        with self.assertRaises(HTTPException) as contexto:
+            calendario_mensal(mes="2026-13", db=self.db, current_user=USUARIO)
+        self.assertEqual(contexto.exception.status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
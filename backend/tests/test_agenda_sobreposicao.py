@@ -0,0 +1,206 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "agenda-sobreposicao-test-secret-key-1234567890",
+)
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints import agenda
+from app.api.v1.endpoints.agenda import (
+    CONSTRAINT_SOBREPOSICAO,
+    LOCAL_TZ,
+    _commit_agendamento,
+    _validar_slot_disponivel,
+)
+from app.models.agendamento import Agendamento
+from app.schemas.agendamento import AgendamentoCreate
+
+
+def _horario(hora: int, minuto: int = 0) -> datetime:
+    return datetime(2026, 3, 2, hora, minuto, tzinfo=LOCAL_TZ)
+
+
+def _agendamento(inicio: datetime, fim, paciente: str, status: str = "Agendado") -> Agendamento:
+    return Agendamento(inicio=inicio, fim=fim, paciente=paciente, status=status)
+
+
+class SobreposicaoAgendaTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(
+            f"sqlite:///{self.tmp_dir.name}/agenda.db",
+            connect_args={"check_same_thread": False, "timeout": 30},
+        )
+        self.addCleanup(self.engine.dispose)
+        Agendamento.__table__.create(bind=self.engine)
+        self.Session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+    def _reservar(self, agendamento: Agendamento, agendamento_id_excluir=None) -> None:
+        db = self.Session()
+        try:
+            _validar_slot_disponivel(db, agendamento, agendamento_id_excluir=agendamento_id_excluir)
+            db.add(agendamento)
+            _commit_agendamento(db)
+        finally:
+            db.close()
+
+    def test_range_query_rules(self) -> None:
+        self._reservar(_agendamento(_horario(9), _horario(10), "Thor"))
+        self._reservar(_agendamento(_horario(11), None, "Legado sem fim"))
+        self._reservar(_agendamento(_horario(13), _horario(14), "Cancelado", status="Cancelado"))
+
+        # Encostado no fim e no inicio nao conflita; cancelado nao ocupa o slot.
+        self._reservar(_agendamento(_horario(10), _horario(11), "Mel"))
+        self._reservar(_agendamento(_horario(13), _horario(14), "Bolt"))
+
+        with self.assertRaises(HTTPException) as contexto:
+            self._reservar(_agendamento(_horario(9, 30), _horario(9, 45), "Luna"))
+        self.assertEqual(contexto.exception.status_code, 409)
+        self.assertIn("09:00 as 10:00, Thor", contexto.exception.detail)
+
+        # Fim ausente vale 30 minutos.
+        with self.assertRaises(HTTPException) as contexto:
+            self._reservar(_agendamento(_horario(11, 15), _horario(12), "Nina"))
+        self.assertIn("11:00 as 11:30", contexto.exception.detail)
+        self._reservar(_agendamento(_horario(11, 30), _horario(12), "Nina"))
+
+        # Na edicao, o proprio agendamento nao conta.
+        db = self.Session()
+        thor = db.query(Agendamento).filter_by(paciente="Thor").one()
+        thor.fim = _horario(9, 45)
+        _validar_slot_disponivel(db, thor, agendamento_id_excluir=thor.id)
+        db.close()
+
+    def test_rejects_bookings_longer_than_the_overlap_window(self) -> None:
+        # Acima de 24 h o agendamento sairia da faixa da busca de sobreposicao.
+        with self.assertRaises(HTTPException) as contexto:
+            self._reservar(_agendamento(_horario(9), datetime(2026, 3, 3, 10, 0, tzinfo=LOCAL_TZ), "Longo"))
+        self.assertEqual(contexto.exception.status_code, 422)
+
+        self._reservar(_agendamento(_horario(9), datetime(2026, 3, 3, 9, 0, tzinfo=LOCAL_TZ), "Um dia"))
+        with self.assertRaises(HTTPException) as contexto:
+            self._reservar(_agendamento(datetime(2026, 3, 3, 8, 0, tzinfo=LOCAL_TZ), None, "Manha seguinte"))
+        self.assertEqual(contexto.exception.status_code, 409)
+
+        # Na edicao vale o mesmo limite.
+        db = self.Session()
+        self.addCleanup(db.close)
+        um_dia = db.query(Agendamento).filter_by(paciente="Um dia").one()
+        um_dia.fim = datetime(2026, 3, 3, 12, 0, tzinfo=LOCAL_TZ)
+        with self.assertRaises(HTTPException) as contexto:
+            _validar_slot_disponivel(db, um_dia, agendamento_id_excluir=um_dia.id)
+        self.assertEqual(contexto.exception.status_code, 422)
+
+    def test_query_uses_inicio_index(self) -> None:
+        with self.engine.connect() as connection:
+            plano = connection.execute(
+                text(
+                    "EXPLAIN QUERY PLAN SELECT id FROM agendamentos "
+                    "WHERE status != 'Cancelado' AND inicio < :fim AND inicio > :limite"
+                ),
+                {"fim": "2026-03-02 10:00:00", "limite": "2026-03-01 09:00:00"},
+            ).fetchall()
+        self.assertIn("ix_agendamentos_inicio", " ".join(str(linha[-1]) for linha in plano))
+
+    def test_parallel_bookings_of_same_slot_have_one_winner(self) -> None:
+        tentativas = 8
+        largada = threading.Barrier(tentativas)
+
+        def _tentar(indice: int) -> str:
+            largada.wait()
+            inicio = _horario(15, (indice % 2) * 15)
+            try:
+                self._reservar(_agendamento(inicio, _horario(16), f"Paciente {indice}"))
+            except HTTPException as exc:
+                return str(exc.status_code)
+            return "ok"
+
+        with ThreadPoolExecutor(max_workers=tentativas) as pool:
+            resultados = list(pool.map(_tentar, range(tentativas)))
+
+        self.assertEqual(resultados.count("ok"), 1, resultados)
+        self.assertEqual(resultados.count("409"), tentativas - 1, resultados)
+        with self.engine.connect() as connection:
+            total = connection.execute(text("SELECT COUNT(*) FROM agendamentos")).scalar()
+        self.assertEqual(total, 1)
+
+    def test_travel_validation_runs_before_the_write_lock(self) -> None:
+        # O cache de geocodificacao grava por outra conexao enquanto as APIs de
+        # rota respondem; sem lock pendente, a gravacao nao espera o busy_timeout.
+        with self.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE geo_cache_teste (chave TEXT)"))
+        outro_engine = create_engine(
+            f"sqlite:///{self.tmp_dir.name}/agenda.db", connect_args={"timeout": 0}
+        )
+        self.addCleanup(outro_engine.dispose)
+        gravacoes = []
+
+        def _deslocamento(db, agendamento_db, **_kwargs):
+            with outro_engine.begin() as connection:
+                connection.execute(text("INSERT INTO geo_cache_teste VALUES ('rota')"))
+            gravacoes.append(agendamento_db.inicio)
+
+        db = self.Session()
+        self.addCleanup(db.close)
+        with patch.object(agenda, "_validar_deslocamento_agendamento", _deslocamento), patch.object(
+            agenda, "_validar_agendamento_no_funcionamento", lambda db, agendamento_db: None
+        ), patch.object(agenda, "_fetch_related_names", lambda db, agendamento_db: {}), patch.object(
+            agenda, "_validar_paciente_tutor_para_status", lambda *args, **kwargs: None
+        ), patch.object(agenda, "registrar_auditoria", lambda **kwargs: None), patch.object(
+            agenda, "_notificar_agenda_update", lambda **kwargs: None
+        ):
+            criado = agenda.criar_agendamento(
+                AgendamentoCreate(inicio=_horario(8), fim=_horario(9), clinica_id=1),
+                request=None,
+                db=db,
+                current_user=SimpleNamespace(id=1, nome="Vet"),
+            )
+
+        self.assertEqual(len(gravacoes), 1)
+        self.assertEqual(criado["status"], "Agendado")
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute(text("SELECT COUNT(*) FROM geo_cache_teste")).scalar(), 1)
+
+    def test_exclusion_constraint_violation_maps_to_409(self) -> None:
+        # Imita a constraint do Postgres: o banco recusa mesmo sem a checagem previa.
+        with self.engine.begin() as connection:
+            connection.execute(
+                text(
+                    "CREATE TRIGGER sobreposicao BEFORE INSERT ON agendamentos "
+                    "WHEN NEW.paciente = 'Conflito' "
+                    f"BEGIN SELECT RAISE(ABORT, 'conflicting key value violates exclusion constraint \"{CONSTRAINT_SOBREPOSICAO}\"'); END"
+                )
+            )
+
+        db = self.Session()
+        self.addCleanup(db.close)
+        db.add(_agendamento(_horario(8), _horario(9), "Conflito"))
+        with self.assertRaises(HTTPException) as contexto:
+            _commit_agendamento(db)
+        self.assertEqual(contexto.exception.status_code, 409)
+        self.assertIn("Horario indisponivel", contexto.exception.detail)
+        self.assertEqual(db.query(Agendamento).count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "atendimento-listagem-test-secret-key-1234567890",
+)
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints.atendimento import _montar_detalhe_atendimento, listar_atendimentos
+from app.core.diagnostico_sql import monitorar_consultas
+from app.core.instrumentation import instalar_instrumentacao_sql
+from app.models.atendimento_clinico import (
+    AnexoAtendimento,
+    AtendimentoClinico,
+    EvolucaoClinica,
+    PrescricaoClinica,
+    PrescricaoItem,
+)
+from app.models.clinica import Clinica
+from app.models.laudo import Exame
+from app.models.paciente import Paciente
+from app.models.tutor import Tutor
+
+USUARIO = SimpleNamespace(id=1, nome="Vet")
+MODELOS = (
+    AtendimentoClinico, AnexoAtendimento, EvolucaoClinica, PrescricaoClinica, PrescricaoItem,
+    Clinica, Exame, Paciente, Tutor,
+)
+
+
+class AtendimentoListagemTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/atendimentos.db")
+        self.addCleanup(self.engine.dispose)
+        instalar_instrumentacao_sql(self.engine)
+        for modelo in MODELOS:
+            modelo.__table__.create(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.db.close)
+        self._popular()
+
+    def _popular(self) -> None:
+        db = self.db
+        db.add_all([
+            Clinica(id=1, nome="Clinica Aldeota"),
+            Tutor(id=1, nome="Maria Souza"),
+            Paciente(id=1, nome="Thor", tutor_id=1),
+            Paciente(id=2, nome="Luna", tutor_id=1),
+        ])
+        base = datetime(2026, 3, 1, 9, 0)
+        for indice in range(1, 8):
+            # Dois atendimentos no mesmo horario: o id desempata a ordem.
+            momento = base + timedelta(days=indice if indice != 7 else 6)
+            db.add(AtendimentoClinico(
+                id=indice, paciente_id=1 if indice % 2 else 2, tutor_id=1, clinica_id=1,
+                veterinario_id=1, data_atendimento=momento, status="Concluido",
+                queixa_principal="Tosse" if indice == 3 else "Rotina", created_at=momento,
+            ))
+        for atendimento_id, quantidade in ((2, 3), (5, 1)):
+            for _ in range(quantidade):
+                db.add(Exame(atendimento_id=atendimento_id, paciente_id=1, tipo_exame="Hemograma"))
+        db.add(PrescricaoClinica(id=1, atendimento_id=5, orientacoes_gerais="Repouso"))
+        db.add_all([
+            PrescricaoItem(prescricao_id=1, medicamento_nome="Pimobendan", ordem=2),
+            PrescricaoItem(prescricao_id=1, medicamento_nome="Furosemida", ordem=1),
+        ])
+        db.add(EvolucaoClinica(atendimento_id=5, descricao="Estavel", data_evolucao=base))
+        db.add(AnexoAtendimento(atendimento_id=5, tipo="imagem", url="/x.png", created_at=base))
+        db.commit()
+
+    def _listar(self, **kwargs):
+        parametros = dict(
+            data_inicio=None, data_fim=None, paciente_id=None, clinica_id=None, agendamento_id=None,
+            status=None, search=None, cursor=None, skip=0, limit=100,
+        )
+        parametros.update(kwargs)
+        return listar_atendimentos(db=self.db, current_user=USUARIO, **parametros)
+
+    def test_lists_aggregates_in_constant_queries(self) -> None:
+        with monitorar_consultas() as coleta:
+            resposta = self._listar()
+
+        self.assertEqual(coleta.total, 2)  # total + pagina com agregados
+        self.assertEqual(resposta["total"], 7)
+        self.assertEqual([item["id"] for item in resposta["items"]], [7, 6, 5, 4, 3, 2, 1])
+        por_id = {item["id"]: item for item in resposta["items"]}
+        self.assertEqual(por_id[2]["total_exames"], 3)
+        self.assertEqual(por_id[5]["total_exames"], 1)
+        self.assertEqual(por_id[1]["total_exames"], 0)
+        self.assertTrue(por_id[5]["tem_prescricao"])
+        self.assertFalse(por_id[2]["tem_prescricao"])
+        self.assertEqual(por_id[1]["paciente_nome"], "Thor")
+        self.assertEqual(por_id[1]["clinica_nome"], "Clinica Aldeota")
+        self.assertIsNone(resposta["next_cursor"])
+
+    def test_keyset_pages_cover_every_row_once(self) -> None:
+        vistos = []
+        resposta = self._listar(limit=2)
+        self.assertEqual(resposta["total"], 7)
+        while True:
+            vistos.extend(item["id"] for item in resposta["items"])
+            if not resposta["next_cursor"]:
+                break
+            with monitorar_consultas() as coleta:
+                resposta = self._listar(limit=2, cursor=resposta["next_cursor"])
+            self.assertEqual(coleta.total, 1)
+            self.assertIsNone(resposta["total"])
+
+        self.assertEqual(vistos, [7, 6, 5, 4, 3, 2, 1])
+
+    def test_search_and_invalid_cursor(self) -> None:
+        resposta = self._listar(search="tosse")
+        self.assertEqual([item["id"] for item in resposta["items"]], [3])
+        self.assertEqual(self._listar(search="luna")["total"], 3)
+
+        with self.assertRaises(HTTPException) as contexto:
+            self._listar(cursor="nao-e-um-cursor")
+        self.assertEqual(contexto.exception.status_code, 400)
+
+    def test_detail_loads_relations_in_batched_queries(self) -> None:
+        atendimento = self.db.get(AtendimentoClinico, 5)
+        with monitorar_consultas() as coleta:
+            detalhe = _montar_detalhe_atendimento(self.db, atendimento)
+
+        self.assertEqual(coleta.total, 5)
+        self.assertEqual(detalhe["paciente_nome"], "Thor")
+        self.assertEqual(detalhe["tutor_nome"], "Maria Souza")
+        self.assertEqual(len(detalhe["exames"]), 1)
+        self.assertEqual(
+            [item["medicamento_nome"] for item in detalhe["prescricao"]["itens"]],
+            ["Furosemida", "Pimobendan"],
+        )
+        self.assertEqual(len(detalhe["evolucoes"]), 1)
+        self.assertEqual(len(detalhe["anexos"]), 1)
+
+        vazio = _montar_detalhe_atendimento(self.db, self.db.get(AtendimentoClinico, 1))
+        self.assertIsNone(vazio["prescricao"])
+        self.assertEqual(vazio["exames"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
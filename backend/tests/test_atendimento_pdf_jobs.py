@@ -0,0 +1,190 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "atendimento-pdf-jobs-test-secret-key-1234567890",
+)
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints import atendimento as atendimento_endpoints
+from app.api.v1.endpoints.atendimento import (
+    criar_job_pdf_atendimento,
+    gerar_pdf_prescricao,
+    gerar_pdf_solicitacao_exames,
+)
+from app.models.atendimento_clinico import AtendimentoClinico, PrescricaoClinica, PrescricaoItem
+from app.models.clinica import Clinica
+from app.models.configuracao import Configuracao
+from app.models.laudo import Exame
+from app.models.laudo_pdf_job import LaudoPdfJob
+from app.models.paciente import Paciente
+from app.models.tutor import Tutor
+from app.services import laudo_pdf_jobs
+from app.services.atendimento_pdf_service import render_atendimento_pdf
+
+USUARIO = SimpleNamespace(id=1, nome="Vet")
+
+
+class AtendimentoPdfJobsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(
+            f"sqlite:///{self.tmp_dir.name}/atendimento.db",
+            connect_args={"check_same_thread": False, "timeout": 30},
+        )
+        self.addCleanup(self.engine.dispose)
+        for modelo in (
+            AtendimentoClinico, PrescricaoClinica, PrescricaoItem, Exame, Paciente, Tutor, Clinica,
+            Configuracao, LaudoPdfJob,
+        ):
+            modelo.__table__.create(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+        self.renders = []
+
+        def _render(db, atendimento_id, documento):
+            self.renders.append(documento)
+            return render_atendimento_pdf(db, atendimento_id, documento)
+
+        for patcher in (
+            patch.object(laudo_pdf_jobs, "SessionLocal", self.Session),
+            patch.object(laudo_pdf_jobs.settings, "UPLOAD_DIR", self.tmp_dir.name),
+            patch.object(laudo_pdf_jobs, "render_atendimento_pdf", _render),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        db = self.Session()
+        db.add_all(
+            [
+                Configuracao(nome_empresa="Fort Cordis"),
+                Paciente(id=1, nome="Thor"),
+                Tutor(id=1, nome="Ana"),
+                Clinica(id=1, nome="Aldeota"),
+                AtendimentoClinico(
+                    id=10, paciente_id=1, tutor_id=1, clinica_id=1, veterinario_id=1,
+                    data_atendimento=datetime(2026, 3, 2, 9, 0), status="Concluido",
+                ),
+                AtendimentoClinico(id=11, paciente_id=1, veterinario_id=1, status="Triagem"),
+                PrescricaoClinica(id=1, atendimento_id=10, orientacoes_gerais="Repouso"),
+                PrescricaoItem(id=1, prescricao_id=1, medicamento_nome="Pimobendan", dose="0,25 mg/kg", ordem=0),
+                Exame(id=1, atendimento_id=10, paciente_id=1, tipo_exame="Hemograma"),
+            ]
+        )
+        db.commit()
+        db.close()
+
+    def _baixar(self, endpoint=gerar_pdf_prescricao, atendimento_id: int = 10):
+        db = self.Session()
+        try:
+            return endpoint(atendimento_id=atendimento_id, db=db, current_user=USUARIO)
+        finally:
+            db.close()
+
+    def test_reprint_is_a_file_send_until_content_changes(self) -> None:
+        primeira = self._baixar()
+        self.assertTrue(Path(primeira.path).read_bytes().startswith(b"%PDF"))
+        self.assertIn("receita_atendimento_10_Thor.pdf", primeira.headers["content-disposition"])
+
+        segunda = self._baixar()
+        self.assertEqual(segunda.path, primeira.path)
+        self.assertEqual(self.renders, ["prescricao"])
+
+        db = self.Session()
+        db.query(PrescricaoItem).filter_by(id=1).update({"dose": "0,3 mg/kg"})
+        db.commit()
+        db.close()
+
+        terceira = self._baixar()
+        self.assertNotEqual(terceira.path, primeira.path)
+        self.assertEqual(self.renders, ["prescricao", "prescricao"])
+
+        self._baixar(gerar_pdf_solicitacao_exames)
+        with self.engine.connect() as connection:
+            documentos = [job.documento for job in connection.execute(LaudoPdfJob.__table__.select()).all()]
+        self.assertEqual(documentos, ["prescricao", "prescricao", "exames"])
+
+    def test_burst_of_clicks_renders_once(self) -> None:
+        tentativas = 6
+        largada = threading.Barrier(tentativas)
+
+        def _clicar(_):
+            largada.wait()
+            return self._baixar().path
+
+        with ThreadPoolExecutor(max_workers=tentativas) as pool:
+            caminhos = list(pool.map(_clicar, range(tentativas)))
+
+        self.assertEqual(len(set(caminhos)), 1)
+        self.assertEqual(self.renders, ["prescricao"])
+
+    def test_slow_render_releases_session_and_returns_202(self) -> None:
+        liberar = threading.Event()
+        self.addCleanup(liberar.set)
+        render_original = laudo_pdf_jobs.render_atendimento_pdf
+
+        def _render_lento(db, atendimento_id, documento):
+            liberar.wait(10)
+            return render_original(db, atendimento_id, documento)
+
+        db = self.Session()
+        self.addCleanup(db.close)
+        em_transacao = []
+
+        def _esperar(job_id, timeout):
+            em_transacao.append(db.in_transaction())
+            return laudo_pdf_jobs.wait_for_pdf_job(job_id, timeout)
+
+        with patch.object(laudo_pdf_jobs, "render_atendimento_pdf", _render_lento), patch.object(
+            atendimento_endpoints, "wait_for_pdf_job", _esperar
+        ), patch.object(atendimento_endpoints, "ESPERA_PDF_SEGUNDOS", 0.2):
+            resposta = gerar_pdf_prescricao(atendimento_id=10, db=db, current_user=USUARIO)
+            liberar.set()
+
+        self.assertEqual(em_transacao, [False])
+        self.assertEqual(resposta.status_code, 202)
+        self.assertIn(b'"documento":"prescricao"', resposta.body)
+        self.assertEqual(resposta.headers["retry-after"], "2")
+
+        self.assertTrue(Path(self._baixar().path).read_bytes().startswith(b"%PDF"))
+
+    def test_missing_document_and_async_job(self) -> None:
+        with self.assertRaises(HTTPException) as contexto:
+            self._baixar(atendimento_id=11)
+        self.assertEqual(contexto.exception.status_code, 404)
+        self.assertIn("Prescricao nao encontrada", contexto.exception.detail)
+
+        db = self.Session()
+        self.addCleanup(db.close)
+        job = criar_job_pdf_atendimento(atendimento_id=10, documento="exames", db=db, current_user=USUARIO)
+        self.assertEqual(job["documento"], "exames")
+        self.assertEqual(job["atendimento_id"], 10)
+        self.assertTrue(laudo_pdf_jobs.wait_for_pdf_job(job["job_id"], timeout=30))
+
+        db.commit()
+        final = laudo_pdf_jobs.serialize_laudo_pdf_job(laudo_pdf_jobs.get_atendimento_pdf_job(db, job["job_id"]))
+        self.assertEqual(final["status"], "completed")
+        self.assertEqual(final["download_url"], f"/api/v1/atendimentos/pdf-jobs/{job['job_id']}/download")
+
+
+if __name__ == "__main__":
+    unittest.main()
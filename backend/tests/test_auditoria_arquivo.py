@@ -0,0 +1,131 @@
+import gzip
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from importlib import util
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "auditoria-arquivo-test-secret-key-1234567890",
+)
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.auditoria_evento import AuditoriaEvento
+from app.services.auditoria_arquivo import arquivar_auditoria, corte_arquivamento
+
+MIGRATION_PATH = BACKEND_DIR / "migrations" / "versions" / "20260318_14_auditoria_particoes.py"
+AGORA = datetime(2026, 6, 15, 12, 0, 0)
+
+
+def _load_migration():
+    spec = util.spec_from_file_location("auditoria_particoes_migration", MIGRATION_PATH)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class AuditoriaArquivoTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.destino = os.path.join(self.tmp_dir.name, "arquivo")
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/auditoria.db")
+        self.addCleanup(self.engine.dispose)
+        AuditoriaEvento.__table__.create(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+        db = self.Session()
+        db.add_all(
+            [
+                AuditoriaEvento(modulo="agenda", entidade="agendamento", acao="CREATE", created_at=datetime(2026, 1, 10, 8)),
+                AuditoriaEvento(modulo="agenda", entidade="agendamento", acao="UPDATE", created_at=datetime(2026, 1, 31, 23)),
+                AuditoriaEvento(modulo="laudos", entidade="laudo", acao="CREATE", created_at=datetime(2026, 2, 3, 9)),
+                AuditoriaEvento(modulo="laudos", entidade="laudo", acao="UPDATE", created_at=datetime(2026, 3, 1, 0)),
+                AuditoriaEvento(modulo="laudos", entidade="laudo", acao="DELETE", created_at=datetime(2026, 6, 1, 10)),
+            ]
+        )
+        db.commit()
+        db.close()
+
+    def _restantes(self):
+        db = self.Session()
+        try:
+            return [evento.acao for evento in db.query(AuditoriaEvento).order_by(AuditoriaEvento.id)]
+        finally:
+            db.close()
+
+    def _ler(self, mes):
+        with gzip.open(os.path.join(self.destino, f"auditoria-{mes}.ndjson.gz"), "rt", encoding="utf-8") as arquivo:
+            return [json.loads(linha) for linha in arquivo]
+
+    def test_cutoff_is_start_of_month(self) -> None:
+        self.assertEqual(corte_arquivamento(AGORA, 100), datetime(2026, 3, 1))
+
+    def test_dry_run_counts_without_touching_anything(self) -> None:
+        report = arquivar_auditoria(self.Session, retencao_dias=100, batch_size=2, dry_run=True, now=AGORA, destino=self.destino)
+
+        self.assertEqual((report["eventos"], report["arquivos"]), (3, {"2026-01": 2, "2026-02": 1}))
+        self.assertEqual(len(self._restantes()), 5)
+        self.assertFalse(os.path.exists(self.destino))
+
+    def test_archives_old_months_in_batches_and_deletes_rows(self) -> None:
+        report = arquivar_auditoria(self.Session, retencao_dias=100, batch_size=2, now=AGORA, destino=self.destino)
+
+        self.assertEqual(report["erros"], [])
+        self.assertEqual(report["eventos"], 3)
+        self.assertEqual(self._restantes(), ["UPDATE", "DELETE"])
+
+        janeiro = self._ler("2026-01")
+        self.assertEqual([linha["acao"] for linha in janeiro], ["CREATE", "UPDATE"])
+        self.assertEqual(janeiro[0]["created_at"], "2026-01-10T08:00:00+00:00")
+        self.assertEqual(self._ler("2026-02")[0]["modulo"], "laudos")
+
+        # Rodar de novo nao repete nada; novo lote entra como outro membro gzip.
+        self.assertEqual(arquivar_auditoria(self.Session, retencao_dias=100, now=AGORA, destino=self.destino)["eventos"], 0)
+        db = self.Session()
+        db.add(AuditoriaEvento(modulo="agenda", entidade="agendamento", acao="DELETE", created_at=datetime(2026, 1, 20)))
+        db.commit()
+        db.close()
+        arquivar_auditoria(self.Session, retencao_dias=100, now=AGORA, destino=self.destino)
+        self.assertEqual([linha["acao"] for linha in self._ler("2026-01")], ["CREATE", "UPDATE", "DELETE"])
+
+    def test_zero_retention_archives_nothing(self) -> None:
+        report = arquivar_auditoria(self.Session, retencao_dias=0, now=AGORA, destino=self.destino)
+
+        self.assertEqual((report["eventos"], report["corte"]), (0, None))
+        self.assertEqual(len(self._restantes()), 5)
+
+    def test_migration_normalizes_sqlite_timestamps_and_adds_keyset_index(self) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(
+                text(
+                    "INSERT INTO auditoria_eventos (modulo, entidade, acao, created_at) "
+                    "VALUES ('agenda', 'agendamento', 'LEGADO', '2026-01-10 08:00:00')"
+                )
+            )
+
+        with self.engine.begin() as connection:
+            _load_migration().upgrade(connection, "sqlite")
+
+        with self.engine.connect() as connection:
+            legado = connection.execute(
+                text("SELECT created_at FROM auditoria_eventos WHERE acao = 'LEGADO'")
+            ).scalar()
+        self.assertEqual(legado, "2026-01-10 08:00:00.000000")
+        indices = {indice["name"] for indice in inspect(self.engine).get_indexes("auditoria_eventos")}
+        self.assertIn("ix_auditoria_eventos_created_at_id", indices)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from threading import Event
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "auditoria-service-test-secret-key-1234567890",
+)
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints.admin import listar_auditoria
+from app.core.config import settings
+from app.models.auditoria_evento import AuditoriaEvento
+from app.services import auditoria_service
+
+USUARIO = SimpleNamespace(id=7, nome="Ana", email="ana@example.com")
+
+
+def _registrar(entidade_id, **extra):
+    auditoria_service.registrar_auditoria(
+        current_user=USUARIO,
+        modulo="agenda",
+        entidade="agendamento",
+        acao="UPDATE",
+        descricao="Agendamento alterado",
+        entidade_id=entidade_id,
+        detalhes={"status": "Confirmado"},
+        **extra,
+    )
+
+
+class AuditoriaServiceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/auditoria.db")
+        self.addCleanup(self.engine.dispose)
+        AuditoriaEvento.__table__.create(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+        self.gravador = auditoria_service._GravadorAuditoria()
+        self.addCleanup(self.gravador.encerrar, 2.0)
+        for target, value in (("SessionLocal", self.Session), ("_GRAVADOR", self.gravador)):
+            patcher = patch.object(auditoria_service, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        auditoria_service.invalidar_facetas_auditoria()
+        self.addCleanup(auditoria_service.invalidar_facetas_auditoria)
+        self._settings(AUDITORIA_MODO="async", AUDITORIA_FLUSH_INTERVAL_MS=50, AUDITORIA_LOTE_MAX=200)
+
+    def _settings(self, **valores) -> None:
+        for nome, valor in valores.items():
+            patcher = patch.object(settings, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _eventos(self):
+        db = self.Session()
+        try:
+            return db.query(AuditoriaEvento).order_by(AuditoriaEvento.id).all()
+        finally:
+            db.close()
+
+    def test_sync_mode_writes_before_returning(self) -> None:
+        self._settings(AUDITORIA_MODO="sync")
+
+        _registrar(1)
+
+        [evento] = self._eventos()
+        self.assertEqual((evento.usuario_id, evento.modulo, evento.entidade_id), (7, "agenda", "1"))
+        self.assertEqual(evento.detalhes_json, '{"status": "Confirmado"}')
+        self.assertIsNone(self.gravador._thread)
+
+    def test_async_mode_enqueues_and_writes_in_batches(self) -> None:
+        with patch.object(auditoria_service, "_gravar_lote", wraps=auditoria_service._gravar_lote) as gravar:
+            for entidade_id in range(50):
+                _registrar(entidade_id)
+            self.assertTrue(auditoria_service.flush_auditoria(5.0))
+
+        eventos = self._eventos()
+        self.assertEqual([evento.entidade_id for evento in eventos], [str(i) for i in range(50)])
+        self.assertLess(gravar.call_count, 50)
+        self.assertTrue(all(evento.created_at is not None for evento in eventos))
+
+        estatisticas = auditoria_service.estatisticas_auditoria()
+        self.assertEqual(
+            (estatisticas["enfileirados"], estatisticas["gravados"], estatisticas["descartados"], estatisticas["fila"]),
+            (50, 50, 0, 0),
+        )
+
+    def test_full_queue_drops_and_counts_events(self) -> None:
+        self._settings(AUDITORIA_FILA_MAX=2, AUDITORIA_LOTE_MAX=1)
+        liberar = Event()
+        gravando = Event()
+        original = auditoria_service._gravar_lote
+
+        def gravar_bloqueado(linhas):
+            gravando.set()
+            liberar.wait(5)
+            return original(linhas)
+
+        with patch.object(auditoria_service, "_gravar_lote", side_effect=gravar_bloqueado):
+            _registrar(1)
+            self.assertTrue(gravando.wait(5))
+            for entidade_id in range(2, 6):
+                _registrar(entidade_id)
+            estatisticas = auditoria_service.estatisticas_auditoria()
+            self.assertEqual((estatisticas["fila"], estatisticas["descartados"]), (2, 2))
+
+            liberar.set()
+            self.assertTrue(auditoria_service.flush_auditoria(5.0))
+
+        self.assertEqual([evento.entidade_id for evento in self._eventos()], ["1", "2", "3"])
+
+    def test_failed_batch_falls_back_to_row_by_row(self) -> None:
+        _registrar(1)
+        auditoria_service._GRAVADOR.enfileirar({"modulo": None, "entidade": "x", "acao": "y"})
+        _registrar(2)
+        self.assertTrue(auditoria_service.flush_auditoria(5.0))
+
+        self.assertEqual([evento.entidade_id for evento in self._eventos()], ["1", "2"])
+        estatisticas = auditoria_service.estatisticas_auditoria()
+        self.assertEqual((estatisticas["gravados"], estatisticas["falhas"]), (2, 1))
+
+    def test_facets_are_cached_and_extended_by_new_events(self) -> None:
+        self._settings(AUDITORIA_MODO="sync")
+        _registrar(1)
+        db = self.Session()
+        self.addCleanup(db.close)
+
+        self.assertEqual(auditoria_service.facetas_auditoria(db), (["agenda"], ["UPDATE"]))
+        with patch.object(db, "query", side_effect=AssertionError("facetas deveriam vir do cache")):
+            auditoria_service.registrar_auditoria(
+                current_user=None, modulo="laudos", entidade="laudo", acao="CREATE", descricao="Novo"
+            )
+            self.assertEqual(auditoria_service.facetas_auditoria(db), (["agenda", "laudos"], ["CREATE", "UPDATE"]))
+
+    def _listar(self, db, **filtros):
+        parametros = {
+            "modulo": None, "acao": None, "entidade": None, "busca": None,
+            "data_inicio": None, "data_fim": None, "cursor": None, "skip": 0, "limit": 100,
+        }
+        parametros.update(filtros)
+        return listar_auditoria(current_user=USUARIO, db=db, **parametros)
+
+    def test_listing_pages_by_cursor_and_filters_by_date_range(self) -> None:
+        db = self.Session()
+        self.addCleanup(db.close)
+        mesmo_instante = datetime(2026, 3, 2, 10, 0, 0)
+        datas = [datetime(2026, 3, 1, 0, 0, 0), mesmo_instante, mesmo_instante, mesmo_instante, datetime(2026, 3, 3, 23, 59)]
+        db.add_all(
+            AuditoriaEvento(modulo="agenda", entidade="agendamento", entidade_id=str(i), acao="UPDATE", created_at=data)
+            for i, data in enumerate(datas)
+        )
+        db.commit()
+
+        vistos = []
+        resposta = self._listar(db, limit=2)
+        self.assertEqual((resposta["total"], resposta["total_exato"]), (5, True))
+        while True:
+            vistos.extend(item["entidade_id"] for item in resposta["items"])
+            if not resposta["next_cursor"]:
+                break
+            resposta = self._listar(db, limit=2, cursor=resposta["next_cursor"])
+            self.assertIsNone(resposta["total"])
+        self.assertEqual(vistos, ["4", "3", "2", "1", "0"])
+
+        resposta = self._listar(db, data_inicio="2026-03-01", data_fim="2026-03-02")
+        self.assertEqual([item["entidade_id"] for item in resposta["items"]], ["3", "2", "1", "0"])
+        self.assertEqual(resposta["modulos"], ["agenda"])
+
+        with patch("app.api.v1.endpoints.admin.AUDITORIA_TOTAL_MAX", 3):
+            self.assertEqual(self._listar(db)["total_exato"], False)
+        with self.assertRaises(HTTPException):
+            self._listar(db, cursor="nao-e-um-cursor")
+
+
+if __name__ == "__main__":
+    unittest.main()
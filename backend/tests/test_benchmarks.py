@@ -0,0 +1,113 @@
+import os
+import sys
+import tempfile
+import unittest
+from dataclasses import replace
+from datetime import date
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "benchmarks-test-secret-key-1234567890",
+)
+
+from sqlalchemy import create_engine, text
+
+import app.models  # noqa: F401
+from app.db.database import Base
+from benchmarks.dados_sinteticos import PERFIS, gerar_dados
+from benchmarks.executar import comparar, contar_falhas, percentil
+
+PERFIL_TESTE = replace(PERFIS["pequeno"], clinicas=2, pacientes_por_clinica=5)
+HOJE = date(2026, 3, 18)
+
+
+class DadosSinteticosTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def _engine(self, nome: str):
+        engine = create_engine(f"sqlite:///{self.tmp_dir.name}/{nome}.db")
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(bind=engine)
+        return engine
+
+    def test_same_seed_generates_same_rows(self) -> None:
+        engines = [self._engine("a"), self._engine("b")]
+        relatorios = [gerar_dados(engine, PERFIL_TESTE, lote=7, hoje=HOJE) for engine in engines]
+
+        self.assertEqual(relatorios[0]["tabelas"], relatorios[1]["tabelas"])
+        tabelas = relatorios[0]["tabelas"]
+        self.assertEqual(tabelas["clinicas"], 2)
+        self.assertEqual(tabelas["pacientes"], 10)
+        self.assertEqual(tabelas["agendamentos"], 30)
+        self.assertGreater(tabelas["laudos"], 0)
+        self.assertEqual(tabelas["imagens_laudo"], tabelas["laudos"])
+
+        consultas = (
+            "SELECT id, nome, tutor_id, especie FROM pacientes ORDER BY id",
+            "SELECT id, inicio, status, paciente_id FROM agendamentos ORDER BY id",
+            "SELECT id, tipo, valor_final, data_transacao FROM transacoes ORDER BY id",
+            "SELECT id, medidas_json FROM laudos ORDER BY id",
+        )
+        for sql in consultas:
+            linhas = []
+            for engine in engines:
+                with engine.connect() as connection:
+                    linhas.append(connection.execute(text(sql)).fetchall())
+            self.assertEqual(linhas[0], linhas[1], sql)
+
+    def test_refuses_populated_database(self) -> None:
+        engine = self._engine("cheia")
+        gerar_dados(engine, PERFIL_TESTE, hoje=HOJE)
+
+        with self.assertRaises(RuntimeError):
+            gerar_dados(engine, PERFIL_TESTE, hoje=HOJE)
+
+
+class ComparacaoBenchmarkTest(unittest.TestCase):
+    def test_percentil_nearest_rank(self) -> None:
+        valores = [float(v) for v in range(1, 21)]
+        self.assertEqual(percentil(valores, 50), 10.0)
+        self.assertEqual(percentil(valores, 95), 19.0)
+        self.assertEqual(percentil([], 95), 0.0)
+
+    def test_flags_latency_and_query_regressions(self) -> None:
+        antes = {"cenarios": {
+            "agenda": {"p95_ms": 10.0, "consultas_max": 5},
+            "laudos": {"p95_ms": 100.0, "consultas_max": 300},
+        }}
+        igual = {"cenarios": {
+            "agenda": {"p95_ms": 11.0, "consultas_max": 5},
+            "laudos": {"p95_ms": 40.0, "consultas_max": 4},
+        }}
+        pior = {"cenarios": {
+            "agenda": {"p95_ms": 10.0, "consultas_max": 6},
+            "laudos": {"p95_ms": 130.0, "consultas_max": 300},
+        }}
+
+        self.assertFalse(comparar(antes, igual, tolerancia=20)[1])
+        tabela, regrediu = comparar(antes, pior, tolerancia=20)
+        self.assertTrue(regrediu)
+        self.assertEqual(tabela.count("regressao"), 2)
+
+    def test_failed_runs_are_regressions(self) -> None:
+        antes = {"cenarios": {"pdf": {"p95_ms": 50.0, "consultas_max": 3, "status": {"200": 10}}}}
+        quebrado = {"cenarios": {"pdf": {"p95_ms": 5.0, "consultas_max": 1, "status": {"200": 2, "500": 8}}}}
+        excecao = {"cenarios": {"pdf": {"p95_ms": 5.0, "consultas_max": 1, "status": {"erro:UnicodeDecodeError": 10}}}}
+
+        self.assertEqual(contar_falhas(quebrado["cenarios"]["pdf"]), 8)
+        tabela, regrediu = comparar(antes, quebrado, tolerancia=20)
+        self.assertTrue(regrediu)
+        self.assertIn("falhas", tabela)
+        self.assertTrue(comparar(excecao, antes, tolerancia=20)[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
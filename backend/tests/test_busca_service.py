@@ -0,0 +1,170 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "busca-service-test-secret-key-1234567890",
+)
+
+from importlib import util
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.clinica import Clinica
+from app.models.paciente import Paciente
+from app.models.tutor import Tutor
+from app.services import busca_service
+
+MIGRATION_PATH = BACKEND_DIR / "migrations" / "versions" / "20260316_12_busca_indices.py"
+MIGRATION_LISTAGENS_PATH = BACKEND_DIR / "migrations" / "versions" / "20260326_22_busca_listagens_nome_key.py"
+
+
+def _load_migration(path=MIGRATION_PATH):
+    spec = util.spec_from_file_location(f"migration_{path.stem}", path)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class BuscaServiceTest(unittest.TestCase):
+    with_fts = True
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/busca.db")
+        self.addCleanup(self.engine.dispose)
+        for model in (Paciente, Tutor, Clinica):
+            model.__table__.create(bind=self.engine)
+
+        with self.engine.begin() as connection:
+            # Indice unico legado: a 20260316_12 deixa o homonimo (4) sem chave.
+            connection.exec_driver_sql("CREATE UNIQUE INDEX ux_tutores_nome_key ON tutores (nome_key)")
+            connection.exec_driver_sql(
+                "INSERT INTO tutores (id, nome, nome_key, ativo) VALUES "
+                "(1, 'João Araújo', 'joao araujo', 1), (2, 'Maria Joana', NULL, 1), "
+                "(4, 'Maria Joana', NULL, 1)"
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO clinicas (id, nome, cidade, ativo) VALUES "
+                "(1, 'Clínica São José', 'Fortaleza', 1), (2, 'Vet Jose', 'Caucaia', 0)"
+            )
+        migration = _load_migration()
+        migration_listagens = _load_migration(MIGRATION_LISTAGENS_PATH)
+        if not self.with_fts:
+            migration._fts5_disponivel = lambda connection: False
+            migration_listagens._trigram_disponivel = lambda connection: False
+        with self.engine.begin() as connection:
+            migration.upgrade(connection, "sqlite")
+        with self.engine.begin() as connection:
+            migration_listagens.upgrade(connection, "sqlite")
+
+        self.Session = sessionmaker(bind=self.engine)
+        busca_service.limpar_cache_recursos()
+        self.addCleanup(busca_service.limpar_cache_recursos)
+
+        db = self.Session()
+        db.add_all([
+            Paciente(id=1, nome="Thor", nome_key="thor", tutor_id=1, ativo=1),
+            Paciente(id=2, nome="Joãozinho", nome_key="joaozinho", tutor_id=2, ativo=1),
+            Paciente(id=3, nome="Joca", nome_key="joca", tutor_id=2, ativo=0),
+        ])
+        db.commit()
+        db.close()
+
+    def test_busca_is_accent_insensitive_across_entities(self) -> None:
+        db = self.Session()
+        try:
+            resultado = busca_service.buscar(db, "JOAO")
+        finally:
+            db.close()
+
+        self.assertEqual([p["id"] for p in resultado["pacientes"]], [2])
+        self.assertEqual([t["nome"] for t in resultado["tutores"]], ["João Araújo"])
+
+        db = self.Session()
+        try:
+            resultado = busca_service.buscar(db, "sao jose")
+        finally:
+            db.close()
+        self.assertEqual([c["id"] for c in resultado["clinicas"]], [1])
+
+    def test_short_terms_return_nothing(self) -> None:
+        db = self.Session()
+        try:
+            resultado = busca_service.buscar(db, "j")
+        finally:
+            db.close()
+        self.assertEqual(resultado["pacientes"] + resultado["tutores"] + resultado["clinicas"], [])
+
+    def test_filtro_nome_follows_updates(self) -> None:
+        db = self.Session()
+        try:
+            paciente = db.get(Paciente, 1)
+            paciente.nome = "Bolinha"
+            paciente.nome_key = "bolinha"
+            db.commit()
+
+            ids = [p.id for p in db.query(Paciente).filter(busca_service.filtro_nome(db, Paciente, "bolin"))]
+            self.assertEqual(ids, [1])
+            self.assertEqual(db.query(Paciente).filter(busca_service.filtro_nome(db, Paciente, "thor")).count(), 0)
+        finally:
+            db.close()
+
+    def test_filtro_nome_keeps_substring_matching(self) -> None:
+        db = self.Session()
+        try:
+            db.add(Tutor(id=3, nome="Ana Silva", nome_key="ana silva", ativo=1))
+            db.commit()
+
+            def _ids(termo):
+                return sorted(t.id for t in db.query(Tutor).filter(busca_service.filtro_nome(db, Tutor, termo)))
+
+            self.assertEqual(_ids("ilva"), [3])
+            self.assertEqual(_ids("raujo"), [1])
+            self.assertEqual(_ids("Araújo"), [1])
+            self.assertEqual(_ids("jo"), [1, 2, 4])
+            # Homonimos que o indice unico legado deixava sem nome_key.
+            self.assertEqual(_ids("Joana"), [2, 4])
+
+            condicao = str(busca_service.filtro_nome(db, Tutor, "ilva"))
+            if self.with_fts:
+                self.assertIn("tutores_nome_key_fts", condicao)
+            else:
+                self.assertNotIn("_fts", condicao)
+        finally:
+            db.close()
+
+    def test_every_row_gets_a_nome_key(self) -> None:
+        with self.engine.connect() as connection:
+            chaves = connection.exec_driver_sql("SELECT id, nome_key FROM tutores ORDER BY id").fetchall()
+            indices = connection.exec_driver_sql("PRAGMA index_list('tutores')").fetchall()
+        self.assertEqual([tuple(row) for row in chaves], [(1, "joao araujo"), (2, "maria joana"), (4, "maria joana")])
+        self.assertNotIn("ux_tutores_nome_key", [row[1] for row in indices])
+
+    def test_detects_available_index(self) -> None:
+        db = self.Session()
+        try:
+            esperado = busca_service.RECURSO_FTS5 if self.with_fts else None
+            self.assertEqual(busca_service.recurso_busca(db), esperado)
+        finally:
+            db.close()
+
+
+class BuscaServiceFallbackTest(BuscaServiceTest):
+    """Mesmo comportamento quando o SQLite nao tem FTS5 (cai no ILIKE)."""
+
+    with_fts = False
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "coorte-eco-test-secret-key-1234567890",
+)
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.laudo import Laudo
+from app.models.paciente import Paciente
+from app.models.referencia_eco import ReferenciaEco
+from app.services import coorte_eco_service, referencias_eco_service
+
+
+def _descricao(**medidas):
+    linhas = ["## Medidas Ecocardiograficas\n"]
+    linhas += [f"- {chave}: {valor}" for chave, valor in medidas.items()]
+    linhas.append("\n## Avaliacao Qualitativa\n- valvas: normais")
+    return "\n".join(linhas)
+
+
+class CoorteEcoServiceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/coorte.db")
+        self.addCleanup(self.engine.dispose)
+        for model in (Laudo, Paciente, ReferenciaEco):
+            model.__table__.create(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+        db = self.Session()
+        db.add_all([
+            ReferenciaEco(especie="Canina", peso_kg=10.0, la_ao_min=0.8, la_ao_max=1.6, lvid_d_min=24.0, lvid_d_max=32.0),
+            ReferenciaEco(especie="Canina", peso_kg=30.0, la_ao_min=0.8, la_ao_max=1.6, lvid_d_min=36.0, lvid_d_max=48.0),
+            Paciente(id=1, nome="Thor", especie="Canina", raca="Golden Retriever", peso_kg=30.0),
+            Paciente(id=2, nome="Mel", especie="Cão", raca="Poodle", peso_kg=10.0),
+            Paciente(id=3, nome="Bob", especie="Canino", raca="Golden retriever", peso_kg=25.0),
+            Paciente(id=4, nome="Mia", especie="Felina", raca="SRD", peso_kg=4.0),
+        ])
+        exame = datetime(2026, 3, 10, 9, 0)
+        db.add_all([
+            Laudo(id=1, paciente_id=1, veterinario_id=1, tipo="ecocardiograma", titulo="Eco",
+                  descricao=_descricao(AE_Ao="2,0", DIVEd=50), data_exame=exame),
+            Laudo(id=2, paciente_id=2, veterinario_id=1, tipo="ecocardiograma", titulo="Eco",
+                  descricao=_descricao(AE_Ao=1.2, DIVEd=28), data_exame=exame),
+            Laudo(id=3, paciente_id=3, veterinario_id=1, tipo="ecocardiograma", titulo="Eco",
+                  descricao=_descricao(AE_Ao=1.4), data_exame=exame + timedelta(days=30)),
+            Laudo(id=4, paciente_id=4, veterinario_id=1, tipo="ecocardiograma", titulo="Eco",
+                  descricao=_descricao(AE_Ao=1.1), data_exame=exame),
+            Laudo(id=5, paciente_id=1, veterinario_id=1, tipo="pressao_arterial", titulo="PA",
+                  descricao="- PAS_media: 180"),
+        ])
+        db.commit()
+        db.close()
+
+        referencias_eco_service.invalidar_cache_referencias()
+        coorte_eco_service.invalidar_cache_coorte()
+        self.addCleanup(referencias_eco_service.invalidar_cache_referencias)
+        self.addCleanup(coorte_eco_service.invalidar_cache_coorte)
+
+        interval = patch.object(coorte_eco_service, "REFRESH_INTERVAL_SECONDS", 0)
+        interval.start()
+        self.addCleanup(interval.stop)
+
+    def _consultar(self, **filtros):
+        db = self.Session()
+        try:
+            return coorte_eco_service.consultar_coorte(db, **filtros)
+        finally:
+            db.close()
+
+    def test_counts_dogs_over_20kg_with_la_ao_above_reference(self) -> None:
+        resultado = self._consultar(especie="cao", peso_min=20, parametro="AE_Ao")
+
+        self.assertEqual(resultado["total_laudos"], 2)
+        [la_ao] = resultado["parametros"]
+        self.assertEqual(la_ao["parametro"], "la_ao")
+        self.assertEqual((la_ao["acima"], la_ao["normal"], la_ao["abaixo"]), (1, 1, 0))
+        self.assertEqual(la_ao["pct_acima"], 50.0)
+        # Thor: media 1.2, dp 0.2 -> z = 4; Bob: z = 1.
+        self.assertEqual(la_ao["z_media"], 2.5)
+        self.assertEqual([grupo["raca"] for grupo in resultado["por_raca"]], ["Golden Retriever"])
+        self.assertEqual(resultado["por_raca"][0]["n"], 2)
+
+    def test_summary_filters_and_weight_bands(self) -> None:
+        resultado = self._consultar(especie="Canina", data_fim="2026-03-31")
+        self.assertEqual(resultado["total_laudos"], 2)
+        self.assertEqual(
+            {item["parametro"]: item["acima"] for item in resultado["parametros"]},
+            {"lvid_d": 1, "la_ao": 1},
+        )
+
+        resultado = self._consultar(parametro="la_ao", faixas_peso=[5, 20])
+        self.assertEqual(
+            [(faixa["peso_de"], faixa["peso_ate"], faixa["n"]) for faixa in resultado["por_faixa_peso"]],
+            [(None, 5.0, 1), (5.0, 20.0, 1), (20.0, None, 2)],
+        )
+
+        with self.assertRaisesRegex(ValueError, "Parametro desconhecido"):
+            self._consultar(parametro="xyz")
+
+    def test_base_refreshes_incrementally_and_rebuilds_after_delete(self) -> None:
+        self.assertEqual(self._consultar(parametro="AE_Ao")["total_laudos"], 4)
+
+        db = self.Session()
+        laudo = db.get(Laudo, 2)
+        laudo.descricao = _descricao(AE_Ao=1.9)
+        db.add(Laudo(id=6, paciente_id=2, veterinario_id=1, tipo="ecocardiograma", titulo="Eco",
+                     descricao=_descricao(AE_Ao=1.0)))
+        db.commit()
+
+        with patch.object(coorte_eco_service, "montar_base", wraps=coorte_eco_service.montar_base) as montar:
+            resultado = self._consultar(especie="Canina", parametro="AE_Ao")
+        relidos = sorted(linha.laudo_id for linha in montar.call_args.args[0])
+        self.assertEqual(relidos, [2, 6])
+        self.assertEqual(resultado["total_laudos"], 4)
+        self.assertEqual(resultado["parametros"][0]["acima"], 2)
+
+        db.query(Laudo).filter(Laudo.id == 1).delete()
+        db.query(Paciente).filter(Paciente.id == 3).update({"peso_kg": 12.0, "updated_at": "2026-04-01 10:00:00"})
+        db.commit()
+        db.close()
+
+        resultado = self._consultar(especie="Canina", peso_min=20, parametro="AE_Ao")
+        self.assertEqual(resultado["total_laudos"], 0)
+        self.assertEqual(self._consultar(especie="Canina")["total_laudos"], 3)
+
+    def test_percentil_normal_matches_known_values(self) -> None:
+        percentis = coorte_eco_service.percentil_normal(np.array([-1.96, 0.0, 1.0]))
+        np.testing.assert_allclose(percentis, [2.5, 50.0, 84.134], atol=1e-2)
+
+
+if __name__ == "__main__":
+    unittest.main()
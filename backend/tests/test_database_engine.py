@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "database-engine-test-secret-key-1234567890",
+)
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.db.database import build_engine, describe_engine
+
+
+class BuildEngineTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.url = f"sqlite:///{self.tmp_dir.name}/engine.db"
+
+    def _engine(self, **kwargs):
+        engine = build_engine(self.url, **kwargs)
+        self.addCleanup(engine.dispose)
+        return engine
+
+    def test_sqlite_connections_get_pragma_profile_and_pool_settings(self) -> None:
+        with patch.object(settings, "DB_POOL_SIZE", 3), patch.object(settings, "DB_MAX_OVERFLOW", 2):
+            engine = self._engine()
+
+        estado = describe_engine(engine)
+        self.assertEqual(estado["pool_size"], 3)
+        self.assertEqual(estado["max_overflow"], 2)
+        self.assertFalse(estado["pool_pre_ping"])
+        self.assertEqual(estado["pragmas"]["journal_mode"], "wal")
+        self.assertEqual(estado["pragmas"]["synchronous"], 1)
+        self.assertEqual(estado["pragmas"]["busy_timeout"], int(settings.SQLITE_BUSY_TIMEOUT_MS))
+        self.assertEqual(estado["pragmas"]["cache_size"], -int(settings.SQLITE_CACHE_SIZE_KB))
+        self.assertEqual(estado["pragmas"]["query_only"], 0)
+
+    def test_invalid_pragma_values_are_ignored(self) -> None:
+        with patch.object(settings, "SQLITE_JOURNAL_MODE", "wal; DROP TABLE x"), patch.object(
+            settings, "SQLITE_SYNCHRONOUS", "talvez"
+        ):
+            engine = self._engine()
+
+        self.assertEqual(describe_engine(engine)["pragmas"]["journal_mode"], "delete")
+
+    def test_read_only_engine_rejects_writes(self) -> None:
+        engine = self._engine()
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE itens (id INTEGER PRIMARY KEY)"))
+            connection.execute(text("INSERT INTO itens (id) VALUES (1)"))
+
+        leitura = self._engine(read_only=True)
+        with leitura.connect() as connection:
+            self.assertEqual(connection.execute(text("SELECT COUNT(*) FROM itens")).scalar(), 1)
+        with self.assertRaises(OperationalError):
+            with leitura.begin() as connection:
+                connection.execute(text("INSERT INTO itens (id) VALUES (2)"))
+        self.assertEqual(describe_engine(leitura)["pragmas"]["query_only"], 1)
+
+    def test_in_memory_sqlite_keeps_default_pool(self) -> None:
+        engine = build_engine("sqlite://")
+        self.addCleanup(engine.dispose)
+
+        self.assertEqual(describe_engine(engine)["pool"], "SingletonThreadPool")
+
+
+if __name__ == "__main__":
+    unittest.main()
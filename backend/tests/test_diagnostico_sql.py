@@ -0,0 +1,115 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "diagnostico-sql-test-secret-key-1234567890",
+)
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core import diagnostico_sql, instrumentation
+from app.core.config import settings
+
+
+def _montar_app(tmp_dir):
+    engine = create_engine(f"sqlite:///{tmp_dir}/diagnostico.db")
+    instrumentation.instalar_instrumentacao_sql(engine)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE itens (id INTEGER PRIMARY KEY, nome TEXT)"))
+        connection.execute(text("INSERT INTO itens (id, nome) VALUES (1, 'a'), (2, 'b'), (3, 'c'), (4, 'd')"))
+
+    app = FastAPI()
+    app.add_middleware(instrumentation.InstrumentacaoMiddleware)
+
+    @app.get("/itens")
+    def listar_um_a_um():
+        with engine.connect() as connection:
+            ids = [row[0] for row in connection.execute(text("SELECT id FROM itens ORDER BY id"))]
+            return [connection.execute(text("SELECT nome FROM itens WHERE id = :id"), {"id": i}).scalar() for i in ids]
+
+    @app.get("/itens/lote")
+    def listar_em_lote():
+        with engine.connect() as connection:
+            return [row[0] for row in connection.execute(text("SELECT nome FROM itens ORDER BY id"))]
+
+    return engine, TestClient(app)
+
+
+class DiagnosticoSqlTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine, self.client = _montar_app(self.tmp_dir.name)
+        self.addCleanup(self.engine.dispose)
+        diagnostico_sql.limpar_diagnostico_sql()
+        self.addCleanup(diagnostico_sql.limpar_diagnostico_sql)
+        for nome, valor in (("SQL_DIAGNOSTICO", True), ("SQL_LENTA_MS", 100000), ("SQL_N_MAIS_UM_LIMITE", 3)):
+            patcher = patch.object(settings, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_normalizes_literals_placeholders_and_in_lists(self) -> None:
+        self.assertEqual(
+            diagnostico_sql.normalizar_sql("SELECT  *\n FROM t WHERE a = 'x''y' AND b = 10 AND c IN (?, ?, ?) AND d = :d"),
+            "SELECT * FROM t WHERE a = ? AND b = ? AND c IN (?...) AND d = ?",
+        )
+        self.assertEqual(
+            diagnostico_sql.normalizar_sql("SELECT laudos_1.id FROM laudos AS laudos_1 WHERE x = %(param_1)s::text"),
+            "SELECT laudos_1.id FROM laudos AS laudos_1 WHERE x = ?::text",
+        )
+
+    def test_reports_n_plus_one_with_route(self) -> None:
+        self.client.get("/itens")
+        self.client.get("/itens/lote")
+
+        relatorio = diagnostico_sql.relatorio_diagnostico_sql()
+        [achado] = relatorio["resumo"]
+        self.assertEqual(
+            (achado["tipo"], achado["rota"], achado["pior"]),
+            ("n_mais_um", "/itens", 4),
+        )
+        self.assertEqual(achado["sql"], "SELECT nome FROM itens WHERE id = ?")
+
+    def test_slow_queries_capture_parameters_and_plan(self) -> None:
+        with patch.object(settings, "SQL_LENTA_MS", 0):
+            self.client.get("/itens/lote")
+
+        relatorio = diagnostico_sql.relatorio_diagnostico_sql()
+        lenta = next(item for item in relatorio["recentes"] if item["tipo"] == "lenta")
+        self.assertEqual(lenta["rota"], "/itens/lote")
+        self.assertTrue(any("SCAN" in linha for linha in lenta["plano"]))
+
+    def test_disabled_mode_records_nothing(self) -> None:
+        with patch.object(settings, "SQL_DIAGNOSTICO", False):
+            self.client.get("/itens")
+        self.assertEqual(diagnostico_sql.relatorio_diagnostico_sql()["resumo"], [])
+
+
+def test_query_budget_fixture_flags_n_plus_one(orcamento_consultas, tmp_path):
+    engine, client = _montar_app(tmp_path)
+    try:
+        with orcamento_consultas(max_consultas=1, max_repeticoes=1):
+            client.get("/itens/lote")
+
+        with pytest.raises(pytest.fail.Exception, match=r"N\+1 em /itens: 4x"):
+            with orcamento_consultas(max_repeticoes=2):
+                client.get("/itens")
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
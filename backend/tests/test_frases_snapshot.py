@@ -0,0 +1,192 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services import frases_service, frases_ultrassom_abdominal_service, json_store
+from app.services.json_store import JournaledJsonStore, JsonSnapshotCache
+
+
+def _frase(frase_id, patologia, grau, conclusao="", ativo=1):
+    return {
+        "id": frase_id,
+        "chave": f"{patologia} ({grau})",
+        "patologia": patologia,
+        "grau": grau,
+        "conclusao": conclusao,
+        "ativo": ativo,
+    }
+
+
+class FrasesSnapshotTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.frases_file = Path(self.tmp_dir.name) / "frases.json"
+        self._write([
+            _frase(1, "Normal", "Normal", "Ecocardiograma dentro da normalidade"),
+            _frase(2, "Endocardiose Mitral", "Leve", "Degeneração valvar mitral"),
+            _frase(3, "Endocardiose Mitral", "Moderada", "Remodelamento cardíaco"),
+            _frase(4, "Estenose Aórtica", "Leve", "Obstrução", ativo=0),
+        ])
+
+        store = JournaledJsonStore(self.frases_file, "frases")
+        cache = JsonSnapshotCache(store, frases_service._build_frases_snapshot)
+        for target, value in (
+            ("FRASES_FILE", self.frases_file),
+            ("_FRASES_STORE", store),
+            ("_FRASES_CACHE", cache),
+        ):
+            patcher = patch.object(frases_service, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        interval = patch.object(json_store, "STAT_INTERVAL_SECONDS", 0)
+        interval.start()
+        self.addCleanup(interval.stop)
+
+    def _write(self, frases) -> None:
+        with open(self.frases_file, "w", encoding="utf-8") as file:
+            json.dump({"version": "1.0", "frases": frases}, file, ensure_ascii=False)
+
+    def test_lookups_by_id_and_chave_ignore_inactive_frases(self) -> None:
+        self.assertEqual(frases_service.obter_frase(2)["grau"], "Leve")
+        self.assertEqual(frases_service.obter_frase_por_chave("Endocardiose Mitral (Moderada)")["id"], 3)
+        self.assertIsNone(frases_service.obter_frase(4))
+        self.assertIsNone(frases_service.obter_frase_por_chave("Estenose Aórtica (Leve)"))
+
+    def test_busca_is_accent_insensitive_and_keeps_file_order(self) -> None:
+        resultado = frases_service.listar_frases(busca="cardiaco")
+        self.assertEqual([item["id"] for item in resultado["items"]], [3])
+
+        resultado = frases_service.listar_frases(busca="mitral")
+        self.assertEqual([item["id"] for item in resultado["items"]], [2, 3])
+
+        resultado = frases_service.listar_frases(patologia="endo", grau="mod")
+        self.assertEqual(resultado["total"], 1)
+
+    def test_returned_frases_do_not_mutate_snapshot(self) -> None:
+        frase = frases_service.obter_frase(1)
+        frase["conclusao"] = "alterada"
+
+        self.assertEqual(
+            frases_service.obter_frase(1)["conclusao"],
+            "Ecocardiograma dentro da normalidade",
+        )
+
+    def test_snapshot_reloads_when_file_changes(self) -> None:
+        self.assertEqual(frases_service.listar_frases()["total"], 3)
+
+        self._write([_frase(1, "Normal", "Normal"), _frase(9, "Cardiomiopatia", "Leve")])
+
+        self.assertEqual(frases_service.listar_frases()["total"], 2)
+        self.assertEqual(frases_service.buscar_frase_por_patologia_grau("Cardiomiopatia")["id"], 9)
+
+    def test_snapshot_is_not_rebuilt_while_file_is_unchanged(self) -> None:
+        frases_service.listar_frases()
+
+        with patch.object(frases_service, "_build_frases_snapshot") as builder_mock:
+            frases_service.obter_frase(1)
+            frases_service.listar_patologias()
+        builder_mock.assert_not_called()
+
+    def test_writes_go_to_journal_and_are_visible_immediately(self) -> None:
+        original = self.frases_file.read_bytes()
+
+        frases_service.atualizar_frase(2, {"conclusao": "Nova conclusão"})
+        nova = frases_service.criar_frase({"chave": "Cardiomiopatia (Leve)", "patologia": "Cardiomiopatia", "grau": "Leve"})
+        frases_service.deletar_frase(1)
+
+        self.assertEqual(self.frases_file.read_bytes(), original)
+        self.assertEqual(nova["id"], 5)
+        self.assertEqual(frases_service.obter_frase(2)["conclusao"], "Nova conclusão")
+        self.assertIsNone(frases_service.obter_frase(1))
+        with self.assertRaisesRegex(ValueError, "Já existe"):
+            frases_service.criar_frase({"chave": "Estenose Aórtica (Leve)"})
+
+        frases_service.compactar_frases()
+
+        self.assertFalse(self.frases_file.with_name("frases.json.journal").exists())
+        with open(self.frases_file, encoding="utf-8") as file:
+            frases = {f["id"]: f for f in json.load(file)["frases"]}
+        self.assertEqual(frases[2]["conclusao"], "Nova conclusão")
+        self.assertEqual(frases[1]["ativo"], 0)
+        self.assertIn(5, frases)
+
+    def test_writes_update_the_snapshot_incrementally(self) -> None:
+        frases_service.atualizar_frase(2, {"chave": "Endocardiose Mitral (Moderada)", "grau": "Moderada"})
+        frases_service.criar_frase({"chave": "Cardiomiopatia (Leve)", "patologia": " Cardiomiopatia ", "grau": "Leve"})
+        frases_service.restaurar_frase(4)
+        frases_service.deletar_frase(3)
+        with patch.object(frases_service, "_build_frases_snapshot") as builder_mock:
+            frases_service.atualizar_frase(1, {"conclusao": "Câmaras cardíacas preservadas"})
+            frases_service.deletar_frase(2)
+        builder_mock.assert_not_called()
+
+        incremental = frases_service._FRASES_CACHE.get()
+        completo = frases_service._build_frases_snapshot(json.loads(json.dumps(incremental.payload)))
+        self.assertEqual(incremental, completo)
+        self.assertEqual(frases_service.listar_frases(busca="cardiacas preserv")["items"][0]["id"], 1)
+        self.assertEqual(frases_service.listar_patologias(), ["Cardiomiopatia", "Estenose Aórtica", "Normal"])
+
+
+class FrasesUltrassomAbdominalSnapshotTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        frases_file = Path(self.tmp_dir.name) / "frases_ultrassom_abdominal.json"
+        with open(frases_file, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": "1.0",
+                    "frases": [
+                        {"id": 1, "orgao": "rim", "sexo": "Todos", "titulo": "Rim normal", "texto": "Rins preservados"},
+                        {"id": 2, "orgao": "figado", "sexo": "Todos", "titulo": "Hepatopatia", "texto": "Fígado aumentado"},
+                        {"id": 3, "orgao": "prostata", "sexo": "Macho", "titulo": "Próstata", "texto": "Sem alterações"},
+                    ],
+                },
+                file,
+                ensure_ascii=False,
+            )
+
+        modulo = frases_ultrassom_abdominal_service
+        store = JournaledJsonStore(frases_file, "frases")
+        cache = JsonSnapshotCache(store, modulo._build_frases_snapshot)
+        for target, value in (("FRASES_FILE", frases_file), ("_FRASES_STORE", store), ("_FRASES_CACHE", cache)):
+            patcher = patch.object(modulo, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        interval = patch.object(json_store, "STAT_INTERVAL_SECONDS", 0)
+        interval.start()
+        self.addCleanup(interval.stop)
+
+    def test_writes_update_the_snapshot_incrementally(self) -> None:
+        modulo = frases_ultrassom_abdominal_service
+        modulo.listar_frases()
+        with patch.object(modulo, "_build_frases_snapshot") as builder_mock:
+            nova = modulo.criar_frase({"orgao": "Baço", "titulo": "Baço normal", "texto": "Esplenomegalia ausente"})
+            modulo.atualizar_frase(1, {"orgao": "bexiga", "texto": "Bexiga repleta"})
+            modulo.deletar_frase(2)
+        builder_mock.assert_not_called()
+
+        incremental = modulo._FRASES_CACHE.get()
+        completo = modulo._build_frases_snapshot(json.loads(json.dumps(incremental.payload)))
+        self.assertEqual(incremental, completo)
+
+        # Listagem segue ordenada por orgao, sexo e titulo.
+        self.assertEqual([item["id"] for item in modulo.listar_frases()["items"]], [nova["id"], 1, 3])
+        self.assertEqual([item["id"] for item in modulo.listar_frases(ativo=None)["items"]], [nova["id"], 1, 2, 3])
+        self.assertEqual([item["id"] for item in modulo.listar_frases(busca="repleta")["items"]], [1])
+        self.assertEqual(modulo.listar_frases(busca="preservados")["total"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
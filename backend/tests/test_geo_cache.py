@@ -0,0 +1,178 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "geo-cache-test-secret-key-1234567890",
+)
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.clinica import Clinica
+from app.models.geo_cache import GeoCacheEntrada
+from app.services import geo_cache, geocoding_service, logistica_service
+from app.services.geocoding_service import GeocodingError, buscar_cep_viacep, geocodificar_endereco_google
+from tests.geo_stub_server import CEP_INEXISTENTE, GeoStubServer
+
+
+class GeoCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/geo.db")
+        self.addCleanup(self.engine.dispose)
+        GeoCacheEntrada.__table__.create(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+        self.stub = GeoStubServer()
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+
+        for alvo, atributo, valor in (
+            (geo_cache, "SessionLocal", self.Session),
+            (settings, "GEO_CACHE_ATIVO", True),
+            (settings, "GOOGLE_MAPS_API_KEY", "chave-de-teste"),
+            (geocoding_service, "VIACEP_URL", self.stub.url("/ws/{cep}/json/")),
+            (geocoding_service, "GOOGLE_GEOCODING_URL", self.stub.url("/maps/api/geocode/json")),
+            (logistica_service, "GOOGLE_ROUTES_API_URL", self.stub.url("/directions/v2:computeRoutes")),
+            (logistica_service, "GOOGLE_DISTANCE_MATRIX_URL", self.stub.url("/maps/api/distancematrix/json")),
+        ):
+            patcher = patch.object(alvo, atributo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_viacep_is_served_from_db_after_first_lookup(self) -> None:
+        antes = geo_cache.estatisticas(geo_cache.PROVEDOR_VIACEP)
+
+        primeiro = buscar_cep_viacep("60115-000")
+        segundo = buscar_cep_viacep("60115000")
+
+        self.assertEqual(primeiro, segundo)
+        self.assertEqual(primeiro["bairro"], "Meireles")
+        self.assertEqual(self.stub.contagem["/ws/60115000/json/"], 1)
+        depois = geo_cache.estatisticas(geo_cache.PROVEDOR_VIACEP)
+        self.assertEqual(depois["hit"] - antes["hit"], 1)
+        self.assertEqual(depois["miss"] - antes["miss"], 1)
+        self.assertIsNotNone(depois["taxa_acerto"])
+
+    def test_failures_are_cached_negatively_with_short_ttl(self) -> None:
+        for _ in range(3):
+            with self.assertRaises(GeocodingError) as contexto:
+                buscar_cep_viacep(CEP_INEXISTENTE)
+            self.assertIn("nao encontrado", str(contexto.exception))
+        self.assertEqual(self.stub.contagem[f"/ws/{CEP_INEXISTENTE}/json/"], 1)
+
+        db = self.Session()
+        entrada = db.query(GeoCacheEntrada).filter_by(provedor=geo_cache.PROVEDOR_VIACEP).one()
+        self.assertFalse(entrada.sucesso)
+        self.assertLessEqual(
+            entrada.expires_at - entrada.created_at,
+            timedelta(seconds=settings.GEO_CACHE_TTL_FALHA_SECONDS),
+        )
+        # Expirada, a falha volta a ser consultada.
+        entrada.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        db.close()
+        with self.assertRaises(GeocodingError):
+            buscar_cep_viacep(CEP_INEXISTENTE)
+        self.assertEqual(self.stub.contagem[f"/ws/{CEP_INEXISTENTE}/json/"], 2)
+
+    def test_concurrent_lookups_for_same_key_are_coalesced(self) -> None:
+        self.stub.latencia = 0.3
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            resultados = list(pool.map(lambda _: buscar_cep_viacep("60160040"), range(6)))
+
+        self.assertEqual(self.stub.contagem["/ws/60160040/json/"], 1)
+        self.assertTrue(all(r == resultados[0] for r in resultados))
+
+    def test_geocoding_and_travel_lookups_use_the_cache(self) -> None:
+        for endereco in ("R. Canuto de Aguiar, 500, Fortaleza", "  r. canuto de aguiar,  500, FORTALEZA "):
+            resultado = geocodificar_endereco_google(endereco, settings.GOOGLE_MAPS_API_KEY)
+            self.assertEqual(resultado.cidade, "Fortaleza")
+            self.assertAlmostEqual(resultado.latitude, -3.7303)
+        self.assertEqual(self.stub.contagem["/maps/api/geocode/json"], 1)
+
+        origem = Clinica(id=1, nome="A", latitude=-3.73, longitude=-38.52)
+        destino = Clinica(id=2, nome="B", latitude=-3.83, longitude=-38.49)
+        for _ in range(3):
+            distancia, duracao, fonte = logistica_service.estimar_deslocamento(origem, destino)
+            self.assertEqual((distancia, duracao, fonte), (8.1, 23, "google_routes_api_traffic"))
+        self.assertEqual(self.stub.contagem["/directions/v2:computeRoutes"], 1)
+
+    def test_transport_failures_bypass_the_cache(self) -> None:
+        origem = Clinica(id=1, nome="A", latitude=-3.73, longitude=-38.52)
+        destino = Clinica(id=2, nome="B", latitude=-3.83, longitude=-38.49)
+        waypoints = (logistica_service._waypoint_google_routes(origem), logistica_service._waypoint_google_routes(destino))
+        chamadas = []
+
+        def _fora_do_ar(*args, **kwargs):
+            chamadas.append(args)
+            raise OSError("timed out")
+
+        with patch.object(logistica_service, "_http_post_json", _fora_do_ar):
+            for _ in range(2):
+                self.assertIsNone(logistica_service._consultar_google_routes_api(*waypoints))
+        self.assertEqual(len(chamadas), 2)
+
+        with patch.object(logistica_service, "_http_get_json", lambda url: {"status": "OVER_QUERY_LIMIT"}):
+            self.assertIsNone(logistica_service._consultar_google_distance_matrix("A", "B"))
+
+        with patch.object(geocoding_service, "_http_get_json", _fora_do_ar):
+            with self.assertRaises(GeocodingError):
+                buscar_cep_viacep("60115000")
+
+        db = self.Session()
+        self.addCleanup(db.close)
+        self.assertEqual(db.query(GeoCacheEntrada).count(), 0)
+
+        # De volta ao ar, a mesma rota e o mesmo CEP vao ao provedor.
+        distancia, _, fonte = logistica_service.estimar_deslocamento(origem, destino)
+        self.assertEqual((distancia, fonte), (8.1, "google_routes_api_traffic"))
+        self.assertEqual(buscar_cep_viacep("60115000")["bairro"], "Meireles")
+        self.assertEqual(self.stub.contagem["/ws/60115000/json/"], 1)
+
+    def test_definitive_no_route_is_cached_negatively(self) -> None:
+        chamadas = []
+
+        def _sem_rota(*args, **kwargs):
+            chamadas.append(args)
+            return {}
+
+        waypoints = ({"address": "Ilha"}, {"address": "Continente"})
+        with patch.object(logistica_service, "_http_post_json", _sem_rota):
+            for _ in range(3):
+                self.assertIsNone(logistica_service._consultar_google_routes_api(*waypoints))
+        self.assertEqual(len(chamadas), 1)
+
+        db = self.Session()
+        self.addCleanup(db.close)
+        entrada = db.query(GeoCacheEntrada).filter_by(provedor=geo_cache.PROVEDOR_GOOGLE_ROUTES).one()
+        self.assertFalse(entrada.sucesso)
+        self.assertEqual(entrada.erro, "sem_resultado")
+
+    def test_database_failure_falls_back_to_provider(self) -> None:
+        def _quebrada():
+            raise RuntimeError("banco fora")
+
+        with patch.object(geo_cache, "SessionLocal", _quebrada):
+            self.assertEqual(buscar_cep_viacep("60115000")["cidade"], "Fortaleza")
+            buscar_cep_viacep("60115000")
+        self.assertEqual(self.stub.contagem["/ws/60115000/json/"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import sys
+import tempfile
+import unittest
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "imagem-thumbs-test-secret-key-1234567890",
+)
+
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints import imagens
+from app.core.security import get_current_user
+from app.db.database import get_db
+from app.models import laudo as _laudo  # noqa: F401  (FK imagens_laudo -> laudos)
+from app.models.imagem_laudo import ImagemLaudo
+from app.services import imagem_thumbs
+from app.services.imagem_thumbs import (
+    compute_image_hash,
+    ensure_thumbnail,
+    find_cached_thumbnail,
+    normalize_thumb_format,
+    normalize_thumb_width,
+    render_thumbnail,
+)
+
+
+def _png_bytes(width: int, height: int, mode: str = "RGB") -> bytes:
+    buffer = BytesIO()
+    Image.new(mode, (width, height), (200, 30, 30, 128)[: len(mode)]).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ImagemThumbsTest(unittest.TestCase):
+    def test_normalize_thumb_width_snaps_to_next_standard_size(self) -> None:
+        self.assertEqual(normalize_thumb_width(100), 160)
+        self.assertEqual(normalize_thumb_width(321), 640)
+        self.assertEqual(normalize_thumb_width(5000), 1024)
+        self.assertEqual(normalize_thumb_width(0), imagem_thumbs.DEFAULT_THUMB_WIDTH)
+
+    def test_normalize_thumb_format_rejects_unknown_formats(self) -> None:
+        self.assertEqual(normalize_thumb_format("JPG"), "jpeg")
+        with self.assertRaisesRegex(ValueError, "Formato de miniatura invalido"):
+            normalize_thumb_format("gif")
+
+    def test_render_thumbnail_keeps_aspect_ratio(self) -> None:
+        thumb = render_thumbnail(_png_bytes(1200, 800), 320, "webp")
+
+        with Image.open(BytesIO(thumb)) as image:
+            self.assertEqual(image.format, "WEBP")
+            self.assertEqual(image.size, (320, 213))
+
+    def test_render_thumbnail_flattens_alpha_for_jpeg(self) -> None:
+        thumb = render_thumbnail(_png_bytes(400, 400, "RGBA"), 160, "jpeg")
+
+        with Image.open(BytesIO(thumb)) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(image.mode, "RGB")
+
+    def test_ensure_thumbnail_reuses_cached_file(self) -> None:
+        content = _png_bytes(800, 600)
+        content_hash = compute_image_hash(content)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch.object(imagem_thumbs.settings, "UPLOAD_DIR", tmp_dir):
+                self.assertIsNone(find_cached_thumbnail(content_hash, 160, "webp"))
+
+                path = ensure_thumbnail(content, 160, "webp", content_hash=content_hash)
+                self.assertTrue(path.startswith(tmp_dir))
+                self.assertEqual(find_cached_thumbnail(content_hash, 160, "webp"), path)
+
+                with patch("app.services.imagem_thumbs.render_thumbnail") as render_mock:
+                    self.assertEqual(ensure_thumbnail(content, 160, "webp"), path)
+                render_mock.assert_not_called()
+
+
+class ImagemThumbEndpointTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        engine = create_engine(f"sqlite:///{self.tmp_dir.name}/imagens.db")
+        self.addCleanup(engine.dispose)
+        ImagemLaudo.__table__.create(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        db = Session()
+        db.add(ImagemLaudo(id=1, nome_arquivo="eco.png", tipo_mime="image/png", conteudo=_png_bytes(800, 600)))
+        db.commit()
+        db.close()
+
+        patcher = patch.object(imagem_thumbs.settings, "UPLOAD_DIR", self.tmp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        def _get_db():
+            sessao = Session()
+            try:
+                yield sessao
+            finally:
+                sessao.close()
+
+        app = FastAPI()
+        app.include_router(imagens.router, prefix="/imagens")
+        app.dependency_overrides[get_db] = _get_db
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, nome="Vet")
+        self.client = TestClient(app)
+
+    def test_if_none_match_returns_304_without_rendering(self) -> None:
+        primeira = self.client.get("/imagens/1/thumb?w=160")
+        self.assertEqual(primeira.status_code, 200)
+        etag = primeira.headers["etag"]
+        self.assertEqual(etag, f'"{compute_image_hash(_png_bytes(800, 600))}-160-webp"')
+
+        with patch.object(imagens, "find_cached_thumbnail") as busca_mock:
+            for if_none_match in (etag, f"W/{etag}", f'"outra", {etag}', "*"):
+                resposta = self.client.get("/imagens/1/thumb?w=160", headers={"If-None-Match": if_none_match})
+                self.assertEqual(resposta.status_code, 304, if_none_match)
+                self.assertEqual(resposta.headers["etag"], etag)
+                self.assertEqual(resposta.content, b"")
+        busca_mock.assert_not_called()
+
+        # Outra largura e outra ETag: o conteudo volta a ser enviado.
+        outra = self.client.get("/imagens/1/thumb?w=320", headers={"If-None-Match": etag})
+        self.assertEqual(outra.status_code, 200)
+        self.assertNotEqual(outra.headers["etag"], etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
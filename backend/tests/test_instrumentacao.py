@@ -0,0 +1,121 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "instrumentacao-test-secret-key-1234567890",
+)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core import instrumentation
+from app.core.metrics import Counter, Gauge, Histogram, Registro
+
+
+class MetricsRenderingTest(unittest.TestCase):
+    def test_renders_prometheus_text_format(self) -> None:
+        registro = Registro()
+        contador = registro.registrar(Counter("x_eventos", "Eventos.", ("tipo",)))
+        histograma = registro.registrar(Histogram("x_duracao_seconds", "Duracao.", buckets=(0.1, 1)))
+        medidor = registro.registrar(Gauge("x_fila", "Fila.", ("fila",)))
+
+        contador.inc(tipo='a"b')
+        contador.inc(2, tipo='a"b')
+        for valor in (0.05, 0.5, 3):
+            histograma.observe(valor)
+        medidor.set_function(lambda: 4, fila="pdf")
+        medidor.set_function(lambda: 1 / 0, fila="quebrada")
+
+        saida = registro.renderizar()
+        self.assertIn("# TYPE x_eventos counter", saida)
+        self.assertIn('x_eventos_total{tipo="a\\"b"} 3', saida)
+        self.assertIn('x_duracao_seconds_bucket{le="0.1"} 1', saida)
+        self.assertIn('x_duracao_seconds_bucket{le="1"} 2', saida)
+        self.assertIn('x_duracao_seconds_bucket{le="+Inf"} 3', saida)
+        self.assertIn("x_duracao_seconds_sum 3.55", saida)
+        self.assertIn('x_fila{fila="pdf"} 4', saida)
+        self.assertNotIn("quebrada", saida)
+
+        self.assertIs(registro.registrar(Counter("x_eventos", "Eventos.", ("tipo",))), contador)
+        with self.assertRaises(ValueError):
+            registro.registrar(Gauge("x_eventos", "Outro."))
+        with self.assertRaises(ValueError):
+            contador.inc(outro="x")
+
+
+class InstrumentacaoMiddlewareTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        engine = self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/metricas.db")
+        self.addCleanup(engine.dispose)
+        instrumentation.instalar_instrumentacao_sql(engine)
+        instrumentation.instalar_instrumentacao_sql(engine)
+
+        app = FastAPI()
+        app.add_middleware(instrumentation.InstrumentacaoMiddleware)
+
+        @app.get("/itens/{item_id}")
+        def obter_item(item_id: int):
+            with engine.connect() as connection:
+                for _ in range(3):
+                    connection.execute(text("SELECT 1"))
+            return {"id": item_id}
+
+        @app.get("/async")
+        async def rota_async():
+            return {"ok": True}
+
+        self.client = TestClient(app)
+
+    def test_records_route_template_and_query_count(self) -> None:
+        antes = instrumentation.HTTP_REQUEST_SECONDS.contagem(method="GET", route="/itens/{item_id}", status=200)
+
+        resposta = self.client.get("/itens/7")
+        self.client.get("/itens/8")
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertRegex(resposta.headers["server-timing"], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="3 consultas"$')
+        self.assertEqual(
+            instrumentation.HTTP_REQUEST_SECONDS.contagem(method="GET", route="/itens/{item_id}", status=200),
+            antes + 2,
+        )
+        self.assertGreaterEqual(instrumentation.DB_QUERIES_POR_REQUISICAO.contagem(route="/itens/{item_id}"), 2)
+
+    def test_unmatched_paths_share_one_label(self) -> None:
+        antes = instrumentation.HTTP_REQUEST_SECONDS.contagem(method="GET", route=instrumentation.SEM_ROTA, status=404)
+
+        self.client.get("/nao-existe/1")
+        self.client.get("/nao-existe/2")
+
+        self.assertEqual(
+            instrumentation.HTTP_REQUEST_SECONDS.contagem(method="GET", route=instrumentation.SEM_ROTA, status=404),
+            antes + 2,
+        )
+        self.assertIn('desc="0 consultas"', self.client.get("/async").headers["server-timing"])
+
+    def test_failed_statements_do_not_leak_start_times(self) -> None:
+        antes = instrumentation.DB_QUERIES_TOTAL.valor()
+        with self.engine.connect() as connection:
+            for _ in range(3):
+                with self.assertRaises(OperationalError):
+                    connection.execute(text("SELECT * FROM tabela_inexistente"))
+                connection.rollback()
+            connection.execute(text("SELECT 1"))
+            self.assertEqual(connection.connection.info.get("_fortcordis_inicio_consulta"), [])
+        self.assertEqual(instrumentation.DB_QUERIES_TOTAL.valor(), antes + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
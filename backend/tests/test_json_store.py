@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.json_store import JournaledJsonStore, apply_upserts, atomic_write_json
+
+
+class JournaledJsonStoreTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = Path(self.tmp_dir.name) / "frases.json"
+        self.payload = {"version": "1.0", "frases": [{"id": 1, "texto": "a"}, {"id": 2, "texto": "b"}]}
+        atomic_write_json(self.path, self.payload)
+        self.store = JournaledJsonStore(self.path, "frases")
+
+    def _commit(self, record: dict) -> None:
+        payload = apply_upserts(self.store.read(), [record], "frases", {"last_updated": "x"})
+        self.store.commit(payload, [record], {"last_updated": "x"})
+
+    def test_commit_appends_to_journal_without_touching_base(self) -> None:
+        base = self.path.read_bytes()
+
+        self._commit({"id": 2, "texto": "b2"})
+        self._commit({"id": 3, "texto": "c"})
+
+        self.assertEqual(self.path.read_bytes(), base)
+        data = self.store.read()
+        self.assertEqual([f["texto"] for f in data["frases"]], ["a", "b2", "c"])
+        self.assertEqual(data["last_updated"], "x")
+
+    def test_torn_last_line_is_ignored(self) -> None:
+        self._commit({"id": 1, "texto": "a2"})
+        with open(self.store.journal_path, "a", encoding="utf-8") as file:
+            file.write('{"upsert": [{"id": 2, "tex')
+
+        self.assertEqual([f["texto"] for f in self.store.read()["frases"]], ["a2", "b"])
+
+    def test_journal_is_ignored_when_base_is_replaced(self) -> None:
+        self._commit({"id": 1, "texto": "a2"})
+        # Base trocado por fora (deploy/scp): o journal antigo nao se aplica.
+        atomic_write_json(self.path, {"version": "1.0", "frases": [{"id": 1, "texto": "novo"}]})
+
+        self.assertEqual(self.store.read()["frases"], [{"id": 1, "texto": "novo"}])
+
+        self._commit({"id": 2, "texto": "z"})
+        self.assertEqual([f["texto"] for f in self.store.read()["frases"]], ["novo", "z"])
+
+    def test_commit_compacts_when_journal_grows(self) -> None:
+        self.store.journal_max_bytes = 1
+        self._commit({"id": 1, "texto": "a2"})
+        self._commit({"id": 2, "texto": "b2"})
+
+        self.assertFalse(self.store.journal_path.exists())
+        with open(self.path, encoding="utf-8") as file:
+            self.assertEqual([f["texto"] for f in json.load(file)["frases"]], ["a2", "b2"])
+
+    def test_atomic_write_leaves_no_temp_files(self) -> None:
+        atomic_write_json(self.path, {"frases": []})
+
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["frases.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
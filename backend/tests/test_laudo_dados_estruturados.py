@@ -0,0 +1,141 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from importlib import util
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "laudo-dados-test-secret-key-1234567890",
+)
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import laudo as laudo_module
+from app.models.laudo import Laudo
+
+MIGRATION_PATH = BACKEND_DIR / "migrations" / "versions" / "20260317_13_laudos_dados_estruturados.py"
+
+DESCRICAO_ECO = (
+    "## Medidas Ecocardiográficas\n"
+    "- DIVEd: 32,5\n"
+    "- AE_Ao: 1.45\n\n"
+    "## Avaliação Qualitativa\n"
+    "- valvas: Espessamento leve\nda mitral\n"
+    "- camaras: Normais\n"
+    "- outro: ignorado"
+)
+PRESSAO = {"pas_1": 150, "pas_2": 160, "pas_3": 170, "pas_media": 160}
+
+
+def _load_migration():
+    spec = util.spec_from_file_location("laudos_dados_estruturados_migration", MIGRATION_PATH)
+    module = util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class LaudoDadosEstruturadosTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/laudos.db")
+        self.addCleanup(self.engine.dispose)
+        self.Session = sessionmaker(bind=self.engine)
+
+    def _novo_laudo(self, **campos) -> Laudo:
+        valores = {"paciente_id": 1, "veterinario_id": 1, "tipo": "ecocardiograma", "titulo": "Eco"}
+        valores.update(campos)
+        return Laudo(**valores)
+
+    def test_columns_are_derived_on_insert_and_update(self) -> None:
+        Laudo.__table__.create(bind=self.engine)
+        db = self.Session()
+        self.addCleanup(db.close)
+
+        laudo = self._novo_laudo(
+            descricao=DESCRICAO_ECO,
+            anexos=json.dumps({"pressao_arterial": PRESSAO}),
+        )
+        pressao = self._novo_laudo(tipo="pressao_arterial", descricao="- PAS_media: 160")
+        db.add_all([laudo, pressao])
+        db.commit()
+
+        self.assertEqual(laudo.medidas, {"DIVEd": 32.5, "AE_Ao": 1.45})
+        self.assertEqual(laudo.qualitativa, {"valvas": "Espessamento leve\nda mitral", "camaras": "Normais"})
+        self.assertEqual(laudo.pressao_arterial["pas_media"], 160)
+        self.assertEqual(pressao.medidas, {})
+
+        laudo.descricao = "## Medidas Ecocardiograficas\n- DIVEd: 30\n\n## Avaliacao Qualitativa\n- funcao: Preservada"
+        laudo.anexos = None
+        db.commit()
+        db.expire_all()
+
+        laudo = db.get(Laudo, laudo.id)
+        self.assertEqual(laudo.medidas, {"DIVEd": 30.0})
+        self.assertEqual(laudo.qualitativa, {"funcao": "Preservada"})
+        self.assertEqual(laudo.pressao_arterial, {})
+
+        laudo.descricao = "- DIVEd: 99"
+        laudo.medidas_json = {"DIVEd": 31.0}
+        db.commit()
+        self.assertEqual(laudo.medidas, {"DIVEd": 31.0})
+
+    def test_anexos_are_parsed_once_per_value(self) -> None:
+        laudo = self._novo_laudo(anexos=json.dumps({"ecocardiograma_cabecalho": {"ritmo": "Sinusal"}}))
+
+        with patch.object(laudo_module, "carregar_anexos", wraps=laudo_module.carregar_anexos) as carregar:
+            self.assertEqual(laudo.anexos_dados["ecocardiograma_cabecalho"]["ritmo"], "Sinusal")
+            laudo.anexos_dados
+            laudo.anexos_dados
+            self.assertEqual(carregar.call_count, 1)
+
+            laudo.anexos = json.dumps({"pressao_arterial": PRESSAO})
+            self.assertIn("pressao_arterial", laudo.anexos_dados)
+            self.assertEqual(carregar.call_count, 2)
+
+    def test_migration_adds_columns_and_backfills_legacy_rows(self) -> None:
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE laudos (id INTEGER PRIMARY KEY, tipo TEXT, descricao TEXT, anexos TEXT)"
+            )
+            connection.execute(
+                text("INSERT INTO laudos (id, tipo, descricao, anexos) VALUES (:id, :tipo, :descricao, :anexos)"),
+                [
+                    {"id": 1, "tipo": "ecocardiograma", "descricao": DESCRICAO_ECO, "anexos": None},
+                    {"id": 2, "tipo": "pressao_arterial", "descricao": "- PAS: 1",
+                     "anexos": json.dumps({"pressao_arterial": PRESSAO})},
+                    {"id": 3, "tipo": "exame", "descricao": "Sem medidas", "anexos": "{invalido"},
+                ],
+            )
+
+        migration = _load_migration()
+        migration.BATCH_SIZE = 2
+        with self.engine.begin() as connection:
+            migration.upgrade(connection, "sqlite")
+
+        with self.engine.connect() as connection:
+            rows = {
+                row[0]: row[1:]
+                for row in connection.exec_driver_sql(
+                    "SELECT id, medidas_json, qualitativa_json, pressao_arterial_json FROM laudos"
+                )
+            }
+        self.assertEqual(json.loads(rows[1][0]), {"DIVEd": 32.5, "AE_Ao": 1.45})
+        self.assertEqual(json.loads(rows[1][1])["camaras"], "Normais")
+        self.assertIsNone(rows[1][2])
+        self.assertEqual((rows[2][0], json.loads(rows[2][2])["pas_media"]), (None, 160))
+        self.assertEqual(rows[3], (None, None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "laudo-pdf-download-test-secret-key-1234567890",
+)
+
+from types import SimpleNamespace
+
+from app.api.v1.endpoints import laudos
+
+USUARIO = SimpleNamespace(id=1, nome="Vet")
+
+
+class LaudoPdfDownloadHeaderTest(unittest.TestCase):
+    def _baixar(self, filename: str):
+        pdf = SimpleNamespace(content=b"%PDF-1.4", filename=filename)
+        with patch.object(laudos, "compute_laudo_pdf_cache_key", side_effect=RuntimeError("sem cache")):
+            with patch.object(laudos, "render_laudo_pdf", return_value=pdf):
+                return laudos.gerar_pdf_laudo(7, db=MagicMock(), current_user=USUARIO)
+
+    def test_accented_filename_uses_rfc5987_filename_star(self) -> None:
+        resposta = self._baixar("Laudo_Conceição_Ł.pdf")
+
+        header = resposta.headers["content-disposition"]
+        header.encode("ascii")
+        self.assertEqual(
+            header,
+            "attachment; filename=\"Laudo_Conceicao_.pdf\"; "
+            "filename*=UTF-8''Laudo_Concei%C3%A7%C3%A3o_%C5%81.pdf",
+        )
+
+    def test_ascii_filename_keeps_the_plain_form(self) -> None:
+        resposta = self._baixar("Laudo_Thor_2026-03-02.pdf")
+        self.assertEqual(resposta.headers["content-disposition"], 'attachment; filename="Laudo_Thor_2026-03-02.pdf"')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "logistica-matriz-test-secret-key-1234567890",
+)
+
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints.logistica import listar_clinicas_proximas
+from app.core.config import settings
+from app.core.diagnostico_sql import monitorar_consultas
+from app.core.instrumentation import instalar_instrumentacao_sql
+from app.models.clinica import Clinica
+from app.models.clinica_deslocamento import ClinicaDeslocamento
+from app.services.logistica_service import (
+    clinicas_proximas,
+    estimar_deslocamento,
+    montar_matriz_heuristica,
+    recalcular_matriz_completa,
+)
+
+USUARIO = SimpleNamespace(id=1, nome="Vet")
+
+
+def _clinicas() -> list[Clinica]:
+    return [
+        Clinica(id=1, nome="Aldeota", cidade="Fortaleza", estado="CE", latitude=-3.7319, longitude=-38.5267),
+        Clinica(id=2, nome="Meireles", cidade="Fortaleza", estado="CE", latitude=-3.7250, longitude=-38.5050),
+        Clinica(id=3, nome="Messejana", cidade="Fortaleza", estado="CE", latitude=-3.8310, longitude=-38.4918),
+        Clinica(id=4, nome="Centro sem GPS", cidade="Fortaleza", estado="CE"),
+        Clinica(id=5, nome="Caucaia", cidade="Caucaia", estado="CE"),
+        Clinica(id=6, nome="Homonima", cidade="fortaleza ", estado="RN"),
+        Clinica(id=7, nome="Sem endereco"),
+    ]
+
+
+class MatrizHeuristicaTest(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = patch.object(settings, "GOOGLE_MAPS_API_KEY", "")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_matches_scalar_estimate_for_every_cell(self) -> None:
+        clinicas = _clinicas()
+        matriz = montar_matriz_heuristica(clinicas)
+
+        for i, origem in enumerate(clinicas):
+            for j, destino in enumerate(clinicas):
+                for perfil in ("comercial", "plantao"):
+                    self.assertEqual(
+                        matriz.estimativa(i, j, perfil),
+                        estimar_deslocamento(origem, destino, perfil=perfil),
+                        (origem.id, destino.id, perfil),
+                    )
+
+    def test_nearest_clinics_and_travel_time_cap(self) -> None:
+        matriz = montar_matriz_heuristica(_clinicas())
+
+        proximas = clinicas_proximas(matriz, 1, k=2)
+        self.assertEqual([item["clinica_id"] for item in proximas], [2, 3])
+        self.assertEqual(proximas[0]["fonte"], "heuristica_haversine")
+
+        todas = clinicas_proximas(matriz, 1)
+        self.assertEqual(len(todas), 6)
+        distancias = [item["distancia_km"] for item in todas]
+        self.assertEqual(distancias, sorted(distancias))
+
+        limite = proximas[1]["duracao_min"]
+        dentro = clinicas_proximas(matriz, 1, max_minutos=limite)
+        self.assertTrue(all(item["duracao_min"] <= limite for item in dentro))
+        self.assertIn(3, [item["clinica_id"] for item in dentro])
+        self.assertEqual(clinicas_proximas(matriz, 99, k=3), [])
+
+
+class RecalculoMatrizTest(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = patch.object(settings, "GOOGLE_MAPS_API_KEY", "")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/matriz.db")
+        self.addCleanup(self.engine.dispose)
+        instalar_instrumentacao_sql(self.engine)
+        for modelo in (Clinica, ClinicaDeslocamento):
+            modelo.__table__.create(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.db.close)
+        self.db.add_all(_clinicas())
+        self.db.commit()
+
+    def test_full_recalculation_reads_existing_rows_once(self) -> None:
+        primeira = recalcular_matriz_completa(self.db)
+        self.assertEqual(primeira["updated"], 7 * 7 * 2)
+
+        manual = (
+            self.db.query(ClinicaDeslocamento)
+            .filter_by(origem_clinica_id=1, destino_clinica_id=3, perfil="comercial")
+            .one()
+        )
+        manual.duracao_min = 99
+        manual.manual_override = True
+        self.db.commit()
+
+        with monitorar_consultas() as coleta:
+            segunda = recalcular_matriz_completa(self.db)
+
+        self.assertEqual(coleta.total, 2)  # clinicas + linhas existentes
+        self.assertEqual(segunda["updated"], 0)
+        self.assertEqual(segunda["skipped_manual"], 1)
+        self.assertEqual(manual.duracao_min, 99)
+
+    def test_nearest_endpoint(self) -> None:
+        resposta = listar_clinicas_proximas(
+            clinica_id=1, k=1, perfil="plantao", max_minutos=None, incluir_inativas=False,
+            db=self.db, current_user=USUARIO,
+        )
+        self.assertEqual(resposta["items"][0]["clinica_id"], 2)
+        self.assertEqual(resposta["items"][0]["nome"], "Meireles")
+
+        with self.assertRaises(HTTPException) as contexto:
+            listar_clinicas_proximas(
+                clinica_id=404, k=1, perfil="comercial", max_minutos=None, incluir_inativas=False,
+                db=self.db, current_user=USUARIO,
+            )
+        self.assertEqual(contexto.exception.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "ordens-servico-listagem-test-secret-key-1234567890",
+)
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints.ordens_servico import ORDENS_LIMITE_MAXIMO, listar_ordens, resumo_os, router
+from app.core.diagnostico_sql import monitorar_consultas
+from app.core.instrumentation import instalar_instrumentacao_sql
+from app.core.security import get_current_user
+from app.db.database import get_db
+from app.models.clinica import Clinica
+from app.models.ordem_servico import OrdemServico
+from app.models.paciente import Paciente
+from app.models.servico import Servico
+from app.models.tutor import Tutor
+
+USUARIO = SimpleNamespace(id=1, nome="Vet")
+BASE = datetime(2026, 3, 2, 9, 0)
+FILTROS = dict(status=None, clinica_id=None, servico_id=None, tipo_horario=None, data_inicio=None, data_fim=None)
+
+
+class OrdensServicoListagemTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/os.db")
+        self.addCleanup(self.engine.dispose)
+        instalar_instrumentacao_sql(self.engine)
+        for modelo in (OrdemServico, Paciente, Tutor, Clinica, Servico):
+            modelo.__table__.create(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.db.close)
+
+        status_por_indice = ["Pendente", "Pago", "Pendente", "Cancelado", "Pago", "Pendente", "Pago"]
+        self.db.add_all([Paciente(id=1, nome="Thor"), Clinica(id=1, nome="Aldeota"), Servico(id=1, nome="Eco")])
+        for indice, status_os in enumerate(status_por_indice):
+            self.db.add(
+                OrdemServico(
+                    id=indice + 1, numero_os=f"OS-{indice + 1}", agendamento_id=indice + 1, paciente_id=1,
+                    clinica_id=1, servico_id=1, status=status_os, valor_final=100 * (indice + 1),
+                    # Duas OS no mesmo instante: o id desempata.
+                    data_atendimento=BASE + timedelta(days=min(indice, 5)),
+                )
+            )
+        self.db.add(
+            OrdemServico(
+                id=8, numero_os="OS-8", agendamento_id=8, paciente_id=1, clinica_id=1, servico_id=1,
+                status="Pendente", valor_final=50, data_atendimento=datetime(2026, 4, 1, 9, 0),
+            )
+        )
+        self.db.commit()
+
+    def test_keyset_pages_cover_every_row_once(self) -> None:
+        vistos = []
+        cursor = None
+        primeira = True
+        while True:
+            resposta = listar_ordens(
+                **FILTROS, cursor=cursor, incluir_total=True, skip=0, limit=3, db=self.db, current_user=USUARIO
+            )
+            if primeira:
+                self.assertEqual(resposta["total"], 8)
+                self.assertTrue(resposta["total_exato"])
+                primeira = False
+            else:
+                self.assertIsNone(resposta["total"])
+            vistos.extend(item["id"] for item in resposta["items"])
+            cursor = resposta["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(vistos, [8, 7, 6, 5, 4, 3, 2, 1])
+        self.assertEqual(resposta["items"][-1]["paciente"], "Thor")
+
+    def test_date_range_filters_and_optional_total(self) -> None:
+        filtros = {**FILTROS, "data_inicio": "2026-03-03", "data_fim": "2026-03-04"}
+        with monitorar_consultas() as coleta:
+            resposta = listar_ordens(
+                **filtros, cursor=None, incluir_total=False, skip=0, limit=10, db=self.db, current_user=USUARIO
+            )
+        self.assertEqual(coleta.total, 1)
+        self.assertIsNone(resposta["total"])
+        self.assertEqual([item["id"] for item in resposta["items"]], [3, 2])
+
+        with self.assertRaises(HTTPException) as contexto:
+            listar_ordens(
+                **{**FILTROS, "data_inicio": "ontem"}, cursor=None, incluir_total=True, skip=0, limit=10,
+                db=self.db, current_user=USUARIO,
+            )
+        self.assertEqual(contexto.exception.status_code, 400)
+        with self.assertRaises(HTTPException):
+            listar_ordens(
+                **FILTROS, cursor="nao-e-cursor", incluir_total=True, skip=0, limit=10,
+                db=self.db, current_user=USUARIO,
+            )
+
+    def test_dashboard_is_a_single_query(self) -> None:
+        with monitorar_consultas() as coleta:
+            resumo = resumo_os(mes=3, ano=2026, db=self.db, current_user=USUARIO)
+        self.assertEqual(coleta.total, 1)
+        self.assertEqual(
+            resumo,
+            {
+                "total_os": 7,
+                "pendentes": 3,
+                "pagas": 3,
+                "canceladas": 1,
+                "valor_total_recebido": 200.0 + 500.0 + 700.0,
+                "valor_pendente": 100.0 + 300.0 + 600.0,
+            },
+        )
+
+    def test_dashboard_values_follow_month_filter(self) -> None:
+        abril = resumo_os(mes=4, ano=2026, db=self.db, current_user=USUARIO)
+        self.assertEqual((abril["pendentes"], abril["pagas"]), (1, 0))
+        self.assertEqual(abril["valor_pendente"], 50.0)
+        self.assertEqual(abril["valor_total_recebido"], 0.0)
+
+        marco = resumo_os(mes=3, ano=2026, db=self.db, current_user=USUARIO)
+        self.assertEqual(marco["valor_pendente"], 1000.0)
+
+        geral = resumo_os(mes=None, ano=None, db=self.db, current_user=USUARIO)
+        self.assertEqual(geral["pendentes"], 4)
+        self.assertEqual(geral["valor_pendente"], 1050.0)
+        self.assertEqual(geral["valor_total_recebido"], 1400.0)
+
+    def test_oversized_limit_is_rejected(self) -> None:
+        app = FastAPI()
+        app.include_router(router, prefix="/ordens-servico")
+        app.dependency_overrides[get_db] = lambda: self.db
+        app.dependency_overrides[get_current_user] = lambda: USUARIO
+        client = TestClient(app)
+
+        resposta = client.get("/ordens-servico", params={"limit": ORDENS_LIMITE_MAXIMO + 1})
+        self.assertEqual(resposta.status_code, 422)
+        resposta = client.get("/ordens-servico", params={"limit": ORDENS_LIMITE_MAXIMO})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.json()["items"]), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
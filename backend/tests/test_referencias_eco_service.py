@@ -0,0 +1,127 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "referencias-eco-test-secret-key-1234567890",
+)
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.referencia_eco import ReferenciaEco
+from app.services import referencias_eco_service
+from app.services.referencias_eco_service import PARAMETROS, construir_tabela
+
+
+def _linha(id_, peso, **faixas):
+    valores = {f"{prefixo}_{lado}": None for prefixo in PARAMETROS for lado in ("min", "max")}
+    valores.update(faixas)
+    return SimpleNamespace(id=id_, especie="Canina", peso_kg=peso, **valores)
+
+
+class TabelaReferenciaTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tabela = construir_tabela("Canina", [
+            _linha(3, 20.0, lvid_d_min=30.0, lvid_d_max=40.0),
+            _linha(1, 5.0, lvid_d_min=20.0, lvid_d_max=28.0, la_ao_min=0.8, la_ao_max=1.5),
+            _linha(2, 10.0, lvid_d_min=24.0, lvid_d_max=32.0),
+        ])
+
+    def test_nearest_lookup_matches_order_by_abs(self) -> None:
+        pesos = np.array([0.5, 5.0, 7.4, 7.6, 14.0, 16.0, 99.0])
+        esperado = [
+            min(range(3), key=lambda i: abs(self.tabela.pesos[i] - peso))
+            for peso in pesos
+        ]
+        np.testing.assert_array_equal(self.tabela.indices_mais_proximos(pesos), esperado)
+
+        referencia = self.tabela.referencia(8.0)
+        self.assertEqual((referencia["id"], referencia["peso_kg"]), (2, 10.0))
+        self.assertEqual(referencia["lvid_d_min"], 24.0)
+        self.assertIsNone(referencia["la_ao_min"])
+
+    def test_interpolation_between_bracketing_weights(self) -> None:
+        referencia = self.tabela.referencia(7.5, interpolar=True)
+
+        self.assertAlmostEqual(referencia["lvid_d_min"], 22.0)
+        self.assertAlmostEqual(referencia["lvid_d_max"], 30.0)
+        self.assertEqual(referencia["peso_kg"], 7.5)
+        # Parametro presente so num dos vizinhos usa o valor existente.
+        self.assertEqual(referencia["la_ao_max"], 1.5)
+        # Fora da tabela fica na ponta.
+        self.assertEqual(self.tabela.referencia(50.0, interpolar=True)["lvid_d_max"], 40.0)
+
+    def test_avaliar_flags_a_batch_in_one_pass(self) -> None:
+        coluna = PARAMETROS.index("lvid_d")
+        valores = np.full((3, len(PARAMETROS)), np.nan)
+        valores[:, coluna] = [19.0, 30.0, 45.0]
+
+        codigos, _, _ = self.tabela.avaliar([5.0, 10.0, 20.0], valores)
+
+        self.assertEqual(codigos[:, coluna].tolist(), [-1, 0, 1])
+        self.assertTrue((np.delete(codigos, coluna, axis=1) == -2).all())
+
+
+class ReferenciasEcoCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/ref.db")
+        self.addCleanup(self.engine.dispose)
+        ReferenciaEco.__table__.create(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+        db = self.Session()
+        db.add_all([
+            ReferenciaEco(especie="caninos", peso_kg=10.0, lvid_d_min=24.0, lvid_d_max=32.0, ao_min=12.0, ao_max=16.0),
+            ReferenciaEco(especie="Felina", peso_kg=4.0, lvid_d_min=12.0, lvid_d_max=18.0),
+        ])
+        db.commit()
+        db.close()
+
+        referencias_eco_service.invalidar_cache_referencias()
+        self.addCleanup(referencias_eco_service.invalidar_cache_referencias)
+
+    def test_avaliar_medidas_accepts_laudo_keys(self) -> None:
+        db = self.Session()
+        try:
+            resultado = referencias_eco_service.avaliar_medidas(
+                db, "Cão", 9.0, {"DIVEd": 33, "Aorta": 14, "Ao_nivel_AP": 11, "Observacao": "x"}
+            )
+        finally:
+            db.close()
+
+        self.assertEqual(resultado["DIVEd"]["status"], "Acima")
+        self.assertEqual(resultado["Aorta"]["status"], "Normal")
+        self.assertEqual(resultado["Ao_nivel_AP"]["status"], "Abaixo")
+        self.assertNotIn("Observacao", resultado)
+
+    def test_cache_is_rebuilt_after_invalidation(self) -> None:
+        db = self.Session()
+        try:
+            self.assertEqual(referencias_eco_service.buscar_referencia(db, "gato", 3.0)["lvid_d_max"], 18.0)
+
+            db.query(ReferenciaEco).filter(ReferenciaEco.especie == "Felina").update({"lvid_d_max": 19.0})
+            db.commit()
+            self.assertEqual(referencias_eco_service.buscar_referencia(db, "gato", 3.0)["lvid_d_max"], 18.0)
+
+            referencias_eco_service.invalidar_cache_referencias()
+            self.assertEqual(referencias_eco_service.buscar_referencia(db, "gato", 3.0)["lvid_d_max"], 19.0)
+            self.assertIsNone(referencias_eco_service.buscar_referencia(db, "Equina", 3.0))
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "relatorio-pendencias-jobs-test-secret-key-1234567890",
+)
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from pypdf import PdfReader
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.clinica import Clinica
+from app.models.configuracao import Configuracao
+from app.models.ordem_servico import OrdemServico
+from app.models.paciente import Paciente
+from app.models.relatorio_pendencias_job import RelatorioPendenciasJob
+from app.models.servico import Servico
+from app.models.tutor import Tutor
+from app.services import relatorio_pendencias_jobs as jobs
+
+
+class RelatorioPendenciasJobsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/pendencias.db")
+        self.addCleanup(self.engine.dispose)
+        for modelo in (OrdemServico, Paciente, Tutor, Clinica, Servico, Configuracao, RelatorioPendenciasJob):
+            modelo.__table__.create(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+        for patcher in (
+            patch.object(jobs, "SessionLocal", self.Session),
+            patch.object(jobs.settings, "UPLOAD_DIR", self.tmp_dir.name),
+            patch.object(jobs.settings, "RELATORIO_PENDENCIAS_PROCESSOS", 0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        db = self.Session()
+        db.add_all(
+            [
+                Configuracao(nome_empresa="Fort Cordis"),
+                Paciente(id=1, nome="Thor"),
+                Servico(id=1, nome="Ecocardiograma"),
+                Clinica(id=1, nome="Aldeota"),
+                Clinica(id=2, nome="Benfica"),
+                Clinica(id=3, nome="Cocó"),
+            ]
+        )
+        os_id = 0
+        for clinica_id, quantidade in ((1, 2), (2, 1), (3, 3)):
+            for indice in range(quantidade):
+                os_id += 1
+                db.add(
+                    OrdemServico(
+                        id=os_id, numero_os=f"OS-{os_id}", agendamento_id=os_id, paciente_id=1,
+                        clinica_id=clinica_id, servico_id=1, status="Pendente", valor_final=150 + indice,
+                        data_atendimento=datetime(2026, 3, 2 + indice, 9, 0),
+                    )
+                )
+        db.add(
+            OrdemServico(
+                id=99, numero_os="OS-99", agendamento_id=99, paciente_id=1, clinica_id=1, servico_id=1,
+                status="Pago", valor_final=300, data_atendimento=datetime(2026, 3, 5, 9, 0),
+            )
+        )
+        db.commit()
+        db.close()
+
+    def _executar(self, formato: str) -> RelatorioPendenciasJob:
+        db = self.Session()
+        job = RelatorioPendenciasJob(
+            requested_by_id=1, status=jobs.JOB_STATUS_PENDING, formato=formato,
+            filtros_json='{"status": "Pendente"}', tentativas=0,
+        )
+        db.add(job)
+        db.commit()
+        job_id = job.id
+        db.close()
+
+        jobs._process_relatorio_pendencias_job(job_id)
+
+        db = self.Session()
+        self.addCleanup(db.close)
+        job = db.query(RelatorioPendenciasJob).filter_by(id=job_id).one()
+        self.assertEqual(job.status, jobs.JOB_STATUS_COMPLETED, job.erro)
+        return job
+
+    def test_zip_has_one_statement_per_clinic_and_reuses_unchanged_ones(self) -> None:
+        job = self._executar("zip")
+        self.assertEqual((job.total_clinicas, job.clinicas_renderizadas, job.clinicas_reaproveitadas), (3, 3, 0))
+        with zipfile.ZipFile(job.arquivo_caminho) as pacote:
+            nomes = pacote.namelist()
+            self.assertEqual(nomes, ["001_aldeota.pdf", "002_benfica.pdf", "003_coco.pdf"])
+            self.assertTrue(pacote.read(nomes[0]).startswith(b"%PDF"))
+
+        # Nova OS so na Benfica: as outras clinicas saem do cache de extratos.
+        db = self.Session()
+        db.add(
+            OrdemServico(
+                id=100, numero_os="OS-100", agendamento_id=100, paciente_id=1, clinica_id=2, servico_id=1,
+                status="Pendente", valor_final=90, data_atendimento=datetime(2026, 3, 9, 9, 0),
+            )
+        )
+        db.commit()
+        db.close()
+
+        segundo = self._executar("zip")
+        self.assertEqual((segundo.clinicas_renderizadas, segundo.clinicas_reaproveitadas), (1, 2))
+        self.assertNotEqual(segundo.cache_key, job.cache_key)
+        self.assertTrue(os.path.exists(job.arquivo_caminho))
+
+    def test_merged_pdf_from_process_pool(self) -> None:
+        with patch.object(jobs.settings, "RELATORIO_PENDENCIAS_PROCESSOS", 2):
+            job = self._executar("pdf")
+        self.assertEqual(job.clinicas_renderizadas, 3)
+
+        extratos = sorted(Path(jobs.get_extratos_clinica_storage_dir()).glob("*.pdf"))
+        self.assertEqual(len(extratos), 3)
+        paginas_extratos = sum(len(PdfReader(str(caminho)).pages) for caminho in extratos)
+        self.assertEqual(len(PdfReader(job.arquivo_caminho).pages), paginas_extratos)
+
+    def test_submits_each_clinic_as_soon_as_its_rows_end_with_bounded_in_flight(self) -> None:
+        eventos: list[str] = []
+        contagem = {"em_voo": 0, "maximo": 0}
+        trava = threading.Lock()
+        item_original = jobs.item_relatorio
+
+        def _item(row):
+            item = item_original(row)
+            eventos.append(f"linha:{item['chave']}")
+            return item
+
+        class _PoolContado(ThreadPoolExecutor):
+            def submit(self, fn, *args):
+                with trava:
+                    contagem["em_voo"] += 1
+                    contagem["maximo"] = max(contagem["maximo"], contagem["em_voo"])
+                eventos.append(f"envio:{args[1][0]['chave']}")
+
+                def _executar():
+                    try:
+                        return fn(*args)
+                    finally:
+                        with trava:
+                            contagem["em_voo"] -= 1
+
+                return super().submit(_executar)
+
+        with (
+            patch.object(jobs, "item_relatorio", _item),
+            patch.object(jobs, "_criar_pool_processos", lambda: _PoolContado(max_workers=1)),
+            patch.object(jobs, "EXTRATOS_EM_VOO_POR_PROCESSO", 1),
+            patch.object(jobs.settings, "RELATORIO_PENDENCIAS_PROCESSOS", 1),
+        ):
+            job = self._executar("pdf")
+
+        self.assertEqual(job.clinicas_renderizadas, 3)
+        self.assertEqual(contagem["maximo"], 1)
+        # A primeira clinica vai para o pool antes de a ultima ser lida.
+        self.assertLess(eventos.index("envio:id:1"), eventos.index("linha:id:3"))
+
+    def test_no_rows_fails_the_job(self) -> None:
+        db = self.Session()
+        db.add(
+            RelatorioPendenciasJob(
+                id=50, requested_by_id=1, status=jobs.JOB_STATUS_PENDING, formato="zip",
+                filtros_json='{"status": "Cancelado"}', tentativas=0,
+            )
+        )
+        db.commit()
+        db.close()
+
+        jobs._process_relatorio_pendencias_job(50)
+
+        db = self.Session()
+        self.addCleanup(db.close)
+        job = db.query(RelatorioPendenciasJob).filter_by(id=50).one()
+        self.assertEqual(job.status, jobs.JOB_STATUS_FAILED)
+        self.assertIn("Nao ha ordens", job.erro)
+
+
+if __name__ == "__main__":
+    unittest.main()
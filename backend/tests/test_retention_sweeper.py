@@ -0,0 +1,156 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "retention-sweeper-test-secret-key-1234567890",
+)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.geo_cache import GeoCacheEntrada
+from app.models.imagem_laudo import ImagemLaudo, ImagemTemporaria
+from app.models.laudo_pdf_job import LaudoPdfJob
+from app.models.relatorio_pendencias_job import RelatorioPendenciasJob
+from app.models.xml_import_job import XmlImportJob
+from app.services import retention_sweeper
+
+
+class RetentionSweeperTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/sweep.db")
+        for model in (
+            ImagemLaudo, ImagemTemporaria, LaudoPdfJob, RelatorioPendenciasJob, XmlImportJob, GeoCacheEntrada
+        ):
+            model.__table__.create(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+        upload_patch = patch.object(retention_sweeper.settings, "UPLOAD_DIR", self.tmp_dir.name)
+        upload_patch.start()
+        self.addCleanup(upload_patch.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.addCleanup(self.engine.dispose)
+
+        self.now = datetime(2026, 3, 20, 12, 0, 0)
+
+    def _write_file(self, name: str, size: int = 10) -> str:
+        path = os.path.join(
+            retention_sweeper.laudo_pdf_jobs.get_laudo_pdf_storage_dir(),
+            name,
+        )
+        with open(path, "wb") as file_obj:
+            file_obj.write(b"x" * size)
+        old = self.now.timestamp() - retention_sweeper.ORPHAN_GRACE_SECONDS - 60
+        os.utime(path, (old, old))
+        return path
+
+    def test_sweep_removes_expired_rows_and_their_files(self) -> None:
+        expired_pdf = self._write_file("laudo_1.pdf", size=100)
+        fresh_pdf = self._write_file("laudo_2.pdf", size=50)
+
+        db = self.Session()
+        db.add_all([
+            ImagemTemporaria(nome_arquivo="a.png", conteudo=b"a", expira_em=self.now - timedelta(hours=1)),
+            ImagemTemporaria(nome_arquivo="b.png", conteudo=b"b", expira_em=self.now + timedelta(hours=1)),
+            LaudoPdfJob(
+                laudo_id=1, requested_by_id=1, status="completed", cache_key="a",
+                arquivo_caminho=expired_pdf, expires_at=self.now - timedelta(days=1),
+            ),
+            LaudoPdfJob(
+                laudo_id=2, requested_by_id=1, status="completed", cache_key="b",
+                arquivo_caminho=fresh_pdf, expires_at=self.now + timedelta(days=1),
+            ),
+            XmlImportJob(
+                requested_by_id=1, status="failed",
+                finished_at=self.now - timedelta(days=30),
+            ),
+            GeoCacheEntrada(
+                provedor="viacep", chave="velha", requisicao="{}", resposta="{}",
+                expires_at=self.now - timedelta(minutes=1),
+            ),
+            GeoCacheEntrada(
+                provedor="viacep", chave="nova", requisicao="{}", resposta="{}",
+                expires_at=self.now + timedelta(days=1),
+            ),
+        ])
+        db.commit()
+        db.close()
+
+        with patch("time.time", return_value=self.now.timestamp()):
+            report = retention_sweeper.run_retention_sweep(
+                session_factory=self.Session,
+                batch_size=1,
+                now=self.now,
+            )
+
+        self.assertEqual(report["imagens_temporarias"], 1)
+        self.assertEqual(report["laudo_pdf_jobs"], 1)
+        self.assertEqual(report["xml_import_jobs"], 1)
+        self.assertEqual(report["geo_cache"], 1)
+        self.assertEqual(report["bytes_liberados"], 100)
+        self.assertEqual(report["erros"], [])
+        self.assertFalse(os.path.exists(expired_pdf))
+        self.assertTrue(os.path.exists(fresh_pdf))
+
+        db = self.Session()
+        try:
+            self.assertEqual(db.query(ImagemTemporaria).count(), 1)
+            self.assertEqual(db.query(LaudoPdfJob).count(), 1)
+            self.assertEqual(db.query(XmlImportJob).count(), 0)
+        finally:
+            db.close()
+
+    def test_sweep_removes_orphan_files_older_than_grace_period(self) -> None:
+        orphan = self._write_file("laudo_99.pdf")
+        recent = self._write_file("laudo_100.pdf")
+        os.utime(recent, (self.now.timestamp(), self.now.timestamp()))
+
+        with patch("time.time", return_value=self.now.timestamp()):
+            report = retention_sweeper.run_retention_sweep(
+                session_factory=self.Session,
+                now=self.now,
+            )
+
+        self.assertEqual(report["arquivos_orfaos"], 1)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(recent))
+
+    def test_dry_run_reports_without_deleting(self) -> None:
+        orphan = self._write_file("laudo_7.pdf")
+        db = self.Session()
+        db.add(ImagemTemporaria(nome_arquivo="a.png", conteudo=b"a", expira_em=self.now - timedelta(days=2)))
+        db.commit()
+        db.close()
+
+        with patch("time.time", return_value=self.now.timestamp()):
+            report = retention_sweeper.run_retention_sweep(
+                session_factory=self.Session,
+                dry_run=True,
+                now=self.now,
+            )
+
+        self.assertTrue(report["dry_run"])
+        self.assertEqual(report["imagens_temporarias"], 1)
+        self.assertEqual(report["arquivos_orfaos"], 1)
+        self.assertTrue(os.path.exists(orphan))
+        db = self.Session()
+        try:
+            self.assertEqual(db.query(ImagemTemporaria).count(), 1)
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "rota-service-test-secret-key-1234567890",
+)
+
+import itertools
+import random
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints.agenda import RotaOtimizadaPayload, otimizar_rota_dia
+from app.core.diagnostico_sql import monitorar_consultas
+from app.core.instrumentation import instalar_instrumentacao_sql
+from app.models.agendamento import Agendamento
+from app.models.clinica import Clinica
+from app.models.clinica_deslocamento import ClinicaDeslocamento
+from app.models.configuracao import Configuracao
+from app.services.logistica_service import carregar_matriz_duracoes
+from app.services.rota_service import MAX_VISITAS, TEMPO_MAXIMO_BUSCA_S, Visita, otimizar_rota
+
+USUARIO = SimpleNamespace(id=1, nome="Vet")
+
+
+def _matriz_aleatoria(rng: random.Random, n: int) -> dict:
+    pontos = {cid: (rng.uniform(0, 40), rng.uniform(0, 40)) for cid in range(1, n + 1)}
+    return {
+        (o, d): int(abs(pontos[o][0] - pontos[d][0]) + abs(pontos[o][1] - pontos[d][1])) + 5
+        for o in pontos
+        for d in pontos
+        if o != d
+    }
+
+
+class OtimizarRotaTest(unittest.TestCase):
+    def test_exact_order_matches_brute_force_with_time_windows(self) -> None:
+        rng = random.Random(7)
+        for _ in range(5):
+            n = 6
+            matriz = _matriz_aleatoria(rng, n)
+            visitas = [
+                Visita(
+                    referencia=cid,
+                    clinica_id=cid,
+                    duracao_min=30,
+                    janela_fim_min=(10 * 60 if cid == 3 else None),
+                )
+                for cid in range(1, n + 1)
+            ]
+            resultado = otimizar_rota(visitas, matriz, inicio_jornada_min=8 * 60, fim_jornada_min=18 * 60)
+
+            melhor = None
+            for ordem in itertools.permutations(range(n)):
+                relogio, anterior, total, viavel = 8 * 60, None, 0, True
+                for indice in ordem:
+                    trecho = 0 if anterior is None else matriz[(visitas[anterior].clinica_id, visitas[indice].clinica_id)]
+                    total += trecho
+                    relogio += trecho
+                    if visitas[indice].janela_fim_min is not None and relogio > visitas[indice].janela_fim_min:
+                        viavel = False
+                    relogio += 30
+                    anterior = indice
+                if viavel and (melhor is None or total < melhor):
+                    melhor = total
+
+            self.assertEqual(resultado["metodo"], "exato")
+            self.assertTrue(resultado["proposta"]["viavel"])
+            self.assertEqual(resultado["proposta"]["deslocamento_total_min"], melhor)
+            etapa_3 = next(e for e in resultado["proposta"]["etapas"] if e["clinica_id"] == 3)
+            self.assertLessEqual(etapa_3["inicio_min"], 10 * 60)
+
+    def test_waits_for_window_opening(self) -> None:
+        matriz = {(1, 2): 10, (2, 1): 10}
+        visitas = [
+            Visita(referencia="a", clinica_id=1, duracao_min=30),
+            Visita(referencia="b", clinica_id=2, duracao_min=30, janela_inicio_min=9 * 60),
+        ]
+        proposta = otimizar_rota(visitas, matriz, inicio_jornada_min=8 * 60, fim_jornada_min=12 * 60)["proposta"]
+
+        self.assertEqual([e["referencia"] for e in proposta["etapas"]], ["a", "b"])
+        self.assertEqual(proposta["etapas"][1]["inicio_min"], 9 * 60)
+        self.assertEqual(proposta["etapas"][1]["espera_min"], 9 * 60 - (8 * 60 + 40))
+
+    def test_large_day_uses_heuristic_fast_and_never_worse_than_current(self) -> None:
+        rng = random.Random(11)
+        n = 30
+        matriz = _matriz_aleatoria(rng, n)
+        visitas = [Visita(referencia=cid, clinica_id=cid, duracao_min=10) for cid in range(1, n + 1)]
+
+        inicio = time.perf_counter()
+        resultado = otimizar_rota(visitas, matriz, inicio_jornada_min=7 * 60, fim_jornada_min=23 * 60)
+        decorrido = time.perf_counter() - inicio
+
+        self.assertEqual(resultado["metodo"], "heuristica")
+        self.assertLess(decorrido, 1.0)
+        self.assertGreater(resultado["economia_min"], 0)
+        self.assertEqual(sorted(e["clinica_id"] for e in resultado["proposta"]["etapas"]), list(range(1, n + 1)))
+
+    def test_max_payload_size_stays_within_time_budget(self) -> None:
+        self.assertEqual(RotaOtimizadaPayload.model_fields["visitas"].metadata[0].max_length, MAX_VISITAS)
+        rng = random.Random(7)
+        n = MAX_VISITAS
+        matriz = _matriz_aleatoria(rng, n)
+        visitas = [
+            Visita(
+                referencia=cid, clinica_id=cid, duracao_min=5,
+                janela_inicio_min=7 * 60 + cid * 5, janela_fim_min=7 * 60 + cid * 5 + 240,
+            )
+            for cid in range(1, n + 1)
+        ]
+
+        inicio = time.perf_counter()
+        resultado = otimizar_rota(visitas, matriz, inicio_jornada_min=7 * 60, fim_jornada_min=23 * 60)
+        decorrido = time.perf_counter() - inicio
+
+        self.assertEqual(resultado["metodo"], "heuristica")
+        self.assertLess(decorrido, TEMPO_MAXIMO_BUSCA_S + 0.3)
+        self.assertLessEqual(
+            (resultado["proposta"]["violacao_min"], resultado["proposta"]["deslocamento_total_min"]),
+            (resultado["atual"]["violacao_min"], resultado["atual"]["deslocamento_total_min"]),
+        )
+        self.assertEqual(sorted(e["clinica_id"] for e in resultado["proposta"]["etapas"]), list(range(1, n + 1)))
+
+
+class RotaDoDiaTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/rota.db")
+        self.addCleanup(self.engine.dispose)
+        instalar_instrumentacao_sql(self.engine)
+        for modelo in (Agendamento, Clinica, ClinicaDeslocamento, Configuracao):
+            modelo.__table__.create(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.db.close)
+
+        self.db.add_all([
+            Clinica(id=1, nome="Aldeota", latitude=-3.7319, longitude=-38.5267),
+            Clinica(id=2, nome="Messejana", latitude=-3.8310, longitude=-38.4918),
+            Clinica(id=3, nome="Meireles", latitude=-3.7250, longitude=-38.5050),
+        ])
+        # Matriz gravada so entre 1 e 3; os demais pares sao estimados.
+        self.db.add_all([
+            ClinicaDeslocamento(origem_clinica_id=1, destino_clinica_id=3, perfil="comercial", duracao_min=6),
+            ClinicaDeslocamento(origem_clinica_id=3, destino_clinica_id=1, perfil="comercial", duracao_min=6),
+        ])
+        # Ordem atual vai e volta de Messejana: 1 -> 2 -> 3.
+        for agendamento_id, clinica_id, hora in ((1, 1, 8), (2, 2, 9), (3, 3, 10)):
+            self.db.add(Agendamento(
+                id=agendamento_id, clinica_id=clinica_id, status="Agendado",
+                inicio=datetime(2026, 3, 2, hora, 0), fim=datetime(2026, 3, 2, hora, 30),
+            ))
+        self.db.commit()
+
+    def test_matrix_is_loaded_in_one_query_per_table(self) -> None:
+        with monitorar_consultas() as coleta:
+            matriz = carregar_matriz_duracoes(self.db, [1, 2, 3])
+
+        self.assertEqual(coleta.total, 2)  # matriz + clinicas para os pares faltantes
+        self.assertEqual(matriz[(1, 3)], 6)
+        self.assertEqual(len(matriz), 6)
+        self.assertGreater(matriz[(1, 2)], matriz[(1, 3)])
+
+    def test_day_route_proposes_shorter_order(self) -> None:
+        resposta = otimizar_rota_dia(
+            payload=RotaOtimizadaPayload(data="2026-03-02"), db=self.db, current_user=USUARIO
+        )
+
+        self.assertEqual(resposta["metodo"], "exato")
+        self.assertTrue(resposta["viavel"])
+        self.assertGreater(resposta["economia_min"], 0)
+        ordem = [item["clinica_id"] for item in resposta["items"]]
+        self.assertIn(ordem, ([1, 3, 2], [3, 1, 2], [2, 3, 1], [2, 1, 3]))
+        self.assertEqual(resposta["items"][0]["inicio"], "08:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "runtime-checks-cache-test-secret-key-1234567890",
+)
+
+from fastapi.testclient import TestClient
+
+from app.core import runtime_checks
+from app.core.config import settings
+from migrations import runner
+
+
+def _relatorio(ready: bool = True) -> dict:
+    return {
+        "status": "healthy",
+        "ready": ready,
+        "database": {"connected": True, "status": "connected", "error": None},
+        "migrations": {},
+        "security": {"secret_key": {"configured": True, "strong": True, "warning": None}},
+        "compatibility_modes": {},
+        "integrations": {},
+        "warnings": [],
+        "startup_enforced_issues": [],
+        "readiness_issues": [] if ready else ["Banco indisponivel."],
+    }
+
+
+class RuntimeReportCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        runtime_checks.clear_runtime_report_cache()
+        self.addCleanup(runtime_checks.clear_runtime_report_cache)
+
+    def _esperar_renovacao(self) -> None:
+        for _ in range(200):
+            if not runtime_checks._REPORT_CACHE._refreshing:
+                return
+            time.sleep(0.01)
+        self.fail("renovacao em segundo plano nao terminou")
+
+    def test_serves_cached_report_and_refreshes_in_background_after_ttl(self) -> None:
+        relatorios = [_relatorio(ready=True), _relatorio(ready=False)]
+        with patch.object(runtime_checks, "build_runtime_report", side_effect=relatorios) as build, patch.object(
+            settings, "HEALTH_CACHE_TTL_SECONDS", 60
+        ):
+            self.assertTrue(runtime_checks.get_cached_runtime_report()["ready"])
+            for _ in range(5):
+                self.assertTrue(runtime_checks.get_cached_runtime_report()["ready"])
+            self.assertEqual(build.call_count, 1)
+
+            with patch.object(settings, "HEALTH_CACHE_TTL_SECONDS", 0):
+                # Expirado: devolve o antigo e renova em segundo plano.
+                self.assertTrue(runtime_checks.get_cached_runtime_report()["ready"])
+                self._esperar_renovacao()
+            self.assertFalse(runtime_checks.get_cached_runtime_report()["ready"])
+            self.assertEqual(build.call_count, 2)
+
+    def test_report_not_refreshed_for_too_long_is_not_ready(self) -> None:
+        with patch.object(runtime_checks, "build_runtime_report", return_value=_relatorio()):
+            runtime_checks.get_cached_runtime_report()
+        runtime_checks._REPORT_CACHE._built_at -= 3600
+        runtime_checks._REPORT_CACHE._refreshing = True  # renovacao travada
+
+        relatorio = runtime_checks.get_cached_runtime_report()
+
+        self.assertFalse(relatorio["ready"])
+        self.assertIn("desatualizado", relatorio["readiness_issues"][-1])
+
+    def test_health_endpoints_do_not_rebuild_report_per_request(self) -> None:
+        from app.main import app
+
+        client = TestClient(app)
+        with patch.object(runtime_checks, "build_runtime_report", return_value=_relatorio()) as build:
+            self.assertEqual(client.get("/live").json(), {"status": "alive"})
+            self.assertEqual(build.call_count, 0)
+            for _ in range(3):
+                self.assertEqual(client.get("/health").status_code, 200)
+                self.assertEqual(client.get("/ready").status_code, 200)
+        self.assertEqual(build.call_count, 1)
+
+
+class MigrationDiscoveryCacheTest(unittest.TestCase):
+    def test_migration_modules_are_loaded_once(self) -> None:
+        runner.clear_migration_cache()
+        self.addCleanup(runner.clear_migration_cache)
+
+        with patch.object(runner, "_load_migration", wraps=runner._load_migration) as carregar:
+            primeira = runner.list_migrations()
+            segunda = runner.list_migrations()
+
+        self.assertGreater(len(primeira), 0)
+        self.assertEqual([m.version for m in primeira], [m.version for m in segunda])
+        self.assertEqual(carregar.call_count, len(primeira))
+
+
+if __name__ == "__main__":
+    unittest.main()
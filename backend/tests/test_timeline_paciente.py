@@ -0,0 +1,174 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./fortcordis.db")
+os.environ.setdefault(
+    "SECRET_KEY",
+    "timeline-paciente-test-secret-key-1234567890",
+)
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints.pacientes import linha_do_tempo_paciente
+from app.core.diagnostico_sql import monitorar_consultas
+from app.core.instrumentation import instalar_instrumentacao_sql
+from app.models.agendamento import Agendamento
+from app.models.atendimento_clinico import AtendimentoClinico
+from app.models.financeiro import Transacao
+from app.models.laudo import Laudo
+from app.models.ordem_servico import OrdemServico
+from app.models.paciente import Paciente
+from app.services.timeline_service import momento_para_coluna, normalizar_momento
+
+USUARIO = SimpleNamespace(id=1, nome="Vet")
+MODELOS = (Agendamento, AtendimentoClinico, Transacao, Laudo, OrdemServico, Paciente)
+BASE = datetime(2026, 3, 2, 9, 0)
+
+
+class TimelinePacienteTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.engine = create_engine(f"sqlite:///{self.tmp_dir.name}/timeline.db")
+        self.addCleanup(self.engine.dispose)
+        instalar_instrumentacao_sql(self.engine)
+        for modelo in MODELOS:
+            modelo.__table__.create(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.db.close)
+        self._popular()
+
+    def _popular(self) -> None:
+        db = self.db
+        db.add_all([Paciente(id=1, nome="Thor"), Paciente(id=2, nome="Luna")])
+        for dia in range(3):
+            momento = BASE + timedelta(days=dia)
+            db.add_all([
+                Agendamento(id=10 + dia, paciente_id=1, inicio=momento, fim=momento, servico="Eco", status="Realizado"),
+                AtendimentoClinico(
+                    id=20 + dia, paciente_id=1, tutor_id=1, clinica_id=1, veterinario_id=1,
+                    data_atendimento=momento + timedelta(minutes=10), queixa_principal="Sopro",
+                ),
+                # Laudo no mesmo instante que a OS: a fonte desempata.
+                Laudo(
+                    id=30 + dia, paciente_id=1, veterinario_id=1, tipo="exame", titulo=f"Eco {dia}",
+                    data_exame=momento + timedelta(minutes=30), data_laudo=BASE,
+                ),
+                OrdemServico(
+                    id=40 + dia, numero_os=f"OS-{dia}", agendamento_id=10 + dia, paciente_id=1,
+                    clinica_id=1, servico_id=1, data_atendimento=momento + timedelta(minutes=30),
+                    valor_final=250,
+                ),
+                Transacao(
+                    id=50 + dia, paciente_id=1, tipo="entrada", categoria="consulta", valor=250,
+                    valor_final=250, descricao=f"Recebimento {dia}",
+                    data_transacao=momento + timedelta(hours=1),
+                ),
+            ])
+        db.add(Agendamento(id=99, paciente_id=2, inicio=BASE, fim=BASE, servico="Outro"))
+        db.commit()
+
+    def _timeline(self, **kwargs):
+        parametros = dict(paciente_id=1, cursor=None, limit=50, tipos=None)
+        parametros.update(kwargs)
+        return linha_do_tempo_paciente(db=self.db, current_user=USUARIO, **parametros)
+
+    def test_merges_sources_in_descending_order_with_one_query_per_source(self) -> None:
+        with monitorar_consultas() as coleta:
+            resposta = self._timeline()
+
+        self.assertEqual(coleta.total, 6)  # paciente + 5 fontes
+        self.assertEqual(resposta["paciente"], {"id": 1, "nome": "Thor"})
+        self.assertIsNone(resposta["next_cursor"])
+        chaves = [(item["tipo"], item["id"]) for item in resposta["items"]]
+        self.assertEqual(len(chaves), 15)
+        self.assertEqual(
+            chaves[:5],
+            [("transacao", 52), ("ordem_servico", 42), ("laudo", 32), ("atendimento", 22), ("agendamento", 12)],
+        )
+        momentos = [item["momento"] for item in resposta["items"]]
+        self.assertEqual(momentos, sorted(momentos, reverse=True))
+        self.assertEqual(resposta["items"][1]["titulo"], "OS OS-2")
+        self.assertEqual(resposta["items"][0]["detalhes"]["valor_final"], 250.0)
+
+    def test_keyset_pages_cover_every_event_once(self) -> None:
+        completa = [(item["tipo"], item["id"]) for item in self._timeline()["items"]]
+
+        vistos = []
+        cursor = None
+        while True:
+            with monitorar_consultas() as coleta:
+                resposta = self._timeline(limit=4, cursor=cursor)
+            self.assertEqual(coleta.total, 6)
+            vistos.extend((item["tipo"], item["id"]) for item in resposta["items"])
+            cursor = resposta["next_cursor"]
+            if not cursor:
+                break
+
+        self.assertEqual(vistos, completa)
+
+    def test_filters_sources_and_rejects_bad_input(self) -> None:
+        resposta = self._timeline(tipos="laudo,agendamento")
+        self.assertEqual({item["tipo"] for item in resposta["items"]}, {"laudo", "agendamento"})
+        self.assertEqual(len(resposta["items"]), 6)
+
+        for kwargs in ({"tipos": "receita"}, {"cursor": "nao-e-um-cursor"}):
+            with self.assertRaises(HTTPException) as contexto:
+                self._timeline(**kwargs)
+            self.assertEqual(contexto.exception.status_code, 400)
+
+        with self.assertRaises(HTTPException) as contexto:
+            self._timeline(paciente_id=404)
+        self.assertEqual(contexto.exception.status_code, 404)
+
+    def test_cursor_keeps_timezone_outside_sqlite(self) -> None:
+        fortaleza = timezone(timedelta(hours=-3))
+        momento = normalizar_momento(datetime(2026, 3, 2, 9, 0, tzinfo=fortaleza))
+        self.assertEqual(momento, datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc))
+        self.assertEqual(normalizar_momento(datetime(2026, 3, 2, 12, 0)), momento)
+
+        self.assertEqual(momento_para_coluna(momento, "postgresql").utcoffset(), timedelta(0))
+        self.assertEqual(momento_para_coluna(momento, "sqlite"), "2026-03-02 12:00:00.000")
+
+    def test_pages_rows_with_database_default_timestamps(self) -> None:
+        # func.now() no SQLite grava 'YYYY-MM-DD HH:MM:SS', sem fracao.
+        self.db.add(Paciente(id=3, nome="Mel"))
+        for transacao_id in (61, 62, 63):
+            self.db.add(Transacao(
+                id=transacao_id, paciente_id=3, tipo="entrada", categoria="consulta", valor=10,
+                valor_final=10, descricao=f"Padrao {transacao_id}",
+            ))
+        self.db.add(Transacao(
+            id=64, paciente_id=3, tipo="entrada", categoria="consulta", valor=10, valor_final=10,
+            descricao="Antiga", data_transacao=datetime(2020, 1, 1, 8, 0, 0, 250000),
+        ))
+        self.db.commit()
+        armazenado = self.db.execute(text("SELECT data_transacao FROM transacoes WHERE id = 61")).scalar()
+        self.assertEqual(len(armazenado), 19)
+
+        vistos = []
+        cursor = None
+        for _ in range(5):
+            resposta = self._timeline(paciente_id=3, limit=2, cursor=cursor)
+            vistos.extend(item["id"] for item in resposta["items"])
+            cursor = resposta["next_cursor"]
+            if not cursor:
+                break
+        self.assertIsNone(cursor)
+        self.assertEqual(vistos, [63, 62, 61, 64])
+
+
+if __name__ == "__main__":
+    unittest.main()
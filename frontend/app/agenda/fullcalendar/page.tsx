@@ -24,6 +24,7 @@ import { CalendarDays, ChevronDown, Download, FileText, RefreshCw, Stethoscope,
 import DashboardLayout from "../../layout-dashboard";
 import NovoAgendamentoModal from "../NovoAgendamentoModal";
 import api from "@/lib/axios";
+import { listarTodasOrdensServico } from "@/lib/ordens-servico";
 import { montarToastAgendaRealtime } from "@/lib/agenda-realtime-toast";
 import { useAgendaRealtime, type AgendaRealtimePayload } from "@/lib/useAgendaRealtime";
 import {
@@ -583,15 +584,13 @@ export default function AgendaFullCalendarPage() {
       }
 
       try {
-        const params = new URLSearchParams();
-        params.append("limit", "2000");
+        const filtros: Record<string, string> = {};
         if (periodo.inicio && periodo.fim) {
-          params.append("data_inicio", periodo.inicio);
-          params.append("data_fim", periodo.fim);
+          filtros.data_inicio = periodo.inicio;
+          filtros.data_fim = periodo.fim;
         }
 
-        const response = await api.get(`/ordens-servico?${params.toString()}`);
-        const listaOs = Array.isArray(response.data?.items) ? response.data.items : [];
+        const listaOs = await listarTodasOrdensServico(filtros);
 
         const mapa: Record<number, OrdemServicoResumo> = {};
         for (const os of listaOs) {
@@ -4,6 +4,7 @@ import { Fragment, useCallback, useEffect, useMemo, useRef, useState } from "rea
 import { useRouter } from "next/navigation";
 import DashboardLayout from "../layout-dashboard";
 import api from "@/lib/axios";
+import { listarTodasOrdensServico } from "@/lib/ordens-servico";
 import { montarToastAgendaRealtime } from "@/lib/agenda-realtime-toast";
 import { useAgendaRealtime, type AgendaRealtimePayload } from "@/lib/useAgendaRealtime";
 import {
@@ -538,17 +539,13 @@ export default function AgendaPage() {
     }
 
     try {
-      const params = new URLSearchParams();
-      params.append("status", "Pago");
-      params.append("limit", "2000");
-
+      const filtros: Record<string, string> = { status: "Pago" };
       if (periodoConsulta.inicio && periodoConsulta.fim) {
-        params.append("data_inicio", periodoConsulta.inicio);
-        params.append("data_fim", periodoConsulta.fim);
+        filtros.data_inicio = periodoConsulta.inicio;
+        filtros.data_fim = periodoConsulta.fim;
       }
 
-      const respOs = await api.get(`/ordens-servico?${params.toString()}`);
-      const listaOs = respOs.data?.items || [];
+      const listaOs = await listarTodasOrdensServico(filtros);
 
       const mapa: Record<number, OrdemServicoPagamento> = {};
       for (const os of listaOs) {
@@ -274,6 +274,29 @@ const emptyForm = (): AtendimentoForm => ({
   anexos: [],
 });
 
+type PdfJobAtendimento = { job_id: number; status: string; erro?: string | null; download_url?: string | null };
+
+const PDF_JOB_TIMEOUT_MS = 60000;
+
+// O download responde 202 com o job quando o PDF ainda esta sendo gerado:
+// acompanha o job (respeitando Retry-After) ate ter a URL do arquivo.
+const aguardarPdfAtendimento = async (jobId: number, retryAfterSegundos: number): Promise<string> => {
+  const inicio = Date.now();
+  let espera = retryAfterSegundos;
+  while (Date.now() - inicio < PDF_JOB_TIMEOUT_MS) {
+    await new Promise((resolve) => window.setTimeout(resolve, espera * 1000));
+    const { data: job } = await api.get<PdfJobAtendimento>(`/atendimentos/pdf-jobs/${jobId}`);
+    if (job.status === "failed") {
+      throw new Error(job.erro || "Falha ao gerar PDF.");
+    }
+    if (job.download_url) {
+      return job.download_url.replace(/^\/api\/v1/, "");
+    }
+    espera = 1;
+  }
+  throw new Error("Tempo limite excedido ao preparar PDF.");
+};
+
 export default function AtendimentoPage() {
   const router = useRouter();
   const [loading, setLoading] = useState(true);
@@ -762,7 +785,13 @@ export default function AtendimentoPage() {
     }
 
     try {
-      const response = await api.get(`/atendimentos/${selecionado}/${tipo}/pdf`, { responseType: "blob" });
+      let response = await api.get(`/atendimentos/${selecionado}/${tipo}/pdf`, { responseType: "blob" });
+      if (response.status === 202) {
+        const job = JSON.parse(await (response.data as Blob).text()) as PdfJobAtendimento;
+        const retryAfter = Number(response.headers?.["retry-after"]) || 2;
+        const downloadUrl = await aguardarPdfAtendimento(job.job_id, retryAfter);
+        response = await api.get(downloadUrl, { responseType: "blob" });
+      }
       const blob = new Blob([response.data], { type: "application/pdf" });
       const url = window.URL.createObjectURL(blob);
       const link = document.createElement("a");
@@ -170,6 +170,7 @@ export default function ConfiguracoesPage() {
   const [matrizPermissoes, setMatrizPermissoes] = useState<MatrizPermissaoPapel[]>([]);
   const [auditoriaItens, setAuditoriaItens] = useState<AuditoriaEventoItem[]>([]);
   const [auditoriaTotal, setAuditoriaTotal] = useState(0);
+  const [auditoriaTotalExato, setAuditoriaTotalExato] = useState(true);
   const [auditoriaModulos, setAuditoriaModulos] = useState<string[]>([]);
   const [auditoriaAcoes, setAuditoriaAcoes] = useState<string[]>([]);
   const [carregandoAuditoria, setCarregandoAuditoria] = useState(false);
@@ -492,6 +493,7 @@ export default function ConfiguracoesPage() {
       const payload = resp?.data || {};
       setAuditoriaItens(Array.isArray(payload.items) ? payload.items : []);
       setAuditoriaTotal(Number(payload.total || 0));
+      setAuditoriaTotalExato(payload.total_exato !== false);
       setAuditoriaModulos(Array.isArray(payload.modulos) ? payload.modulos : []);
       setAuditoriaAcoes(Array.isArray(payload.acoes) ? payload.acoes : []);
     } catch (error: any) {
@@ -1772,7 +1774,8 @@ export default function ConfiguracoesPage() {
                   Limpar filtros
                 </button>
                 <div className="ml-auto text-sm text-gray-500 self-center">
-                  {auditoriaTotal} registro(s)
+                  {auditoriaTotal}
+                  {auditoriaTotalExato ? "" : "+"} registro(s)
                 </div>
               </div>
 
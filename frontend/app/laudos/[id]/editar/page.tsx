@@ -155,6 +155,7 @@ interface Imagem {
   ordem: number;
   descricao: string;
   url: string;
+  url_thumb?: string;
   dataUrl?: string;
   tamanho: number;
 }
@@ -903,7 +904,7 @@ export default function EditarLaudoPage({ params }: { params: { id: string } })
         const imagensComDataUrl = await Promise.all(
           laudoData.imagens.map(async (img: Imagem) => {
             try {
-              const resp = await api.get(img.url, {
+              const resp = await api.get(img.url_thumb || img.url, {
                 responseType: 'blob',
                 headers: token ? { Authorization: `Bearer ${token}` } : {}
               });
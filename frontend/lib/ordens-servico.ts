@@ -0,0 +1,29 @@
+import api from "@/lib/axios";
+
+// Mesmo teto do backend (ORDENS_LIMITE_MAXIMO): acima disso a API responde 422.
+const ORDENS_POR_PAGINA = 500;
+
+/**
+ * Todas as ordens de servico que atendem aos filtros, seguindo `next_cursor`
+ * pagina a pagina.
+ */
+export async function listarTodasOrdensServico(filtros: Record<string, string>): Promise<any[]> {
+  const itens: any[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const params = new URLSearchParams(filtros);
+    params.set("limit", String(ORDENS_POR_PAGINA));
+    params.set("incluir_total", "false");
+    if (cursor) {
+      params.set("cursor", cursor);
+    }
+
+    const response = await api.get(`/ordens-servico?${params.toString()}`);
+    const pagina = Array.isArray(response.data?.items) ? response.data.items : [];
+    itens.push(...pagina);
+    cursor = response.data?.next_cursor || null;
+  } while (cursor);
+
+  return itens;
+}